@@ -0,0 +1,40 @@
+"""
+配置查找开销基准测试
+对比 Config.get 逐级查找、带缓存的 Config.get 与类型化快照的属性访问
+"""
+
+import sys
+import timeit
+from pathlib import Path
+
+# 添加src目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / 'src'))
+
+from yoloface.config import Config
+
+
+def main():
+    """运行基准测试"""
+    config_path = project_root / 'config.yaml'
+    config = Config(str(config_path) if config_path.exists() else None)
+    settings = config.settings
+    number = 200000
+    
+    cases = [
+        ('逐级查找 (_lookup)', lambda: config._lookup('detection.haar.scale_factor')),
+        ('Config.get (缓存)', lambda: config.get('detection.haar.scale_factor', 1.1)),
+        ('Config.get 整段字典', lambda: config.get('output', {}).get('save_frames', False)),
+        ('settings 属性访问', lambda: settings.detection.haar.scale_factor),
+        ('settings.output 属性访问', lambda: settings.output.save_frames),
+    ]
+    
+    print(f"每项执行 {number} 次，取5轮最小值")
+    print(f"{'方式':<28}{'ns/次':>10}")
+    for name, func in cases:
+        best = min(timeit.repeat(func, number=number, repeat=5))
+        print(f"{name:<28}{best / number * 1e9:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
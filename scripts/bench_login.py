@@ -0,0 +1,84 @@
+"""
+登录延迟基准测试
+按用户数生成用户数据，对比JSON存储（内存缓存命中 / 文件变化后重新加载）与SQLite存储的 login_user 延迟
+"""
+
+import argparse
+import json
+import logging
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 添加src目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / 'src'))
+
+from yoloface.utils.db_manager import DatabaseManager
+
+
+def make_users_file(path: Path, count: int):
+    """生成包含 count 个用户的 users.json（密码均为 password<编号>）"""
+    users = [
+        {
+            'id': i + 1,
+            'username': f'user{i:06d}',
+            'password': DatabaseManager.hash_password(f'password{i}'),
+            'created_at': '2024-01-01 00:00:00'
+        }
+        for i in range(count)
+    ]
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'users': users}, f)
+
+
+def time_logins(db: DatabaseManager, count: int, rounds: int, touch=None) -> float:
+    """随机用户登录 rounds 次的平均耗时（毫秒），touch 在每次登录前调用"""
+    rng = random.Random(0)
+    elapsed = 0.0
+    for _ in range(rounds):
+        i = rng.randrange(count)
+        if touch is not None:
+            touch()
+        start = time.perf_counter()
+        ok, message = db.login_user(f'user{i:06d}', f'password{i}')
+        elapsed += time.perf_counter() - start
+        assert ok, message
+    return elapsed / rounds * 1000.0
+
+
+def main():
+    """运行基准测试"""
+    parser = argparse.ArgumentParser(description='登录延迟随用户数变化的基准测试')
+    parser.add_argument('--counts', type=int, nargs='+', default=[100, 1000, 10000, 50000], help='用户数')
+    parser.add_argument('--rounds', type=int, default=200, help='每项登录次数')
+    args = parser.parse_args()
+    
+    # 屏蔽每次登录的日志
+    logging.getLogger('yoloface.utils.db_manager').setLevel(logging.WARNING)
+    
+    print(f"{'用户数':>8}{'JSON缓存(ms)':>16}{'JSON重新加载(ms)':>20}{'SQLite(ms)':>14}")
+    for count in args.counts:
+        with tempfile.TemporaryDirectory() as tmp:
+            json_file = Path(tmp) / 'users.json'
+            make_users_file(json_file, count)
+            
+            json_db = DatabaseManager(str(json_file), backend='json')
+            # 首次加载不计入缓存命中的耗时
+            json_db.user_exists('user000000')
+            cached = time_logins(json_db, count, args.rounds)
+            # 每次登录前使缓存失效，相当于改造前每次调用都读取并解析文件
+            reload_rounds = max(1, min(args.rounds, 20))
+            reloaded = time_logins(json_db, count, reload_rounds, touch=lambda: setattr(json_db, '_stamp', None))
+            
+            sqlite_db = DatabaseManager(str(json_file), backend='sqlite', db_file=str(Path(tmp) / 'users.db'))
+            indexed = time_logins(sqlite_db, count, args.rounds)
+            sqlite_db.disconnect()
+        
+        print(f"{count:>8}{cached:>16.3f}{reloaded:>20.3f}{indexed:>14.3f}")
+
+
+if __name__ == '__main__':
+    main()
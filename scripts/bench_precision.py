@@ -0,0 +1,173 @@
+"""
+模型精度变体基准测试
+对比 FP32 与量化变体（model.int8.onnx / model.fp16.onnx）在 OpenCV DNN 下的延迟与结果一致性：
+检测器按各自的后处理解码出检测框后统计IoU匹配率，分类器统计top-1一致率
+
+用法:
+    python scripts/bench_precision.py --model yolo_fastestv2/model.onnx --kind fastestv2 --images data/calib
+    python scripts/bench_precision.py --model yolo11n.onnx --kind yolo11 --images data/calib
+    python scripts/bench_precision.py --model models/gender_net.onnx --kind gender --precision fp16
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# 添加src目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / 'src'))
+
+from yoloface.detectors.fastestv2_detector import decode_output
+from yoloface.detectors.model_variants import variant_path
+from yoloface.detectors.preprocess import BlobPreprocessor
+
+IMAGE_SUFFIXES = ('.jpg', '.jpeg', '.png', '.bmp')
+
+# 各检测器的默认输入尺寸
+DEFAULT_IMGSZ = {'fastestv2': 416, 'yolo11': 640}
+
+
+def load_images(image_dir, count, size, seed=0):
+    """读取测试图片，未提供目录时生成随机图像"""
+    if image_dir:
+        paths = sorted(p for p in Path(image_dir).rglob('*') if p.suffix.lower() in IMAGE_SUFFIXES)
+        images = [cv2.imread(str(p)) for p in paths[:count]]
+        images = [img for img in images if img is not None]
+        if images:
+            return images
+        print(f"目录中没有可用图片: {image_dir}，使用随机图像")
+    rng = np.random.default_rng(seed)
+    return [rng.integers(0, 256, (size, size, 3), dtype=np.uint8) for _ in range(count)]
+
+
+def run_model(model_path, blobs, warmup=2):
+    """逐张前向推理，返回 (输出列表, 每张耗时ms)"""
+    net = cv2.dnn.readNetFromONNX(model_path)
+    net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+    net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+    for blob in blobs[:warmup]:
+        net.setInput(blob)
+        net.forward()
+    outputs, timings = [], []
+    for blob in blobs:
+        start = time.perf_counter()
+        net.setInput(blob)
+        outputs.append(net.forward().copy())
+        timings.append((time.perf_counter() - start) * 1000.0)
+    return outputs, np.array(timings)
+
+
+def decode_yolo11(output, conf_threshold, letterbox, iou_threshold=0.7):
+    """
+    按 ultralytics 的后处理解码导出的 YOLO11 ONNX 输出：
+    [1, 4+类别数, N]，前4行为网络输入坐标系下的 (cx, cy, w, h)，其余为各类别得分，最后做NMS
+    """
+    rows = output.reshape(output.shape[-2], output.shape[-1]).T
+    if rows.shape[1] < 5:
+        return np.empty((0, 4))
+    scores = rows[:, 4:].max(axis=1)
+    rows, scores = rows[scores > conf_threshold], scores[scores > conf_threshold]
+    centers, sizes = rows[:, 0:2], rows[:, 2:4]
+    boxes = np.hstack([centers - sizes / 2, centers + sizes / 2])
+    keep = cv2.dnn.NMSBoxes(
+        np.hstack([boxes[:, :2], sizes]).tolist(), scores.tolist(), conf_threshold, iou_threshold
+    )
+    keep = np.asarray(keep, dtype=np.int64).reshape(-1)
+    return letterbox.to_source(boxes[keep])
+
+
+def decode_boxes(kind, output, conf_threshold, imgsz, letterbox):
+    """使用与运行时检测器一致的后处理解码检测框（原图坐标 x1, y1, x2, y2）"""
+    if kind == 'yolo11':
+        return decode_yolo11(output, conf_threshold, letterbox)
+    return decode_output(output, conf_threshold, imgsz, letterbox)[:, :4]
+
+
+def box_match_rate(reference, candidate, iou_threshold=0.5):
+    """参考框中能在候选框里找到 IoU>=阈值 匹配的比例"""
+    if len(reference) == 0:
+        return 1.0 if len(candidate) == 0 else 0.0
+    if len(candidate) == 0:
+        return 0.0
+    a = reference[:, None, :]
+    b = candidate[None, :, :]
+    inter_w = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    inter_h = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = inter_w * inter_h
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    iou = inter / np.maximum(area_a + area_b - inter, 1e-9)
+    return float((iou.max(axis=1) >= iou_threshold).mean())
+
+
+def main():
+    """运行基准测试"""
+    parser = argparse.ArgumentParser(description='模型精度变体基准测试')
+    parser.add_argument('--model', type=str, required=True, help='FP32 ONNX模型路径')
+    parser.add_argument('--variant', type=str, default=None, help='变体路径，默认按约定命名')
+    parser.add_argument('--precision', type=str, choices=['int8', 'fp16'], default='int8', help='变体精度')
+    parser.add_argument('--kind', type=str, choices=['fastestv2', 'yolo11', 'gender'], default='fastestv2',
+                        help='模型类型，决定预处理与输出解码方式')
+    parser.add_argument('--images', type=str, default=None, help='测试图片目录（默认随机图像）')
+    parser.add_argument('--num-images', type=int, default=50, help='测试图片数量')
+    parser.add_argument('--imgsz', type=int, default=None, help='检测器输入尺寸（默认 FastestV2 416，YOLO11 640）')
+    parser.add_argument('--input-size', type=int, nargs=2, default=[227, 227], help='分类器输入尺寸 (宽 高)')
+    parser.add_argument('--conf', type=float, default=0.5, help='检测器置信度阈值')
+    args = parser.parse_args()
+
+    variant = args.variant or variant_path(args.model, args.precision)
+    for path in (args.model, variant):
+        if not Path(path).exists():
+            print(f"错误: 模型文件不存在: {path}")
+            return
+
+    is_detector = args.kind != 'gender'
+    if is_detector:
+        imgsz = args.imgsz or DEFAULT_IMGSZ[args.kind]
+        preprocessor = BlobPreprocessor((imgsz, imgsz), scale=1 / 255.0, swap_rb=True, mode='letterbox')
+        images = load_images(args.images, args.num_images, imgsz)
+    else:
+        imgsz = None
+        preprocessor = BlobPreprocessor(tuple(args.input_size), mean=(104, 117, 123), mode='crop')
+        images = load_images(args.images, args.num_images, max(args.input_size))
+    blobs, letterboxes = [], []
+    for image in images:
+        blob, letterbox = preprocessor(image)
+        blobs.append(blob.copy())
+        letterboxes.append(letterbox)
+
+    ref_outputs, ref_times = run_model(args.model, blobs)
+    var_outputs, var_times = run_model(variant, blobs)
+
+    print(f"图片数: {len(blobs)}")
+    print(f"{'模型':<12}{'中位数ms':>10}{'P90 ms':>10}")
+    for name, timings in (('fp32', ref_times), (args.precision, var_times)):
+        print(f"{name:<12}{np.median(timings):>10.2f}{np.percentile(timings, 90):>10.2f}")
+    print(f"加速比: {np.median(ref_times) / max(np.median(var_times), 1e-9):.2f}x")
+
+    diffs = np.array([np.abs(r - v).max() for r, v in zip(ref_outputs, var_outputs)])
+    print(f"输出最大绝对误差: 平均 {diffs.mean():.4f} / 最大 {diffs.max():.4f}")
+
+    if is_detector:
+        rates = [
+            box_match_rate(
+                decode_boxes(args.kind, r, args.conf, imgsz, letterbox),
+                decode_boxes(args.kind, v, args.conf, imgsz, letterbox)
+            )
+            for r, v, letterbox in zip(ref_outputs, var_outputs, letterboxes)
+        ]
+        print(f"检测框匹配率 (IoU>=0.5): {np.mean(rates):.1%}")
+    else:
+        agree = np.mean([
+            r.reshape(-1).argmax() == v.reshape(-1).argmax()
+            for r, v in zip(ref_outputs, var_outputs)
+        ])
+        print(f"top-1 一致率: {agree:.1%}")
+
+
+if __name__ == '__main__':
+    main()
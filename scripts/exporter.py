@@ -1,12 +1,32 @@
 """
 模型导出工具
-将PyTorch模型导出为ONNX、NCNN等格式，用于EAIDK-310部署
+将PyTorch模型导出为ONNX、NCNN等格式，用于EAIDK-310部署；
+quantize 子命令使用本地校准图片生成静态INT8（或FP16）ONNX模型
+
+用法:
+    python scripts/exporter.py --model yolo11n.pt --format onnx
+    python scripts/exporter.py quantize --model yolo_fastestv2/model.onnx --kind detector --calib-dir data/calib
+    python scripts/exporter.py quantize --model models/gender_net.onnx --kind gender --calib-dir data/faces
 """
 
-import torch
-from ultralytics import YOLO
 import argparse
 import os
+import sys
+from pathlib import Path
+
+try:
+    import torch
+    from ultralytics import YOLO
+    ULTRALYTICS_AVAILABLE = True
+except ImportError:
+    # 仅量化已有ONNX模型时不需要PyTorch/ultralytics
+    ULTRALYTICS_AVAILABLE = False
+
+# 添加src目录到路径（量化时复用运行时的预处理，保证校准数据与推理输入一致）
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / 'src'))
+
+IMAGE_SUFFIXES = ('.jpg', '.jpeg', '.png', '.bmp')
 
 
 def export_to_onnx(model_path, output_path=None, imgsz=640):
@@ -99,30 +119,231 @@ def export_to_tensorrt(model_path, output_path=None, imgsz=640):
         return None
 
 
+def _create_preprocessor(kind, imgsz, input_size, mean_values, scale):
+    """创建与运行时一致的预处理器"""
+    from yoloface.detectors.preprocess import BlobPreprocessor
+    
+    if kind == 'detector':
+        # 与 YoloFastestV2Detector 一致：letterbox、RGB、归一化到0~1
+        return BlobPreprocessor((imgsz, imgsz), scale=1 / 255.0, swap_rb=True, mode='letterbox')
+    # 与 GenderClassifier 一致：中心裁剪、BGR、减均值
+    return BlobPreprocessor(tuple(input_size), mean=mean_values, scale=scale, swap_rb=False, mode='crop')
+
+
+def default_imgsz(model_path, kind='detector'):
+    """
+    按模型选择默认输入尺寸：YOLO11 的 .pt 为640，ONNX 读取模型的静态输入尺寸，
+    无法确定时使用 FastestV2 的416
+    
+    Args:
+        model_path: 模型路径
+        kind: 模型类型
+        
+    Returns:
+        输入尺寸
+    """
+    if model_path.endswith('.pt'):
+        return 640
+    if kind == 'detector' and model_path.endswith('.onnx'):
+        try:
+            import onnx
+            dims = onnx.load(model_path, load_external_data=False).graph.input[0].type.tensor_type.shape.dim
+            if len(dims) == 4 and dims[2].dim_value > 0:
+                return int(dims[2].dim_value)
+        except Exception:
+            pass
+    return 416
+
+
+def list_calibration_images(calib_dir, limit=None):
+    """
+    列出校准图片
+    
+    Args:
+        calib_dir: 校准图片目录（递归查找）
+        limit: 最多使用的图片数
+        
+    Returns:
+        图片路径列表（按路径排序，结果可复现）
+    """
+    paths = sorted(
+        str(path) for path in Path(calib_dir).rglob('*')
+        if path.suffix.lower() in IMAGE_SUFFIXES
+    )
+    return paths[:limit] if limit else paths
+
+
+def quantize_model(model_path, calib_dir, kind='detector', output_path=None, precision='int8',
+                   imgsz=None, input_size=(227, 227), mean_values=(104, 117, 123), scale=1.0,
+                   num_images=100, quant_format='qdq', per_channel=False):
+    """
+    生成量化模型
+    
+    Args:
+        model_path: 输入ONNX模型路径（.pt会先导出为ONNX）
+        calib_dir: 本地校准图片目录（INT8需要）
+        kind: 'detector'（人脸检测器）或 'gender'（性别分类器），决定校准数据的预处理
+        output_path: 输出路径，默认按约定命名为 model.int8.onnx / model.fp16.onnx
+        precision: 'int8'（静态量化）或 'fp16'
+        imgsz: 检测器输入尺寸，None时按 default_imgsz 选择
+        input_size: 分类器输入尺寸 (width, height)
+        mean_values: 分类器图像均值
+        scale: 分类器缩放因子
+        num_images: 最多使用的校准图片数
+        quant_format: 'qdq' 或 'qoperator'
+        per_channel: 是否按通道量化权重
+        
+    Returns:
+        输出路径，失败时返回None
+    """
+    import cv2
+    import numpy as np
+    from yoloface.detectors.model_variants import variant_path
+    
+    try:
+        import onnx
+        from onnxruntime.quantization import (
+            CalibrationDataReader, QuantFormat, QuantType, quantize_static
+        )
+    except ImportError:
+        print("量化需要 onnx 与 onnxruntime，请运行: pip install \"yoloface[quantize]\"")
+        return None
+    
+    if imgsz is None:
+        imgsz = default_imgsz(model_path, kind)
+    if model_path.endswith('.pt'):
+        model_path = export_to_onnx(model_path, imgsz=imgsz)
+        if not model_path or not os.path.exists(model_path):
+            return None
+    if output_path is None:
+        output_path = variant_path(model_path, precision)
+    
+    if precision == 'fp16':
+        try:
+            from onnxconverter_common import float16
+        except ImportError:
+            from onnxruntime.transformers import float16
+        print(f"转换FP16模型: {model_path}")
+        model = float16.convert_float_to_float16(onnx.load(model_path), keep_io_types=True)
+        onnx.save(model, output_path)
+        print(f"FP16模型已保存: {output_path}")
+        return output_path
+    
+    images = list_calibration_images(calib_dir, num_images) if calib_dir else []
+    if not images:
+        print(f"错误: 校准目录中没有图片: {calib_dir}")
+        return None
+    
+    preprocessor = _create_preprocessor(kind, imgsz, input_size, mean_values, scale)
+    input_name = onnx.load(model_path, load_external_data=False).graph.input[0].name
+    
+    class ImageCalibrationReader(CalibrationDataReader):
+        """逐张读取校准图片（只保留当前一张的blob）"""
+        
+        def __init__(self):
+            self._paths = iter(images)
+        
+        def get_next(self):
+            for path in self._paths:
+                image = cv2.imread(path)
+                if image is None:
+                    print(f"跳过无法读取的图片: {path}")
+                    continue
+                blob, _ = preprocessor(image)
+                return {input_name: np.array(blob, copy=True)}
+            return None
+    
+    print(f"静态INT8量化: {model_path}（{kind}，{len(images)} 张校准图片）")
+    quantize_static(
+        model_path,
+        output_path,
+        ImageCalibrationReader(),
+        quant_format=QuantFormat.QDQ if quant_format == 'qdq' else QuantFormat.QOperator,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=per_channel
+    )
+    print(f"INT8模型已保存: {output_path}")
+    return output_path
+
+
+def _quantize_command(args):
+    """quantize 子命令"""
+    if not os.path.exists(args.model):
+        print(f"错误: 模型文件不存在: {args.model}")
+        return
+    quantize_model(
+        args.model,
+        args.calib_dir,
+        kind=args.kind,
+        output_path=args.output,
+        precision=args.precision,
+        imgsz=args.imgsz,
+        input_size=tuple(args.input_size),
+        mean_values=tuple(args.mean),
+        scale=args.scale,
+        num_images=args.num_images,
+        quant_format=args.quant_format,
+        per_channel=args.per_channel
+    )
+
+
 def main():
     """主函数"""
     parser = argparse.ArgumentParser(description='模型导出工具')
-    parser.add_argument('--model', type=str, required=True, help='输入模型路径')
+    parser.add_argument('--model', type=str, default=None, help='输入模型路径（quantize 时为 .onnx 或先导出的 .pt）')
     parser.add_argument('--format', type=str, choices=['onnx', 'ncnn', 'tensorrt', 'all'],
                        default='onnx', help='导出格式')
-    parser.add_argument('--output', type=str, default=None, help='输出路径/目录')
-    parser.add_argument('--imgsz', type=int, default=640, help='输入图像尺寸')
+    parser.add_argument('--output', type=str, default=None, help='输出路径/目录（quantize 默认 model.int8.onnx）')
+    parser.add_argument('--imgsz', type=int, default=None,
+                       help='输入图像尺寸（默认 .pt 为640，ONNX 检测器读取模型输入尺寸，否则416）')
+    
+    subparsers = parser.add_subparsers(dest='command')
+    quantize = subparsers.add_parser('quantize', help='导出并量化为INT8/FP16 ONNX模型')
+    # 通用参数在子命令后同样可用（SUPPRESS：未在子命令后给出时保留主命令上的取值）
+    quantize.add_argument('--model', type=str, default=argparse.SUPPRESS, help='输入模型路径（.onnx 或先导出的 .pt）')
+    quantize.add_argument('--output', type=str, default=argparse.SUPPRESS, help='输出路径（默认 model.int8.onnx）')
+    quantize.add_argument('--imgsz', type=int, default=argparse.SUPPRESS, help='检测器输入图像尺寸')
+    quantize.add_argument('--kind', type=str, choices=['detector', 'gender'], default='detector',
+                          help='模型类型，决定校准数据的预处理方式')
+    quantize.add_argument('--calib-dir', type=str, default=None, help='本地校准图片目录（INT8必需）')
+    quantize.add_argument('--precision', type=str, choices=['int8', 'fp16'], default='int8', help='目标精度')
+    quantize.add_argument('--input-size', type=int, nargs=2, default=[227, 227], help='分类器输入尺寸 (宽 高)')
+    quantize.add_argument('--mean', type=float, nargs=3, default=[104, 117, 123], help='分类器图像均值')
+    quantize.add_argument('--scale', type=float, default=1.0, help='分类器缩放因子')
+    quantize.add_argument('--num-images', type=int, default=100, help='最多使用的校准图片数')
+    quantize.add_argument('--quant-format', type=str, choices=['qdq', 'qoperator'], default='qdq',
+                          help='量化格式')
+    quantize.add_argument('--per-channel', action='store_true', help='按通道量化权重')
     
     args = parser.parse_args()
     
+    if not args.model:
+        parser.error("需要 --model 参数")
+    
+    if args.command == 'quantize':
+        _quantize_command(args)
+        return
+    
+    imgsz = args.imgsz or default_imgsz(args.model)
+    
+    if not ULTRALYTICS_AVAILABLE:
+        print("错误: 导出需要 torch 与 ultralytics，请运行: pip install ultralytics")
+        return
+    
     if not os.path.exists(args.model):
         print(f"错误: 模型文件不存在: {args.model}")
         return
     
     if args.format == 'all':
-        export_to_onnx(args.model, args.output, args.imgsz)
-        export_to_ncnn(args.model, args.output, args.imgsz)
+        export_to_onnx(args.model, args.output, imgsz)
+        export_to_ncnn(args.model, args.output, imgsz)
     elif args.format == 'onnx':
-        export_to_onnx(args.model, args.output, args.imgsz)
+        export_to_onnx(args.model, args.output, imgsz)
     elif args.format == 'ncnn':
-        export_to_ncnn(args.model, args.output, args.imgsz)
+        export_to_ncnn(args.model, args.output, imgsz)
     elif args.format == 'tensorrt':
-        export_to_tensorrt(args.model, args.output, args.imgsz)
+        export_to_tensorrt(args.model, args.output, imgsz)
     
     print("导出完成")
 
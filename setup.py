@@ -38,10 +38,20 @@ setup(
             "flake8>=6.0.0",
             "mypy>=1.0.0",
         ],
+        "quantize": [
+            "onnx>=1.14.0",
+            "onnxruntime>=1.16.0",
+            "onnxconverter-common>=1.13.0",
+        ],
     },
     entry_points={
         "console_scripts": [
             "yoloface=yoloface.app:main",
+            "yoloface-serve=yoloface.serving.server:main",
+            "yoloface-users=yoloface.utils.db_manager:main",
+            "yoloface-eval=yoloface.evaluation.runner:main",
+            "yoloface-calibrate-gender=yoloface.evaluation.gender_calibration:main",
+            "yoloface-synth-video=yoloface.utils.synthetic_video:main",
         ],
     },
     classifiers=[
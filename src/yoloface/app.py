@@ -29,7 +29,13 @@ def main():
         level=log_config.get('level', 'INFO'),
         log_file=log_config.get('file'),
         console=log_config.get('console', True),
-        format_str=log_config.get('format')
+        format_str=log_config.get('format'),
+        use_queue=log_config.get('use_queue', False),
+        queue_size=log_config.get('queue_size', 10000),
+        max_bytes=int(log_config.get('max_file_mb', 0) * 1024 * 1024),
+        backup_count=log_config.get('backup_count', 3),
+        rate_limit=log_config.get('rate_limit', 0),
+        rate_limit_loggers=log_config.get('rate_limit_loggers')
     )
     
     logger.info("启动人脸识别系统")
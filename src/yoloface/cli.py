@@ -3,16 +3,24 @@
 用于在没有PyQt5的嵌入式设备上运行
 """
 
+import os
 import sys
 import cv2
 import time
 import signal
-from typing import Optional
+from typing import List, Optional, Union
 
-from .utils.logger import get_logger
-from .utils.video import VideoCapture, FPSCounter, draw_info
+from .utils.logger import collect as collect_logging, get_logger
+from .utils.video import VideoCapture, FPSCounter, draw_info, open_capture
+from .utils.profiler import get_profiler
+from .utils.metrics_server import MetricsServer, get_metrics_registry
 from .detectors import HaarFaceDetector, YOLO11FaceDetector, YoloFastestV2Detector, FaceTracker
-from .config import Config
+from .detectors.attribute_service import get_attribute_service
+from .detectors.attribute_worker import get_attribute_worker
+from .detectors.dnn_backend import apply_thread_plan
+from .detectors.model_registry import get_model_registry
+from .multi_stream import ALGORITHM_NAMES, MultiStreamPipeline, StreamResult
+from .config import Config, ConfigWatcher, ConfigChange
 
 logger = get_logger(__name__)
 
@@ -20,28 +28,43 @@ logger = get_logger(__name__)
 class CLIDetector:
     """命令行检测器"""
     
-    def __init__(self, detector_type: str, config: Config):
+    def __init__(self, detector_type: str, config: Config, sources: Optional[List[Union[int, str]]] = None):
         """
         初始化检测器
         
         Args:
             detector_type: 检测器类型 ('haar', 'yolo11', 'fastestv2', 'track')
             config: 配置对象
+            sources: 视频源（摄像头索引、视频路径或合成视频），只有一路时代替 camera.index，多于一路时启用多路批量检测
         """
         self.detector_type = detector_type
         self.config = config
+        self.sources = list(sources or [])
         self.detector = None
         self.tracker = None
+        self.pipeline: Optional[MultiStreamPipeline] = None
         self.running = False
         self.cap: Optional[VideoCapture] = None
         self.fps_counter = FPSCounter(
             config.get('performance.fps_update_interval', 30)
         )
+        self.profiler = get_profiler()
+        self.metrics = get_metrics_registry()
+        self.metrics_server: Optional[MetricsServer] = None
+        self.config_watcher: Optional[ConfigWatcher] = None
         self.init_detector()
     
     def init_detector(self):
         """初始化检测器"""
+        # 按流水线并行规划设置OpenCV线程数（进程内只设置一次）
+        apply_thread_plan()
         try:
+            if len(self.sources) > 1:
+                # 多路视频流共享一个检测器，批量推理
+                self.pipeline = MultiStreamPipeline(
+                    self.detector_type, self.sources, self.config, sinks=[self._stream_sink]
+                )
+                return
             if self.detector_type == 'haar':
                 self.detector = HaarFaceDetector()
             elif self.detector_type == 'yolo11':
@@ -57,69 +80,98 @@ class CLIDetector:
     
     def start(self):
         """开始检测"""
+        if self.pipeline is not None:
+            self.start_multi_stream()
+            return
         try:
             camera_config = self.config.get('camera', {})
-            self.cap = VideoCapture(
-                index=camera_config.get('index', 0),
-                width=camera_config.get('width', 640),
-                height=camera_config.get('height', 480)
-            )
+            width = camera_config.get('width', 640)
+            height = camera_config.get('height', 480)
+            if self.sources:
+                # 只给出一路视频源时打开它（视频文件、合成视频或指定的摄像头）
+                self.cap = open_capture(self.sources[0], width, height)
+            else:
+                self.cap = VideoCapture(index=camera_config.get('index', 0), width=width, height=height)
             self.running = True
-            logger.info("摄像头已打开，开始检测...")
+            logger.info("视频源已打开，开始检测...")
             logger.info("按 Ctrl+C 停止检测")
             
+            self.start_metrics_server()
+            self.start_config_watcher()
+            
             self.fps_counter.reset()
+            self.profiler.reset()
             frame_count = 0
             
             while self.running:
-                ret, frame = self.cap.read()
+                # 帧间应用热更新的配置
+                if self.config_watcher:
+                    change = self.config_watcher.apply_pending()
+                    if change:
+                        self.apply_config_change(change)
+                
+                with self.profiler.span('capture'):
+                    ret, frame = self.cap.read()
                 if not ret:
-                    logger.warning("无法读取摄像头帧")
+                    logger.warning("视频源已结束或无法读取帧")
                     break
                 
                 frame_count += 1
                 
                 # 检测
                 if self.detector_type == 'track':
-                    tracks = self.tracker.detect_and_track(frame)
-                    frame = self.tracker.draw_tracks(frame, tracks)
-                    detection_count = len(tracks)
+                    detections = self.tracker.detect_and_track(frame)
                 elif self.detector_type in ['haar', 'yolo11', 'fastestv2']:
-                    faces = self.detector.detect(frame)
-                    frame = self.detector.draw_detections(frame, faces)
-                    detection_count = len(faces)
+                    detections = self.detector.detect(frame)
                 else:
-                    detection_count = 0
+                    detections = []
+                detection_count = len(detections)
                 
                 # 计算FPS
                 fps = self.fps_counter.update()
                 
-                # 添加信息
+                # 更新监控指标
+                self.metrics.inc_counter('frames_total', 1, '已处理帧数')
+                self.metrics.set_gauge('fps', fps, '当前帧率')
+                self.metrics.set_gauge('detections', detection_count, '当前帧检测数量')
+                
+                # 绘制检测结果与信息（每帧记录一次绘制耗时，其中的属性识别单独计入 classification）
                 algorithm_names = {
                     'haar': 'Haar',
                     'yolo11': 'YOLO11',
                     'fastestv2': 'FastestV2',
                     'track': 'Tracking'
                 }
-                frame = draw_info(
-                    frame, fps, detection_count,
-                    algorithm_names.get(self.detector_type, '')
-                )
+                with self.profiler.span('drawing'):
+                    if self.detector_type == 'track':
+                        frame = self.tracker.draw_tracks(frame, detections)
+                    elif self.detector_type in ['haar', 'yolo11', 'fastestv2']:
+                        frame = self.detector.draw_detections(frame, detections)
+                    frame = draw_info(
+                        frame, fps, detection_count,
+                        algorithm_names.get(self.detector_type, '')
+                    )
                 
                 # 控制台输出（每30帧输出一次）
                 if frame_count % 30 == 0:
-                    print(f"\r[帧 {frame_count}] FPS: {fps:.2f} | 检测数量: {detection_count} | 算法: {algorithm_names.get(self.detector_type, '')}", 
-                          end='', flush=True)
+                    with self.profiler.span('display'):
+                        print(f"\r[帧 {frame_count}] FPS: {fps:.2f} | 检测数量: {detection_count} | 算法: {algorithm_names.get(self.detector_type, '')}", 
+                              end='', flush=True)
                 
-                # 可选：保存检测结果图像
-                save_config = self.config.get('output', {})
-                if save_config.get('save_frames', False) and frame_count % save_config.get('save_interval', 100) == 0:
-                    output_dir = save_config.get('output_dir', 'output')
-                    import os
+                # 可选：保存检测结果图像（磁盘写入不计入任何阶段）
+                save_settings = self.config.settings.output
+                if save_settings.save_frames and frame_count % save_settings.save_interval == 0:
+                    output_dir = save_settings.output_dir
                     os.makedirs(output_dir, exist_ok=True)
                     output_path = os.path.join(output_dir, f'frame_{frame_count:06d}.jpg')
                     cv2.imwrite(output_path, frame)
-                    logger.debug(f"保存帧: {output_path}")
+                    logger.debug("保存帧: %s", output_path)
+                
+                # 周期性写入延迟快照
+                try:
+                    self.profiler.maybe_write_snapshot()
+                except OSError as e:
+                    logger.warning("写入延迟快照失败: %s", e)
                 
                 # 控制帧率
                 time.sleep(1.0 / 30)  # 约30 FPS
@@ -136,22 +188,159 @@ class CLIDetector:
         finally:
             self.stop()
     
+    def start_multi_stream(self):
+        """多路视频流批量检测"""
+        try:
+            self.pipeline.start()
+            self.running = True
+            logger.info(f"已打开 {len(self.sources)} 路视频源，开始批量检测...")
+            logger.info("按 Ctrl+C 停止检测")
+            
+            self.start_metrics_server()
+            self.metrics.add_collector(self.pipeline.collect)
+            self.start_config_watcher()
+            self.profiler.reset()
+            self.pipeline.run(before_batch=self._apply_pending_config)
+            
+            print()  # 换行
+            logger.info("检测已停止")
+        except KeyboardInterrupt:
+            print()  # 换行
+            logger.info("收到停止信号，正在关闭...")
+        finally:
+            self.stop()
+    
+    def _apply_pending_config(self):
+        """帧间应用热更新的配置"""
+        if self.config_watcher:
+            change = self.config_watcher.apply_pending()
+            if change:
+                self.apply_config_change(change)
+    
+    def _stream_sink(self, result: StreamResult):
+        """多路模式的输出：按路保存帧，并周期性打印各路帧率"""
+        stats = self.pipeline.stats[result.stream]
+        self.metrics.inc_counter('frames_total', 1, '已处理帧数')
+        
+        save_settings = self.config.settings.output
+        if save_settings.save_frames and stats.frames % save_settings.save_interval == 0:
+            output_dir = os.path.join(save_settings.output_dir, f'stream_{result.stream}')
+            os.makedirs(output_dir, exist_ok=True)
+            cv2.imwrite(os.path.join(output_dir, f'frame_{stats.frames:06d}.jpg'), result.frame)
+        
+        if result.stream == 0 and stats.frames % 30 == 0:
+            summary = ' | '.join(
+                f"#{i} {s.fps:.1f}FPS/{s.frames}帧" for i, s in enumerate(self.pipeline.stats)
+            )
+            print(f"\r[{ALGORITHM_NAMES.get(self.detector_type, '')}] {summary}", end='', flush=True)
+    
     def stop(self):
         """停止检测"""
         self.running = False
         if self.cap:
             self.cap.release()
             self.cap = None
+        if self.pipeline is not None:
+            self.pipeline.stop()
+            print(self.pipeline.report())
+        if self.metrics_server:
+            self.metrics_server.stop()
+            self.metrics_server = None
+        if self.config_watcher:
+            self.config_watcher.stop()
+            self.config_watcher = None
+        worker = get_attribute_worker()
+        if worker is not None:
+            worker.stop()
+        self.print_latency_report()
         logger.info("资源已释放")
+    
+    def start_config_watcher(self):
+        """按配置启动配置文件热加载"""
+        if not self.config.get('app.hot_reload', False) or self.config_watcher:
+            return
+        watcher = ConfigWatcher(self.config, interval=self.config.get('app.hot_reload_interval', 1.0))
+        if watcher.start():
+            self.config_watcher = watcher
+    
+    def apply_config_change(self, change: ConfigChange):
+        """
+        将配置变更应用到当前检测器
+        
+        Args:
+            change: 配置变更
+        """
+        if change.changed('detection.gender'):
+            get_attribute_service().apply_settings(change.new.detection.gender)
+        if change.changed('detection.age'):
+            get_attribute_service().apply_age_settings(change.new.detection.age)
+        
+        if self.pipeline is not None:
+            target = self.pipeline
+        else:
+            target = self.tracker if self.detector_type == 'track' else self.detector
+        if target is None or not change.changed('detection'):
+            return
+        try:
+            target.apply_settings(change.new.detection)
+            logger.info(f"检测参数已热更新: {self.detector_type}")
+        except Exception as e:
+            logger.error(f"应用新配置失败: {e}")
+    
+    def start_metrics_server(self):
+        """按配置启动本地监控指标服务"""
+        metrics_config = self.config.get('metrics', {})
+        if not metrics_config.get('enabled', False) or self.metrics_server:
+            return
+        try:
+            self.metrics_server = MetricsServer(
+                self.metrics,
+                host=metrics_config.get('host', '127.0.0.1'),
+                port=metrics_config.get('port', 9108)
+            )
+            self.metrics_server.start()
+            self.metrics.add_collector(get_attribute_service().crop_cache.collect)
+            self.metrics.add_collector(get_model_registry().collect)
+            self.metrics.add_collector(collect_logging)
+            worker = get_attribute_worker()
+            if worker is not None:
+                self.metrics.add_collector(worker.collect)
+        except OSError as e:
+            # 端口被占用等情况不影响检测
+            logger.warning(f"监控指标服务启动失败: {e}")
+            self.metrics_server = None
+    
+    def print_latency_report(self):
+        """打印各阶段延迟统计"""
+        if not self.profiler.enabled:
+            return
+        histograms = self.profiler.histograms()
+        if not histograms:
+            return
+        print("各阶段延迟统计 (ms):")
+        print(f"  {'阶段':<16}{'次数':>8}{'平均':>10}{'p50':>8}{'p95':>8}{'p99':>8}{'最大':>10}")
+        for name, hist in histograms.items():
+            print(f"  {name:<16}{hist.count:>8}{hist.mean:>10.2f}"
+                  f"{hist.percentile(0.5):>8.0f}{hist.percentile(0.95):>8.0f}"
+                  f"{hist.percentile(0.99):>8.0f}{hist.max:>10.2f}")
+        try:
+            self.profiler.maybe_write_snapshot(force=True)
+        except OSError as e:
+            logger.warning(f"写入延迟快照失败: {e}")
 
 
-def run_cli(detector_type: str = 'haar', config: Optional[Config] = None):
+def run_cli(
+    detector_type: str = 'haar',
+    config: Optional[Config] = None,
+    sources: Optional[List[Union[int, str]]] = None
+):
     """
     运行命令行界面
     
     Args:
         detector_type: 检测器类型
         config: 配置对象，如果为None则使用默认配置
+        sources: 多路视频源，None时使用配置中的 camera.sources
     """
     if config is None:
         from .config import load_config
@@ -166,7 +355,9 @@ def run_cli(detector_type: str = 'haar', config: Optional[Config] = None):
     signal.signal(signal.SIGTERM, signal_handler)
     
     try:
-        detector = CLIDetector(detector_type, config)
+        if sources is None:
+            sources = config.get('camera.sources', None) or []
+        detector = CLIDetector(detector_type, config, sources)
         detector.start()
     except Exception as e:
         logger.error(f"运行失败: {e}")
@@ -196,6 +387,28 @@ def main():
         default=0,
         help='摄像头索引 (默认: 0)'
     )
+    parser.add_argument(
+        '--sources', '-s',
+        nargs='+',
+        default=None,
+        help="多路视频源（摄像头索引、视频文件路径或合成视频 'synthetic:<种子>[,参数=值...]'），多于一路时合并为批量推理"
+    )
+    parser.add_argument(
+        '--metrics-port',
+        type=int,
+        default=None,
+        help='启用本地监控指标服务并指定端口（Prometheus格式，仅监听127.0.0.1）'
+    )
+    parser.add_argument(
+        '--no-profile',
+        action='store_true',
+        help='禁用分阶段延迟统计'
+    )
+    parser.add_argument(
+        '--write-model-manifest',
+        action='store_true',
+        help='扫描模型目录并写入模型清单（含sha256）后退出'
+    )
     
     args = parser.parse_args()
     
@@ -203,12 +416,27 @@ def main():
     from .config import load_config
     config = load_config(args.config)
     
+    if args.write_model_manifest:
+        get_model_registry().save()
+        return
+    
+    # 命令行参数作为覆盖项，配置文件热加载后仍然生效
+    if args.no_profile:
+        config.override('performance.profiling.enabled', False)
+    
+    if args.metrics_port is not None:
+        config.override('metrics.enabled', True)
+        config.override('metrics.port', args.metrics_port)
+    
     # 设置摄像头索引
     if args.camera != 0:
-        config.set('camera.index', args.camera)
+        config.override('camera.index', args.camera)
     
     # 运行
-    run_cli(args.algorithm, config)
+    sources = None
+    if args.sources:
+        sources = [int(source) if source.isdigit() else source for source in args.sources]
+    run_cli(args.algorithm, config, sources)
 
 
 if __name__ == '__main__':
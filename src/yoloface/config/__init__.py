@@ -3,6 +3,12 @@
 """
 
 from .config import Config, load_config, get_config
+from .settings import Settings, build_settings
+from .watcher import ConfigWatcher, ConfigChange
 
-__all__ = ['Config', 'load_config', 'get_config']
+__all__ = [
+    'Config', 'load_config', 'get_config',
+    'Settings', 'build_settings',
+    'ConfigWatcher', 'ConfigChange'
+]
 
@@ -12,6 +12,11 @@ try:
 except ImportError:
     YAML_AVAILABLE = False
 
+from .settings import Settings, build_settings
+
+# 查找缓存中表示"未缓存"的哨兵
+_MISSING = object()
+
 
 class Config:
     """配置管理类"""
@@ -25,6 +30,10 @@ class Config:
         """
         self.config_path = config_path
         self._config: Dict[str, Any] = {}
+        self._cache: Dict[str, Any] = {}
+        self._settings: Optional[Settings] = None
+        # 命令行等运行时覆盖的配置项，热加载后重新应用
+        self._overrides: Dict[str, Any] = {}
         self._load_config()
     
     def _load_config(self):
@@ -39,6 +48,19 @@ class Config:
                 self._config = self._get_default_config()
         else:
             self._config = self._get_default_config()
+        self._invalidate()
+    
+    def _invalidate(self):
+        """配置变更后清空查找缓存并重建快照"""
+        self._cache.clear()
+        self._settings = build_settings(self._config)
+    
+    @property
+    def settings(self) -> Settings:
+        """不可变的类型化配置快照，热路径上使用属性访问"""
+        if self._settings is None:
+            self._settings = build_settings(self._config)
+        return self._settings
     
     def _get_default_config(self) -> Dict[str, Any]:
         """获取默认配置"""
@@ -95,7 +117,17 @@ class Config:
             'performance': {
                 'fps_update_interval': 30,
                 'enable_multiprocess': False,
-                'num_processes': 2
+                'num_processes': 2,
+                'profiling': {
+                    'enabled': True,
+                    'snapshot_file': 'logs/latency.json',
+                    'snapshot_interval': 10.0
+                }
+            },
+            'metrics': {
+                'enabled': False,
+                'host': '127.0.0.1',
+                'port': 9108
             }
         }
     
@@ -110,6 +142,15 @@ class Config:
         Returns:
             配置值
         """
+        value = self._cache.get(key, _MISSING)
+        if value is _MISSING:
+            value = self._lookup(key)
+            self._cache[key] = value
+        
+        return value if value is not None else default
+    
+    def _lookup(self, key: str) -> Any:
+        """逐级查找点号分隔的键，未找到时返回None"""
         keys = key.split('.')
         value = self._config
         
@@ -117,11 +158,11 @@ class Config:
             if isinstance(value, dict):
                 value = value.get(k)
                 if value is None:
-                    return default
+                    return None
             else:
-                return default
+                return None
         
-        return value if value is not None else default
+        return value
     
     def set(self, key: str, value: Any):
         """
@@ -140,6 +181,40 @@ class Config:
             config = config[k]
         
         config[keys[-1]] = value
+        self._cache.clear()
+        self._settings = None
+    
+    def override(self, key: str, value: Any):
+        """
+        设置运行时覆盖项（如命令行参数），配置文件热加载后仍然生效
+        
+        Args:
+            key: 配置键，支持点号分隔的嵌套键
+            value: 配置值
+        """
+        self._overrides[key] = value
+        self.set(key, value)
+    
+    @property
+    def overrides(self) -> Dict[str, Any]:
+        """当前的运行时覆盖项"""
+        return dict(self._overrides)
+    
+    def replace(self, data: Dict[str, Any], settings: Optional[Settings] = None):
+        """
+        整体替换配置内容（用于热加载），运行时覆盖项会重新应用到新配置上
+        
+        Args:
+            data: 新的配置字典
+            settings: 已校验的配置快照，为None时重新构建；存在覆盖项时总是重新构建
+        """
+        self._config = data
+        for key, value in self._overrides.items():
+            self.set(key, value)
+        self._cache.clear()
+        if settings is None or self._overrides:
+            settings = build_settings(self._config)
+        self._settings = settings
     
     def save(self, path: Optional[str] = None):
         """
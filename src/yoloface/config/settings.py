@@ -0,0 +1,289 @@
+"""
+类型化配置快照
+加载配置时一次性构建的不可变对象，热路径上以属性访问代替 Config.get 的逐级查找
+
+说明：项目需兼容 Python 3.8，dataclass(slots=True) 不可用，
+因此各类手动声明 __slots__，且字段不设默认值（默认值统一在 build_settings 中填充）。
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class CameraSettings:
+    """摄像头配置"""
+    __slots__ = ('index', 'width', 'height', 'fps')
+    index: int
+    width: int
+    height: int
+    fps: int
+
+
+@dataclass(frozen=True)
+class HaarSettings:
+    """Haar级联器配置"""
+    __slots__ = ('cascade_path', 'scale_factor', 'min_neighbors', 'min_size')
+    cascade_path: Optional[str]
+    scale_factor: float
+    min_neighbors: int
+    min_size: Tuple[int, int]
+
+
+@dataclass(frozen=True)
+class YOLO11Settings:
+    """YOLO11配置"""
+    __slots__ = ('model_path', 'conf_threshold', 'iou_threshold', 'imgsz', 'precision')
+    model_path: str
+    conf_threshold: float
+    iou_threshold: float
+    imgsz: int
+    precision: str
+
+
+@dataclass(frozen=True)
+class FastestV2Settings:
+    """Yolo-FastestV2配置"""
+    __slots__ = ('model_path', 'conf_threshold', 'imgsz', 'precision')
+    model_path: str
+    conf_threshold: float
+    imgsz: int
+    precision: str
+
+
+@dataclass(frozen=True)
+class TrackingSettings:
+    """跟踪配置"""
+    __slots__ = ('iou_threshold', 'max_history', 'track_lost_threshold')
+    iou_threshold: float
+    max_history: int
+    track_lost_threshold: int
+
+
+@dataclass(frozen=True)
+class GenderHeuristicSettings:
+    """无模型时启发式性别分类的阈值"""
+    __slots__ = ('edge_density', 'dark_brightness', 'bright_brightness', 'contrast', 'aspect_ratio')
+    edge_density: float
+    dark_brightness: float
+    bright_brightness: float
+    contrast: float
+    aspect_ratio: float
+
+
+@dataclass(frozen=True)
+class GenderSettings:
+    """性别识别配置"""
+    __slots__ = ('enabled', 'model_path', 'prototxt_path', 'input_size', 'mean_values', 'scale', 'precision',
+                 'heuristic')
+    enabled: bool
+    model_path: Optional[str]
+    prototxt_path: Optional[str]
+    input_size: Tuple[int, int]
+    mean_values: Tuple[float, ...]
+    scale: float
+    precision: str
+    heuristic: GenderHeuristicSettings
+
+
+@dataclass(frozen=True)
+class AgeSettings:
+    """年龄估计配置"""
+    __slots__ = ('enabled', 'model_path', 'prototxt_path', 'input_size', 'mean_values', 'scale')
+    enabled: bool
+    model_path: Optional[str]
+    prototxt_path: Optional[str]
+    input_size: Tuple[int, int]
+    mean_values: Tuple[float, ...]
+    scale: float
+
+
+@dataclass(frozen=True)
+class AttributeWorkerSettings:
+    """异步属性识别配置"""
+    __slots__ = ('async_enabled', 'max_queue_depth', 'result_ttl_ms', 'refresh_interval_ms', 'position_grid')
+    async_enabled: bool
+    max_queue_depth: int
+    result_ttl_ms: float
+    refresh_interval_ms: float
+    position_grid: int
+
+
+@dataclass(frozen=True)
+class DetectionSettings:
+    """检测算法配置"""
+    __slots__ = ('haar', 'yolo11', 'fastestv2', 'tracking', 'gender', 'age', 'attributes')
+    haar: HaarSettings
+    yolo11: YOLO11Settings
+    fastestv2: FastestV2Settings
+    tracking: TrackingSettings
+    gender: GenderSettings
+    age: AgeSettings
+    attributes: AttributeWorkerSettings
+
+
+@dataclass(frozen=True)
+class OutputSettings:
+    """检测结果保存配置"""
+    __slots__ = ('save_frames', 'save_interval', 'output_dir')
+    save_frames: bool
+    save_interval: int
+    output_dir: str
+
+
+@dataclass(frozen=True)
+class PerformanceSettings:
+    """性能配置"""
+    __slots__ = ('fps_update_interval', 'enable_multiprocess', 'num_processes')
+    fps_update_interval: int
+    enable_multiprocess: bool
+    num_processes: int
+
+
+@dataclass(frozen=True)
+class Settings:
+    """完整配置快照"""
+    __slots__ = ('camera', 'detection', 'output', 'performance')
+    camera: CameraSettings
+    detection: DetectionSettings
+    output: OutputSettings
+    performance: PerformanceSettings
+
+
+def _section(data: Optional[Dict[str, Any]], key: str) -> Dict[str, Any]:
+    """获取子配置字典，缺失或类型错误时返回空字典"""
+    if not isinstance(data, dict):
+        return {}
+    value = data.get(key)
+    return value if isinstance(value, dict) else {}
+
+
+def _value(section: Dict[str, Any], key: str, default: Any) -> Any:
+    """获取配置值，None视为缺失（与 Config.get 行为一致）"""
+    value = section.get(key)
+    return default if value is None else value
+
+
+def _pair(value: Any, name: str) -> Tuple[int, int]:
+    """转换为二元整数元组"""
+    try:
+        first, second = value
+        return int(first), int(second)
+    except (TypeError, ValueError):
+        raise ValueError(f"配置项 {name} 应为两个整数，实际为: {value!r}")
+
+
+def _precision(value: Any, name: str) -> str:
+    """校验模型精度偏好"""
+    precision = str(value).lower()
+    if precision not in ('fp32', 'fp16', 'int8', 'auto'):
+        raise ValueError(f"配置项 {name} 应为 fp32/fp16/int8/auto，实际为: {value!r}")
+    return precision
+
+
+def build_settings(data: Dict[str, Any]) -> Settings:
+    """
+    根据配置字典构建类型化快照
+
+    Args:
+        data: 原始配置字典
+
+    Returns:
+        Settings实例
+
+    Raises:
+        ValueError: 配置值类型不正确
+    """
+    camera = _section(data, 'camera')
+    detection = _section(data, 'detection')
+    haar = _section(detection, 'haar')
+    yolo11 = _section(detection, 'yolo11')
+    fastestv2 = _section(detection, 'fastestv2')
+    tracking = _section(detection, 'tracking')
+    gender = _section(detection, 'gender')
+    heuristic = _section(gender, 'heuristic')
+    age = _section(detection, 'age')
+    attributes = _section(detection, 'attributes')
+    output = _section(data, 'output')
+    performance = _section(data, 'performance')
+
+    try:
+        return Settings(
+            camera=CameraSettings(
+                index=int(_value(camera, 'index', 0)),
+                width=int(_value(camera, 'width', 640)),
+                height=int(_value(camera, 'height', 480)),
+                fps=int(_value(camera, 'fps', 30)),
+            ),
+            detection=DetectionSettings(
+                haar=HaarSettings(
+                    cascade_path=haar.get('cascade_path'),
+                    scale_factor=float(_value(haar, 'scale_factor', 1.1)),
+                    min_neighbors=int(_value(haar, 'min_neighbors', 5)),
+                    min_size=_pair(_value(haar, 'min_size', (30, 30)), 'detection.haar.min_size'),
+                ),
+                yolo11=YOLO11Settings(
+                    model_path=str(_value(yolo11, 'model_path', 'yolo11n.pt')),
+                    conf_threshold=float(_value(yolo11, 'conf_threshold', 0.25)),
+                    iou_threshold=float(_value(yolo11, 'iou_threshold', 0.45)),
+                    imgsz=int(_value(yolo11, 'imgsz', 640)),
+                    precision=_precision(_value(yolo11, 'precision', 'fp32'), 'detection.yolo11.precision'),
+                ),
+                fastestv2=FastestV2Settings(
+                    model_path=str(_value(fastestv2, 'model_path', 'yolo_fastestv2/model.onnx')),
+                    conf_threshold=float(_value(fastestv2, 'conf_threshold', 0.25)),
+                    imgsz=int(_value(fastestv2, 'imgsz', 416)),
+                    precision=_precision(_value(fastestv2, 'precision', 'fp32'), 'detection.fastestv2.precision'),
+                ),
+                tracking=TrackingSettings(
+                    iou_threshold=float(_value(tracking, 'iou_threshold', 0.3)),
+                    max_history=int(_value(tracking, 'max_history', 30)),
+                    track_lost_threshold=int(_value(tracking, 'track_lost_threshold', 5)),
+                ),
+                gender=GenderSettings(
+                    enabled=bool(_value(gender, 'enabled', True)),
+                    model_path=gender.get('model_path'),
+                    prototxt_path=gender.get('prototxt_path'),
+                    input_size=_pair(_value(gender, 'input_size', (227, 227)),
+                                     'detection.gender.input_size'),
+                    mean_values=tuple(float(v) for v in _value(gender, 'mean_values', (104, 117, 123))),
+                    scale=float(_value(gender, 'scale', 1.0)),
+                    precision=_precision(_value(gender, 'precision', 'fp32'), 'detection.gender.precision'),
+                    heuristic=GenderHeuristicSettings(
+                        edge_density=float(_value(heuristic, 'edge_density', 0.12)),
+                        dark_brightness=float(_value(heuristic, 'dark_brightness', 110)),
+                        bright_brightness=float(_value(heuristic, 'bright_brightness', 130)),
+                        contrast=float(_value(heuristic, 'contrast', 0.4)),
+                        aspect_ratio=float(_value(heuristic, 'aspect_ratio', 0.85)),
+                    ),
+                ),
+                age=AgeSettings(
+                    enabled=bool(_value(age, 'enabled', False)),
+                    model_path=age.get('model_path'),
+                    prototxt_path=age.get('prototxt_path'),
+                    input_size=_pair(_value(age, 'input_size', (227, 227)),
+                                     'detection.age.input_size'),
+                    mean_values=tuple(float(v) for v in _value(age, 'mean_values', (104, 117, 123))),
+                    scale=float(_value(age, 'scale', 1.0)),
+                ),
+                attributes=AttributeWorkerSettings(
+                    async_enabled=bool(_value(attributes, 'async_enabled', False)),
+                    max_queue_depth=max(1, int(_value(attributes, 'max_queue_depth', 2))),
+                    result_ttl_ms=float(_value(attributes, 'result_ttl_ms', 1000)),
+                    refresh_interval_ms=float(_value(attributes, 'refresh_interval_ms', 200)),
+                    position_grid=max(1, int(_value(attributes, 'position_grid', 48))),
+                ),
+            ),
+            output=OutputSettings(
+                save_frames=bool(_value(output, 'save_frames', False)),
+                save_interval=int(_value(output, 'save_interval', 100)),
+                output_dir=str(_value(output, 'output_dir', 'output')),
+            ),
+            performance=PerformanceSettings(
+                fps_update_interval=int(_value(performance, 'fps_update_interval', 30)),
+                enable_multiprocess=bool(_value(performance, 'enable_multiprocess', False)),
+                num_processes=int(_value(performance, 'num_processes', 2)),
+            ),
+        )
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"配置格式错误: {e}") from e
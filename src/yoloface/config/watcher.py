@@ -0,0 +1,165 @@
+"""
+配置文件热加载
+后台线程轮询配置文件变化，校验通过后暂存，由处理循环在帧间调用 apply_pending() 原子地应用
+"""
+
+import os
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import yaml
+    YAML_AVAILABLE = True
+except ImportError:
+    YAML_AVAILABLE = False
+
+from .config import Config
+from .settings import Settings, build_settings
+
+
+@dataclass(frozen=True)
+class ConfigChange:
+    """一次配置变更"""
+    old: Settings
+    new: Settings
+
+    def changed(self, section: str) -> bool:
+        """
+        判断某个配置段是否变化
+
+        Args:
+            section: 点号分隔的配置段，如 'detection.haar'
+
+        Returns:
+            是否变化
+        """
+        old, new = self.old, self.new
+        for name in section.split('.'):
+            old, new = getattr(old, name), getattr(new, name)
+        return old != new
+
+
+class ConfigWatcher:
+    """配置文件监视器（轮询方式）"""
+
+    def __init__(self, config: Config, interval: float = 1.0):
+        """
+        初始化监视器
+
+        Args:
+            config: 要更新的配置对象，必须带有 config_path
+            interval: 轮询间隔（秒）
+        """
+        # 避免循环导入
+        from ..utils.logger import get_logger
+        self._logger = get_logger(__name__)
+
+        self.config = config
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._pending: Optional[Tuple[Dict[str, Any], Settings]] = None
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stamp = self._file_stamp()
+
+    def _file_stamp(self) -> Optional[Tuple[int, int]]:
+        """获取文件的 (mtime_ns, size)，文件不存在时返回None"""
+        try:
+            stat = os.stat(self.config.config_path)
+            return stat.st_mtime_ns, stat.st_size
+        except (OSError, TypeError):
+            return None
+
+    def start(self) -> bool:
+        """
+        启动后台轮询线程
+
+        Returns:
+            是否成功启动（未指定配置文件或缺少PyYAML时不启动）
+        """
+        if not self.config.config_path or not YAML_AVAILABLE:
+            self._logger.info("未指定配置文件或PyYAML不可用，配置热加载未启用")
+            return False
+        if self._thread is not None:
+            return True
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='yoloface-config-watcher', daemon=True)
+        self._thread.start()
+        self._logger.info(f"配置热加载已启用: {self.config.config_path}")
+        return True
+
+    def stop(self):
+        """停止轮询"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval * 2)
+            self._thread = None
+
+    def _run(self):
+        """轮询循环"""
+        while not self._stop_event.wait(self.interval):
+            self.check()
+
+    def check(self) -> bool:
+        """
+        检查一次文件是否变化，变化且校验通过时暂存新配置
+
+        Returns:
+            是否暂存了新配置
+        """
+        stamp = self._file_stamp()
+        if stamp is None or stamp == self._stamp:
+            return False
+        self._stamp = stamp
+
+        try:
+            with open(self.config.config_path, 'r', encoding='utf-8') as f:
+                data = yaml.safe_load(f) or {}
+            if not isinstance(data, dict):
+                raise ValueError("顶层必须是映射")
+            settings = build_settings(data)
+        except Exception as e:
+            # 编辑过程中可能读到不完整的文件，保留旧配置
+            self._logger.warning(f"新配置校验失败，忽略本次修改: {e}")
+            return False
+
+        with self._lock:
+            self._pending = (data, settings)
+        self._logger.info("检测到配置文件变化，将在下一帧应用")
+        return True
+
+    def apply_pending(self) -> Optional[ConfigChange]:
+        """
+        应用暂存的新配置（应在两帧之间、处理线程中调用）
+
+        Returns:
+            配置变更，无待应用配置时返回None
+        """
+        if self._pending is None:
+            return None
+        with self._lock:
+            pending, self._pending = self._pending, None
+        if pending is None:
+            return None
+
+        data, settings = pending
+        old = self.config.settings
+        self.config.replace(data, settings)
+        change = ConfigChange(old=old, new=self.config.settings)
+        changed = [name for name in self.sections() if change.changed(name)]
+        self._logger.info(f"配置已更新: {', '.join(changed) or '无检测相关变化'}")
+        return change
+
+    @staticmethod
+    def sections() -> List[str]:
+        """可热更新的配置段"""
+        return [
+            'detection.haar',
+            'detection.yolo11',
+            'detection.fastestv2',
+            'detection.tracking',
+            'detection.gender',
+            'detection.age',
+            'output',
+        ]
@@ -7,6 +7,10 @@ from .yolo11_detector import YOLO11FaceDetector
 from .fastestv2_detector import YoloFastestV2Detector
 from .face_tracker import FaceTracker
 from .gender_classifier import GenderClassifier, Gender
+from .age_estimator import AgeEstimator
+from .attribute_service import AttributeModelService, get_attribute_service
+from .attribute_worker import AttributeWorker, get_attribute_worker
+from .model_registry import ModelRegistry, get_model_registry
 
 __all__ = [
     'HaarFaceDetector',
@@ -14,6 +18,13 @@ __all__ = [
     'YoloFastestV2Detector',
     'FaceTracker',
     'GenderClassifier',
-    'Gender'
+    'Gender',
+    'AgeEstimator',
+    'AttributeModelService',
+    'get_attribute_service',
+    'AttributeWorker',
+    'get_attribute_worker',
+    'ModelRegistry',
+    'get_model_registry'
 ]
 
@@ -0,0 +1,257 @@
+"""
+年龄估计器
+基于OpenCV DNN（Caffe age_net）或人脸纹理启发式的年龄段估计，
+启发式所需的灰度、Laplacian、模糊、Canny等派生图像来自与性别识别共享的 FaceFeatures
+"""
+
+import threading
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from ..utils.logger import get_logger
+from ..config import get_config
+from .features import FaceFeatures
+from .preprocess import BlobPreprocessor
+from .model_registry import get_model_registry
+
+logger = get_logger(__name__)
+
+# (年龄段标签, 年龄范围, 置信度)
+AgeEstimate = Tuple[str, Tuple[int, int], float]
+
+UNKNOWN_AGE: AgeEstimate = ('Unknown', (0, 0), 0.5)
+
+
+class AgeEstimator:
+    """年龄估计器"""
+
+    # 年龄段定义（顺序与 AGE_LABELS 一致）
+    AGE_GROUPS = ['child', 'teen', 'young_adult', 'adult', 'senior']
+    AGE_RANGES = [(0, 12), (13, 19), (20, 35), (36, 50), (51, 100)]
+    AGE_LABELS = ['Child(0-12)', 'Teen(13-19)', 'Young(20-35)', 'Adult(36-50)', 'Senior(51+)']
+
+    # 常见的8类Caffe age_net输出
+    # (0-2, 4-6, 8-12, 15-20, 25-32, 38-43, 48-53, 60-100) 合并到上面的5个年龄段
+    _NET_CLASS_TO_GROUP = np.array([0, 0, 0, 1, 2, 3, 4, 4])
+
+    # 启发式规则：各特征的分档阈值与每档对5个年龄段的加分
+    _WRINKLE_BINS = np.array([5.0, 10.0, 15.0, 20.0])
+    _WRINKLE_SCORES = np.array([
+        [0.3, 0.2, 0.0, 0.0, 0.0],
+        [0.0, 0.3, 0.2, 0.0, 0.0],
+        [0.0, 0.0, 0.3, 0.2, 0.0],
+        [0.0, 0.0, 0.0, 0.3, 0.2],
+        [0.0, 0.0, 0.0, 0.1, 0.3],
+    ])
+    _SMOOTHNESS_BINS = np.array([5.0, 10.0, 15.0, 20.0])
+    _SMOOTHNESS_SCORES = np.array([
+        [0.25, 0.15, 0.0, 0.0, 0.0],
+        [0.0, 0.25, 0.15, 0.0, 0.0],
+        [0.0, 0.0, 0.25, 0.15, 0.0],
+        [0.0, 0.0, 0.0, 0.25, 0.15],
+        [0.0, 0.0, 0.0, 0.1, 0.25],
+    ])
+    _CONTRAST_BINS = np.array([20.0, 30.0, 40.0, 50.0])
+    _CONTRAST_SCORES = np.array([
+        [0.2, 0.0, 0.0, 0.0, 0.0],
+        [0.0, 0.2, 0.1, 0.0, 0.0],
+        [0.0, 0.0, 0.2, 0.1, 0.0],
+        [0.0, 0.0, 0.0, 0.2, 0.1],
+        [0.0, 0.0, 0.0, 0.1, 0.2],
+    ])
+    # 亮度越高越年轻：按 (>130, >110, >90, >70, 其他) 排列
+    _BRIGHTNESS_BINS = np.array([70.0, 90.0, 110.0, 130.0])
+    _BRIGHTNESS_SCORES = np.array([
+        [0.15, 0.1, 0.0, 0.0, 0.0],
+        [0.0, 0.15, 0.1, 0.0, 0.0],
+        [0.0, 0.0, 0.15, 0.1, 0.0],
+        [0.0, 0.0, 0.0, 0.15, 0.1],
+        [0.0, 0.0, 0.0, 0.1, 0.15],
+    ])
+    _EDGE_BINS = np.array([0.08, 0.12, 0.16, 0.20])
+    _EDGE_SCORES = np.array([
+        [0.1, 0.0, 0.0, 0.0, 0.0],
+        [0.0, 0.1, 0.05, 0.0, 0.0],
+        [0.0, 0.0, 0.1, 0.05, 0.0],
+        [0.0, 0.0, 0.0, 0.1, 0.05],
+        [0.0, 0.0, 0.0, 0.05, 0.1],
+    ])
+
+    def __init__(self, model_path: Optional[str] = None, prototxt_path: Optional[str] = None, **kwargs):
+        """
+        初始化年龄估计器
+
+        Args:
+            model_path: 模型文件路径（.caffemodel或.onnx），None时使用配置
+            prototxt_path: 模型配置文件路径（.prototxt，仅Caffe模型需要）
+            **kwargs: 其他参数（input_size, mean_values, scale, enabled）
+        """
+        age_settings = get_config().settings.detection.age
+
+        self.model_path = model_path if model_path is not None else age_settings.model_path
+        self.prototxt_path = prototxt_path if prototxt_path is not None else age_settings.prototxt_path
+        self.input_size = kwargs.get('input_size') or age_settings.input_size
+        self.mean_values = kwargs.get('mean_values') or age_settings.mean_values
+        self.scale = kwargs.get('scale') or age_settings.scale
+        self.enabled = kwargs.get('enabled', age_settings.enabled)
+        self.net = None
+        self._net_lock = threading.Lock()
+        # 与原脚本的 blobFromImage(crop=False) 相同的直接缩放，复用输入缓冲区
+        self._preprocessor = BlobPreprocessor(
+            tuple(self.input_size), mean=self.mean_values, scale=self.scale, swap_rb=False, mode='stretch'
+        )
+
+        if self.enabled and self.model_path:
+            self._load_model()
+        elif self.enabled:
+            logger.info("年龄估计已启用但未提供模型路径，将使用基于特征的启发式估计")
+
+    def _load_model(self):
+        """加载模型（经模型注册表解析并共享），失败时退回启发式估计"""
+        registry = get_model_registry()
+        entry = registry.find(self.model_path)
+        if entry is None:
+            logger.warning(f"未找到年龄模型: {self.model_path}，将使用启发式估计")
+            return
+        if entry.format == 'caffe' and self.prototxt_path:
+            entry = entry._replace(config_path=self.prototxt_path)
+        if entry.input_size or entry.mean or entry.scale is not None:
+            # 清单中记录的预处理参数描述的是该模型文件本身，优先于配置
+            self.input_size = entry.input_size or self.input_size
+            self.mean_values = entry.mean or self.mean_values
+            self.scale = entry.scale if entry.scale is not None else self.scale
+            self._preprocessor = BlobPreprocessor(
+                tuple(self.input_size), mean=self.mean_values, scale=self.scale, swap_rb=False, mode='stretch'
+            )
+
+        try:
+            width, height = self.input_size
+            loaded = registry.load_net(entry, (1, 3, height, width))
+            self.net, self._net_lock = loaded.net, loaded.lock
+            logger.info(f"成功加载年龄模型: {entry.path}")
+        except Exception as e:
+            logger.error(f"加载年龄模型失败: {e}，将使用启发式估计")
+            self.net = None
+
+    def predict(self, face_roi: np.ndarray, features: Optional[FaceFeatures] = None) -> AgeEstimate:
+        """
+        估计单个人脸的年龄段
+
+        Args:
+            face_roi: 人脸区域图像 (BGR格式)
+            features: 该人脸的共享特征包（可选）
+
+        Returns:
+            (年龄段标签, 年龄范围, 置信度)
+        """
+        return self.predict_batch([face_roi], None if features is None else [features])[0]
+
+    def predict_batch(
+        self,
+        face_rois: List[np.ndarray],
+        features: Optional[List[FaceFeatures]] = None
+    ) -> List[AgeEstimate]:
+        """
+        批量估计年龄段，使用模型时所有人脸合并为一次前向推理
+
+        Args:
+            face_rois: 人脸区域图像列表
+            features: 与 face_rois 一一对应的共享特征包列表（可选）
+
+        Returns:
+            [(年龄段标签, 年龄范围, 置信度), ...] 列表
+        """
+        if not face_rois:
+            return []
+        if not self.enabled:
+            return [UNKNOWN_AGE] * len(face_rois)
+        if features is None:
+            features = [FaceFeatures(roi) for roi in face_rois]
+
+        if self.net is not None:
+            try:
+                return self._predict_net(face_rois)
+            except Exception as e:
+                logger.error("批量年龄估计失败: %s", e)
+        return self._predict_simple(features)
+
+    def _predict_net(self, face_rois: List[np.ndarray]) -> List[AgeEstimate]:
+        """使用模型推理，空区域直接返回未知"""
+        results: List[AgeEstimate] = [UNKNOWN_AGE] * len(face_rois)
+        valid = [i for i, roi in enumerate(face_rois) if roi is not None and roi.size > 0]
+        if not valid:
+            return results
+
+        blob, _ = self._preprocessor.batch([face_rois[i] for i in valid])
+        with self._net_lock:
+            self.net.setInput(blob)
+            output = self.net.forward().reshape(len(valid), -1)
+
+        if output.shape[1] == len(self._NET_CLASS_TO_GROUP):
+            # 将细分类别的概率累加到对应年龄段
+            probs = np.zeros((len(valid), len(self.AGE_GROUPS)))
+            np.add.at(probs.T, self._NET_CLASS_TO_GROUP, output.T)
+        else:
+            probs = output[:, :len(self.AGE_GROUPS)]
+
+        groups = probs.argmax(axis=1)
+        for i, group, row in zip(valid, groups, probs):
+            results[i] = (self.AGE_LABELS[group], self.AGE_RANGES[group], float(row[group]))
+        return results
+
+    def _predict_simple(self, features: List[FaceFeatures]) -> List[AgeEstimate]:
+        """启发式估计，所有人脸的打分一次向量化完成"""
+        results: List[AgeEstimate] = [UNKNOWN_AGE] * len(features)
+        valid = [i for i, feat in enumerate(features) if not feat.empty and min(feat.shape) >= 10]
+        if not valid:
+            return results
+
+        try:
+            stats = np.array([
+                (feat.wrinkle_score, feat.smoothness, feat.std, feat.brightness, feat.edge_density)
+                for feat in (features[i] for i in valid)
+            ])
+        except Exception as e:
+            logger.error("启发式年龄估计失败: %s", e)
+            return results
+
+        groups, confidences = self._score_features(*stats.T)
+        for i, group, conf in zip(valid, groups, confidences):
+            results[i] = (self.AGE_LABELS[group], self.AGE_RANGES[group], float(conf))
+        return results
+
+    @classmethod
+    def _score_features(
+        cls,
+        wrinkle: np.ndarray,
+        smoothness: np.ndarray,
+        contrast: np.ndarray,
+        brightness: np.ndarray,
+        edge_density: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        启发式规则打分（向量化）
+
+        Args:
+            wrinkle: 皱纹强度（年龄越大越高）
+            smoothness: 皮肤粗糙度（年龄越大越高）
+            contrast: 亮度标准差（年龄越大越高）
+            brightness: 平均亮度（年龄越大越暗）
+            edge_density: 边缘密度（年龄越大越高）
+
+        Returns:
+            (年龄段索引数组, 置信度数组)
+        """
+        scores = (
+            cls._WRINKLE_SCORES[np.digitize(wrinkle, cls._WRINKLE_BINS)]
+            + cls._SMOOTHNESS_SCORES[np.digitize(smoothness, cls._SMOOTHNESS_BINS)]
+            + cls._CONTRAST_SCORES[np.digitize(contrast, cls._CONTRAST_BINS)]
+            + cls._BRIGHTNESS_SCORES[4 - np.digitize(brightness, cls._BRIGHTNESS_BINS, right=True)]
+            + cls._EDGE_SCORES[np.digitize(edge_density, cls._EDGE_BINS)]
+        )
+        groups = scores.argmax(axis=1)
+        best = scores[np.arange(len(groups)), groups]
+        # 每条规则都有加分，总分恒大于0
+        confidences = np.minimum(best / scores.sum(axis=1), 1.0)
+        return groups, confidences
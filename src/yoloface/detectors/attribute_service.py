@@ -0,0 +1,275 @@
+"""
+人脸属性模型服务
+进程内每种模型配置只加载一个性别分类器（及年龄估计器），供所有检测器共享；
+一帧中的所有人脸在调用线程中一次识别（整帧特征或单次批量前向推理）
+"""
+
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..utils.logger import get_logger
+from ..config import get_config
+from ..config.settings import AgeSettings, GenderSettings
+from .age_estimator import AgeEstimate, AgeEstimator
+from .crop_cache import CropCache
+from .features import FaceFeatures
+from .gender_classifier import GenderClassifier, Gender
+
+logger = get_logger(__name__)
+
+
+class AttributeModelService:
+    """人脸属性模型服务（线程安全）"""
+
+    def __init__(self, crop_cache: Optional[CropCache] = None):
+        """
+        初始化服务
+
+        Args:
+            crop_cache: predict_frame / predict_attributes 使用的人脸结果缓存，None表示不缓存
+        """
+        self._lock = threading.Lock()
+        self._classifiers: Dict[GenderSettings, Optional[GenderClassifier]] = {}
+        self._inference_locks: Dict[GenderSettings, threading.Lock] = {}
+        self._age_estimators: Dict[AgeSettings, AgeEstimator] = {}
+        self._settings: GenderSettings = get_config().settings.detection.gender
+        self._age_settings: AgeSettings = get_config().settings.detection.age
+        self.crop_cache = crop_cache if crop_cache is not None else CropCache(max_entries=0)
+
+    @property
+    def enabled(self) -> bool:
+        """当前配置是否启用性别识别"""
+        return self._settings.enabled
+
+    @property
+    def age_enabled(self) -> bool:
+        """当前配置是否启用年龄估计"""
+        return self._age_settings.enabled
+
+    def get_classifier(self, settings: Optional[GenderSettings] = None) -> Optional[GenderClassifier]:
+        """
+        获取指定配置对应的分类器（不存在时创建，同一配置只创建一次）
+
+        Args:
+            settings: 性别识别配置，None表示使用当前配置
+
+        Returns:
+            分类器实例，加载失败时返回None
+        """
+        settings = settings or self._settings
+        with self._lock:
+            if settings not in self._classifiers:
+                try:
+                    self._classifiers[settings] = GenderClassifier(
+                        model_path=settings.model_path,
+                        prototxt_path=settings.prototxt_path,
+                        input_size=settings.input_size,
+                        mean_values=settings.mean_values,
+                        scale=settings.scale,
+                        enabled=settings.enabled,
+                        precision=settings.precision,
+                        heuristic=settings.heuristic
+                    )
+                except Exception as e:
+                    logger.warning(f"无法加载性别分类器: {e}")
+                    self._classifiers[settings] = None
+            return self._classifiers[settings]
+
+    def get_age_estimator(self, settings: Optional[AgeSettings] = None) -> AgeEstimator:
+        """
+        获取指定配置对应的年龄估计器（同一配置只创建一次）
+
+        Args:
+            settings: 年龄估计配置，None表示使用当前配置
+
+        Returns:
+            年龄估计器实例
+        """
+        settings = settings or self._age_settings
+        with self._lock:
+            if settings not in self._age_estimators:
+                self._age_estimators[settings] = AgeEstimator(
+                    model_path=settings.model_path,
+                    prototxt_path=settings.prototxt_path,
+                    input_size=settings.input_size,
+                    mean_values=settings.mean_values,
+                    scale=settings.scale,
+                    enabled=settings.enabled
+                )
+            return self._age_estimators[settings]
+
+    def apply_age_settings(self, settings: AgeSettings):
+        """
+        切换到新的年龄估计配置（热更新），旧配置的估计器被释放
+
+        Args:
+            settings: 新的年龄估计配置
+        """
+        with self._lock:
+            old = self._age_settings
+            self._age_settings = settings
+            if old != settings:
+                self._age_estimators.pop(old, None)
+                self._inference_locks.pop(old, None)
+
+    def apply_settings(self, settings: GenderSettings):
+        """
+        切换到新的性别识别配置（热更新），旧配置的分类器被释放
+
+        Args:
+            settings: 新的性别识别配置
+        """
+        with self._lock:
+            old = self._settings
+            self._settings = settings
+            if old != settings:
+                self._classifiers.pop(old, None)
+                self._inference_locks.pop(old, None)
+        if old != settings:
+            self.crop_cache.clear()
+            logger.info("性别识别配置已更新，将按新配置加载分类器")
+
+    def predict_batch(self, face_rois: List[np.ndarray]) -> List[Tuple[Gender, float]]:
+        """
+        批量预测，在调用线程中直接执行一次前向推理
+
+        Args:
+            face_rois: 人脸区域图像列表
+
+        Returns:
+            [(性别, 置信度), ...] 列表
+        """
+        settings = self._settings
+        classifier = self.get_classifier(settings)
+        if classifier is None:
+            return [(Gender.UNKNOWN, 0.0)] * len(face_rois)
+        with self._lock:
+            lock = self._inference_locks.setdefault(settings, threading.Lock())
+        # cv2.dnn.Net 不支持并发 forward，同一分类器的推理串行执行
+        with lock:
+            return classifier.classify_batch(face_rois)
+
+    def predict_frame(
+        self,
+        frame: np.ndarray,
+        boxes: List[Tuple[int, int, int, int]],
+        gray: Optional[np.ndarray] = None,
+        origin: Tuple[int, int] = (0, 0)
+    ) -> List[Tuple[Gender, float]]:
+        """
+        对一帧中的所有人脸一次性分类（整帧特征或单次批量推理）
+        命中结果缓存的人脸不再重新分类
+
+        Args:
+            frame: 输入图像帧 (BGR格式)
+            boxes: 人脸边界框列表 [(x1, y1, x2, y2), ...]
+            gray: 已计算好的整帧灰度图（可选）
+            origin: frame 左上角在原始整帧中的坐标，frame 为裁剪区域时用于计算缓存位置
+
+        Returns:
+            [(性别, 置信度), ...] 列表，与 boxes 一一对应
+        """
+        if self.get_classifier(self._settings) is None:
+            return [(Gender.UNKNOWN, 0.0)] * len(boxes)
+        return self._predict(frame, boxes, gray, origin, with_age=False)
+
+    def predict_attributes(
+        self,
+        frame: np.ndarray,
+        boxes: List[Tuple[int, int, int, int]],
+        gray: Optional[np.ndarray] = None,
+        origin: Tuple[int, int] = (0, 0)
+    ) -> List[Tuple[Gender, float, AgeEstimate]]:
+        """
+        同时估计一帧中所有人脸的性别与年龄
+        每个人脸只构建一个特征包，性别与年龄共用其中的派生图像；
+        两者的结果一起写入人脸结果缓存
+
+        Args:
+            frame: 输入图像帧 (BGR格式)
+            boxes: 人脸边界框列表 [(x1, y1, x2, y2), ...]
+            gray: 已计算好的整帧灰度图（可选）
+            origin: frame 左上角在原始整帧中的坐标，frame 为裁剪区域时用于计算缓存位置
+
+        Returns:
+            [(性别, 置信度, (年龄段标签, 年龄范围, 置信度)), ...] 列表，与 boxes 一一对应
+        """
+        if not boxes:
+            return []
+        return self._predict(frame, boxes, gray, origin, with_age=True)
+
+    def _predict(
+        self,
+        frame: np.ndarray,
+        boxes: List[Tuple[int, int, int, int]],
+        gray: Optional[np.ndarray],
+        origin: Tuple[int, int],
+        with_age: bool
+    ) -> list:
+        """predict_frame / predict_attributes 的共同实现：先查缓存，未命中的人脸一起识别"""
+        gender_settings, age_settings = self._settings, self._age_settings
+        results: list = [None] * len(boxes)
+        keys: List[Optional[tuple]] = [None] * len(boxes)
+        if self.crop_cache.enabled:
+            ox, oy = origin
+            for i, (x1, y1, x2, y2) in enumerate(boxes):
+                roi = frame[max(0, y1):max(0, y2), max(0, x1):max(0, x2)]
+                key = self.crop_cache.make_key(roi, (x1 + ox, y1 + oy, x2 + ox, y2 + oy))
+                # 含年龄的结果与仅性别的结果分开缓存
+                keys[i] = key + ('age',) if with_age and key is not None else key
+                results[i] = self.crop_cache.get(keys[i])
+
+        misses = [i for i, result in enumerate(results) if result is None]
+        if not misses:
+            return results
+        miss_boxes = [boxes[i] for i in misses]
+
+        # 同时估计年龄时每个人脸只构建一个特征包，性别与年龄共用其中的灰度、边缘等派生图像
+        features = [FaceFeatures.from_box(frame, box, gray) for box in miss_boxes] if with_age else None
+
+        classifier = self.get_classifier(gender_settings)
+        if classifier is None:
+            computed = [(Gender.UNKNOWN, 0.0)] * len(misses)
+        else:
+            with self._lock:
+                gender_lock = self._inference_locks.setdefault(gender_settings, threading.Lock())
+            with gender_lock:
+                computed = classifier.classify_frame(frame, miss_boxes, gray, features)
+
+        if with_age:
+            estimator = self.get_age_estimator(age_settings)
+            with self._lock:
+                age_lock = self._inference_locks.setdefault(age_settings, threading.Lock())
+            with age_lock:
+                ages = estimator.predict_batch([feat.roi for feat in features], features)
+            computed = [(gender, conf, age) for (gender, conf), age in zip(computed, ages)]
+
+        for i, result in zip(misses, computed):
+            results[i] = result
+            self.crop_cache.put(keys[i], result)
+        return results
+
+
+# 全局服务实例
+_global_service: Optional[AttributeModelService] = None
+_global_lock = threading.Lock()
+
+
+def get_attribute_service() -> AttributeModelService:
+    """获取全局人脸属性模型服务"""
+    global _global_service
+    if _global_service is None:
+        with _global_lock:
+            if _global_service is None:
+                config = get_config()
+                _global_service = AttributeModelService(
+                    crop_cache=CropCache(
+                        max_entries=config.get('detection.gender.cache_size', 256),
+                        ttl_ms=config.get('detection.gender.cache_ttl_ms', 2000),
+                        position_grid=config.settings.detection.attributes.position_grid
+                    )
+                )
+    return _global_service
+
@@ -0,0 +1,333 @@
+"""
+异步人脸属性识别
+绘制线程只提交人脸区域并读取最近一次结果，性别/年龄识别在后台线程中完成，
+识别耗时不再直接拉低显示帧率。结果按跟踪ID（或人脸中心所在网格）关联，
+队列有最大深度，过期结果不再显示，延迟始终有上界。
+"""
+
+import queue
+import threading
+import time
+from typing import Dict, Hashable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..utils.logger import get_logger
+from ..config import get_config
+from ..config.settings import AttributeWorkerSettings
+from .age_estimator import AgeEstimate
+from .attribute_service import AttributeModelService, get_attribute_service
+from .gender_classifier import Gender
+
+logger = get_logger(__name__)
+
+
+class AttributeResult(NamedTuple):
+    """单个人脸的属性识别结果"""
+    gender: Gender
+    confidence: float
+    age: Optional[AgeEstimate]
+    timestamp: float
+
+    def label(self) -> str:
+        """绘制用标签文本"""
+        text = f'{self.gender.value} {self.confidence:.2f}'
+        if self.age is not None and self.age[2] > 0 and self.age[0] != 'Unknown':
+            text += f' {self.age[0]}'
+        return text
+
+
+class _Job(NamedTuple):
+    """一次识别请求（一帧中需要识别的人脸）"""
+    submitted: float
+    region: np.ndarray
+    origin: Tuple[int, int]
+    keys: List[Hashable]
+    boxes: List[Tuple[int, int, int, int]]
+
+
+class AttributeWorker:
+    """后台属性识别线程"""
+
+    def __init__(
+        self,
+        service: Optional[AttributeModelService] = None,
+        max_queue_depth: int = 2,
+        result_ttl_ms: float = 1000.0,
+        refresh_interval_ms: float = 200.0,
+        position_grid: int = 48
+    ):
+        """
+        初始化
+
+        Args:
+            service: 属性模型服务，None表示使用全局实例
+            max_queue_depth: 待处理请求的最大数量，满时丢弃最旧的请求
+            result_ttl_ms: 结果有效期（毫秒），同时用于丢弃排队过久的请求
+            refresh_interval_ms: 同一人脸两次识别之间的最短间隔（毫秒）
+            position_grid: 无跟踪ID时用于关联结果的网格大小（像素）
+        """
+        self.service = service or get_attribute_service()
+        self.max_queue_depth = max(1, int(max_queue_depth))
+        self.result_ttl = max(0.0, result_ttl_ms) / 1000.0
+        self.refresh_interval = max(0.0, refresh_interval_ms) / 1000.0
+        self.position_grid = max(1, int(position_grid))
+
+        self._lock = threading.Lock()
+        self._queue: 'queue.Queue[_Job]' = queue.Queue(maxsize=self.max_queue_depth)
+        self._results: Dict[Hashable, AttributeResult] = {}
+        self._requested: Dict[Hashable, float] = {}
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.submitted = 0
+        self.completed = 0
+        self.dropped = 0
+        self.stale = 0
+
+    @classmethod
+    def from_settings(cls, settings: AttributeWorkerSettings, **kwargs) -> 'AttributeWorker':
+        """根据配置快照创建"""
+        return cls(
+            max_queue_depth=settings.max_queue_depth,
+            result_ttl_ms=settings.result_ttl_ms,
+            refresh_interval_ms=settings.refresh_interval_ms,
+            position_grid=settings.position_grid,
+            **kwargs
+        )
+
+    @property
+    def queue_depth(self) -> int:
+        """当前排队的请求数"""
+        return self._queue.qsize()
+
+    def position_key(self, box: Sequence[int]) -> Tuple[str, int, int]:
+        """
+        无跟踪ID时按人脸中心所在网格生成关联键
+
+        Args:
+            box: 边界框 (x1, y1, x2, y2)
+
+        Returns:
+            关联键
+        """
+        x1, y1, x2, y2 = box
+        grid = self.position_grid
+        return 'pos', int((x1 + x2) // 2) // grid, int((y1 + y2) // 2) // grid
+
+    def ensure_queue_depth(self, depth: int):
+        """
+        将队列上限至少提高到 depth（多路视频流时每路每轮各提交一次请求）
+
+        Args:
+            depth: 需要的队列深度
+        """
+        with self._queue.mutex:
+            if depth > self.max_queue_depth:
+                self.max_queue_depth = int(depth)
+                self._queue.maxsize = self.max_queue_depth
+
+    def start(self):
+        """启动后台线程"""
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='yoloface-attribute-worker', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止后台线程"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+    def lookup(
+        self,
+        frame: np.ndarray,
+        boxes: List[Tuple[int, int, int, int]],
+        keys: Optional[List[Hashable]] = None,
+        namespace: Optional[Hashable] = None
+    ) -> List[Optional[AttributeResult]]:
+        """
+        返回各人脸最近一次的识别结果，并为需要刷新的人脸提交新的识别请求
+        只做裁剪与入队，不等待识别完成
+
+        Args:
+            frame: 当前帧（绘制前）
+            boxes: 人脸边界框列表 [(x1, y1, x2, y2), ...]
+            keys: 与 boxes 一一对应的关联键（如跟踪ID），None时按位置生成
+            namespace: 关联键的命名空间（多路视频流时为流编号，避免不同画面的同一位置/ID互相覆盖）
+
+        Returns:
+            与 boxes 一一对应的结果，尚无有效结果时为None
+        """
+        if keys is None:
+            keys = [self.position_key(box) for box in boxes]
+        if namespace is not None:
+            keys = [(namespace, key) for key in keys]
+        now = time.monotonic()
+
+        results: List[Optional[AttributeResult]] = []
+        pending_keys: List[Hashable] = []
+        pending_boxes: List[Tuple[int, int, int, int]] = []
+        with self._lock:
+            self._expire(now)
+            for key, box in zip(keys, boxes):
+                results.append(self._results.get(key))
+                if now - self._requested.get(key, -float('inf')) >= self.refresh_interval:
+                    self._requested[key] = now
+                    pending_keys.append(key)
+                    pending_boxes.append(box)
+
+        if pending_boxes:
+            self._submit(now, frame, pending_keys, pending_boxes)
+        return results
+
+    def _expire(self, now: float):
+        """清除过期结果（需持有锁）"""
+        expired = [key for key, result in self._results.items() if now - result.timestamp > self.result_ttl]
+        for key in expired:
+            del self._results[key]
+        expired = [key for key, requested in self._requested.items() if now - requested > self.result_ttl]
+        for key in expired:
+            del self._requested[key]
+
+    def _submit(self, now: float, frame: np.ndarray, keys: List[Hashable], boxes: List[Tuple[int, int, int, int]]):
+        """复制包含所有人脸的最小区域并入队，队列满时丢弃最旧的请求"""
+        arr = np.asarray(boxes, dtype=np.int64).reshape(-1, 4)
+        h, w = frame.shape[:2]
+        x0, y0 = int(np.clip(arr[:, 0].min(), 0, w)), int(np.clip(arr[:, 1].min(), 0, h))
+        x1, y1 = int(np.clip(arr[:, 2].max(), x0, w)), int(np.clip(arr[:, 3].max(), y0, h))
+        # 复制一份，绘制线程随后会在原帧上画框
+        region = frame[y0:y1, x0:x1].copy()
+        local_boxes = [(bx1 - x0, by1 - y0, bx2 - x0, by2 - y0) for bx1, by1, bx2, by2 in boxes]
+        job = _Job(now, region, (x0, y0), list(keys), local_boxes)
+
+        self.start()
+        while True:
+            try:
+                self._queue.put_nowait(job)
+                break
+            except queue.Full:
+                try:
+                    dropped = self._queue.get_nowait()
+                except queue.Empty:
+                    continue
+                self._forget(dropped.keys)
+                self.dropped += 1
+        self.submitted += 1
+
+    def _forget(self, keys: List[Hashable]):
+        """请求被丢弃后允许这些人脸立即重新提交"""
+        with self._lock:
+            for key in keys:
+                self._requested.pop(key, None)
+
+    def _run(self):
+        """后台线程：逐个处理请求"""
+        while not self._stop_event.is_set():
+            try:
+                job = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if time.monotonic() - job.submitted > self.result_ttl:
+                # 排队过久，结果出来时已经过期
+                self._forget(job.keys)
+                self.stale += 1
+                continue
+            try:
+                self._process(job)
+            except Exception as e:
+                logger.debug("异步属性识别失败: %s", e)
+                self._forget(job.keys)
+
+    def _process(self, job: _Job):
+        """执行一次识别并更新结果"""
+        if self.service.age_enabled:
+            predictions = self.service.predict_attributes(job.region, job.boxes, origin=job.origin)
+        else:
+            predictions = [
+                (gender, conf, None)
+                for gender, conf in self.service.predict_frame(job.region, job.boxes, origin=job.origin)
+            ]
+        now = time.monotonic()
+        with self._lock:
+            for key, (gender, conf, age) in zip(job.keys, predictions):
+                self._results[key] = AttributeResult(gender, conf, age, now)
+        self.completed += 1
+
+    def collect(self) -> List[Tuple[str, str, str, float]]:
+        """监控指标采集函数（供 MetricsRegistry.add_collector 使用）"""
+        return [
+            ('attribute_queue_depth', 'gauge', '异步属性识别排队的请求数', self.queue_depth),
+            ('attribute_requests_total', 'counter', '提交的属性识别请求数', self.submitted),
+            ('attribute_completed_total', 'counter', '完成的属性识别请求数', self.completed),
+            ('attribute_dropped_total', 'counter', '队列满时丢弃的请求数', self.dropped),
+            ('attribute_stale_total', 'counter', '排队过久被跳过的请求数', self.stale),
+        ]
+
+
+# 全局实例
+_global_worker: Optional[AttributeWorker] = None
+_global_lock = threading.Lock()
+
+
+def get_attribute_worker() -> Optional[AttributeWorker]:
+    """
+    获取全局异步属性识别线程
+
+    Returns:
+        AttributeWorker实例，配置中关闭异步识别时返回None
+    """
+    global _global_worker
+    settings = get_config().settings.detection.attributes
+    if not settings.async_enabled:
+        return None
+    if _global_worker is None:
+        with _global_lock:
+            if _global_worker is None:
+                _global_worker = AttributeWorker.from_settings(settings)
+    return _global_worker
+
+
+def classify_faces(
+    frame: np.ndarray,
+    boxes: List[Tuple[int, int, int, int]],
+    keys: Optional[List[Hashable]] = None,
+    gray: Optional[np.ndarray] = None,
+    stream: Optional[Hashable] = None
+) -> List[Optional[AttributeResult]]:
+    """
+    绘制时获取各人脸的属性：开启异步识别时返回最近结果，否则在当前线程同步识别
+
+    Args:
+        frame: 当前帧（绘制前）
+        boxes: 人脸边界框列表 [(x1, y1, x2, y2), ...]
+        keys: 与 boxes 一一对应的关联键（如跟踪ID），None时按位置生成
+        gray: 已计算好的整帧灰度图（仅同步识别时使用）
+        stream: 多路视频流时的流编号，用作关联键的命名空间
+
+    Returns:
+        与 boxes 一一对应的结果，无可用结果时为None
+    """
+    if not boxes:
+        return []
+    service = get_attribute_service()
+    if not service.enabled:
+        return [None] * len(boxes)
+
+    worker = get_attribute_worker()
+    if worker is not None:
+        return worker.lookup(frame, boxes, keys, namespace=stream)
+
+    now = time.monotonic()
+    if service.age_enabled:
+        return [
+            AttributeResult(gender, conf, age, now)
+            for gender, conf, age in service.predict_attributes(frame, boxes, gray)
+        ]
+    return [
+        AttributeResult(gender, conf, None, now)
+        for gender, conf in service.predict_frame(frame, boxes, gray)
+    ]
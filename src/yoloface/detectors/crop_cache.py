@@ -0,0 +1,146 @@
+"""
+人脸区域结果缓存
+非跟踪检测器在帧间没有身份信息，静止的人脸每帧都会被重新分类；
+这里以缩小后人脸的感知哈希（dHash）加上粗粒度位置作为键，缓存分类结果，
+LRU淘汰并带有有效期
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+# dHash 比较 9x8 缩略图中水平相邻像素，得到 64 位哈希
+_HASH_WIDTH = 9
+_HASH_HEIGHT = 8
+_HASH_WEIGHTS = (1 << np.arange(64, dtype=np.uint64)).reshape(_HASH_HEIGHT, _HASH_WIDTH - 1)
+
+
+def dhash(face_roi: np.ndarray) -> int:
+    """
+    计算人脸区域的 64 位差值哈希
+
+    Args:
+        face_roi: 人脸区域图像 (BGR或灰度)
+
+    Returns:
+        64位整数哈希
+    """
+    small = cv2.resize(face_roi, (_HASH_WIDTH, _HASH_HEIGHT), interpolation=cv2.INTER_AREA)
+    if small.ndim == 3:
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    bits = small[:, 1:] > small[:, :-1]
+    return int(_HASH_WEIGHTS[bits].sum())
+
+
+class CropCache:
+    """以感知哈希+粗粒度位置为键的LRU结果缓存（线程安全）"""
+
+    def __init__(self, max_entries: int = 256, ttl_ms: float = 2000.0, position_grid: int = 48):
+        """
+        初始化
+
+        Args:
+            max_entries: 最大缓存条目数，0表示禁用
+            ttl_ms: 条目有效期（毫秒）
+            position_grid: 位置量化网格大小（像素）
+        """
+        self.max_entries = max(0, int(max_entries))
+        self.ttl = max(0.0, ttl_ms) / 1000.0
+        self.position_grid = max(1, int(position_grid))
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[Hashable, Tuple[float, Any]]' = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        """是否启用缓存"""
+        return self.max_entries > 0
+
+    @property
+    def hit_rate(self) -> float:
+        """命中率"""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def make_key(self, face_roi: np.ndarray, box: Sequence[int]) -> Optional[Hashable]:
+        """
+        生成缓存键
+
+        Args:
+            face_roi: 人脸区域图像
+            box: 人脸在整帧中的边界框 (x1, y1, x2, y2)
+
+        Returns:
+            缓存键，区域为空时返回None
+        """
+        if face_roi is None or face_roi.size == 0:
+            return None
+        x1, y1, x2, y2 = box
+        grid = self.position_grid
+        return dhash(face_roi), int((x1 + x2) // 2) // grid, int((y1 + y2) // 2) // grid
+
+    def get(self, key: Optional[Hashable]) -> Optional[Any]:
+        """
+        查询缓存，命中时刷新LRU顺序
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            缓存的结果，未命中或已过期时返回None
+        """
+        if key is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] <= self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+                self.evictions += 1
+            self.misses += 1
+            return None
+
+    def put(self, key: Optional[Hashable], value: Any):
+        """
+        写入缓存，超过容量时淘汰最久未使用的条目
+
+        Args:
+            key: 缓存键
+            value: 结果
+        """
+        if key is None or not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """清空缓存（模型或配置变化时调用）"""
+        with self._lock:
+            self._entries.clear()
+
+    def collect(self) -> List[Tuple[str, str, str, float]]:
+        """监控指标采集函数（供 MetricsRegistry.add_collector 使用）"""
+        return [
+            ('crop_cache_hits_total', 'counter', '人脸结果缓存命中次数', self.hits),
+            ('crop_cache_misses_total', 'counter', '人脸结果缓存未命中次数', self.misses),
+            ('crop_cache_evictions_total', 'counter', '人脸结果缓存淘汰条目数', self.evictions),
+            ('crop_cache_entries', 'gauge', '人脸结果缓存当前条目数', len(self._entries)),
+            ('crop_cache_hit_ratio', 'gauge', '人脸结果缓存命中率', self.hit_rate),
+        ]
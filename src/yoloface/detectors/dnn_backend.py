@@ -0,0 +1,341 @@
+"""
+OpenCV DNN后端选择与线程配置
+启动时探测可用的 (后端, 目标) 组合，用空输入实测前向耗时选出最快的组合并缓存到磁盘；
+探测失败（如无GPU的板子上的CUDA）在这里暴露，而不是在第一帧 forward() 时才出错。
+同时按流水线的并行规划设置 cv2.setNumThreads。
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from ..utils.logger import get_logger
+from ..config import get_config
+
+logger = get_logger(__name__)
+
+
+def _constants(prefix: str) -> Dict[int, str]:
+    """收集 cv2.dnn 中的后端/目标常量 {值: 名称}"""
+    names = {}
+    for attr in dir(cv2.dnn):
+        if attr.startswith(prefix):
+            names.setdefault(getattr(cv2.dnn, attr), attr[len(prefix):].lower())
+    return names
+
+
+BACKEND_NAMES = _constants('DNN_BACKEND_')
+TARGET_NAMES = _constants('DNN_TARGET_')
+
+# 探测顺序，CPU放在最前作为兜底
+_PROBE_BACKENDS = ('OPENCV', 'CUDA', 'INFERENCE_ENGINE', 'VKCOM', 'TIMVX', 'CANN')
+
+
+class BackendChoice(NamedTuple):
+    """选中的后端与目标"""
+    backend: int
+    target: int
+    latency_ms: float
+
+    @property
+    def name(self) -> str:
+        """可读名称，如 'opencv/cpu'"""
+        return f"{BACKEND_NAMES.get(self.backend, self.backend)}/{TARGET_NAMES.get(self.target, self.target)}"
+
+
+CPU_CHOICE = BackendChoice(cv2.dnn.DNN_BACKEND_OPENCV, cv2.dnn.DNN_TARGET_CPU, 0.0)
+
+
+def cuda_device_count() -> int:
+    """
+    当前可用的CUDA设备数量
+    OpenCV在CUDA后端初始化失败时会静默回退到CPU，测速结果会被误记为CUDA，因此先确认有设备
+
+    Returns:
+        设备数量，OpenCV未编译CUDA支持时为0
+    """
+    try:
+        return int(cv2.cuda.getCudaEnabledDeviceCount())
+    except (AttributeError, cv2.error):
+        return 0
+
+
+def available_backends() -> List[Tuple[int, int]]:
+    """
+    列出当前OpenCV构建中可用的 (后端, 目标) 组合
+
+    Returns:
+        [(backend, target), ...]，至少包含 OpenCV/CPU
+    """
+    pairs: List[Tuple[int, int]] = []
+    for name in _PROBE_BACKENDS:
+        backend = getattr(cv2.dnn, f'DNN_BACKEND_{name}', None)
+        if backend is None:
+            continue
+        if name == 'CUDA' and cuda_device_count() == 0:
+            continue
+        try:
+            targets = cv2.dnn.getAvailableTargets(backend)
+        except cv2.error:
+            continue
+        pairs.extend((backend, int(target)) for target in targets)
+    if CPU_CHOICE[:2] not in pairs:
+        pairs.insert(0, CPU_CHOICE[:2])
+    return pairs
+
+
+def parse_backend(spec: str) -> Optional[Tuple[int, int]]:
+    """
+    解析 'cuda'、'opencv/opencl' 形式的后端配置
+
+    Args:
+        spec: 后端名称，可带 '/目标'
+
+    Returns:
+        (backend, target)，无法识别时返回None
+    """
+    backend_name, _, target_name = spec.lower().partition('/')
+    backends = {name: value for value, name in BACKEND_NAMES.items()}
+    targets = {name: value for value, name in TARGET_NAMES.items()}
+    if backend_name not in backends:
+        return None
+    backend = backends[backend_name]
+    if target_name:
+        if target_name not in targets:
+            return None
+        return backend, targets[target_name]
+    # 未指定目标时使用该后端的默认目标
+    default_targets = {'cuda': 'cuda', 'vkcom': 'vulkan', 'timvx': 'npu', 'cann': 'npu'}
+    return backend, targets[default_targets.get(backend_name, 'cpu')]
+
+
+class DnnBackendSelector:
+    """DNN后端选择器（线程安全，结果按模型缓存到磁盘）"""
+
+    def __init__(
+        self,
+        mode: str = 'auto',
+        cache_file: Optional[str] = None,
+        runs: int = 3
+    ):
+        """
+        初始化
+
+        Args:
+            mode: 'auto' 实测选择最快组合；'cpu' 固定 OpenCV/CPU；其他值按 parse_backend 解析为固定组合
+            cache_file: 测速结果缓存文件，None表示不缓存
+            runs: 每个组合计时的前向次数（另有一次预热）
+        """
+        self.mode = (mode or 'auto').lower()
+        self.cache_file = cache_file
+        self.runs = max(1, int(runs))
+        self._lock = threading.Lock()
+        self._cache: Optional[Dict[str, Dict[str, float]]] = None
+
+    def candidates(self) -> List[Tuple[int, int]]:
+        """当前模式下需要尝试的组合"""
+        if self.mode == 'auto':
+            return available_backends()
+        if self.mode == 'cpu':
+            return [CPU_CHOICE[:2]]
+        forced = parse_backend(self.mode)
+        if forced is None:
+            logger.warning(f"无法识别的DNN后端配置: {self.mode}，使用CPU")
+            return [CPU_CHOICE[:2]]
+        if forced[0] == getattr(cv2.dnn, 'DNN_BACKEND_CUDA', None) and cuda_device_count() == 0:
+            logger.warning(f"未检测到CUDA设备，DNN后端 {self.mode} 不可用，使用CPU")
+            return [CPU_CHOICE[:2]]
+        return [forced, CPU_CHOICE[:2]]
+
+    @staticmethod
+    def _model_key(model_path: str, input_shape: Sequence[int]) -> str:
+        """缓存键：模型文件身份 + 输入尺寸 + OpenCV版本"""
+        try:
+            stat = os.stat(model_path)
+            identity = f"{os.path.abspath(model_path)}:{stat.st_mtime_ns}:{stat.st_size}"
+        except OSError:
+            identity = os.path.abspath(model_path)
+        shape = 'x'.join(str(int(v)) for v in input_shape)
+        return f"{identity}:{shape}:{cv2.__version__}"
+
+    def _load_cache(self) -> Dict[str, Dict[str, float]]:
+        """读取缓存文件（需持有锁）"""
+        if self._cache is None:
+            self._cache = {}
+            if self.cache_file and os.path.exists(self.cache_file):
+                try:
+                    with open(self.cache_file, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                    if isinstance(data, dict):
+                        self._cache = data
+                except (OSError, ValueError) as e:
+                    logger.warning(f"读取DNN后端缓存失败: {e}")
+        return self._cache
+
+    def _save_cache(self):
+        """原子写入缓存文件（需持有锁）"""
+        if not self.cache_file:
+            return
+        try:
+            path = Path(self.cache_file)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temp_file = path.with_suffix('.tmp')
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(self._cache, f, ensure_ascii=False, indent=2)
+            os.replace(temp_file, path)
+        except OSError as e:
+            logger.warning(f"写入DNN后端缓存失败: {e}")
+
+    def _benchmark(self, net, dummy: np.ndarray, backend: int, target: int) -> Optional[float]:
+        """在指定组合上计时前向推理，失败时返回None"""
+        try:
+            net.setPreferableBackend(backend)
+            net.setPreferableTarget(target)
+            net.setInput(dummy)
+            net.forward()  # 预热，同时触发该后端的初始化
+            timings = []
+            for _ in range(self.runs):
+                start = time.perf_counter()
+                net.setInput(dummy)
+                net.forward()
+                timings.append((time.perf_counter() - start) * 1000.0)
+            return float(np.median(timings))
+        except cv2.error as e:
+            logger.debug("DNN后端 %s 不可用: %s",
+                         BackendChoice(backend, target, 0.0).name, str(e).strip().splitlines()[-1:])
+            return None
+
+    def select(self, net, model_path: str, input_shape: Sequence[int]) -> BackendChoice:
+        """
+        为网络选择并应用后端
+
+        Args:
+            net: cv2.dnn网络
+            model_path: 模型文件路径（用于缓存键）
+            input_shape: 输入blob形状，如 (1, 3, 416, 416)
+
+        Returns:
+            选中的组合
+        """
+        key = self._model_key(model_path, input_shape)
+        candidates = self.candidates()
+
+        with self._lock:
+            cached = self._load_cache().get(key)
+        if cached and (int(cached['backend']), int(cached['target'])) in candidates:
+            choice = BackendChoice(int(cached['backend']), int(cached['target']), float(cached['latency_ms']))
+            net.setPreferableBackend(choice.backend)
+            net.setPreferableTarget(choice.target)
+            logger.info(f"DNN后端（缓存）: {choice.name} {choice.latency_ms:.1f}ms")
+            return choice
+
+        dummy = np.zeros(tuple(int(v) for v in input_shape), dtype=np.float32)
+        results: List[BackendChoice] = []
+        for backend, target in candidates:
+            latency = self._benchmark(net, dummy, backend, target)
+            if latency is not None:
+                results.append(BackendChoice(backend, target, latency))
+                if self.mode != 'auto':
+                    # 固定后端模式下第一个可用的即为结果
+                    break
+
+        choice = min(results, key=lambda c: c.latency_ms) if results else CPU_CHOICE
+        net.setPreferableBackend(choice.backend)
+        net.setPreferableTarget(choice.target)
+        logger.info(
+            f"DNN后端: {choice.name} {choice.latency_ms:.1f}ms"
+            f"（候选: {', '.join(f'{c.name}={c.latency_ms:.1f}ms' for c in results) or '无'}）"
+        )
+
+        with self._lock:
+            self._load_cache()[key] = {
+                'backend': choice.backend,
+                'target': choice.target,
+                'name': choice.name,
+                'latency_ms': round(choice.latency_ms, 3),
+            }
+            self._save_cache()
+        return choice
+
+
+def plan_num_threads(
+    num_threads: int = 0,
+    cpu_count: Optional[int] = None,
+    async_attributes: bool = True,
+    num_processes: int = 1
+) -> int:
+    """
+    根据流水线并行规划计算OpenCV线程数
+
+    采集/显示占用一个核，开启异步属性识别时后台线程再占用一个核，
+    剩余的核在检测进程之间平分
+
+    Args:
+        num_threads: 配置的线程数，大于0时直接使用
+        cpu_count: CPU核数，None时自动获取
+        async_attributes: 是否开启异步属性识别线程
+        num_processes: 并行检测进程数
+
+    Returns:
+        线程数（至少为1）
+    """
+    if num_threads and num_threads > 0:
+        return int(num_threads)
+    cpu_count = cpu_count or os.cpu_count() or 1
+    reserved = 1 + (1 if async_attributes else 0)
+    return max(1, (cpu_count - reserved) // max(1, num_processes))
+
+
+_threads_applied = False
+
+
+def apply_thread_plan(force: bool = False) -> int:
+    """
+    按配置设置 cv2.setNumThreads（进程内只设置一次）
+
+    Args:
+        force: 是否忽略已设置的标记重新设置
+
+    Returns:
+        设置的线程数
+    """
+    global _threads_applied
+    settings = get_config().settings
+    performance = settings.performance
+    threads = plan_num_threads(
+        num_threads=get_config().get('performance.dnn.num_threads', 0),
+        async_attributes=settings.detection.attributes.async_enabled,
+        num_processes=performance.num_processes if performance.enable_multiprocess else 1
+    )
+    if force or not _threads_applied:
+        cv2.setNumThreads(threads)
+        _threads_applied = True
+        logger.info(f"OpenCV线程数: {threads}")
+    return threads
+
+
+# 全局实例
+_global_selector: Optional[DnnBackendSelector] = None
+_global_lock = threading.Lock()
+
+
+def get_backend_selector() -> DnnBackendSelector:
+    """获取全局DNN后端选择器（首次调用时同时应用线程规划）"""
+    global _global_selector
+    if _global_selector is None:
+        with _global_lock:
+            if _global_selector is None:
+                config = get_config()
+                _global_selector = DnnBackendSelector(
+                    mode=config.get('performance.dnn.backend', 'auto'),
+                    cache_file=config.get('performance.dnn.cache_file', 'logs/dnn_backend.json'),
+                    runs=config.get('performance.dnn.benchmark_runs', 3)
+                )
+                apply_thread_plan()
+    return _global_selector
@@ -15,24 +15,14 @@ except ImportError:
 
 from ..utils.logger import get_logger
 from ..utils.file_utils import get_model_path
+from ..utils.profiler import get_profiler
 from ..config import get_config
+from .attribute_worker import classify_faces
+from .gender_classifier import Gender
+from .model_registry import get_model_registry
 
 logger = get_logger(__name__)
 
-# 延迟导入性别分类器
-_gender_classifier = None
-
-def _get_gender_classifier():
-    """获取性别分类器实例（单例）"""
-    global _gender_classifier
-    if _gender_classifier is None:
-        try:
-            from .gender_classifier import GenderClassifier
-            _gender_classifier = GenderClassifier()
-        except Exception as e:
-            logger.warning(f"无法加载性别分类器: {e}")
-            _gender_classifier = None
-    return _gender_classifier
 
 
 class FaceTracker:
@@ -45,40 +35,71 @@ class FaceTracker:
         Args:
             model_path: YOLO11模型文件路径
             conf_threshold: 置信度阈值
-            **kwargs: 其他参数
+            **kwargs: 其他参数（model: 已加载的YOLO模型，多路视频流的各跟踪器共享一个模型）
         """
         if not YOLO_AVAILABLE:
             raise ImportError("ultralytics未安装，请运行: pip install ultralytics")
         
-        config = get_config()
+        detection_settings = get_config().settings.detection
         
         if model_path is None:
-            model_path = config.get('detection.yolo11.model_path', 'yolo11n.pt')
+            model_path = detection_settings.yolo11.model_path
         
         if conf_threshold is None:
-            conf_threshold = config.get('detection.yolo11.conf_threshold', 0.25)
+            conf_threshold = detection_settings.yolo11.conf_threshold
         
         self.conf_threshold = conf_threshold
+        self.model_path = model_path
+        self.model = kwargs.get('model') or self._load_model(model_path)
+        
+        # 跟踪参数
+        tracking_settings = detection_settings.tracking
+        self.iou_threshold = kwargs.get('iou_threshold') or tracking_settings.iou_threshold
+        self.max_history = kwargs.get('max_history') or tracking_settings.max_history
+        self.track_lost_threshold = kwargs.get('track_lost_threshold') or tracking_settings.track_lost_threshold
+        
+        # 跟踪数据
+        self.track_history = defaultdict(list)
+        self.track_colors = {}
+        self.next_track_id = 0
+    
+    def _load_model(self, model_path: str):
+        """
+        加载YOLO11模型
         
+        Args:
+            model_path: 模型文件路径
+            
+        Returns:
+            YOLO模型
+        """
         try:
-            full_path = get_model_path(model_path)
+            entry = get_model_registry().find(model_path)
+            full_path = entry.path if entry is not None else get_model_path(model_path)
             logger.info(f"加载YOLO11模型: {full_path}")
-            self.model = YOLO(full_path)
+            return YOLO(full_path)
         except Exception as e:
             logger.error(f"加载模型失败: {e}")
             logger.info("尝试使用预训练模型...")
-            self.model = YOLO('yolo11n.pt')
+            return YOLO('yolo11n.pt')
+    
+    def apply_settings(self, detection_settings):
+        """
+        热更新检测与跟踪参数（应在两帧之间调用），仅在模型路径变化时重新加载模型
         
-        # 跟踪参数
-        tracking_config = config.get('detection.tracking', {})
-        self.iou_threshold = kwargs.get('iou_threshold') or tracking_config.get('iou_threshold', 0.3)
-        self.max_history = kwargs.get('max_history') or tracking_config.get('max_history', 30)
-        self.track_lost_threshold = kwargs.get('track_lost_threshold') or tracking_config.get('track_lost_threshold', 5)
+        Args:
+            detection_settings: 新的检测配置快照（DetectionSettings）
+        """
+        yolo11_settings = detection_settings.yolo11
+        if yolo11_settings.model_path != self.model_path:
+            self.model = self._load_model(yolo11_settings.model_path)
+            self.model_path = yolo11_settings.model_path
+        self.conf_threshold = yolo11_settings.conf_threshold
         
-        # 跟踪数据
-        self.track_history = defaultdict(list)
-        self.track_colors = {}
-        self.next_track_id = 0
+        tracking_settings = detection_settings.tracking
+        self.iou_threshold = tracking_settings.iou_threshold
+        self.max_history = tracking_settings.max_history
+        self.track_lost_threshold = tracking_settings.track_lost_threshold
     
     def calculate_iou(self, box1: Tuple[int, int, int, int], box2: Tuple[int, int, int, int]) -> float:
         """
@@ -195,26 +216,47 @@ class FaceTracker:
         Returns:
             tracks: 跟踪结果
         """
-        results = self.model(frame, conf=self.conf_threshold, verbose=False)
-        detections = []
+        profiler = get_profiler()
+        detections = self.detect_batch([frame])[0]
+        with profiler.span('postprocess'):
+            return self.update_tracks(detections)
+    
+    def detect_batch(self, frames: List[np.ndarray]) -> List[List[Tuple[int, int, int, int, float, int]]]:
+        """
+        批量检测（不更新跟踪状态，多路视频流时由各路跟踪器分别调用 update_tracks）
         
-        for result in results:
-            boxes = result.boxes
-            for box in boxes:
-                cls = int(box.cls[0])
-                conf = float(box.conf[0])
-                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                detections.append((int(x1), int(y1), int(x2), int(y2), conf, cls))
+        Args:
+            frames: 输入图像帧列表
+            
+        Returns:
+            与 frames 一一对应的检测结果
+        """
+        if not frames:
+            return []
+        profiler = get_profiler()
         
-        tracks = self.update_tracks(detections)
-        return tracks
+        with profiler.span('inference'):
+            results = self.model(list(frames), conf=self.conf_threshold, verbose=False)
+        
+        batch = []
+        with profiler.span('postprocess'):
+            for result in results:
+                detections = []
+                for box in result.boxes:
+                    cls = int(box.cls[0])
+                    conf = float(box.conf[0])
+                    x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
+                    detections.append((int(x1), int(y1), int(x2), int(y2), conf, cls))
+                batch.append(detections)
+        return batch
     
     def draw_tracks(
         self,
         frame: np.ndarray,
         tracks: Dict[int, Tuple[int, int, int, int, float, int]],
         show_trail: bool = True,
-        show_gender: bool = True
+        show_gender: bool = True,
+        stream: Optional[int] = None
     ) -> np.ndarray:
         """
         绘制跟踪结果
@@ -224,38 +266,41 @@ class FaceTracker:
             tracks: 跟踪结果
             show_trail: 是否显示轨迹
             show_gender: 是否显示性别
+            stream: 多路视频流时的流编号（区分各路画面的属性识别结果）
             
         Returns:
             frame: 绘制了跟踪框和轨迹的图像
         """
-        gender_classifier = _get_gender_classifier() if show_gender else None
+        profiler = get_profiler()
+        
+        # 性别识别：先对整帧所有跟踪目标一次性分类，再绘制
+        labels = {track_id: f'ID:{track_id} {det[4]:.2f}' for track_id, det in tracks.items()}
+        if show_gender:
+            boxes, track_ids = [], []
+            for track_id, (x1, y1, x2, y2, conf, cls) in tracks.items():
+                # 提取人脸区域（确保坐标有效）
+                x1_safe, y1_safe = max(0, x1), max(0, y1)
+                x2_safe, y2_safe = min(frame.shape[1], x2), min(frame.shape[0], y2)
+                if x2_safe - x1_safe > 10 and y2_safe - y1_safe > 10:
+                    boxes.append((x1_safe, y1_safe, x2_safe, y2_safe))
+                    track_ids.append(track_id)
+            try:
+                with profiler.span('classification'):
+                    results = classify_faces(frame, boxes, track_ids, stream=stream)
+                for track_id, result in zip(track_ids, results):
+                    if result and result.gender != Gender.UNKNOWN:
+                        labels[track_id] = f'ID:{track_id} {result.label()}'
+            except Exception as e:
+                logger.debug("性别识别失败: %s", e)
         
         for track_id, (x1, y1, x2, y2, conf, cls) in tracks.items():
             # 获取跟踪颜色
             color = self.track_colors.get(track_id, (0, 255, 0))
+            label = labels[track_id]
             
             # 绘制边界框
             cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
             
-            # 性别识别
-            label = f'ID:{track_id} {conf:.2f}'
-            if gender_classifier:
-                try:
-                    # 提取人脸区域（确保坐标有效）
-                    x1_safe = max(0, x1)
-                    y1_safe = max(0, y1)
-                    x2_safe = min(frame.shape[1], x2)
-                    y2_safe = min(frame.shape[0], y2)
-                    
-                    if x2_safe > x1_safe and y2_safe > y1_safe:
-                        face_roi = frame[y1_safe:y2_safe, x1_safe:x2_safe]
-                        if face_roi.size > 0 and face_roi.shape[0] > 10 and face_roi.shape[1] > 10:
-                            gender, gender_conf = gender_classifier.predict(face_roi)
-                            if gender.value != "未知":
-                                label = f'ID:{track_id} {gender.value} {gender_conf:.2f}'
-                except Exception as e:
-                    logger.debug(f"性别识别失败: {e}")
-            
             # 绘制标签
             cv2.putText(frame, label, (x1, y1 - 10),
                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
@@ -4,29 +4,43 @@ Yolo-FastestV2轻量级检测器
 
 import cv2
 import numpy as np
-import os
+import threading
 from typing import List, Tuple, Optional
 
 from ..utils.logger import get_logger
-from ..utils.file_utils import find_file
+from ..utils.profiler import get_profiler
 from ..config import get_config
+from .attribute_worker import classify_faces
+from .gender_classifier import Gender
+from .preprocess import BlobPreprocessor
+from .model_registry import get_model_registry
 
 logger = get_logger(__name__)
 
-# 延迟导入性别分类器
-_gender_classifier = None
 
-def _get_gender_classifier():
-    """获取性别分类器实例（单例）"""
-    global _gender_classifier
-    if _gender_classifier is None:
-        try:
-            from .gender_classifier import GenderClassifier
-            _gender_classifier = GenderClassifier()
-        except Exception as e:
-            logger.warning(f"无法加载性别分类器: {e}")
-            _gender_classifier = None
-    return _gender_classifier
+def decode_output(output: np.ndarray, conf_threshold: float, imgsz: int, letterbox) -> np.ndarray:
+    """
+    解码单张图像的网络输出（检测器与基准测试脚本共用）
+    
+    Args:
+        output: 单张图像的输出，格式为 [num_detections, 6] (cx, cy, w, h, conf, cls)，坐标相对网络输入归一化
+        conf_threshold: 置信度阈值
+        imgsz: 网络输入尺寸
+        letterbox: 该图像的缩放参数（LetterboxInfo）
+        
+    Returns:
+        形状为 (N, 6) 的数组 (x1, y1, x2, y2, conf, cls)，坐标为原图坐标
+    """
+    if len(output.shape) == 3:
+        output = output[0]  # 移除多余的维度
+    if output.ndim != 2 or output.shape[1] < 6:
+        return np.empty((0, 6))
+    output = output[output[:, 4] > conf_threshold]
+    centers, sizes = output[:, 0:2], output[:, 2:4]
+    boxes = np.hstack([centers - sizes / 2, centers + sizes / 2]) * imgsz
+    # 去除letterbox的缩放与填充，映射回原图坐标
+    boxes = letterbox.to_source(boxes)
+    return np.hstack([boxes, output[:, 4:6]])
 
 
 class YoloFastestV2Detector:
@@ -39,44 +53,82 @@ class YoloFastestV2Detector:
         Args:
             model_path: 模型文件路径（ONNX格式）
             conf_threshold: 置信度阈值
-            **kwargs: 其他参数
+            **kwargs: 其他参数（imgsz、precision: fp32/fp16/int8/auto）
         """
-        config = get_config()
+        fastestv2_settings = get_config().settings.detection.fastestv2
         
         if model_path is None:
-            model_path = config.get('detection.fastestv2.model_path', 'yolo_fastestv2/model.onnx')
+            model_path = fastestv2_settings.model_path
         
         if conf_threshold is None:
-            conf_threshold = config.get('detection.fastestv2.conf_threshold', 0.25)
+            conf_threshold = fastestv2_settings.conf_threshold
         
         self.conf_threshold = conf_threshold
-        self.imgsz = kwargs.get('imgsz') or config.get('detection.fastestv2.imgsz', 416)
-        self.net = None
+        self.imgsz = kwargs.get('imgsz') or fastestv2_settings.imgsz
+        self.precision = kwargs.get('precision') or fastestv2_settings.precision
+        self.model_path = model_path
+        self._net_lock = threading.Lock()
+        self._batch_supported = True
+        self.net = self._load_model(model_path)
+        self._preprocessor = self._create_preprocessor()
+    
+    def _create_preprocessor(self) -> BlobPreprocessor:
+        """创建letterbox预处理器（保持宽高比，RGB，归一化到0~1）"""
+        return BlobPreprocessor((self.imgsz, self.imgsz), scale=1/255.0, swap_rb=True, mode='letterbox')
+    
+    def _load_model(self, model_path: str):
+        """
+        加载ONNX模型（经模型注册表解析，同一进程内共享已加载的网络）
         
-        # 查找模型文件
-        search_dirs = ['yolo_fastestv2', 'data/models', 'models']
-        found_path = find_file(os.path.basename(model_path), search_dirs)
-        if found_path:
-            model_path = found_path
+        Args:
+            model_path: 模型文件路径或清单中的模型名称
+            
+        Returns:
+            cv2.dnn网络，加载失败时返回None
+        """
+        registry = get_model_registry()
+        # 按精度偏好选择量化变体
+        entry = registry.resolve(model_path, self.precision)
+        if entry is None:
+            logger.warning(f"模型文件不存在: {model_path}")
+            logger.info("提示: 请先下载或训练Yolo-FastestV2模型")
+            return None
+        
+        if entry.input_size and entry.input_size[0] != self.imgsz:
+            # 清单中记录的输入尺寸描述的是该模型文件本身，优先于配置
+            logger.info(f"按模型清单使用输入尺寸: {entry.input_size[0]}")
+            self.imgsz = entry.input_size[0]
         
         try:
-            if os.path.exists(model_path):
-                logger.info(f"加载Yolo-FastestV2模型: {model_path}")
-                self.net = cv2.dnn.readNetFromONNX(model_path)
-                # 尝试使用GPU加速
-                try:
-                    self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_CUDA)
-                    self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CUDA)
-                    logger.info("使用CUDA加速")
-                except:
-                    self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
-                    self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
-                    logger.info("使用CPU")
-            else:
-                logger.warning(f"模型文件不存在: {model_path}")
-                logger.info("提示: 请先下载或训练Yolo-FastestV2模型")
+            logger.info(f"加载Yolo-FastestV2模型: {entry.path}")
+            loaded = registry.load_net(entry, (1, 3, self.imgsz, self.imgsz))
         except Exception as e:
             logger.error(f"加载模型失败: {e}")
+            return None
+        self._net_lock = loaded.lock
+        self._batch_supported = True
+        return loaded.net
+    
+    def apply_settings(self, detection_settings):
+        """
+        热更新检测参数（应在两帧之间调用），仅在模型路径变化时重新加载模型
+        
+        Args:
+            detection_settings: 新的检测配置快照（DetectionSettings）
+        """
+        fastestv2_settings = detection_settings.fastestv2
+        reload = (fastestv2_settings.model_path != self.model_path
+                  or fastestv2_settings.precision != self.precision)
+        self.conf_threshold = fastestv2_settings.conf_threshold
+        imgsz = self.imgsz
+        if fastestv2_settings.imgsz != self.imgsz:
+            self.imgsz = fastestv2_settings.imgsz
+        if reload:
+            self.precision = fastestv2_settings.precision
+            self.net = self._load_model(fastestv2_settings.model_path)
+            self.model_path = fastestv2_settings.model_path
+        if self.imgsz != imgsz:
+            self._preprocessor = self._create_preprocessor()
     
     def detect(self, frame: np.ndarray) -> List[Tuple[int, int, int, int, float, int]]:
         """
@@ -91,37 +143,71 @@ class YoloFastestV2Detector:
         if self.net is None:
             return []
         
-        # 预处理
-        blob = cv2.dnn.blobFromImage(
-            frame, 1/255.0, (self.imgsz, self.imgsz),
-            swapRB=True, crop=False
-        )
+        profiler = get_profiler()
         
-        self.net.setInput(blob)
-        outputs = self.net.forward()
+        # 预处理：letterbox写入复用的输入缓冲区
+        with profiler.span('preprocess'):
+            blob, letterbox = self._preprocessor(frame)
         
-        # 解析输出
-        faces = []
-        h, w = frame.shape[:2]
+        with profiler.span('inference'), self._net_lock:
+            self.net.setInput(blob)
+            outputs = self.net.forward()
         
-        if len(outputs) > 0:
-            output = outputs[0]
-            if len(output.shape) == 3:
-                output = output[0]  # 移除batch维度
+        with profiler.span('postprocess'):
+            return self._parse_output(outputs[0], letterbox) if len(outputs) > 0 else []
+    
+    def detect_batch(self, frames: List[np.ndarray]) -> List[List[Tuple[int, int, int, int, float, int]]]:
+        """
+        批量检测（多路视频流的帧合并为一次前向推理）
+        
+        Args:
+            frames: 输入图像帧列表
+            
+        Returns:
+            与 frames 一一对应的人脸列表
+        """
+        if self.net is None or not frames:
+            return [[] for _ in frames]
+        if len(frames) == 1 or not self._batch_supported:
+            return [self.detect(frame) for frame in frames]
+        
+        profiler = get_profiler()
+        
+        with profiler.span('preprocess'):
+            blob, letterboxes = self._preprocessor.batch(frames)
+        
+        try:
+            with profiler.span('inference'), self._net_lock:
+                self.net.setInput(blob)
+                outputs = self.net.forward()
+        except cv2.error as e:
+            outputs = None
+            logger.debug("批量推理失败: %s", e)
+        if outputs is None or len(outputs) != len(frames):
+            # 导出时固定了batch=1的模型无法批量推理，之后逐帧处理
+            logger.warning("模型不支持批量推理，改为逐帧检测")
+            self._batch_supported = False
+            return [self.detect(frame) for frame in frames]
+        
+        with profiler.span('postprocess'):
+            return [self._parse_output(output, letterbox) for output, letterbox in zip(outputs, letterboxes)]
+    
+    def _parse_output(self, output: np.ndarray, letterbox) -> List[Tuple[int, int, int, int, float, int]]:
+        """
+        解析单张图像的网络输出
+        
+        Args:
+            output: 单张图像的输出（已去除batch维度）
+            letterbox: 该图像的缩放参数（LetterboxInfo）
             
-            # 假设输出格式为 [num_detections, 6] (x, y, w, h, conf, cls)
-            for detection in output:
-                if len(detection) >= 6:
-                    x, y, w_det, h_det, conf, cls = detection[:6]
-                    if conf > self.conf_threshold:
-                        # 转换为像素坐标
-                        x1 = int((x - w_det/2) * w)
-                        y1 = int((y - h_det/2) * h)
-                        x2 = int((x + w_det/2) * w)
-                        y2 = int((y + h_det/2) * h)
-                        faces.append((x1, y1, x2, y2, conf, int(cls)))
-        
-        return faces
+        Returns:
+            人脸列表 [(x1, y1, x2, y2, conf, cls), ...]
+        """
+        detections = decode_output(output, self.conf_threshold, self.imgsz, letterbox)
+        return [
+            (int(x1), int(y1), int(x2), int(y2), float(conf), int(cls))
+            for x1, y1, x2, y2, conf, cls in detections
+        ]
     
     def draw_detections(
         self,
@@ -129,7 +215,8 @@ class YoloFastestV2Detector:
         faces: List[Tuple[int, int, int, int, float, int]],
         color: Tuple[int, int, int] = (0, 255, 0),
         thickness: int = 2,
-        show_gender: bool = True
+        show_gender: bool = True,
+        stream: Optional[int] = None
     ) -> np.ndarray:
         """
         在图像上绘制检测结果
@@ -140,35 +227,37 @@ class YoloFastestV2Detector:
             color: 绘制颜色
             thickness: 线条粗细
             show_gender: 是否显示性别
+            stream: 多路视频流时的流编号（区分各路画面的属性识别结果）
             
         Returns:
             frame: 绘制了检测框的图像
         """
-        gender_classifier = _get_gender_classifier() if show_gender else None
+        profiler = get_profiler()
         
-        for (x1, y1, x2, y2, conf, cls) in faces:
+        # 性别识别：先对整帧所有人脸一次性分类，再绘制
+        labels = [f'Face {conf:.2f}' for (_, _, _, _, conf, _) in faces]
+        if show_gender:
+            boxes, indices = [], []
+            for i, (x1, y1, x2, y2, conf, cls) in enumerate(faces):
+                # 提取人脸区域（确保坐标有效）
+                x1_safe, y1_safe = max(0, x1), max(0, y1)
+                x2_safe, y2_safe = min(frame.shape[1], x2), min(frame.shape[0], y2)
+                if x2_safe - x1_safe > 10 and y2_safe - y1_safe > 10:
+                    boxes.append((x1_safe, y1_safe, x2_safe, y2_safe))
+                    indices.append(i)
+            try:
+                with profiler.span('classification'):
+                    results = classify_faces(frame, boxes, stream=stream)
+                for i, result in zip(indices, results):
+                    if result and result.gender != Gender.UNKNOWN:
+                        labels[i] = result.label()
+            except Exception as e:
+                logger.debug("性别识别失败: %s", e)
+        
+        for (x1, y1, x2, y2, conf, cls), label in zip(faces, labels):
             # 绘制边界框
             cv2.rectangle(frame, (x1, y1), (x2, y2), color, thickness)
             
-            # 性别识别
-            label = f'Face {conf:.2f}'
-            if gender_classifier:
-                try:
-                    # 提取人脸区域（确保坐标有效）
-                    x1_safe = max(0, x1)
-                    y1_safe = max(0, y1)
-                    x2_safe = min(frame.shape[1], x2)
-                    y2_safe = min(frame.shape[0], y2)
-                    
-                    if x2_safe > x1_safe and y2_safe > y1_safe:
-                        face_roi = frame[y1_safe:y2_safe, x1_safe:x2_safe]
-                        if face_roi.size > 0 and face_roi.shape[0] > 10 and face_roi.shape[1] > 10:
-                            gender, gender_conf = gender_classifier.predict(face_roi)
-                            if gender.value != "未知":
-                                label = f'{gender.value} {gender_conf:.2f}'
-                except Exception as e:
-                    logger.debug(f"性别识别失败: {e}")
-            
             # 绘制标签
             cv2.putText(frame, label, (x1, y1 - 10),
                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, thickness)
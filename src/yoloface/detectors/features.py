@@ -0,0 +1,295 @@
+"""
+人脸特征提取
+FrameFeatures: 每帧只做一次灰度转换和一次Canny，并构建积分图；
+之后每个人脸的亮度、对比度、边缘密度都是 O(1) 的矩形查表，所有人脸一次向量化计算
+FaceFeatures: 单个人脸的派生图像包（灰度、Canny、Laplacian、模糊、HSV），
+按需计算且只计算一次，供性别、年龄等多个属性分类器共享
+"""
+
+from typing import Dict, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+
+def clip_boxes(
+    boxes: Sequence[Sequence[int]],
+    shape: Tuple[int, int],
+    offset: Tuple[int, int] = (0, 0)
+) -> np.ndarray:
+    """
+    将整帧坐标的 (x1, y1, x2, y2) 边界框转换到区域坐标并裁剪到区域范围内
+
+    Args:
+        boxes: 边界框列表
+        shape: 区域尺寸 (h, w)
+        offset: 区域左上角在整帧中的坐标 (x, y)
+
+    Returns:
+        int64数组，形状为 (N, 4)
+    """
+    h, w = shape[:2]
+    arr = np.asarray(boxes, dtype=np.int64).reshape(-1, 4).copy()
+    arr[:, [0, 2]] -= offset[0]
+    arr[:, [1, 3]] -= offset[1]
+    arr[:, [0, 2]] = np.clip(arr[:, [0, 2]], 0, w)
+    arr[:, [1, 3]] = np.clip(arr[:, [1, 3]], 0, h)
+    return arr
+
+
+class FrameFeatures:
+    """单帧的积分图特征"""
+
+    __slots__ = ('gray', 'shape', 'offset', 'sum', 'sqsum', 'edge_sum')
+
+    def __init__(self, gray: np.ndarray, edges: np.ndarray, offset: Tuple[int, int] = (0, 0)):
+        """
+        初始化
+
+        Args:
+            gray: 灰度图（整帧或包含所有人脸的区域）
+            edges: 对应区域的Canny边缘图
+            offset: 区域左上角在整帧中的坐标 (x, y)
+        """
+        self.gray = gray
+        self.shape = gray.shape[:2]
+        self.offset = offset
+        # 积分图比原图多一行一列，便于矩形求和
+        self.sum, self.sqsum = cv2.integral2(gray, sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F)
+        self.edge_sum = cv2.integral((edges > 0).view(np.uint8), sdepth=cv2.CV_32S)
+
+    def clip_boxes(self, boxes: Sequence[Sequence[int]]) -> np.ndarray:
+        """
+        将整帧坐标的 (x1, y1, x2, y2) 边界框转换到区域坐标并裁剪到范围内
+
+        Args:
+            boxes: 边界框列表
+
+        Returns:
+            int64数组，形状为 (N, 4)
+        """
+        return clip_boxes(boxes, self.shape, self.offset)
+
+    @staticmethod
+    def _rect_sum(integral: np.ndarray, boxes: np.ndarray) -> np.ndarray:
+        """使用积分图对多个矩形区域并行求和"""
+        x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+        return (integral[y2, x2] - integral[y1, x2] - integral[y2, x1] + integral[y1, x1]).astype(np.float64)
+
+    def box_stats(self, boxes: Sequence[Sequence[int]]) -> Dict[str, np.ndarray]:
+        """
+        计算多个人脸区域的统计特征
+
+        Args:
+            boxes: 边界框列表 [(x1, y1, x2, y2), ...]
+
+        Returns:
+            {'mean', 'std', 'contrast', 'edge_density', 'aspect_ratio', 'valid'} 各为长度N的数组
+        """
+        arr = self.clip_boxes(boxes)
+        widths = arr[:, 2] - arr[:, 0]
+        heights = arr[:, 3] - arr[:, 1]
+        valid = (widths > 0) & (heights > 0)
+        area = np.maximum(widths * heights, 1).astype(np.float64)
+
+        mean = self._rect_sum(self.sum, arr) / area
+        sq_mean = self._rect_sum(self.sqsum, arr) / area
+        std = np.sqrt(np.maximum(sq_mean - mean * mean, 0.0))
+        edge_density = self._rect_sum(self.edge_sum, arr) / area
+        aspect_ratio = np.where(heights > 0, widths / np.maximum(heights, 1), 1.0)
+
+        return {
+            'mean': mean,
+            'std': std,
+            'contrast': std / (mean + 1e-5),
+            'edge_density': edge_density,
+            'aspect_ratio': aspect_ratio,
+            'valid': valid,
+        }
+
+
+class FrameFeatureExtractor:
+    """整帧特征提取器"""
+
+    def __init__(self, canny_low: int = 50, canny_high: int = 150):
+        """
+        初始化
+
+        Args:
+            canny_low: Canny低阈值
+            canny_high: Canny高阈值
+        """
+        self.canny_low = canny_low
+        self.canny_high = canny_high
+
+    def compute(
+        self,
+        frame: np.ndarray,
+        gray: Optional[np.ndarray] = None,
+        boxes: Optional[Sequence[Sequence[int]]] = None
+    ) -> FrameFeatures:
+        """
+        计算整帧特征
+
+        Args:
+            frame: 输入图像帧 (BGR或灰度)
+            gray: 已计算好的整帧灰度图（如检测器中已有），None时在此计算
+            boxes: 本帧人脸框，给出时只处理包含所有人脸的最小矩形区域
+
+        Returns:
+            FrameFeatures实例
+        """
+        gray, offset = self.gray_region(frame, gray, boxes)
+        edges = cv2.Canny(gray, self.canny_low, self.canny_high)
+        return FrameFeatures(gray, edges, offset=offset)
+
+    @staticmethod
+    def gray_region(
+        frame: np.ndarray,
+        gray: Optional[np.ndarray] = None,
+        boxes: Optional[Sequence[Sequence[int]]] = None
+    ) -> Tuple[np.ndarray, Tuple[int, int]]:
+        """
+        取包含所有人脸的最小矩形区域的灰度图（只转换该区域）
+
+        Args:
+            frame: 输入图像帧 (BGR或灰度)
+            gray: 已计算好的整帧灰度图，None时在此计算
+            boxes: 本帧人脸框，None或为空时取整帧
+
+        Returns:
+            (区域灰度图, 区域左上角在整帧中的坐标 (x, y))
+        """
+        h, w = frame.shape[:2]
+        x0, y0, x1, y1 = 0, 0, w, h
+        if boxes is not None and len(boxes) > 0:
+            arr = np.asarray(boxes, dtype=np.int64).reshape(-1, 4)
+            x0 = int(np.clip(arr[:, 0].min(), 0, w))
+            y0 = int(np.clip(arr[:, 1].min(), 0, h))
+            x1 = int(np.clip(arr[:, 2].max(), x0, w))
+            y1 = int(np.clip(arr[:, 3].max(), y0, h))
+
+        if gray is not None:
+            gray = gray[y0:y1, x0:x1]
+        else:
+            region = frame[y0:y1, x0:x1]
+            gray = cv2.cvtColor(region, cv2.COLOR_BGR2GRAY) if region.ndim == 3 else region
+        return gray, (x0, y0)
+
+
+class FaceFeatures:
+    """单个人脸的派生图像与统计量（惰性计算并缓存）"""
+
+    __slots__ = ('roi', 'canny_low', 'canny_high', '_cache')
+
+    def __init__(self, face_roi: np.ndarray, canny_low: int = 50, canny_high: int = 150):
+        """
+        初始化
+
+        Args:
+            face_roi: 人脸区域图像 (BGR或灰度)
+            canny_low: Canny低阈值
+            canny_high: Canny高阈值
+        """
+        self.roi = face_roi
+        self.canny_low = canny_low
+        self.canny_high = canny_high
+        self._cache: Dict[str, object] = {}
+
+    @classmethod
+    def from_box(
+        cls,
+        frame: np.ndarray,
+        box: Sequence[int],
+        gray: Optional[np.ndarray] = None,
+        **kwargs
+    ) -> 'FaceFeatures':
+        """
+        从整帧中按边界框裁剪（坐标自动裁剪到图像范围内）
+
+        Args:
+            frame: 输入图像帧
+            box: 边界框 (x1, y1, x2, y2)
+            gray: 已计算好的整帧灰度图（可选），给出时人脸灰度图直接从中裁剪
+
+        Returns:
+            FaceFeatures实例
+        """
+        h, w = frame.shape[:2]
+        x1, y1, x2, y2 = box
+        x1, y1 = min(max(0, int(x1)), w), min(max(0, int(y1)), h)
+        x2, y2 = min(max(x1, int(x2)), w), min(max(y1, int(y2)), h)
+        features = cls(frame[y1:y2, x1:x2], **kwargs)
+        if gray is not None:
+            features._cache['gray'] = gray[y1:y2, x1:x2]
+        return features
+
+    def _get(self, key: str, factory):
+        """取缓存值，不存在时计算"""
+        value = self._cache.get(key)
+        if value is None:
+            value = factory()
+            self._cache[key] = value
+        return value
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        """人脸区域尺寸 (h, w)"""
+        return self.roi.shape[:2]
+
+    @property
+    def empty(self) -> bool:
+        """人脸区域是否为空"""
+        return self.roi is None or self.roi.size == 0
+
+    @property
+    def gray(self) -> np.ndarray:
+        """灰度图"""
+        return self._get('gray', lambda: (
+            cv2.cvtColor(self.roi, cv2.COLOR_BGR2GRAY) if self.roi.ndim == 3 else self.roi
+        ))
+
+    @property
+    def edges(self) -> np.ndarray:
+        """Canny边缘图"""
+        return self._get('edges', lambda: cv2.Canny(self.gray, self.canny_low, self.canny_high))
+
+    @property
+    def laplacian(self) -> np.ndarray:
+        """Laplacian响应 (float64)"""
+        return self._get('laplacian', lambda: cv2.Laplacian(self.gray, cv2.CV_64F))
+
+    @property
+    def blur(self) -> np.ndarray:
+        """5x5高斯模糊后的灰度图"""
+        return self._get('blur', lambda: cv2.GaussianBlur(self.gray, (5, 5), 0))
+
+    @property
+    def hsv(self) -> np.ndarray:
+        """HSV图像（仅彩色输入可用）"""
+        return self._get('hsv', lambda: cv2.cvtColor(self.roi, cv2.COLOR_BGR2HSV))
+
+    @property
+    def brightness(self) -> float:
+        """平均亮度"""
+        return self._get('brightness', lambda: float(self.gray.mean()))
+
+    @property
+    def std(self) -> float:
+        """亮度标准差"""
+        return self._get('std', lambda: float(self.gray.std()))
+
+    @property
+    def edge_density(self) -> float:
+        """边缘像素占比"""
+        return self._get('edge_density', lambda: float(np.count_nonzero(self.edges)) / max(self.gray.size, 1))
+
+    @property
+    def wrinkle_score(self) -> float:
+        """平均Laplacian绝对响应（纹理/皱纹强度）"""
+        return self._get('wrinkle_score', lambda: float(np.abs(self.laplacian).mean()))
+
+    @property
+    def smoothness(self) -> float:
+        """与高斯模糊图的平均绝对差（皮肤粗糙度）"""
+        return self._get('smoothness', lambda: float(cv2.absdiff(self.gray, self.blur).mean()))
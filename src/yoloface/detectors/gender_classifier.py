@@ -5,12 +5,17 @@
 
 import cv2
 import numpy as np
-import os
-from typing import Tuple, Optional, Dict
+import threading
+from dataclasses import asdict
+from typing import Any, Mapping, Tuple, Optional, Dict, List
 from enum import Enum
 
 from ..utils.logger import get_logger
 from ..config import get_config
+from ..config.settings import GenderHeuristicSettings
+from .features import FaceFeatures, FrameFeatureExtractor, FrameFeatures, clip_boxes
+from .preprocess import BlobPreprocessor
+from .model_registry import ModelEntry, get_model_registry
 
 logger = get_logger(__name__)
 
@@ -22,6 +27,90 @@ class Gender(Enum):
     UNKNOWN = "未知"
 
 
+def face_statistics(face_roi: np.ndarray, features: Optional[FaceFeatures] = None) -> Tuple[float, float, float, float]:
+    """
+    启发式分类使用的人脸统计特征
+    小于100像素的人脸先放大再计算，原尺寸直接使用共享特征包中的灰度图与边缘图
+    
+    Args:
+        face_roi: 人脸区域图像（非空）
+        features: 该人脸的共享特征包（可选）
+        
+    Returns:
+        (平均亮度, 亮度标准差, 边缘密度, 宽高比)
+    """
+    if features is None:
+        features = FaceFeatures(face_roi)
+    h, w = face_roi.shape[:2]
+    if h < 100 or w < 100:
+        # 调整大小以确保特征提取的一致性，至少100，或原尺寸的2倍
+        target_size = max(100, min(h, w) * 2)
+        gray = cv2.resize(features.gray, (target_size, target_size))
+        mean, std = cv2.meanStdDev(gray)
+        mean_brightness, std_brightness = float(mean[0, 0]), float(std[0, 0])
+        edges = cv2.Canny(gray, 50, 150)
+        edge_density = cv2.countNonZero(edges) / (target_size * target_size)
+    else:
+        mean_brightness = features.brightness
+        std_brightness = features.std
+        edge_density = features.edge_density
+    aspect_ratio = w / h if h > 0 else 1.0
+    return mean_brightness, std_brightness, edge_density, aspect_ratio
+
+
+def _bounding_area(boxes: np.ndarray) -> int:
+    """多个边界框 (N, 4) 的外接矩形面积"""
+    return int((boxes[:, 2].max() - boxes[:, 0].min()) * (boxes[:, 3].max() - boxes[:, 1].min()))
+
+
+def heuristic_scores(
+    mean_brightness: np.ndarray,
+    std_brightness: np.ndarray,
+    edge_density: np.ndarray,
+    aspect_ratio: np.ndarray,
+    thresholds: Mapping[str, Any]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    启发式规则的男性/女性得分（向量化）
+    阈值可以是标量，也可以是与特征广播的数组（标定时一次计算多组阈值）
+    
+    Args:
+        mean_brightness: 平均亮度
+        std_brightness: 亮度标准差
+        edge_density: 边缘密度
+        aspect_ratio: 宽高比
+        thresholds: 阈值，键与 GenderHeuristicSettings 的字段相同
+        
+    Returns:
+        (男性得分, 女性得分)，每条规则至少一方得分，总分恒大于0
+    """
+    # 计算面部区域的对比度
+    contrast = std_brightness / (mean_brightness + 1e-5)
+    
+    # 边缘密度：男性通常面部轮廓更明显
+    strong_edges = edge_density > thresholds['edge_density']
+    male_score = np.where(strong_edges, 0.3, 0.0)
+    female_score = np.where(strong_edges, 0.0, 0.2)
+    
+    # 亮度：男性皮肤通常较暗；中等亮度不偏向任何一方
+    dark = mean_brightness < thresholds['dark_brightness']
+    bright = mean_brightness > thresholds['bright_brightness']
+    middle = ~dark & ~bright
+    male_score = male_score + np.where(dark, 0.3, 0.0) + np.where(middle, 0.1, 0.0)
+    female_score = female_score + np.where(bright, 0.3, 0.0) + np.where(middle, 0.1, 0.0)
+    
+    # 对比度：男性面部特征通常更明显
+    high_contrast = contrast > thresholds['contrast']
+    male_score = male_score + np.where(high_contrast, 0.2, 0.0)
+    female_score = female_score + np.where(high_contrast, 0.0, 0.2)
+    
+    # 面部宽高比：较宽的脸型
+    wide = aspect_ratio > thresholds['aspect_ratio']
+    male_score = male_score + np.where(wide, 0.2, 0.0)
+    female_score = female_score + np.where(wide, 0.0, 0.2)
+    return male_score, female_score
+
+
 class GenderClassifier:
     """性别分类器"""
     
@@ -32,23 +121,33 @@ class GenderClassifier:
         Args:
             model_path: 模型文件路径（.caffemodel或.onnx）
             prototxt_path: 模型配置文件路径（.prototxt，仅Caffe模型需要）
-            **kwargs: 其他参数
+            **kwargs: 其他参数（input_size、mean_values、scale、enabled、precision: fp32/fp16/int8/auto、
+                heuristic: 启发式分类阈值 GenderHeuristicSettings）
         """
-        config = get_config()
+        gender_settings = get_config().settings.detection.gender
         
         # 获取模型路径
         if model_path is None:
-            model_path = config.get('detection.gender.model_path')
+            model_path = gender_settings.model_path
         if prototxt_path is None:
-            prototxt_path = config.get('detection.gender.prototxt_path')
+            prototxt_path = gender_settings.prototxt_path
         
         self.model_path = model_path
         self.prototxt_path = prototxt_path
         self.net = None
-        self.input_size = kwargs.get('input_size') or config.get('detection.gender.input_size', (227, 227))
-        self.mean_values = kwargs.get('mean_values') or config.get('detection.gender.mean_values', [104, 117, 123])
-        self.scale = kwargs.get('scale') or config.get('detection.gender.scale', 1.0)
-        self.enabled = config.get('detection.gender.enabled', True)
+        self._net_lock = threading.Lock()
+        self.input_size = kwargs.get('input_size') or gender_settings.input_size
+        self.mean_values = kwargs.get('mean_values') or gender_settings.mean_values
+        self.scale = kwargs.get('scale') or gender_settings.scale
+        self.enabled = kwargs.get('enabled', gender_settings.enabled)
+        self.precision = kwargs.get('precision') or gender_settings.precision
+        self.heuristic: GenderHeuristicSettings = kwargs.get('heuristic') or gender_settings.heuristic
+        self._thresholds = asdict(self.heuristic)
+        self._feature_extractor = FrameFeatureExtractor()
+        # 与 blobFromImage(crop=True) 相同的中心裁剪预处理，复用输入缓冲区
+        self._preprocessor = BlobPreprocessor(
+            tuple(self.input_size), mean=self.mean_values, scale=self.scale, swap_rb=False, mode='crop'
+        )
         
         if self.enabled and model_path:
             self._load_model()
@@ -60,76 +159,54 @@ class GenderClassifier:
             logger.info("性别识别已禁用")
     
     def _load_model(self):
-        """加载模型"""
+        """加载模型（经模型注册表解析，同一进程内共享已加载的网络）"""
         if not self.model_path:
             return
         
-        # 尝试查找模型文件
-        search_dirs = ['models', 'data/models', 'gender_models']
-        model_file = None
-        prototxt_file = None
-        
-        for search_dir in search_dirs:
-            if os.path.exists(os.path.join(search_dir, os.path.basename(self.model_path))):
-                model_file = os.path.join(search_dir, os.path.basename(self.model_path))
-                break
-        
-        if not model_file and os.path.exists(self.model_path):
-            model_file = self.model_path
-        
-        if not model_file:
+        registry = get_model_registry()
+        # 按精度偏好选择量化变体（仅ONNX模型有变体）
+        entry = registry.resolve(self.model_path, self.precision)
+        if entry is None:
             logger.warning(f"未找到性别分类模型: {self.model_path}")
             logger.info("将使用基于特征的简单分类")
             self.use_simple_classifier = True
             return
+        if entry.format == 'caffe' and self.prototxt_path:
+            entry = entry._replace(config_path=self.prototxt_path)
+        self._apply_model_metadata(entry)
         
         try:
-            # 判断模型类型
-            if model_file.endswith('.caffemodel'):
-                # Caffe模型
-                if not self.prototxt_path:
-                    # 尝试查找prototxt文件
-                    prototxt_file = model_file.replace('.caffemodel', '.prototxt')
-                    if not os.path.exists(prototxt_file):
-                        logger.error("Caffe模型需要prototxt文件")
-                        self.use_simple_classifier = True
-                        return
-                else:
-                    prototxt_file = self.prototxt_path
-                
-                self.net = cv2.dnn.readNetFromCaffe(prototxt_file, model_file)
-                logger.info(f"成功加载Caffe性别分类模型: {model_file}")
-            elif model_file.endswith('.onnx'):
-                # ONNX模型
-                self.net = cv2.dnn.readNetFromONNX(model_file)
-                logger.info(f"成功加载ONNX性别分类模型: {model_file}")
-            else:
-                logger.warning(f"不支持的模型格式: {model_file}")
-                self.use_simple_classifier = True
-                return
-            
-            # 尝试使用GPU
-            try:
-                self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_CUDA)
-                self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CUDA)
-                logger.info("使用CUDA加速")
-            except:
-                self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
-                self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
-                logger.info("使用CPU")
-            
+            width, height = self.input_size
+            loaded = registry.load_net(entry, (1, 3, height, width))
+            self.net, self._net_lock = loaded.net, loaded.lock
+            logger.info(f"成功加载{entry.format.upper()}性别分类模型: {entry.path}")
             self.use_simple_classifier = False
         except Exception as e:
             logger.error(f"加载性别分类模型失败: {e}")
             logger.info("将使用基于特征的简单分类")
             self.use_simple_classifier = True
     
-    def predict(self, face_roi: np.ndarray) -> Tuple[Gender, float]:
+    def _apply_model_metadata(self, entry: ModelEntry):
+        """使用模型清单中记录的输入尺寸与均值/缩放（描述的是该模型文件本身，优先于配置）"""
+        input_size = entry.input_size or self.input_size
+        mean_values = entry.mean or self.mean_values
+        scale = entry.scale if entry.scale is not None else self.scale
+        current = (tuple(self.input_size), tuple(self.mean_values), self.scale)
+        if (tuple(input_size), tuple(mean_values), scale) == current:
+            return
+        logger.info(f"按模型清单使用预处理参数: 输入 {tuple(input_size)}，均值 {tuple(mean_values)}，缩放 {scale}")
+        self.input_size, self.mean_values, self.scale = input_size, mean_values, scale
+        self._preprocessor = BlobPreprocessor(
+            tuple(self.input_size), mean=self.mean_values, scale=self.scale, swap_rb=False, mode='crop'
+        )
+    
+    def predict(self, face_roi: np.ndarray, features: Optional[FaceFeatures] = None) -> Tuple[Gender, float]:
         """
         预测性别
         
         Args:
             face_roi: 人脸区域图像 (BGR格式)
+            features: 该人脸的共享特征包（可选，与年龄估计等共用派生图像）
             
         Returns:
             (性别, 置信度)
@@ -138,25 +215,19 @@ class GenderClassifier:
             return Gender.UNKNOWN, 0.0
         
         if self.use_simple_classifier:
-            return self._simple_classify(face_roi)
+            return self._simple_classify(face_roi, features)
         
         if self.net is None:
             return Gender.UNKNOWN, 0.0
         
         try:
             # 预处理
-            blob = cv2.dnn.blobFromImage(
-                face_roi,
-                scalefactor=self.scale,
-                size=self.input_size,
-                mean=tuple(self.mean_values),
-                swapRB=False,
-                crop=True
-            )
+            blob, _ = self._preprocessor(face_roi)
             
             # 推理
-            self.net.setInput(blob)
-            output = self.net.forward()
+            with self._net_lock:
+                self.net.setInput(blob)
+                output = self.net.forward()
             
             # 解析输出
             # 假设输出格式为 [1, 2] 或 [2]，第一个值是男性概率，第二个值是女性概率
@@ -165,37 +236,51 @@ class GenderClassifier:
             else:
                 probs = output.flatten()
             
-            if len(probs) >= 2:
-                male_prob = float(probs[0])
-                female_prob = float(probs[1])
-            else:
-                # 如果只有一个输出，假设是男性概率
-                male_prob = float(probs[0])
-                female_prob = 1.0 - male_prob
-            
-            # 归一化概率
-            total = male_prob + female_prob
-            if total > 0:
-                male_prob /= total
-                female_prob /= total
-            
-            # 判断性别
-            if male_prob > female_prob:
-                return Gender.MALE, male_prob
-            else:
-                return Gender.FEMALE, female_prob
+            return self._parse_probs(probs)
                 
         except Exception as e:
-            logger.error(f"性别分类失败: {e}")
-            return self._simple_classify(face_roi)
+            logger.error("性别分类失败: %s", e)
+            return self._simple_classify(face_roi, features)
+    
+    @staticmethod
+    def _parse_probs(probs: np.ndarray) -> Tuple[Gender, float]:
+        """
+        将模型输出解析为性别与置信度
+        
+        Args:
+            probs: 单个样本的输出向量
+            
+        Returns:
+            (性别, 置信度)
+        """
+        if len(probs) >= 2:
+            male_prob = float(probs[0])
+            female_prob = float(probs[1])
+        else:
+            # 如果只有一个输出，假设是男性概率
+            male_prob = float(probs[0])
+            female_prob = 1.0 - male_prob
+        
+        # 归一化概率
+        total = male_prob + female_prob
+        if total > 0:
+            male_prob /= total
+            female_prob /= total
+        
+        # 判断性别
+        if male_prob > female_prob:
+            return Gender.MALE, male_prob
+        else:
+            return Gender.FEMALE, female_prob
     
-    def _simple_classify(self, face_roi: np.ndarray) -> Tuple[Gender, float]:
+    def _simple_classify(self, face_roi: np.ndarray, features: Optional[FaceFeatures] = None) -> Tuple[Gender, float]:
         """
         基于特征的简单性别分类（备用方案）
         这是一个非常简单的实现，准确率较低，仅作为演示
         
         Args:
             face_roi: 人脸区域图像
+            features: 该人脸的共享特征包（可选）
             
         Returns:
             (性别, 置信度)
@@ -210,110 +295,179 @@ class GenderClassifier:
             # 确保人脸区域足够大
             h, w = face_roi.shape[:2]
             if h < 20 or w < 20:
-                logger.debug(f"人脸区域较小 ({w}x{h})，使用默认分类")
+                logger.debug("人脸区域较小 (%sx%s)，使用默认分类", w, h)
                 # 即使区域小也尝试分类，不返回UNKNOWN
                 # 继续执行，使用调整大小的方式
             
-            # 转换为灰度图
-            if len(face_roi.shape) == 3:
-                gray = cv2.cvtColor(face_roi, cv2.COLOR_BGR2GRAY)
-            else:
-                gray = face_roi
-            
-            # 调整大小以确保特征提取的一致性
-            # 即使区域很小也调整到合适大小
-            target_size = max(100, min(h, w) * 2)  # 至少100，或原尺寸的2倍
-            if h < 100 or w < 100:
-                gray = cv2.resize(gray, (target_size, target_size))
-            
             # 简单的特征提取：基于面部区域的统计特征
             # 注意：这是一个非常简化的实现，实际应用中应该使用训练好的模型
+            mean_brightness, std_brightness, edge_density, aspect_ratio = face_statistics(face_roi, features)
             
-            # 计算面部区域的亮度分布
-            mean_brightness = np.mean(gray)
-            std_brightness = np.std(gray)
-            
-            # 计算边缘特征（男性通常面部轮廓更明显）
-            edges = cv2.Canny(gray, 50, 150)
-            edge_density = np.sum(edges > 0) / (gray.shape[0] * gray.shape[1])
-            
-            # 计算面部区域的对比度
-            contrast = std_brightness / (mean_brightness + 1e-5)
-            
-            # 改进的启发式规则
-            # 这些规则基于一些观察，但准确率仍然有限
-            male_score = 0.0
-            female_score = 0.0
+            return self._score_features(
+                np.array([mean_brightness]),
+                np.array([std_brightness]),
+                np.array([edge_density]),
+                np.array([aspect_ratio])
+            )[0]
+                
+        except Exception as e:
+            logger.error("简单性别分类失败: %s", e, exc_info=True)
+            # 即使出错也返回一个默认值，而不是UNKNOWN
+            # 这样可以确保界面显示正常
+            return Gender.FEMALE, 0.5
+    
+    def _score_features(
+        self,
+        mean_brightness: np.ndarray,
+        std_brightness: np.ndarray,
+        edge_density: np.ndarray,
+        aspect_ratio: np.ndarray
+    ) -> List[Tuple[Gender, float]]:
+        """
+        启发式规则打分（向量化，一次处理多张人脸），阈值来自 detection.gender.heuristic
+        这些规则基于一些观察，准确率有限
+        
+        Args:
+            mean_brightness: 平均亮度
+            std_brightness: 亮度标准差
+            edge_density: 边缘密度
+            aspect_ratio: 宽高比
             
-            # 边缘密度：男性通常面部轮廓更明显
-            if edge_density > 0.12:
-                male_score += 0.3
-            else:
-                female_score += 0.2
+        Returns:
+            [(性别, 置信度), ...] 列表
+        """
+        male_score, female_score = heuristic_scores(
+            mean_brightness, std_brightness, edge_density, aspect_ratio, self._thresholds
+        )
+        
+        # 归一化分数（各规则至少一方得分，总分恒大于0）
+        total_score = male_score + female_score
+        male_prob = male_score / total_score
+        female_prob = female_score / total_score
+        
+        is_male = male_prob > female_prob
+        conf = np.clip(np.where(is_male, male_prob, female_prob), 0.5, 0.9)
+        return [
+            (Gender.MALE if male else Gender.FEMALE, float(c))
+            for male, c in zip(is_male, conf)
+        ]
+    
+    def classify_frame(
+        self,
+        frame: np.ndarray,
+        boxes: List[Tuple[int, int, int, int]],
+        gray: Optional[np.ndarray] = None,
+        features: Optional[List[FaceFeatures]] = None
+    ) -> List[Tuple[Gender, float]]:
+        """
+        对一帧中的多个人脸分类，结果与逐个人脸分类一致
+        简单分类时灰度转换与Canny的代价都与像素数成正比，人脸密集（外接区域不大于人脸面积之和）时
+        整个区域只做一次，稀疏时只处理各人脸区域，各人脸的打分一次向量化完成：
+        不小于100像素的人脸在区域Canny后由积分图O(1)查表得到特征；
+        小于100像素的人脸需要先放大再提取特征，从共享的灰度图中裁剪后逐个计算；
+        给出 features 时各人脸的灰度与边缘图取自特征包（与年龄估计共用），不做区域计算；
+        使用模型时裁剪出所有人脸做一次批量前向推理
+        
+        Args:
+            frame: 输入图像帧 (BGR格式)
+            boxes: 人脸边界框列表 [(x1, y1, x2, y2), ...]
+            gray: 已计算好的整帧灰度图（可选）
+            features: 与 boxes 一一对应的共享特征包列表（可选，如 FaceFeatures.from_box 的结果）
             
-            # 亮度：男性皮肤通常较暗
-            if mean_brightness < 110:
-                male_score += 0.3
-            elif mean_brightness > 130:
-                female_score += 0.3
-            else:
-                # 中等亮度，不偏向任何一方
-                male_score += 0.1
-                female_score += 0.1
+        Returns:
+            [(性别, 置信度), ...] 列表，与 boxes 一一对应
+        """
+        if not boxes:
+            return []
+        
+        if not self.enabled:
+            return [(Gender.UNKNOWN, 0.0)] * len(boxes)
+        
+        if not self.use_simple_classifier and self.net is not None:
+            if features is not None:
+                return self.classify_batch([feat.roi for feat in features], features)
+            rois = [frame[max(0, y1):max(0, y2), max(0, x1):max(0, x2)] for x1, y1, x2, y2 in boxes]
+            return self.classify_batch(rois)
+        
+        try:
+            arr = clip_boxes(boxes, frame.shape[:2])
+            widths = arr[:, 2] - arr[:, 0]
+            heights = arr[:, 3] - arr[:, 1]
+            areas = widths * heights
+            valid = areas > 0
+            large = valid & (widths >= 100) & (heights >= 100)
+            if not valid.any():
+                return [(Gender.FEMALE, 0.5)] * len(boxes)
             
-            # 对比度：男性面部特征通常更明显
-            if contrast > 0.4:
-                male_score += 0.2
-            else:
-                female_score += 0.2
+            # 灰度来源：已有的整帧灰度图、密集人脸的外接区域灰度图，或稀疏时直接从彩色帧逐个裁剪
+            source, (ox, oy) = frame, (0, 0)
+            if gray is not None:
+                source = gray
+            elif features is None and _bounding_area(arr[valid]) <= areas.sum():
+                source, (ox, oy) = self._feature_extractor.gray_region(frame, None, arr[valid])
             
-            # 面部宽高比（如果可能的话）
-            aspect_ratio = w / h if h > 0 else 1.0
-            if aspect_ratio > 0.85:  # 较宽的脸型
-                male_score += 0.2
-            else:
-                female_score += 0.2
+            n = len(arr)
+            mean, std, edge_density = np.zeros(n), np.zeros(n), np.zeros(n)
+            aspect_ratio = np.where(heights > 0, widths / np.maximum(heights, 1), 1.0)
+            per_face = valid.copy()
             
-            # 归一化分数
-            total_score = male_score + female_score
-            if total_score > 0:
-                male_prob = male_score / total_score
-                female_prob = female_score / total_score
-            else:
-                # 如果无法判断，默认返回女性（因为通常女性特征更明显）
-                male_prob = 0.4
-                female_prob = 0.6
+            if features is None and large.any() and _bounding_area(arr[large]) <= areas[large].sum():
+                x0, y0 = arr[large, 0].min(), arr[large, 1].min()
+                x1, y1 = arr[large, 2].max(), arr[large, 3].max()
+                region = source[y0 - oy:y1 - oy, x0 - ox:x1 - ox]
+                if region.ndim == 3:
+                    region = cv2.cvtColor(region, cv2.COLOR_BGR2GRAY)
+                edges = cv2.Canny(region, self._feature_extractor.canny_low, self._feature_extractor.canny_high)
+                stats = FrameFeatures(region, edges, offset=(int(x0), int(y0))).box_stats(arr[large])
+                mean[large], std[large], edge_density[large] = stats['mean'], stats['std'], stats['edge_density']
+                per_face &= ~large
             
-            # 判断性别（使用0.5作为阈值，但置信度基于概率差）
-            confidence = abs(male_prob - female_prob)
-            if confidence < 0.1:
-                # 如果差异太小，降低置信度
-                confidence = 0.5
+            for i in np.flatnonzero(per_face):
+                if features is not None:
+                    stats = face_statistics(features[i].roi, features[i])
+                else:
+                    x1, y1, x2, y2 = arr[i]
+                    stats = face_statistics(source[y1 - oy:y2 - oy, x1 - ox:x2 - ox])
+                mean[i], std[i], edge_density[i], _ = stats
             
-            if male_prob > female_prob:
-                return Gender.MALE, max(0.5, min(0.9, male_prob))
-            else:
-                return Gender.FEMALE, max(0.5, min(0.9, female_prob))
-                
+            results = self._score_features(mean, std, edge_density, aspect_ratio)
+            # 无效区域与逐个分类时的处理保持一致
+            return [result if ok else (Gender.FEMALE, 0.5) for result, ok in zip(results, valid)]
         except Exception as e:
-            logger.error(f"简单性别分类失败: {e}", exc_info=True)
-            # 即使出错也返回一个默认值，而不是UNKNOWN
-            # 这样可以确保界面显示正常
-            return Gender.FEMALE, 0.5
+            logger.error("整帧性别分类失败: %s", e)
+            return [(Gender.FEMALE, 0.5)] * len(boxes)
     
-    def classify_batch(self, face_rois: list) -> list:
+    def classify_batch(self, face_rois: list, features: Optional[List[FaceFeatures]] = None) -> list:
         """
-        批量分类
+        批量分类，使用模型时所有人脸合并为一次前向推理
         
         Args:
             face_rois: 人脸区域图像列表
+            features: 与 face_rois 一一对应的共享特征包列表（可选）
             
         Returns:
             [(性别, 置信度), ...] 列表
         """
-        results = []
-        for roi in face_rois:
-            gender, conf = self.predict(roi)
-            results.append((gender, conf))
-        return results
+        if not face_rois:
+            return []
+        
+        if not self.enabled:
+            return [(Gender.UNKNOWN, 0.0)] * len(face_rois)
+        
+        if features is None:
+            features = [None] * len(face_rois)
+        
+        if self.use_simple_classifier or self.net is None or len(face_rois) == 1:
+            return [self.predict(roi, feat) for roi, feat in zip(face_rois, features)]
+        
+        try:
+            blob, _ = self._preprocessor.batch(face_rois)
+            with self._net_lock:
+                self.net.setInput(blob)
+                output = self.net.forward()
+            output = output.reshape(len(face_rois), -1)
+            return [self._parse_probs(probs) for probs in output]
+        except Exception as e:
+            logger.error("批量性别分类失败: %s", e)
+            return [self._simple_classify(roi, feat) for roi, feat in zip(face_rois, features)]
 
@@ -8,7 +8,10 @@ import os
 from typing import List, Tuple, Optional
 
 from ..utils.logger import get_logger
+from ..utils.profiler import get_profiler
 from ..config import get_config
+from .attribute_worker import classify_faces
+from .gender_classifier import Gender
 
 logger = get_logger(__name__)
 
@@ -19,20 +22,6 @@ try:
 except ImportError:
     USE_CHINESE_TEXT = False
 
-# 延迟导入性别分类器，避免循环依赖
-_gender_classifier = None
-
-def _get_gender_classifier():
-    """获取性别分类器实例（单例）"""
-    global _gender_classifier
-    if _gender_classifier is None:
-        try:
-            from .gender_classifier import GenderClassifier
-            _gender_classifier = GenderClassifier()
-        except Exception as e:
-            logger.warning(f"无法加载性别分类器: {e}")
-            _gender_classifier = None
-    return _gender_classifier
 
 
 class HaarFaceDetector:
@@ -46,14 +35,36 @@ class HaarFaceDetector:
             cascade_path: Haar级联分类器文件路径，如果为None则使用配置或默认
             **kwargs: 其他参数（scale_factor, min_neighbors, min_size）
         """
-        config = get_config()
+        haar_settings = get_config().settings.detection.haar
         
         # 获取级联分类器路径
         if cascade_path is None:
-            cascade_path = config.get('detection.haar.cascade_path')
+            cascade_path = haar_settings.cascade_path
+        
+        # 最近一次检测的帧及其灰度图
+        self._last_frame: Optional[np.ndarray] = None
+        self._last_gray: Optional[np.ndarray] = None
         
         # 加载级联分类器
-        self.face_cascade = None
+        self.cascade_path = cascade_path
+        self.face_cascade = self._load_cascade(cascade_path)
+        
+        # 检测参数
+        self.scale_factor = kwargs.get('scale_factor') or haar_settings.scale_factor
+        self.min_neighbors = kwargs.get('min_neighbors') or haar_settings.min_neighbors
+        self.min_size = kwargs.get('min_size') or haar_settings.min_size
+    
+    def _load_cascade(self, cascade_path: Optional[str]) -> cv2.CascadeClassifier:
+        """
+        加载级联分类器
+        
+        Args:
+            cascade_path: 级联分类器文件路径，None表示使用OpenCV内置
+            
+        Returns:
+            级联分类器
+        """
+        face_cascade = None
 
         # 尝试多个路径来加载级联分类器
         paths_to_try = []
@@ -73,27 +84,39 @@ class HaarFaceDetector:
                 if os.path.exists(path) or 'cv2.data' in path:
                     cascade = cv2.CascadeClassifier(path)
                     if not cascade.empty():
-                        self.face_cascade = cascade
+                        face_cascade = cascade
                         logger.info(f"成功加载级联分类器: {path}")
                         break
             except Exception as e:
-                logger.debug(f"尝试加载 {path} 失败: {e}")
+                logger.debug("尝试加载 %s 失败: %s", path, e)
                 continue
 
         # 如果所有路径都失败，使用OpenCV内置的
-        if self.face_cascade is None:
+        if face_cascade is None:
             logger.warning("使用OpenCV内置级联分类器")
-            self.face_cascade = cv2.CascadeClassifier(
+            face_cascade = cv2.CascadeClassifier(
                 cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
             )
-            if self.face_cascade.empty():
+            if face_cascade.empty():
                 logger.error("无法加载任何级联分类器")
                 raise ValueError("无法加载任何级联分类器")
         
-        # 检测参数
-        self.scale_factor = kwargs.get('scale_factor') or config.get('detection.haar.scale_factor', 1.1)
-        self.min_neighbors = kwargs.get('min_neighbors') or config.get('detection.haar.min_neighbors', 5)
-        self.min_size = kwargs.get('min_size') or config.get('detection.haar.min_size', (30, 30))
+        return face_cascade
+    
+    def apply_settings(self, detection_settings):
+        """
+        热更新检测参数（应在两帧之间调用）
+        
+        Args:
+            detection_settings: 新的检测配置快照（DetectionSettings）
+        """
+        haar_settings = detection_settings.haar
+        if haar_settings.cascade_path != self.cascade_path:
+            self.face_cascade = self._load_cascade(haar_settings.cascade_path)
+            self.cascade_path = haar_settings.cascade_path
+        self.scale_factor = haar_settings.scale_factor
+        self.min_neighbors = haar_settings.min_neighbors
+        self.min_size = haar_settings.min_size
     
     def detect(self, frame: np.ndarray) -> List[Tuple[int, int, int, int]]:
         """
@@ -105,18 +128,38 @@ class HaarFaceDetector:
         Returns:
             faces: 检测到的人脸列表，格式为 [(x, y, w, h), ...]
         """
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        profiler = get_profiler()
+        
+        with profiler.span('preprocess'):
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        # 保留本帧灰度图，供性别识别复用
+        self._last_frame = frame
+        self._last_gray = gray
         
         # 检测人脸
-        faces = self.face_cascade.detectMultiScale(
-            gray,
-            scaleFactor=self.scale_factor,
-            minNeighbors=self.min_neighbors,
-            minSize=self.min_size,
-            flags=cv2.CASCADE_SCALE_IMAGE
-        )
-        
-        return faces.tolist() if len(faces) > 0 else []
+        with profiler.span('inference'):
+            faces = self.face_cascade.detectMultiScale(
+                gray,
+                scaleFactor=self.scale_factor,
+                minNeighbors=self.min_neighbors,
+                minSize=self.min_size,
+                flags=cv2.CASCADE_SCALE_IMAGE
+            )
+        
+        with profiler.span('postprocess'):
+            return faces.tolist() if len(faces) > 0 else []
+    
+    def detect_batch(self, frames: List[np.ndarray]) -> List[List[Tuple[int, int, int, int]]]:
+        """
+        批量检测（级联分类器没有批量接口，逐帧检测）
+        
+        Args:
+            frames: 输入图像帧列表
+            
+        Returns:
+            与 frames 一一对应的人脸列表
+        """
+        return [self.detect(frame) for frame in frames]
     
     def draw_detections(
         self,
@@ -124,7 +167,8 @@ class HaarFaceDetector:
         faces: List[Tuple[int, int, int, int]],
         color: Tuple[int, int, int] = (0, 255, 0),
         thickness: int = 2,
-        show_gender: bool = True
+        show_gender: bool = True,
+        stream: Optional[int] = None
     ) -> np.ndarray:
         """
         在图像上绘制检测结果
@@ -135,44 +179,40 @@ class HaarFaceDetector:
             color: 绘制颜色
             thickness: 线条粗细
             show_gender: 是否显示性别
+            stream: 多路视频流时的流编号（区分各路画面的属性识别结果）
             
         Returns:
             frame: 绘制了检测框的图像
         """
-        gender_classifier = _get_gender_classifier() if show_gender else None
+        profiler = get_profiler()
         
-        for (x, y, w, h) in faces:
+        # 性别识别：先对整帧所有人脸一次性分类，再绘制（分类区域不含已绘制的边框）
+        labels = ['Face'] * len(faces)
+        if show_gender:
+            boxes, indices = [], []
+            for i, (x, y, w, h) in enumerate(faces):
+                # 提取人脸区域（确保坐标有效）
+                x1, y1 = max(0, x), max(0, y)
+                x2, y2 = min(frame.shape[1], x + w), min(frame.shape[0], y + h)
+                if x2 - x1 > 10 and y2 - y1 > 10:
+                    boxes.append((x1, y1, x2, y2))
+                    indices.append(i)
+            try:
+                # 复用detect()中已计算的灰度图
+                gray = self._last_gray if self._last_frame is frame else None
+                with profiler.span('classification'):
+                    results = classify_faces(frame, boxes, gray=gray, stream=stream)
+                for i, result in zip(indices, results):
+                    # 确保不显示UNKNOWN，返回未知时使用默认标签
+                    if result and result.gender != Gender.UNKNOWN:
+                        labels[i] = result.label()
+            except Exception as e:
+                logger.debug("性别识别失败: %s", e)
+        
+        for (x, y, w, h), label in zip(faces, labels):
             # 绘制边界框
             cv2.rectangle(frame, (x, y), (x + w, y + h), color, thickness)
             
-            # 性别识别
-            label = 'Face'
-            if gender_classifier:
-                try:
-                    # 提取人脸区域（确保坐标有效）
-                    x1 = max(0, x)
-                    y1 = max(0, y)
-                    x2 = min(frame.shape[1], x + w)
-                    y2 = min(frame.shape[0], y + h)
-                    
-                    if x2 > x1 and y2 > y1:
-                        face_roi = frame[y1:y2, x1:x2]
-                        if face_roi.size > 0 and face_roi.shape[0] > 10 and face_roi.shape[1] > 10:
-                            gender, conf = gender_classifier.predict(face_roi)
-                            # 确保不返回UNKNOWN，如果返回了也使用默认标签
-                            if gender and hasattr(gender, 'value') and gender.value not in ["未知", "UNKNOWN"]:
-                                label = f'{gender.value} {conf:.2f}'
-                            else:
-                                # 如果返回未知，使用默认标签
-                                label = 'Face'
-                        else:
-                            label = 'Face'
-                    else:
-                        label = 'Face'
-                except Exception as e:
-                    logger.debug(f"性别识别失败: {e}")
-                    label = 'Face'
-            
             # 绘制标签（支持中文）
             if USE_CHINESE_TEXT:
                 frame = put_chinese_text(frame, label, (x, y - 10), 
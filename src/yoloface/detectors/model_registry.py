@@ -0,0 +1,402 @@
+"""
+模型注册表
+启动时一次性读取模型清单（manifest）并扫描模型目录建立索引，之后的模型解析只查内存索引，不再逐次探测文件系统。
+清单记录每个模型的路径、格式、输入尺寸、均值/缩放、sha256校验和与精度；
+权重通过内存映射直接交给 cv2.dnn 解析（readNetFromONNX/readNetFromCaffe 的缓冲区重载），
+同一进程内多个流水线加载同一模型时共享一个网络实例。
+
+清单格式（JSON）:
+    {"models": [{"name": "fastestv2", "path": "yolo_fastestv2/model.onnx", "format": "onnx",
+                 "input_size": [416, 416], "mean": [0, 0, 0], "scale": 0.00392, "sha256": "...",
+                 "precision": "fp32"}]}
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from ..utils.logger import get_logger
+from ..config import get_config
+from .dnn_backend import get_backend_selector
+from .model_variants import resolve_model_variant
+
+logger = get_logger(__name__)
+
+# 文件后缀 -> 模型格式
+MODEL_FORMATS = {'.onnx': 'onnx', '.caffemodel': 'caffe', '.pt': 'torch'}
+
+DEFAULT_SEARCH_DIRS = ('data/models', 'models', 'yolo_fastestv2', 'gender_models', 'models/age_net')
+
+class ModelEntry(NamedTuple):
+    """清单中的一个模型"""
+    name: str
+    path: str
+    format: str
+    input_size: Optional[Tuple[int, int]] = None
+    mean: Optional[Tuple[float, float, float]] = None
+    scale: Optional[float] = None
+    sha256: Optional[str] = None
+    precision: str = 'fp32'
+    config_path: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        """转为清单中的JSON对象（省略空字段）"""
+        data = self._asdict()
+        for key in ('input_size', 'mean'):
+            if data[key] is not None:
+                data[key] = list(data[key])
+        return {key: value for key, value in data.items() if value is not None}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'ModelEntry':
+        """从清单中的JSON对象创建（相对路径相对于工作目录，与配置文件中的模型路径一致）"""
+        path = data['path']
+        return cls(
+            name=data.get('name') or os.path.basename(path),
+            path=path,
+            format=data.get('format') or _guess_format(path),
+            input_size=tuple(int(v) for v in data['input_size']) if data.get('input_size') else None,
+            mean=tuple(float(m) for m in data['mean']) if data.get('mean') else None,
+            scale=float(data['scale']) if data.get('scale') is not None else None,
+            sha256=data.get('sha256'),
+            precision=data.get('precision') or _guess_precision(path),
+            config_path=data.get('config_path'),
+        )
+
+
+class LoadedModel(NamedTuple):
+    """共享的已加载网络；cv2.dnn.Net 的 setInput/forward 不是线程安全的，调用方需持有 lock"""
+    entry: ModelEntry
+    net: object
+    lock: threading.Lock
+
+
+def _guess_format(path: str) -> str:
+    """按后缀推断模型格式"""
+    return MODEL_FORMATS.get(os.path.splitext(path)[1].lower(), 'unknown')
+
+
+def _guess_precision(path: str) -> str:
+    """按命名约定（model.int8.onnx）推断精度"""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    for precision in ('int8', 'fp16'):
+        if stem.endswith(f'.{precision}'):
+            return precision
+    return 'fp32'
+
+
+def sha256_file(path: str) -> str:
+    """
+    计算文件的sha256（通过内存映射，不把整个文件读入Python内存）
+
+    Args:
+        path: 文件路径
+
+    Returns:
+        十六进制摘要
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return hashlib.sha256(b'').hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return hashlib.sha256(mapped).hexdigest()
+
+
+class ModelRegistry:
+    """模型注册表（线程安全）"""
+
+    def __init__(
+        self,
+        manifest_path: Optional[str] = None,
+        search_dirs: Sequence[str] = DEFAULT_SEARCH_DIRS,
+        verify_checksum: bool = True
+    ):
+        """
+        初始化
+
+        Args:
+            manifest_path: 清单文件路径，None或不存在时只使用目录扫描结果
+            search_dirs: 扫描的模型目录（按优先级排列）
+            verify_checksum: 加载时是否校验清单中记录的sha256
+        """
+        self.manifest_path = manifest_path
+        self.search_dirs = list(search_dirs)
+        self.verify_checksum = verify_checksum
+        self._lock = threading.RLock()
+        self._indexed = False
+        self._by_name: Dict[str, ModelEntry] = {}
+        self._by_path: Dict[str, ModelEntry] = {}
+        self._by_basename: Dict[str, List[ModelEntry]] = {}
+        self._loaded: Dict[Tuple[str, Optional[str]], LoadedModel] = {}
+        # 已校验过的文件 {绝对路径: (mtime_ns, size)}，文件未变化时不重复计算
+        self._verified: Dict[str, Tuple[int, int]] = {}
+
+        self.loads = 0
+        self.shared_hits = 0
+
+    def _add(self, entry: ModelEntry, replace: bool = True):
+        """加入索引（需持有锁）"""
+        key = os.path.abspath(entry.path)
+        if not replace and key in self._by_path:
+            return
+        old = self._by_path.get(key)
+        self._by_path[key] = entry
+        self._by_name.setdefault(entry.name, entry)
+        entries = self._by_basename.setdefault(os.path.basename(entry.path), [])
+        if old is not None and old in entries:
+            entries[entries.index(old)] = entry
+        else:
+            entries.append(entry)
+
+    def index(self, force: bool = False) -> int:
+        """
+        建立索引：读取清单并扫描模型目录（进程内只执行一次）
+
+        Args:
+            force: 是否重新建立索引
+
+        Returns:
+            索引中的模型数量
+        """
+        with self._lock:
+            if self._indexed and not force:
+                return len(self._by_path)
+            self._by_name.clear()
+            self._by_path.clear()
+            self._by_basename.clear()
+
+            if self.manifest_path and os.path.exists(self.manifest_path):
+                try:
+                    with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                    for item in data.get('models', []):
+                        self._add(ModelEntry.from_dict(item))
+                except (OSError, ValueError, KeyError, TypeError) as e:
+                    logger.warning(f"读取模型清单失败: {e}")
+
+            for search_dir in self.search_dirs:
+                try:
+                    names = sorted(os.listdir(search_dir))
+                except OSError:
+                    continue
+                for filename in names:
+                    fmt = _guess_format(filename)
+                    if fmt == 'unknown':
+                        continue
+                    path = os.path.join(search_dir, filename)
+                    config_path = None
+                    if fmt == 'caffe':
+                        prototxt = path[:-len('.caffemodel')] + '.prototxt'
+                        config_path = prototxt if os.path.exists(prototxt) else None
+                    self._add(ModelEntry(
+                        name=filename, path=path, format=fmt,
+                        precision=_guess_precision(filename), config_path=config_path
+                    ), replace=False)
+
+            self._indexed = True
+            logger.info(f"模型注册表已索引 {len(self._by_path)} 个模型")
+            return len(self._by_path)
+
+    def entries(self) -> List[ModelEntry]:
+        """索引中的全部模型"""
+        self.index()
+        with self._lock:
+            return list(self._by_path.values())
+
+    def find(self, model: Optional[str]) -> Optional[ModelEntry]:
+        """
+        查找模型：清单名称 > 精确路径 > 搜索目录中的同名文件 > 索引之外但存在的路径
+
+        Args:
+            model: 清单中的名称或模型路径
+
+        Returns:
+            模型条目，未找到时返回None
+        """
+        if not model:
+            return None
+        self.index()
+        with self._lock:
+            entry = self._by_name.get(model) or self._by_path.get(os.path.abspath(model))
+            if entry is not None:
+                return entry
+            candidates = self._by_basename.get(os.path.basename(model))
+            if candidates:
+                return candidates[0]
+            if os.path.isfile(model):
+                # 不在模型目录中的文件（如命令行指定的路径），登记后复用
+                entry = ModelEntry(name=model, path=model, format=_guess_format(model),
+                                   precision=_guess_precision(model))
+                self._add(entry)
+                return entry
+        return None
+
+    def resolve(self, model: Optional[str], precision: Optional[str] = 'fp32') -> Optional[ModelEntry]:
+        """
+        按精度偏好解析模型条目（变体命名约定见 model_variants）
+
+        Args:
+            model: 清单中的名称或模型路径
+            precision: 'fp32'、'fp16'、'int8' 或 'auto'
+
+        Returns:
+            模型条目；请求的变体不存在时返回原模型条目，原模型也不存在时返回None
+        """
+        entry = self.find(model)
+        if entry is None:
+            return None
+        if (precision or 'fp32').lower() == entry.precision:
+            return entry
+        resolved = resolve_model_variant(entry.path, precision, locate=self._locate)
+        return self.find(resolved) or entry
+
+    def _locate(self, path: str) -> Optional[str]:
+        """在内存索引中查找模型文件，返回索引中的路径"""
+        entry = self.find(path)
+        return entry.path if entry is not None else None
+
+    def _verify(self, entry: ModelEntry, mapped) -> Optional[str]:
+        """校验（清单中没有记录时计算）sha256，返回摘要；校验失败时抛出ValueError"""
+        key = os.path.abspath(entry.path)
+        stat = os.stat(entry.path)
+        identity = (stat.st_mtime_ns, stat.st_size)
+        if not self.verify_checksum or (entry.sha256 and self._verified.get(key) == identity):
+            return entry.sha256
+        digest = hashlib.sha256(mapped).hexdigest()
+        if entry.sha256 and digest != entry.sha256.lower():
+            raise ValueError(f"模型校验和不匹配: {entry.path}（清单 {entry.sha256[:12]}…，实际 {digest[:12]}…）")
+        self._verified[key] = identity
+        return digest
+
+    def load_net(self, entry: ModelEntry, input_shape: Sequence[int]) -> LoadedModel:
+        """
+        加载（或复用已加载的）cv2.dnn网络
+
+        Args:
+            entry: 模型条目（onnx或caffe格式）
+            input_shape: 输入blob形状，用于首次加载时的后端选择
+
+        Returns:
+            共享的已加载模型
+
+        Raises:
+            ValueError: 格式不支持、缺少prototxt或校验和不匹配
+            OSError: 文件无法读取
+        """
+        key = (os.path.abspath(entry.path), entry.config_path and os.path.abspath(entry.config_path))
+        with self._lock:
+            loaded = self._loaded.get(key)
+            if loaded is not None:
+                self.shared_hits += 1
+                logger.info(f"复用已加载的模型: {entry.path}")
+                return loaded
+
+            if entry.format not in ('onnx', 'caffe'):
+                raise ValueError(f"不支持的模型格式: {entry.path}")
+            if entry.format == 'caffe' and not (entry.config_path and os.path.exists(entry.config_path)):
+                raise ValueError(f"Caffe模型需要prototxt文件: {entry.path}")
+
+            with open(entry.path, 'rb') as f, \
+                    mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                digest = self._verify(entry, mapped)
+                weights = np.frombuffer(mapped, dtype=np.uint8)
+                try:
+                    if entry.format == 'onnx':
+                        net = cv2.dnn.readNetFromONNX(weights)
+                    else:
+                        proto = np.frombuffer(Path(entry.config_path).read_bytes(), dtype=np.uint8)
+                        net = cv2.dnn.readNetFromCaffe(proto, weights)
+                finally:
+                    # 解析后权重已复制到网络内部，释放对映射的引用以便关闭
+                    del weights
+
+            if digest and digest != entry.sha256:
+                entry = entry._replace(sha256=digest)
+                self._add(entry)
+            get_backend_selector().select(net, entry.path, input_shape)
+            loaded = LoadedModel(entry, net, threading.Lock())
+            self._loaded[key] = loaded
+            self.loads += 1
+            return loaded
+
+    def release(self, entry: Optional[ModelEntry] = None):
+        """
+        释放共享网络（模型文件更新后调用）
+
+        Args:
+            entry: 要释放的模型，None表示全部
+        """
+        with self._lock:
+            if entry is None:
+                self._loaded.clear()
+                return
+            path = os.path.abspath(entry.path)
+            for key in [key for key in self._loaded if key[0] == path]:
+                del self._loaded[key]
+
+    def save(self, path: Optional[str] = None, checksums: bool = True) -> str:
+        """
+        将索引写入清单文件（原子写入）
+
+        Args:
+            path: 输出路径，默认为当前清单路径
+            checksums: 是否为尚无校验和的模型计算sha256
+
+        Returns:
+            写入的路径
+        """
+        path = path or self.manifest_path
+        if not path:
+            raise ValueError("未指定模型清单路径")
+        entries = self.entries()
+        if checksums:
+            entries = [
+                entry if entry.sha256 else entry._replace(sha256=sha256_file(entry.path))
+                for entry in entries
+                if os.path.exists(entry.path)
+            ]
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        temp_file = target.with_suffix('.tmp')
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump({'models': [entry.to_dict() for entry in entries]}, f, ensure_ascii=False, indent=2)
+        os.replace(temp_file, target)
+        logger.info(f"模型清单已写入: {target}（{len(entries)} 个模型）")
+        return str(target)
+
+    def collect(self) -> List[Tuple[str, str, str, float]]:
+        """监控指标采集函数（供 MetricsRegistry.add_collector 使用）"""
+        return [
+            ('model_registry_models', 'gauge', '模型注册表中的模型数', len(self._by_path)),
+            ('model_registry_loads_total', 'counter', '从磁盘加载模型的次数', self.loads),
+            ('model_registry_shared_total', 'counter', '复用已加载模型的次数', self.shared_hits),
+        ]
+
+
+# 全局实例
+_global_registry: Optional[ModelRegistry] = None
+_global_lock = threading.Lock()
+
+
+def get_model_registry() -> ModelRegistry:
+    """获取全局模型注册表（首次调用时建立索引）"""
+    global _global_registry
+    if _global_registry is None:
+        with _global_lock:
+            if _global_registry is None:
+                config = get_config()
+                registry = ModelRegistry(
+                    manifest_path=config.get('models.manifest', 'data/models/manifest.json'),
+                    search_dirs=config.get('models.search_dirs', None) or DEFAULT_SEARCH_DIRS,
+                    verify_checksum=config.get('models.verify_checksum', True)
+                )
+                registry.index()
+                _global_registry = registry
+    return _global_registry
@@ -0,0 +1,100 @@
+"""
+模型精度变体
+量化工具（scripts/exporter.py quantize）按约定命名输出：
+    model.onnx -> model.int8.onnx / model.fp16.onnx
+运行时按精度偏好查找对应变体，不存在时回退到原模型
+"""
+
+import os
+from typing import Callable, Iterable, List, Optional
+
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+PRECISIONS = ('fp32', 'fp16', 'int8', 'auto')
+
+# 'auto' 的查找顺序：CPU上INT8通常最快，FP16只在GPU目标上有收益，因此不参与自动选择
+_AUTO_ORDER = ('int8', 'fp32')
+
+
+def variant_path(model_path: str, precision: str) -> str:
+    """
+    获取指定精度变体的文件路径（按命名约定，不检查是否存在）
+
+    Args:
+        model_path: 原模型路径（.onnx/.pt等）
+        precision: 'fp32'、'fp16' 或 'int8'
+
+    Returns:
+        变体路径；fp32 返回原路径
+    """
+    if precision == 'fp32':
+        return model_path
+    stem, _ = os.path.splitext(model_path)
+    # 已经是变体路径时先去掉精度后缀
+    for known in ('.int8', '.fp16'):
+        if stem.endswith(known):
+            stem = stem[:-len(known)]
+    return f"{stem}.{precision}.onnx"
+
+
+def _first_existing(path: str, search_dirs: Iterable[str]) -> Optional[str]:
+    """在原路径与搜索目录中查找文件"""
+    if os.path.exists(path):
+        return path
+    for search_dir in search_dirs:
+        candidate = os.path.join(search_dir, os.path.basename(path))
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+
+def resolve_model_variant(
+    model_path: Optional[str],
+    precision: Optional[str] = 'fp32',
+    search_dirs: Iterable[str] = (),
+    locate: Optional[Callable[[str], Optional[str]]] = None
+) -> Optional[str]:
+    """
+    按精度偏好解析实际加载的模型文件
+
+    Args:
+        model_path: 配置中的模型路径
+        precision: 'fp32'、'fp16'、'int8' 或 'auto'
+        search_dirs: 额外的搜索目录
+        locate: 查找变体文件的函数（变体路径 -> 实际路径或None），默认在原路径与搜索目录中探测文件系统；
+            模型注册表传入基于内存索引的查找
+
+    Returns:
+        存在的变体路径；请求的变体不存在时返回原路径（可能同样不存在，由调用方处理）
+    """
+    if not model_path:
+        return model_path
+    precision = (precision or 'fp32').lower()
+    if precision not in PRECISIONS:
+        logger.warning(f"未知的模型精度: {precision}，使用fp32")
+        precision = 'fp32'
+    if precision == 'fp32':
+        return model_path
+
+    if locate is None:
+        search_dirs = list(search_dirs)
+
+        def locate(path: str) -> Optional[str]:
+            return _first_existing(path, search_dirs)
+
+    order: List[str] = list(_AUTO_ORDER) if precision == 'auto' else [precision]
+    for candidate_precision in order:
+        if candidate_precision == 'fp32':
+            break
+        found = locate(variant_path(model_path, candidate_precision))
+        if found:
+            logger.info(f"使用{candidate_precision.upper()}模型变体: {found}")
+            return found
+
+    if precision != 'auto':
+        logger.warning(
+            f"未找到{precision.upper()}模型变体 {variant_path(model_path, precision)}，使用原模型"
+        )
+    return model_path
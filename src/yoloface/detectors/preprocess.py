@@ -0,0 +1,159 @@
+"""
+DNN输入预处理
+将图像缩放（letterbox / 中心裁剪 / 拉伸）后写入预先分配的 float32 NCHW 缓冲区，
+通道交换与归一化在缓冲区上原地完成，每帧不再重新分配blob；
+letterbox 模式记录缩放比例与填充，检测框可以精确映射回原图
+"""
+
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+MODES = ('letterbox', 'crop', 'stretch')
+
+
+class LetterboxInfo(NamedTuple):
+    """一张图像的缩放与填充参数（网络输入坐标 = 原图坐标 * scale + pad）"""
+    scale_x: float
+    scale_y: float
+    pad_x: float
+    pad_y: float
+    width: int
+    height: int
+
+    def to_source(self, boxes: np.ndarray) -> np.ndarray:
+        """
+        将网络输入坐标系下的 (x1, y1, x2, y2) 映射回原图并裁剪到图像范围
+
+        Args:
+            boxes: 形状为 (N, 4) 的数组
+
+        Returns:
+            float64数组，形状为 (N, 4)
+        """
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        out = np.empty_like(boxes)
+        out[:, [0, 2]] = (boxes[:, [0, 2]] - self.pad_x) / self.scale_x
+        out[:, [1, 3]] = (boxes[:, [1, 3]] - self.pad_y) / self.scale_y
+        np.clip(out[:, [0, 2]], 0, self.width, out=out[:, [0, 2]])
+        np.clip(out[:, [1, 3]], 0, self.height, out=out[:, [1, 3]])
+        return out
+
+
+class BlobPreprocessor:
+    """复用缓冲区的blob预处理器（非线程安全，每个模型实例持有一个）"""
+
+    def __init__(
+        self,
+        size: Tuple[int, int],
+        mean: Sequence[float] = (0.0, 0.0, 0.0),
+        scale: float = 1.0,
+        swap_rb: bool = False,
+        mode: str = 'letterbox',
+        pad_value: int = 114
+    ):
+        """
+        初始化
+
+        Args:
+            size: 网络输入尺寸 (width, height)
+            mean: 各通道均值（按输出通道顺序，即 swap_rb 之后）
+            scale: 减均值后的缩放系数
+            swap_rb: 是否将BGR转为RGB
+            mode: 'letterbox' 保持宽高比并填充；'crop' 缩放后中心裁剪（同 blobFromImage(crop=True)）；
+                  'stretch' 直接缩放到目标尺寸（同 blobFromImage(crop=False)）
+            pad_value: letterbox 填充值
+        """
+        if mode not in MODES:
+            raise ValueError(f"不支持的预处理模式: {mode}，可选 {MODES}")
+        self.width, self.height = int(size[0]), int(size[1])
+        self.mean = tuple(float(m) for m in (tuple(mean) + (0.0, 0.0, 0.0))[:3])
+        self.scale = float(scale)
+        self.swap_rb = swap_rb
+        self.mode = mode
+        self.pad_value = pad_value
+        # BGR输入中对应输出第c个通道的下标
+        self._channel_order = (2, 1, 0) if swap_rb else (0, 1, 2)
+        self._buffer = np.empty((0, 3, self.height, self.width), dtype=np.float32)
+        self._canvas = np.full((self.height, self.width, 3), pad_value, dtype=np.uint8)
+        self._canvas_geometry: Optional[Tuple[int, int, int, int]] = None
+
+    def _ensure_capacity(self, batch_size: int) -> np.ndarray:
+        """按需扩大缓冲区，返回前 batch_size 个样本的视图"""
+        if self._buffer.shape[0] < batch_size:
+            self._buffer = np.empty((batch_size, 3, self.height, self.width), dtype=np.float32)
+        return self._buffer[:batch_size]
+
+    def _resize(self, image: np.ndarray) -> Tuple[np.ndarray, LetterboxInfo]:
+        """按模式缩放为 (height, width, 3) 的uint8图像"""
+        if image.ndim == 2:
+            image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+        h, w = image.shape[:2]
+
+        if self.mode == 'stretch':
+            resized = cv2.resize(image, (self.width, self.height))
+            return resized, LetterboxInfo(self.width / w, self.height / h, 0.0, 0.0, w, h)
+
+        if self.mode == 'crop':
+            # 与 blobFromImage(crop=True) 一致：单精度缩放系数，裁剪起点向下取整
+            factor = float(np.float32(max(np.float32(self.width) / w, np.float32(self.height) / h)))
+            resized = cv2.resize(image, None, fx=factor, fy=factor)
+            x0 = (resized.shape[1] - self.width) // 2
+            y0 = (resized.shape[0] - self.height) // 2
+            cropped = resized[y0:y0 + self.height, x0:x0 + self.width]
+            return cropped, LetterboxInfo(factor, factor, -float(x0), -float(y0), w, h)
+
+        factor = min(self.width / w, self.height / h)
+        new_w = max(1, min(self.width, int(round(w * factor))))
+        new_h = max(1, min(self.height, int(round(h * factor))))
+        left = (self.width - new_w) // 2
+        top = (self.height - new_h) // 2
+        geometry = (left, top, new_w, new_h)
+        if geometry != self._canvas_geometry:
+            # 尺寸变化时才重新填充边框，否则只覆盖内容区域
+            self._canvas.fill(self.pad_value)
+            self._canvas_geometry = geometry
+        self._canvas[top:top + new_h, left:left + new_w] = cv2.resize(image, (new_w, new_h))
+        return self._canvas, LetterboxInfo(new_w / w, new_h / h, float(left), float(top), w, h)
+
+    def _fill(self, target: np.ndarray, image: np.ndarray):
+        """将缩放后的图像写入单个样本 (3, H, W)，原地完成通道交换与归一化"""
+        for c, src in enumerate(self._channel_order):
+            plane = target[c]
+            np.copyto(plane, image[:, :, src], casting='unsafe')
+            if self.mean[c]:
+                plane -= self.mean[c]
+            if self.scale != 1.0:
+                plane *= self.scale
+
+    def __call__(self, image: np.ndarray) -> Tuple[np.ndarray, LetterboxInfo]:
+        """
+        预处理单张图像
+
+        Args:
+            image: 输入图像 (BGR或灰度)
+
+        Returns:
+            (形状为 (1, 3, H, W) 的blob（复用的缓冲区，下次调用前有效）, 缩放参数)
+        """
+        blob, infos = self.batch([image])
+        return blob, infos[0]
+
+    def batch(self, images: Sequence[np.ndarray]) -> Tuple[np.ndarray, List[LetterboxInfo]]:
+        """
+        预处理多张图像为一个批次
+
+        Args:
+            images: 输入图像列表
+
+        Returns:
+            (形状为 (N, 3, H, W) 的blob（复用的缓冲区，下次调用前有效）, 各图像的缩放参数)
+        """
+        blob = self._ensure_capacity(len(images))
+        infos = []
+        for i, image in enumerate(images):
+            resized, info = self._resize(image)
+            self._fill(blob[i], resized)
+            infos.append(info)
+        return blob, infos
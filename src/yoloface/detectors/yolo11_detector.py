@@ -14,7 +14,11 @@ except ImportError:
 
 from ..utils.logger import get_logger
 from ..utils.file_utils import get_model_path
+from ..utils.profiler import get_profiler
 from ..config import get_config
+from .attribute_worker import classify_faces
+from .gender_classifier import Gender
+from .model_registry import get_model_registry
 
 logger = get_logger(__name__)
 
@@ -25,26 +29,6 @@ try:
 except ImportError:
     USE_CHINESE_TEXT = False
 
-# 导入Gender枚举用于检查
-try:
-    from .gender_classifier import Gender
-except ImportError:
-    Gender = None
-
-# 延迟导入性别分类器
-_gender_classifier = None
-
-def _get_gender_classifier():
-    """获取性别分类器实例（单例）"""
-    global _gender_classifier
-    if _gender_classifier is None:
-        try:
-            from .gender_classifier import GenderClassifier
-            _gender_classifier = GenderClassifier()
-        except Exception as e:
-            logger.warning(f"无法加载性别分类器: {e}")
-            _gender_classifier = None
-    return _gender_classifier
 
 
 class YOLO11FaceDetector:
@@ -57,35 +41,67 @@ class YOLO11FaceDetector:
         Args:
             model_path: YOLO11模型文件路径
             conf_threshold: 置信度阈值
-            **kwargs: 其他参数
+            **kwargs: 其他参数（iou_threshold、imgsz、precision: fp32/fp16/int8/auto）
         """
         if not YOLO_AVAILABLE:
             raise ImportError("ultralytics未安装，请运行: pip install ultralytics")
         
-        config = get_config()
+        yolo11_settings = get_config().settings.detection.yolo11
         
         # 获取模型路径
         if model_path is None:
-            model_path = config.get('detection.yolo11.model_path', 'yolo11n.pt')
+            model_path = yolo11_settings.model_path
         
         # 获取置信度阈值
         if conf_threshold is None:
-            conf_threshold = config.get('detection.yolo11.conf_threshold', 0.25)
+            conf_threshold = yolo11_settings.conf_threshold
         
         self.conf_threshold = conf_threshold
-        self.iou_threshold = kwargs.get('iou_threshold') or config.get('detection.yolo11.iou_threshold', 0.45)
-        self.imgsz = kwargs.get('imgsz') or config.get('detection.yolo11.imgsz', 640)
+        self.iou_threshold = kwargs.get('iou_threshold') or yolo11_settings.iou_threshold
+        self.imgsz = kwargs.get('imgsz') or yolo11_settings.imgsz
+        self.precision = kwargs.get('precision') or yolo11_settings.precision
+        self.model_path = model_path
+        self.model = self._load_model(model_path)
+    
+    def _load_model(self, model_path: str):
+        """
+        加载YOLO11模型
         
+        Args:
+            model_path: 模型文件路径
+            
+        Returns:
+            YOLO模型
+        """
         try:
-            # 尝试获取完整路径
-            full_path = get_model_path(model_path)
+            # 经模型注册表解析，按精度偏好选择量化的ONNX变体（ultralytics可直接加载ONNX）；
+            # 未登记的模型名交给ultralytics处理（可自动下载预训练权重）
+            entry = get_model_registry().resolve(model_path, self.precision)
+            full_path = entry.path if entry is not None else get_model_path(model_path)
             logger.info(f"加载YOLO11模型: {full_path}")
-            self.model = YOLO(full_path)
+            model = YOLO(full_path)
             logger.info("YOLO11模型加载成功")
+            return model
         except Exception as e:
             logger.error(f"加载YOLO11模型失败: {e}")
             logger.info("尝试使用预训练模型...")
-            self.model = YOLO('yolo11n.pt')  # 使用Ultralytics提供的预训练模型
+            return YOLO('yolo11n.pt')  # 使用Ultralytics提供的预训练模型
+    
+    def apply_settings(self, detection_settings):
+        """
+        热更新检测参数（应在两帧之间调用），仅在模型路径变化时重新加载模型
+        
+        Args:
+            detection_settings: 新的检测配置快照（DetectionSettings）
+        """
+        yolo11_settings = detection_settings.yolo11
+        if yolo11_settings.model_path != self.model_path or yolo11_settings.precision != self.precision:
+            self.precision = yolo11_settings.precision
+            self.model = self._load_model(yolo11_settings.model_path)
+            self.model_path = yolo11_settings.model_path
+        self.conf_threshold = yolo11_settings.conf_threshold
+        self.iou_threshold = yolo11_settings.iou_threshold
+        self.imgsz = yolo11_settings.imgsz
     
     def detect(self, frame: np.ndarray) -> List[Tuple[int, int, int, int, float, int]]:
         """
@@ -97,21 +113,43 @@ class YOLO11FaceDetector:
         Returns:
             faces: 检测到的人脸列表，格式为 [(x1, y1, x2, y2, conf, cls), ...]
         """
-        results = self.model(frame, conf=self.conf_threshold, iou=self.iou_threshold, verbose=False)
-        faces = []
+        return self.detect_batch([frame])[0]
+    
+    def detect_batch(self, frames: List[np.ndarray]) -> List[List[Tuple[int, int, int, int, float, int]]]:
+        """
+        批量检测（多路视频流的帧合并为一次前向推理，ultralytics按列表输入组批）
         
-        for result in results:
-            boxes = result.boxes
-            for box in boxes:
-                # 只检测person类别（类别0），或者如果模型专门训练了人脸检测
-                cls = int(box.cls[0])
-                conf = float(box.conf[0])
-                
-                # 获取边界框坐标
-                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                
-                faces.append((int(x1), int(y1), int(x2), int(y2), conf, cls))
+        Args:
+            frames: 输入图像帧列表
+            
+        Returns:
+            与 frames 一一对应的人脸列表
+        """
+        if not frames:
+            return []
+        profiler = get_profiler()
         
+        # Ultralytics内部完成预处理、推理和NMS，整体计入inference阶段
+        with profiler.span('inference'):
+            results = self.model(list(frames), conf=self.conf_threshold, iou=self.iou_threshold,
+                                 imgsz=self.imgsz, verbose=False)
+        
+        with profiler.span('postprocess'):
+            return [self._parse_result(result) for result in results]
+    
+    @staticmethod
+    def _parse_result(result) -> List[Tuple[int, int, int, int, float, int]]:
+        """将单张图像的ultralytics结果转换为 [(x1, y1, x2, y2, conf, cls), ...]"""
+        faces = []
+        for box in result.boxes:
+            # 只检测person类别（类别0），或者如果模型专门训练了人脸检测
+            cls = int(box.cls[0])
+            conf = float(box.conf[0])
+            
+            # 获取边界框坐标
+            x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
+            
+            faces.append((int(x1), int(y1), int(x2), int(y2), conf, cls))
         return faces
     
     def draw_detections(
@@ -120,7 +158,8 @@ class YOLO11FaceDetector:
         faces: List[Tuple[int, int, int, int, float, int]],
         color: Tuple[int, int, int] = (0, 255, 0),
         thickness: int = 2,
-        show_gender: bool = True
+        show_gender: bool = True,
+        stream: Optional[int] = None
     ) -> np.ndarray:
         """
         在图像上绘制检测结果
@@ -131,49 +170,45 @@ class YOLO11FaceDetector:
             color: 绘制颜色
             thickness: 线条粗细
             show_gender: 是否显示性别
+            stream: 多路视频流时的流编号（区分各路画面的属性识别结果）
             
         Returns:
             frame: 绘制了检测框的图像
         """
-        gender_classifier = _get_gender_classifier() if show_gender else None
+        profiler = get_profiler()
+        
+        # 性别识别：先对整帧所有人体一次性分类，再绘制
+        labels = [f'Person {conf:.2f}' for (_, _, _, _, conf, _) in faces]
+        if show_gender:
+            boxes, indices = [], []
+            for i, (x1, y1, x2, y2, conf, cls) in enumerate(faces):
+                # 提取人体区域（确保坐标有效）
+                x1_safe, y1_safe = max(0, x1), max(0, y1)
+                x2_safe, y2_safe = min(frame.shape[1], x2), min(frame.shape[0], y2)
+                person_w, person_h = x2_safe - x1_safe, y2_safe - y1_safe
+                if person_w > 30 and person_h > 30:
+                    # YOLO11检测的是整个人体，人脸通常在人体区域的上部（上40%）
+                    face_h = int(person_h * 0.4)
+                    # 如果提取的区域太小，使用整个人体区域的上半部分
+                    if face_h < 30:
+                        face_h = int(person_h * 0.5)
+                    if face_h > 20:
+                        boxes.append((x1_safe, y1_safe, x2_safe, y1_safe + face_h))
+                        indices.append(i)
+            try:
+                with profiler.span('classification'):
+                    results = classify_faces(frame, boxes, stream=stream)
+                for i, result in zip(indices, results):
+                    # 确保不显示UNKNOWN
+                    if result and result.gender != Gender.UNKNOWN:
+                        labels[i] = result.label()
+            except Exception as e:
+                logger.debug("性别识别失败: %s", e)
         
-        for (x1, y1, x2, y2, conf, cls) in faces:
+        for (x1, y1, x2, y2, conf, cls), label in zip(faces, labels):
             # 绘制边界框
             cv2.rectangle(frame, (x1, y1), (x2, y2), color, thickness)
             
-            # 性别识别
-            label = f'Person {conf:.2f}'
-            if gender_classifier:
-                try:
-                    # 提取人体区域（确保坐标有效）
-                    x1_safe = max(0, x1)
-                    y1_safe = max(0, y1)
-                    x2_safe = min(frame.shape[1], x2)
-                    y2_safe = min(frame.shape[0], y2)
-                    
-                    if x2_safe > x1_safe and y2_safe > y1_safe:
-                        person_roi = frame[y1_safe:y2_safe, x1_safe:x2_safe]
-                        if person_roi.size > 0 and person_roi.shape[0] > 30 and person_roi.shape[1] > 30:
-                            # YOLO11检测的是整个人体，需要提取人脸区域
-                            # 人脸通常在人体区域的上1/3部分
-                            face_region_height = int(person_roi.shape[0] * 0.4)  # 上40%区域
-                            face_roi = person_roi[0:face_region_height, :]
-                            
-                            # 如果提取的区域太小，使用整个人体区域的上半部分
-                            if face_roi.shape[0] < 30 or face_roi.shape[1] < 30:
-                                face_roi = person_roi[0:int(person_roi.shape[0] * 0.5), :]
-                            
-                            if face_roi.size > 0 and face_roi.shape[0] > 20 and face_roi.shape[1] > 20:
-                                gender, gender_conf = gender_classifier.predict(face_roi)
-                                # 确保不返回UNKNOWN
-                                if gender.value != "未知" and gender != Gender.UNKNOWN:
-                                    label = f'{gender.value} {gender_conf:.2f}'
-                                else:
-                                    # 如果返回未知，使用默认标签
-                                    label = f'Person {conf:.2f}'
-                except Exception as e:
-                    logger.debug(f"性别识别失败: {e}")
-            
             # 绘制标签（支持中文）
             if USE_CHINESE_TEXT:
                 frame = put_chinese_text(frame, label, (x1, y1 - 10), 
@@ -0,0 +1,31 @@
+"""
+检测器离线评估模块
+"""
+
+from .datasets import LabeledFace, Sample, load_dataset, load_fddb, load_gender_dataset, load_wider_face
+from .gender_calibration import extract_features, format_config_block, search_thresholds, threshold_grid
+from .metrics import DetectionEvaluator, TrackingEvaluator, average_precision, iou_matrix, match_detections
+from .runner import evaluate_config, expand_grid, format_table, mark_pareto, run_grid
+
+__all__ = [
+    'LabeledFace',
+    'Sample',
+    'load_dataset',
+    'load_fddb',
+    'load_gender_dataset',
+    'load_wider_face',
+    'DetectionEvaluator',
+    'TrackingEvaluator',
+    'average_precision',
+    'iou_matrix',
+    'match_detections',
+    'evaluate_config',
+    'expand_grid',
+    'format_table',
+    'mark_pareto',
+    'run_grid',
+    'extract_features',
+    'format_config_block',
+    'search_thresholds',
+    'threshold_grid'
+]
@@ -0,0 +1,228 @@
+"""
+标注数据集读取
+支持 WIDER FACE（wider_face_bbx_gt.txt）与 FDDB（FDDB-fold-XX-ellipseList.txt）文本格式，
+标注框统一转换为 (x1, y1, x2, y2)；以及性别标注的人脸数据集（按目录或CSV）
+"""
+
+import csv
+import math
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+PathLike = Union[str, Path]
+
+# 支持的数据集格式
+DATASET_FORMATS = ('wider', 'fddb')
+
+# 性别标注取值（目录名或CSV中的 gender 列）-> 1 男性，0 女性
+GENDER_LABELS = {
+    'male': 1, 'm': 1, 'man': 1, '1': 1, '男': 1,
+    'female': 0, 'f': 0, 'woman': 0, '0': 0, '女': 0,
+}
+
+# 性别数据集中识别的图片扩展名
+IMAGE_SUFFIXES = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+
+@dataclass
+class Sample:
+    """一张标注图片"""
+    image_path: str
+    boxes: np.ndarray       # (N, 4) float32，x1, y1, x2, y2
+    ignore: np.ndarray      # (N,) bool，不参与评估的标注（如 WIDER 的 invalid 人脸）
+
+
+@dataclass
+class LabeledFace:
+    """一张性别标注的人脸"""
+    image_path: str
+    label: int                                      # 1 男性，0 女性
+    box: Optional[Tuple[int, int, int, int]] = None  # 人脸在图片中的 x1, y1, x2, y2，None表示整张图片即人脸
+
+
+def _make_sample(image_path: Path, boxes: List[List[float]], ignore: List[bool]) -> Sample:
+    return Sample(
+        image_path=str(image_path),
+        boxes=np.asarray(boxes, dtype=np.float32).reshape(-1, 4),
+        ignore=np.asarray(ignore, dtype=bool).reshape(-1),
+    )
+
+
+def load_wider_face(annotation_file: PathLike, images_dir: PathLike, min_size: int = 0) -> List[Sample]:
+    """
+    读取 WIDER FACE 标注
+
+    格式：图片相对路径、人脸数、每张人脸一行 "x y w h blur expression illumination invalid occlusion pose"
+    （人脸数为0时仍跟一行全0）
+
+    Args:
+        annotation_file: 标注文件路径
+        images_dir: 图片根目录（WIDER_val/images）
+        min_size: 宽或高小于该值的人脸标记为忽略（检测器的最小检测尺寸以下的人脸不计入漏检）
+
+    Returns:
+        样本列表
+    """
+    images_dir = Path(images_dir)
+    with open(annotation_file, 'r', encoding='utf-8') as f:
+        lines = [line.strip() for line in f if line.strip()]
+
+    samples = []
+    i = 0
+    while i < len(lines):
+        image_path = images_dir / lines[i]
+        count = int(lines[i + 1])
+        rows = lines[i + 2:i + 2 + max(count, 1)]
+        i += 2 + max(count, 1)
+        boxes, ignore = [], []
+        for row in rows[:count]:
+            values = [float(v) for v in row.split()]
+            x, y, w, h = values[:4]
+            invalid = len(values) > 7 and values[7] > 0
+            boxes.append([x, y, x + w, y + h])
+            ignore.append(invalid or w <= 0 or h <= 0 or min(w, h) < min_size)
+        samples.append(_make_sample(image_path, boxes, ignore))
+    return samples
+
+
+def ellipse_to_box(major: float, minor: float, angle: float, cx: float, cy: float) -> List[float]:
+    """
+    FDDB 椭圆标注的外接矩形
+
+    Args:
+        major: 长半轴
+        minor: 短半轴
+        angle: 长轴方向（弧度）
+        cx: 中心x
+        cy: 中心y
+
+    Returns:
+        [x1, y1, x2, y2]
+    """
+    cos, sin = math.cos(angle), math.sin(angle)
+    half_w = math.sqrt((major * cos) ** 2 + (minor * sin) ** 2)
+    half_h = math.sqrt((major * sin) ** 2 + (minor * cos) ** 2)
+    return [cx - half_w, cy - half_h, cx + half_w, cy + half_h]
+
+
+def load_fddb(fold_files: Iterable[PathLike], images_dir: PathLike, min_size: int = 0) -> List[Sample]:
+    """
+    读取 FDDB 椭圆标注
+
+    格式：图片路径（不含扩展名）、人脸数、每张人脸一行 "长半轴 短半轴 角度 中心x 中心y 1"
+
+    Args:
+        fold_files: 一个或多个 FDDB-fold-XX-ellipseList.txt
+        images_dir: 图片根目录（originalPics）
+        min_size: 宽或高小于该值的人脸标记为忽略
+
+    Returns:
+        样本列表
+    """
+    images_dir = Path(images_dir)
+    if isinstance(fold_files, (str, Path)):
+        fold_files = [fold_files]
+
+    samples = []
+    for fold_file in fold_files:
+        with open(fold_file, 'r', encoding='utf-8') as f:
+            lines = [line.strip() for line in f if line.strip()]
+        i = 0
+        while i < len(lines):
+            name = lines[i]
+            count = int(lines[i + 1])
+            boxes, ignore = [], []
+            for row in lines[i + 2:i + 2 + count]:
+                major, minor, angle, cx, cy = (float(v) for v in row.split()[:5])
+                box = ellipse_to_box(major, minor, angle, cx, cy)
+                boxes.append(box)
+                ignore.append(min(box[2] - box[0], box[3] - box[1]) < min_size)
+            i += 2 + count
+            image_path = images_dir / name
+            if not image_path.suffix:
+                image_path = image_path.with_name(image_path.name + '.jpg')
+            samples.append(_make_sample(image_path, boxes, ignore))
+    return samples
+
+
+def load_dataset(
+    fmt: str,
+    annotations: Union[PathLike, List[PathLike]],
+    images_dir: PathLike,
+    limit: Optional[int] = None,
+    min_size: int = 0
+) -> List[Sample]:
+    """
+    按格式读取数据集
+
+    Args:
+        fmt: 'wider' 或 'fddb'
+        annotations: 标注文件（FDDB可为多个fold文件）
+        images_dir: 图片根目录
+        limit: 最多读取的图片数
+        min_size: 小于该尺寸的人脸标记为忽略
+
+    Returns:
+        样本列表
+    """
+    if fmt == 'wider':
+        if isinstance(annotations, (list, tuple)):
+            samples = [s for path in annotations for s in load_wider_face(path, images_dir, min_size)]
+        else:
+            samples = load_wider_face(annotations, images_dir, min_size)
+    elif fmt == 'fddb':
+        samples = load_fddb(annotations, images_dir, min_size)
+    else:
+        raise ValueError(f"不支持的数据集格式: {fmt}（支持 {', '.join(DATASET_FORMATS)}）")
+    return samples[:limit] if limit else samples
+
+
+def _gender_label(value: str, where: str) -> int:
+    label = GENDER_LABELS.get(value.strip().lower())
+    if label is None:
+        raise ValueError(f"{where}: 无法识别的性别标注 {value!r}（支持 {', '.join(GENDER_LABELS)}）")
+    return label
+
+
+def load_gender_dataset(source: PathLike, images_dir: Optional[PathLike] = None) -> List[LabeledFace]:
+    """
+    读取性别标注的人脸数据集
+
+    目录：source 下每个子目录名为性别（如 male/、female/），其中的图片（含更深层目录）即人脸裁剪图；
+    CSV：列 path、gender，可选 x1、y1、x2、y2 指定人脸在图片中的位置
+
+    Args:
+        source: 数据集目录或CSV文件
+        images_dir: CSV中相对路径的根目录，默认为CSV所在目录
+
+    Returns:
+        人脸列表（目录按路径排序，CSV按行顺序）
+    """
+    source = Path(source)
+    faces: List[LabeledFace] = []
+    if source.is_dir():
+        for class_dir in sorted(p for p in source.iterdir() if p.is_dir()):
+            label = _gender_label(class_dir.name, str(class_dir))
+            faces.extend(
+                LabeledFace(str(path), label)
+                for path in sorted(class_dir.rglob('*'))
+                if path.suffix.lower() in IMAGE_SUFFIXES
+            )
+        return faces
+
+    root = Path(images_dir) if images_dir is not None else source.parent
+    with open(source, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.DictReader(f)
+        if not reader.fieldnames or not {'path', 'gender'} <= set(reader.fieldnames):
+            raise ValueError(f"{source}: CSV需要包含 path 与 gender 列")
+        has_box = {'x1', 'y1', 'x2', 'y2'} <= set(reader.fieldnames)
+        for row in reader:
+            where = f"{source}:{reader.line_num}"
+            box = None
+            if has_box and row['x1'] not in (None, ''):
+                box = tuple(int(float(row[key])) for key in ('x1', 'y1', 'x2', 'y2'))
+            faces.append(LabeledFace(str(root / row['path']), _gender_label(row['gender'], where), box))
+    return faces
@@ -0,0 +1,401 @@
+"""
+启发式性别分类阈值标定（yoloface-calibrate-gender）
+在性别标注的人脸数据集上多进程提取 face_statistics 特征并缓存为 .npy 特征库，
+之后用向量化 NumPy 一次评估整张阈值网格，输出可直接写入 config.yaml 的配置块；
+特征库命中时重新标定只需数秒
+"""
+
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from ..utils.logger import get_logger
+from ..config import load_config
+from ..detectors.gender_classifier import face_statistics, heuristic_scores
+from .datasets import LabeledFace, load_gender_dataset
+
+logger = get_logger(__name__)
+
+# 启发式阈值名（与 detection.gender.heuristic 的键一致）
+THRESHOLD_NAMES = ('edge_density', 'dark_brightness', 'bright_brightness', 'contrast', 'aspect_ratio')
+
+# 标定的优化目标
+CALIBRATION_METRICS = ('balanced_accuracy', 'accuracy')
+
+# 特征库中的数值字段（路径字段宽度按实际路径长度确定）
+_FEATURE_FIELDS = [
+    ('x1', np.int32), ('y1', np.int32), ('x2', np.int32), ('y2', np.int32),
+    ('mtime', np.float64), ('label', np.int8),
+    ('mean', np.float64), ('std', np.float64), ('edge_density', np.float64), ('aspect_ratio', np.float64),
+]
+
+# 特征库的一行：(路径, x1, y1, x2, y2, 修改时间, 标注, 平均亮度, 标准差, 边缘密度, 宽高比)
+FeatureRow = Tuple[str, int, int, int, int, float, int, float, float, float, float]
+
+# 启发式规则及其使用的阈值（得分按规则相加，每条规则只依赖自己的阈值）
+_RULES = (('edge_density',), ('dark_brightness', 'bright_brightness'), ('contrast',), ('aspect_ratio',))
+
+# 按规则拆分求和后的浮点误差容限：真实得分差是规则权重的组合，相等时（判为女性）恰为0
+_TIE_TOLERANCE = 1e-9
+
+# 网格搜索每块临时数组的最大元素数，限制内存
+_CHUNK_ELEMENTS = 1 << 22
+
+
+def _face_key(face: LabeledFace) -> Tuple[str, int, int, int, int]:
+    """人脸在特征库中的键（无标注框时坐标记为-1）"""
+    box = face.box if face.box is not None else (-1, -1, -1, -1)
+    return (face.image_path, *(int(v) for v in box))
+
+
+def _to_array(rows: Sequence[FeatureRow]) -> np.ndarray:
+    """特征行转换为结构化数组"""
+    width = max([len(row[0]) for row in rows] + [1])
+    return np.array(list(rows), dtype=[('path', f'U{width}')] + _FEATURE_FIELDS)
+
+
+def _extract_face(face: LabeledFace) -> Optional[FeatureRow]:
+    """
+    提取一张人脸的特征
+
+    Args:
+        face: 标注人脸
+
+    Returns:
+        特征行，图片无法读取或人脸区域为空时返回None
+    """
+    image = cv2.imread(face.image_path)
+    if image is None:
+        return None
+    if face.box is not None:
+        x1, y1, x2, y2 = face.box
+        image = image[max(0, y1):max(0, y2), max(0, x1):max(0, x2)]
+    if image.size == 0:
+        return None
+    stats = face_statistics(image)
+    return (*_face_key(face), os.path.getmtime(face.image_path), face.label, *stats)
+
+
+def _init_worker():
+    """进程池初始化：限制OpenCV线程数以减少进程间争用"""
+    cv2.setNumThreads(1)
+
+
+def extract_features(
+    faces: List[LabeledFace],
+    cache_path: Optional[str] = None,
+    workers: Optional[int] = None,
+    refresh: bool = False
+) -> np.ndarray:
+    """
+    提取数据集的特征，使用并更新 .npy 特征库
+
+    特征库按 (路径, 标注框) 索引，图片修改时间不变的人脸直接复用，其余的在进程池中提取；
+    特征库中不属于本数据集的行保留，便于在不同子集间共享
+
+    Args:
+        faces: 标注人脸列表
+        cache_path: 特征库文件路径，None表示不缓存
+        workers: 进程数，None表示CPU核数，1表示在本进程中依次提取
+        refresh: 忽略已有特征库，全部重新提取
+
+    Returns:
+        结构化数组（字段见 _FEATURE_FIELDS 与 path），顺序与 faces 一致，已跳过无法读取的图片；
+        label 列以本次数据集的标注为准
+    """
+    cached: Dict[Tuple[str, int, int, int, int], FeatureRow] = {}
+    if cache_path and not refresh and os.path.exists(cache_path):
+        store = np.load(cache_path)
+        for row in store.tolist():
+            cached[tuple(row[:5])] = row
+        logger.info("已加载特征库 %s（%d 条）", cache_path, len(cached))
+
+    rows: List[Optional[FeatureRow]] = []
+    pending: List[int] = []
+    for face in faces:
+        row = cached.get(_face_key(face))
+        if row is not None:
+            try:
+                fresh = os.path.getmtime(face.image_path) == row[5]
+            except OSError:
+                fresh = False
+            if fresh:
+                rows.append((*row[:6], face.label, *row[7:]))
+                continue
+        rows.append(None)
+        pending.append(len(rows) - 1)
+
+    if pending:
+        workers = workers if workers is not None else (os.cpu_count() or 1)
+        workers = max(1, min(workers, len(pending)))
+        logger.info("提取 %d 张人脸的特征（%d 个进程，%d 张命中特征库）",
+                    len(pending), workers, len(faces) - len(pending))
+        todo = [faces[i] for i in pending]
+        if workers == 1:
+            extracted = [_extract_face(face) for face in todo]
+        else:
+            chunksize = max(1, len(todo) // (workers * 8))
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+                extracted = list(pool.map(_extract_face, todo, chunksize=chunksize))
+        for i, row in zip(pending, extracted):
+            rows[i] = row
+
+    valid = [row for row in rows if row is not None]
+    missing = len(rows) - len(valid)
+    if missing:
+        logger.warning("%d 张图片无法读取或人脸区域为空，已跳过", missing)
+
+    if cache_path and pending:
+        for row in valid:
+            cached[tuple(row[:5])] = row
+        path = Path(cache_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # 先写临时文件再替换，中断时不会留下损坏的特征库
+        tmp_path = path.with_name(path.name + '.tmp.npy')
+        np.save(tmp_path, _to_array(list(cached.values())))
+        os.replace(tmp_path, path)
+        logger.info("特征库已保存: %s（%d 条）", cache_path, len(cached))
+    return _to_array(valid)
+
+
+def threshold_grid(store: np.ndarray, steps: int = 7) -> Dict[str, np.ndarray]:
+    """
+    按特征分布的分位数生成候选阈值
+
+    Args:
+        store: extract_features 返回的特征数组
+        steps: 每个阈值的候选个数（5%~95% 分位数均匀取）
+
+    Returns:
+        {阈值名: 候选值数组}
+    """
+    quantiles = np.linspace(0.05, 0.95, max(1, steps))
+    contrast = store['std'] / (store['mean'] + 1e-5)
+
+    def candidates(values: np.ndarray, decimals: int) -> np.ndarray:
+        return np.unique(np.round(np.quantile(values.astype(np.float64), quantiles), decimals))
+
+    brightness = candidates(store['mean'], 1)
+    return {
+        'edge_density': candidates(store['edge_density'], 4),
+        'dark_brightness': brightness,
+        'bright_brightness': brightness,
+        'contrast': candidates(contrast, 3),
+        'aspect_ratio': candidates(store['aspect_ratio'], 3),
+    }
+
+
+def _scores(
+    correct_male: np.ndarray,
+    correct_female: np.ndarray,
+    num_male: int,
+    num_female: int
+) -> Dict[str, np.ndarray]:
+    """按类别的正确数计算准确率、平衡准确率与各类召回率"""
+    male_recall = correct_male / max(num_male, 1)
+    female_recall = correct_female / max(num_female, 1)
+    return {
+        'accuracy': (correct_male + correct_female) / max(num_male + num_female, 1),
+        'balanced_accuracy': (male_recall + female_recall) / 2,
+        'male_recall': male_recall,
+        'female_recall': female_recall,
+    }
+
+
+def evaluate_thresholds(store: np.ndarray, thresholds: Dict[str, float]) -> Dict[str, float]:
+    """
+    一组阈值在特征库上的准确率
+
+    Args:
+        store: extract_features 返回的特征数组
+        thresholds: {阈值名: 取值}
+
+    Returns:
+        accuracy、balanced_accuracy、male_recall、female_recall
+    """
+    male_score, female_score = heuristic_scores(
+        store['mean'], store['std'], store['edge_density'], store['aspect_ratio'], thresholds
+    )
+    is_male = store['label'] == 1
+    predicted_male = male_score > female_score
+    scores = _scores(
+        np.count_nonzero(predicted_male & is_male), np.count_nonzero(~predicted_male & ~is_male),
+        int(np.count_nonzero(is_male)), int(np.count_nonzero(~is_male))
+    )
+    return {name: float(value) for name, value in scores.items()}
+
+
+def _margin(features: Sequence[np.ndarray], thresholds: Dict[str, Any]) -> np.ndarray:
+    """男性得分减女性得分（大于0判为男性）"""
+    male_score, female_score = heuristic_scores(*features, thresholds)
+    return male_score - female_score
+
+
+def search_thresholds(
+    store: np.ndarray,
+    grid: Dict[str, Sequence[float]],
+    metric: str = 'balanced_accuracy',
+    top_k: int = 10
+) -> List[Dict[str, Any]]:
+    """
+    网格搜索启发式阈值
+
+    启发式得分按规则相加、每条规则只依赖自己的阈值：先用 heuristic_scores 对每条规则的全部候选阈值
+    向量化计算各人脸的得分差，再按广播相加得到所有组合的判定，不必对每个组合重新计算全部规则；
+    打分与分类器使用同一函数，结果与逐张分类一致
+
+    Args:
+        store: extract_features 返回的特征数组
+        grid: {阈值名: [候选值, ...]}，须包含全部阈值名
+        metric: 排序目标，'balanced_accuracy' 或 'accuracy'
+        top_k: 返回的最优组合数
+
+    Returns:
+        按目标降序的结果：thresholds 与 accuracy、balanced_accuracy、male_recall、female_recall
+    """
+    if metric not in CALIBRATION_METRICS:
+        raise ValueError(f"不支持的标定目标: {metric}（支持 {', '.join(CALIBRATION_METRICS)}）")
+    missing = [name for name in THRESHOLD_NAMES if name not in grid]
+    if missing:
+        raise ValueError(f"阈值网格缺少: {', '.join(missing)}")
+
+    # 每条规则的候选阈值 (K, 规则阈值数)；偏暗阈值高于偏亮阈值时两条亮度规则同时成立，不是有意义的组合
+    candidates = []
+    for names in _RULES:
+        values = np.array(list(itertools.product(*(grid[name] for name in names))), dtype=np.float64)
+        if names == ('dark_brightness', 'bright_brightness'):
+            values = values[values[:, 0] <= values[:, 1]]
+        candidates.append(values.reshape(-1, len(names)))
+    shape = tuple(len(values) for values in candidates)
+    if 0 in shape or len(store) == 0:
+        return []
+
+    is_male_all = store['label'] == 1
+    num_male = int(np.count_nonzero(is_male_all))
+    correct_male = np.zeros(shape, dtype=np.int64)
+    correct_female = np.zeros(shape, dtype=np.int64)
+    base = {name: float(grid[name][0]) for name in THRESHOLD_NAMES}
+    # 最后两条规则的全部组合与人脸一次广播，按人脸分块限制临时数组的内存
+    chunk = max(1, _CHUNK_ELEMENTS // (shape[-2] * shape[-1]))
+    for start in range(0, len(store), chunk):
+        # 结构化数组的字段是跨步视图，先复制为连续数组
+        features = [np.ascontiguousarray(store[name][start:start + chunk])
+                    for name in ('mean', 'std', 'edge_density', 'aspect_ratio')]
+        is_male = is_male_all[start:start + chunk]
+        base_margin = _margin(features, base)
+        terms = []
+        for names, values in zip(_RULES, candidates):
+            thresholds = dict(base)
+            thresholds.update({name: values[:, i:i + 1] for i, name in enumerate(names)})
+            terms.append(_margin([f[None, :] for f in features], thresholds) - base_margin)
+        inner = terms[-2][:, None, :] + terms[-1][None, :, :]
+        for index in itertools.product(*(range(k) for k in shape[:-2])):
+            partial = base_margin + sum(term[i] for term, i in zip(terms, index))
+            predicted_male = (partial + inner) > _TIE_TOLERANCE
+            correct_male[index] += np.count_nonzero(predicted_male & is_male, axis=-1)
+            correct_female[index] += np.count_nonzero(~predicted_male & ~is_male, axis=-1)
+
+    scores = _scores(correct_male.ravel(), correct_female.ravel(), num_male, len(store) - num_male)
+    order = np.argsort(-scores[metric], kind='stable')[:max(1, top_k)]
+    results = []
+    for flat in order:
+        thresholds = {}
+        for names, values, i in zip(_RULES, candidates, np.unravel_index(flat, shape)):
+            thresholds.update({name: float(value) for name, value in zip(names, values[i])})
+        results.append({
+            'thresholds': {name: thresholds[name] for name in THRESHOLD_NAMES},
+            **{name: float(values[flat]) for name, values in scores.items()},
+        })
+    return results
+
+
+def format_config_block(thresholds: Dict[str, float]) -> str:
+    """
+    阈值输出为 config.yaml 配置块
+
+    Args:
+        thresholds: {阈值名: 取值}
+
+    Returns:
+        detection.gender.heuristic 配置块文本
+    """
+    lines = ['detection:', '  gender:', '    heuristic:']
+    lines.extend(f'      {name}: {float(thresholds[name]):g}' for name in THRESHOLD_NAMES)
+    return '\n'.join(lines) + '\n'
+
+
+def main():
+    """yoloface-calibrate-gender 命令行入口"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='启发式性别分类阈值标定')
+    parser.add_argument('--config', '-c', type=str, default=None, help='配置文件路径')
+    parser.add_argument('--labels', required=True,
+                        help='数据集：按性别分子目录（male/、female/）的目录，或含 path、gender 列的CSV')
+    parser.add_argument('--images', type=str, default=None, help='CSV中相对路径的根目录（默认为CSV所在目录）')
+    parser.add_argument('--cache', type=str, default=None, help='特征库 .npy 文件（默认使用配置，未配置时不缓存）')
+    parser.add_argument('--refresh', action='store_true', help='忽略已有特征库，全部重新提取')
+    parser.add_argument('--workers', type=int, default=None, help='进程数（默认使用配置，未配置时为CPU核数）')
+    parser.add_argument('--steps', type=int, default=None, help='每个阈值的候选个数')
+    parser.add_argument('--metric', choices=CALIBRATION_METRICS, default=None, help='优化目标')
+    parser.add_argument('--top', type=int, default=5, help='打印的最优组合数')
+    parser.add_argument('--output', '-o', type=str, default=None, help='配置块输出文件，默认只打印')
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    eval_config = config.get('evaluation', {}) or {}
+    gender_config = eval_config.get('gender', {}) or {}
+    metric = args.metric or gender_config.get('metric', 'balanced_accuracy')
+
+    faces = load_gender_dataset(args.labels, args.images)
+    if not faces:
+        parser.error(f"数据集为空: {args.labels}")
+
+    start = time.perf_counter()
+    store = extract_features(
+        faces,
+        cache_path=args.cache or gender_config.get('cache'),
+        workers=args.workers if args.workers is not None else eval_config.get('workers'),
+        refresh=args.refresh
+    )
+    extract_seconds = time.perf_counter() - start
+    if len(store) == 0:
+        parser.error("没有可用的人脸图片")
+
+    start = time.perf_counter()
+    grid = threshold_grid(store, args.steps or int(gender_config.get('steps', 7)))
+    results = search_thresholds(store, grid, metric, top_k=args.top)
+    search_seconds = time.perf_counter() - start
+
+    num_male = int(np.count_nonzero(store['label'] == 1))
+    current = config.settings.detection.gender.heuristic
+    baseline = evaluate_thresholds(store, {name: getattr(current, name) for name in THRESHOLD_NAMES})
+    print(f"人脸: {len(store)}（男 {num_male}，女 {len(store) - num_male}），"
+          f"特征提取 {extract_seconds:.1f}s，网格搜索 {search_seconds:.1f}s")
+    print(f"当前阈值: accuracy={baseline['accuracy']:.4f} balanced_accuracy={baseline['balanced_accuracy']:.4f}")
+    print()
+    header = ['#', *THRESHOLD_NAMES, 'accuracy', 'balanced_acc', 'male_recall', 'female_recall']
+    print('| ' + ' | '.join(header) + ' |')
+    print('|' + '---|' * len(header))
+    for rank, result in enumerate(results, 1):
+        values = [f"{result['thresholds'][name]:g}" for name in THRESHOLD_NAMES]
+        values += [f"{result[name]:.4f}" for name in ('accuracy', 'balanced_accuracy', 'male_recall', 'female_recall')]
+        print('| ' + ' | '.join([str(rank), *values]) + ' |')
+    print()
+
+    block = format_config_block(results[0]['thresholds'])
+    print(block)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(block)
+        print(f"配置块已写入: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,267 @@
+"""
+检测与跟踪评估指标
+向量化IoU矩阵、按置信度贪心匹配，以及跨图片汇总的 precision/recall/AP（全点插值）；
+跟踪结果按帧累计为 CLEAR MOT 指标
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+def iou_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """
+    两组框两两之间的IoU
+
+    Args:
+        boxes_a: (N, 4) x1, y1, x2, y2
+        boxes_b: (M, 4) x1, y1, x2, y2
+
+    Returns:
+        (N, M) IoU矩阵
+    """
+    a = np.asarray(boxes_a, dtype=np.float32).reshape(-1, 4)[:, None, :]
+    b = np.asarray(boxes_b, dtype=np.float32).reshape(-1, 4)[None, :, :]
+    inter_w = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    inter_h = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = inter_w * inter_h
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    return inter / np.maximum(area_a + area_b - inter, 1e-9)
+
+
+def match_detections(
+    boxes: np.ndarray,
+    scores: np.ndarray,
+    gt_boxes: np.ndarray,
+    gt_ignore: Optional[np.ndarray] = None,
+    iou_threshold: float = 0.5
+) -> np.ndarray:
+    """
+    单张图片的检测结果与标注匹配（按置信度从高到低，每个标注最多匹配一次）
+
+    Args:
+        boxes: (N, 4) 检测框
+        scores: (N,) 置信度
+        gt_boxes: (M, 4) 标注框
+        gt_ignore: (M,) 忽略的标注，与之匹配的检测既不算正确也不算误检
+        iou_threshold: 匹配所需的最小IoU
+
+    Returns:
+        (N,) int8：1 正确检测，0 误检，-1 忽略；顺序与输入一致
+    """
+    n = len(boxes)
+    result = np.zeros(n, dtype=np.int8)
+    if n == 0 or len(gt_boxes) == 0:
+        return result
+    ignore = np.zeros(len(gt_boxes), dtype=bool) if gt_ignore is None else np.asarray(gt_ignore, dtype=bool)
+
+    ious = iou_matrix(boxes, gt_boxes)
+    # 先与有效标注匹配，剩余的再看是否落在忽略标注上
+    valid_ious = np.where(ignore[None, :], -1.0, ious)
+    taken = np.zeros(len(gt_boxes), dtype=bool)
+    for i in np.argsort(-np.asarray(scores), kind='stable'):
+        candidates = np.where(taken, -1.0, valid_ious[i])
+        j = int(candidates.argmax())
+        if candidates[j] >= iou_threshold:
+            taken[j] = True
+            result[i] = 1
+        elif ignore.any() and ious[i, ignore].max() >= iou_threshold:
+            result[i] = -1
+    return result
+
+
+def average_precision(recall: np.ndarray, precision: np.ndarray) -> float:
+    """
+    全点插值AP（precision取右侧最大值后对recall积分）
+
+    Args:
+        recall: 按置信度降序累计的召回率
+        precision: 对应的精确率
+
+    Returns:
+        AP
+    """
+    if len(recall) == 0:
+        return 0.0
+    r = np.concatenate(([0.0], recall, [recall[-1]]))
+    p = np.concatenate(([1.0], precision, [0.0]))
+    p = np.maximum.accumulate(p[::-1])[::-1]
+    steps = np.nonzero(r[1:] != r[:-1])[0]
+    return float(np.sum((r[steps + 1] - r[steps]) * p[steps + 1]))
+
+
+class DetectionEvaluator:
+    """跨图片累计检测结果并计算 precision/recall/AP"""
+
+    def __init__(self, iou_threshold: float = 0.5):
+        """
+        初始化
+
+        Args:
+            iou_threshold: 判定正确检测的最小IoU
+        """
+        self.iou_threshold = iou_threshold
+        self._scores: List[np.ndarray] = []
+        self._matches: List[np.ndarray] = []
+        self.num_gt = 0
+
+    def add(self, boxes: np.ndarray, scores: np.ndarray, gt_boxes: np.ndarray, gt_ignore: Optional[np.ndarray] = None):
+        """
+        加入一张图片的检测结果
+
+        Args:
+            boxes: (N, 4) 检测框 x1, y1, x2, y2
+            scores: (N,) 置信度（无置信度的检测器传全1）
+            gt_boxes: (M, 4) 标注框
+            gt_ignore: (M,) 忽略的标注
+        """
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        scores = np.asarray(scores, dtype=np.float32).reshape(-1)
+        matches = match_detections(boxes, scores, gt_boxes, gt_ignore, self.iou_threshold)
+        keep = matches >= 0
+        self._scores.append(scores[keep])
+        self._matches.append(matches[keep])
+        ignored = 0 if gt_ignore is None else int(np.count_nonzero(gt_ignore))
+        self.num_gt += len(gt_boxes) - ignored
+
+    def curve(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        precision/recall 曲线
+
+        Returns:
+            (按置信度降序的阈值, recall, precision)
+        """
+        if not self._scores:
+            empty = np.zeros(0, dtype=np.float32)
+            return empty, empty, empty
+        scores = np.concatenate(self._scores)
+        matches = np.concatenate(self._matches)
+        order = np.argsort(-scores, kind='stable')
+        tp = np.cumsum(matches[order] == 1)
+        fp = np.cumsum(matches[order] == 0)
+        recall = tp / max(self.num_gt, 1)
+        precision = tp / np.maximum(tp + fp, 1)
+        return scores[order], recall, precision
+
+    def summary(self) -> Dict[str, float]:
+        """
+        汇总指标
+
+        Returns:
+            ap、precision 与 recall（全部检测结果处）、tp、fp、num_gt
+        """
+        _, recall, precision = self.curve()
+        if len(recall) == 0:
+            return {'ap': 0.0, 'precision': 0.0, 'recall': 0.0, 'tp': 0, 'fp': 0, 'num_gt': self.num_gt}
+        matches = np.concatenate(self._matches)
+        return {
+            'ap': average_precision(recall, precision),
+            'precision': float(precision[-1]),
+            'recall': float(recall[-1]),
+            'tp': int(np.count_nonzero(matches == 1)),
+            'fp': int(np.count_nonzero(matches == 0)),
+            'num_gt': self.num_gt,
+        }
+
+
+class TrackingEvaluator:
+    """跨帧累计跟踪结果并计算 CLEAR MOT 指标（MOTA、MOTP、ID切换）"""
+
+    def __init__(self, iou_threshold: float = 0.5):
+        """
+        初始化
+
+        Args:
+            iou_threshold: 判定匹配的最小IoU
+        """
+        self.iou_threshold = iou_threshold
+        self._last_match: Dict[int, int] = {}   # 真值ID -> 上次匹配的跟踪ID
+        self.frames = 0
+        self.num_gt = 0
+        self.matches = 0
+        self.false_positives = 0
+        self.misses = 0
+        self.id_switches = 0
+        self._iou_sum = 0.0
+
+    def add(
+        self,
+        gt_boxes: np.ndarray,
+        gt_ids: np.ndarray,
+        boxes: np.ndarray,
+        track_ids: np.ndarray,
+        gt_ignore: Optional[np.ndarray] = None
+    ):
+        """
+        加入一帧的跟踪结果
+
+        上一帧已匹配的 (真值, 跟踪) 对只要IoU仍达标就保持，其余按IoU从高到低贪心匹配；
+        真值匹配到的跟踪ID与上次不同时计一次ID切换
+
+        Args:
+            gt_boxes: (M, 4) 真值框 x1, y1, x2, y2
+            gt_ids: (M,) 真值ID
+            boxes: (N, 4) 跟踪框
+            track_ids: (N,) 跟踪ID
+            gt_ignore: (M,) 忽略的真值（如遮挡严重），与之匹配的跟踪框不算误检，未匹配也不算漏检
+        """
+        gt_boxes = np.asarray(gt_boxes, dtype=np.float32).reshape(-1, 4)
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        gt_ids = [int(v) for v in np.asarray(gt_ids).reshape(-1)]
+        track_ids = [int(v) for v in np.asarray(track_ids).reshape(-1)]
+        ignore = np.zeros(len(gt_ids), dtype=bool) if gt_ignore is None else np.asarray(gt_ignore, dtype=bool)
+        self.frames += 1
+
+        ious = iou_matrix(gt_boxes, boxes)
+        pairs: Dict[int, int] = {}
+        track_index = {track_id: j for j, track_id in enumerate(track_ids)}
+        for i, gt_id in enumerate(gt_ids):
+            j = track_index.get(self._last_match.get(gt_id, -1))
+            if j is not None and j not in pairs.values() and ious[i, j] >= self.iou_threshold:
+                pairs[i] = j
+        candidates = ious.copy()
+        if pairs:
+            candidates[list(pairs), :] = -1.0
+            candidates[:, list(pairs.values())] = -1.0
+        while candidates.size:
+            i, j = np.unravel_index(int(candidates.argmax()), candidates.shape)
+            if candidates[i, j] < self.iou_threshold:
+                break
+            pairs[int(i)] = int(j)
+            candidates[i, :] = -1.0
+            candidates[:, j] = -1.0
+
+        matched_tracks = set()
+        for i, j in pairs.items():
+            matched_tracks.add(j)
+            if ignore[i]:
+                continue
+            self.matches += 1
+            self._iou_sum += float(ious[i, j])
+            previous = self._last_match.get(gt_ids[i])
+            if previous is not None and previous != track_ids[j]:
+                self.id_switches += 1
+            self._last_match[gt_ids[i]] = track_ids[j]
+        self.num_gt += int(np.count_nonzero(~ignore))
+        self.misses += sum(1 for i in range(len(gt_ids)) if i not in pairs and not ignore[i])
+        self.false_positives += len(track_ids) - len(matched_tracks)
+
+    def summary(self) -> Dict[str, float]:
+        """
+        汇总指标
+
+        Returns:
+            mota、motp（匹配框的平均IoU）、id_switches、false_positives、misses、matches、num_gt、frames
+        """
+        errors = self.misses + self.false_positives + self.id_switches
+        return {
+            'mota': 1.0 - errors / self.num_gt if self.num_gt else 0.0,
+            'motp': self._iou_sum / self.matches if self.matches else 0.0,
+            'id_switches': self.id_switches,
+            'false_positives': self.false_positives,
+            'misses': self.misses,
+            'matches': self.matches,
+            'num_gt': self.num_gt,
+            'frames': self.frames,
+        }
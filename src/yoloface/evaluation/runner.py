@@ -0,0 +1,341 @@
+"""
+检测器离线评估（yoloface-eval）
+按参数网格创建各检测器，在标注数据集上逐张检测并计时，统计 AP/precision/recall 与 ms/帧，
+各参数组合分配到多个进程并行运行，结果输出为标出 Pareto 前沿（AP 更高或更快）的表格
+"""
+
+import csv
+import io
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from ..utils.logger import get_logger
+from ..config import load_config
+from .datasets import DATASET_FORMATS, Sample, load_dataset
+from .metrics import DetectionEvaluator
+
+logger = get_logger(__name__)
+
+# 可评估的检测算法
+EVAL_DETECTORS = ('haar', 'yolo11', 'fastestv2')
+
+# 参数网格：{检测算法: {参数名: [取值, ...]}}
+ParameterGrid = Dict[str, Dict[str, Sequence[Any]]]
+
+# 工作进程中的数据集（由进程池初始化函数设置，避免每个任务重复传输）
+_worker_samples: List[Sample] = []
+
+
+def expand_grid(grid: Dict[str, Sequence[Any]]) -> List[Dict[str, Any]]:
+    """
+    展开参数网格
+
+    Args:
+        grid: {参数名: [取值, ...]}，单个取值也可不写成列表
+
+    Returns:
+        所有参数组合（空网格返回一个空组合，即使用配置中的参数）
+    """
+    if not grid:
+        return [{}]
+    names = list(grid)
+    values = [v if isinstance(v, (list, tuple)) else [v] for v in grid.values()]
+    return [dict(zip(names, combo)) for combo in itertools.product(*values)]
+
+
+def create_detector(detector_type: str, params: Dict[str, Any]):
+    """
+    按参数创建检测器（未给出的参数使用配置）
+
+    Args:
+        detector_type: 'haar'、'yolo11' 或 'fastestv2'
+        params: 构造参数，如 Haar 的 scale_factor/min_neighbors/min_size，YOLO 的 conf_threshold/imgsz
+
+    Returns:
+        检测器实例
+    """
+    from ..detectors import HaarFaceDetector, YOLO11FaceDetector, YoloFastestV2Detector
+
+    params = dict(params)
+    if detector_type == 'haar':
+        if 'min_size' in params:
+            size = params['min_size']
+            params['min_size'] = tuple(size) if isinstance(size, (list, tuple)) else (size, size)
+        return HaarFaceDetector(**params)
+    if detector_type == 'yolo11':
+        return YOLO11FaceDetector(**params)
+    if detector_type == 'fastestv2':
+        return YoloFastestV2Detector(**params)
+    raise ValueError(f"不支持的检测算法: {detector_type}")
+
+
+def detections_to_arrays(detector_type: str, faces: list) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    检测元组转换为 (N, 4) xyxy 框与 (N,) 置信度（Haar 无置信度，记为1）
+
+    Args:
+        detector_type: 检测算法
+        faces: detect() 返回的人脸列表
+
+    Returns:
+        (boxes, scores)
+    """
+    if not faces:
+        return np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.float32)
+    data = np.asarray([face[:5] if detector_type != 'haar' else face[:4] for face in faces], dtype=np.float32)
+    boxes = data[:, :4].copy()
+    if detector_type == 'haar':
+        boxes[:, 2:] += boxes[:, :2]
+        return boxes, np.ones(len(boxes), dtype=np.float32)
+    return boxes, data[:, 4]
+
+
+def evaluate_config(
+    detector_type: str,
+    params: Dict[str, Any],
+    samples: Optional[List[Sample]] = None,
+    iou_threshold: float = 0.5,
+    warmup: int = 1
+) -> Dict[str, Any]:
+    """
+    在数据集上评估一组参数
+
+    Args:
+        detector_type: 检测算法
+        params: 检测器构造参数
+        samples: 样本列表，None表示使用工作进程中的数据集
+        iou_threshold: 判定正确检测的最小IoU
+        warmup: 计时前预热的图片数
+
+    Returns:
+        结果：detector、params、ap、precision、recall、tp、fp、num_gt、ms_per_frame、p90_ms、images、missing；
+        检测器无法创建时含 error
+    """
+    samples = _worker_samples if samples is None else samples
+    result: Dict[str, Any] = {'detector': detector_type, 'params': dict(params)}
+    try:
+        detector = create_detector(detector_type, params)
+    except Exception as e:
+        logger.warning("无法创建检测器 %s %s: %s", detector_type, params, e)
+        result['error'] = str(e)
+        return result
+
+    evaluator = DetectionEvaluator(iou_threshold)
+    timings: List[float] = []
+    missing = 0
+    warmed = 0
+    for sample in samples:
+        image = cv2.imread(sample.image_path)
+        if image is None:
+            missing += 1
+            continue
+        if warmed < warmup:
+            detector.detect(image)
+            warmed += 1
+        start = time.perf_counter()
+        faces = detector.detect(image)
+        timings.append((time.perf_counter() - start) * 1000.0)
+        boxes, scores = detections_to_arrays(detector_type, faces)
+        evaluator.add(boxes, scores, sample.boxes, sample.ignore)
+
+    result.update(evaluator.summary())
+    result['ms_per_frame'] = float(np.mean(timings)) if timings else 0.0
+    result['p90_ms'] = float(np.percentile(timings, 90)) if timings else 0.0
+    result['images'] = len(timings)
+    result['missing'] = missing
+    return result
+
+
+def _init_worker(config_path: Optional[str], samples: List[Sample], threads: int):
+    """进程池初始化：加载配置与数据集，限制OpenCV线程数以减少进程间争用"""
+    global _worker_samples
+    load_config(config_path)
+    cv2.setNumThreads(threads)
+    _worker_samples = samples
+
+
+def _evaluate_task(task: Tuple[str, Dict[str, Any], float]) -> Dict[str, Any]:
+    detector_type, params, iou_threshold = task
+    return evaluate_config(detector_type, params, iou_threshold=iou_threshold)
+
+
+def run_grid(
+    samples: List[Sample],
+    grid: ParameterGrid,
+    workers: Optional[int] = None,
+    iou_threshold: float = 0.5,
+    config_path: Optional[str] = None,
+    threads_per_worker: int = 1
+) -> List[Dict[str, Any]]:
+    """
+    评估参数网格中的全部组合
+
+    Args:
+        samples: 样本列表
+        grid: {检测算法: {参数名: [取值, ...]}}
+        workers: 进程数，None表示CPU核数，1表示在本进程中依次运行
+        iou_threshold: 判定正确检测的最小IoU
+        config_path: 工作进程加载的配置文件
+        threads_per_worker: 每个工作进程的OpenCV线程数
+
+    Returns:
+        各组合的结果（顺序与网格展开顺序一致），已标记 pareto
+    """
+    for detector_type in grid:
+        if detector_type not in EVAL_DETECTORS:
+            raise ValueError(f"不支持的检测算法: {detector_type}")
+    tasks = [
+        (detector_type, params, iou_threshold)
+        for detector_type, detector_grid in grid.items()
+        for params in expand_grid(detector_grid or {})
+    ]
+    workers = workers if workers is not None else (os.cpu_count() or 1)
+    workers = max(1, min(workers, len(tasks)))
+    logger.info("评估 %d 组参数，%d 张图片，%d 个进程", len(tasks), len(samples), workers)
+
+    if workers == 1:
+        results = [evaluate_config(d, p, samples, iou) for d, p, iou in tasks]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(config_path, samples, threads_per_worker)
+        ) as pool:
+            results = list(pool.map(_evaluate_task, tasks))
+    mark_pareto(results)
+    return results
+
+
+def mark_pareto(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    标记 Pareto 前沿：没有其他组合 AP 不低于它且更快（或同样快且AP更高）
+
+    Args:
+        results: run_grid / evaluate_config 的结果列表（原地写入 pareto 字段）
+
+    Returns:
+        results
+    """
+    valid = [r for r in results if 'error' not in r]
+    ap = np.asarray([r['ap'] for r in valid], dtype=np.float64)
+    ms = np.asarray([r['ms_per_frame'] for r in valid], dtype=np.float64)
+    if len(valid):
+        dominated = (
+            (ap[None, :] >= ap[:, None]) & (ms[None, :] <= ms[:, None])
+            & ((ap[None, :] > ap[:, None]) | (ms[None, :] < ms[:, None]))
+        ).any(axis=1)
+        for result, flag in zip(valid, dominated):
+            result['pareto'] = not bool(flag)
+    for result in results:
+        result.setdefault('pareto', False)
+    return results
+
+
+def _format_params(params: Dict[str, Any]) -> str:
+    return ', '.join(f'{k}={v}' for k, v in params.items()) or '(配置默认)'
+
+
+def format_table(results: List[Dict[str, Any]], fmt: str = 'markdown') -> str:
+    """
+    按 ms/帧 升序输出结果表
+
+    Args:
+        results: 已标记 pareto 的结果
+        fmt: 'markdown' 或 'csv'
+
+    Returns:
+        表格文本
+    """
+    header = ['detector', 'params', 'AP', 'precision', 'recall', 'ms/frame', 'p90 ms', 'pareto']
+    rows = []
+    for r in sorted(results, key=lambda r: (r.get('ms_per_frame', float('inf')), -r.get('ap', 0.0))):
+        if 'error' in r:
+            rows.append([r['detector'], _format_params(r['params']), '-', '-', '-', '-', '-', f"错误: {r['error']}"])
+            continue
+        rows.append([
+            r['detector'], _format_params(r['params']),
+            f"{r['ap']:.4f}", f"{r['precision']:.4f}", f"{r['recall']:.4f}",
+            f"{r['ms_per_frame']:.2f}", f"{r['p90_ms']:.2f}", '*' if r['pareto'] else '',
+        ])
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(header)
+        writer.writerows(rows)
+        return buffer.getvalue()
+    lines = ['| ' + ' | '.join(header) + ' |', '|' + '---|' * len(header)]
+    lines.extend('| ' + ' | '.join(row) + ' |' for row in rows)
+    return '\n'.join(lines) + '\n'
+
+
+def main():
+    """yoloface-eval 命令行入口"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='人脸检测器精度/速度离线评估')
+    parser.add_argument('--config', '-c', type=str, default=None, help='配置文件路径')
+    parser.add_argument('--dataset', choices=DATASET_FORMATS, required=True, help='标注格式')
+    parser.add_argument('--annotations', nargs='+', required=True,
+                        help='标注文件（WIDER: wider_face_val_bbx_gt.txt；FDDB: 一个或多个 ellipseList 文件）')
+    parser.add_argument('--images', required=True, help='图片根目录')
+    parser.add_argument('--detectors', nargs='+', choices=EVAL_DETECTORS, default=None,
+                        help='只评估这些检测算法（默认为参数网格中的全部）')
+    parser.add_argument('--grid', type=str, default=None,
+                        help='参数网格YAML文件（默认使用配置 evaluation.grid）')
+    parser.add_argument('--workers', type=int, default=None, help='进程数（默认使用配置，未配置时为CPU核数）')
+    parser.add_argument('--iou', type=float, default=None, help='判定正确检测的最小IoU')
+    parser.add_argument('--limit', type=int, default=None, help='最多评估的图片数')
+    parser.add_argument('--min-size', type=int, default=None, help='小于该尺寸的标注人脸不参与评估')
+    parser.add_argument('--output', '-o', type=str, default=None,
+                        help='结果文件（.md、.csv 或 .json），默认只打印')
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    eval_config = config.get('evaluation', {}) or {}
+    if args.grid:
+        import yaml
+        with open(args.grid, 'r', encoding='utf-8') as f:
+            grid = yaml.safe_load(f) or {}
+    else:
+        grid = dict(eval_config.get('grid', {}) or {})
+    if args.detectors:
+        grid = {name: grid.get(name, {}) for name in args.detectors}
+    if not grid:
+        parser.error("参数网格为空：请在配置 evaluation.grid 中设置或使用 --grid")
+
+    samples = load_dataset(
+        args.dataset,
+        args.annotations if args.dataset == 'fddb' or len(args.annotations) > 1 else args.annotations[0],
+        args.images,
+        limit=args.limit,
+        min_size=args.min_size if args.min_size is not None else eval_config.get('min_face_size', 0)
+    )
+    results = run_grid(
+        samples,
+        grid,
+        workers=args.workers if args.workers is not None else eval_config.get('workers'),
+        iou_threshold=args.iou if args.iou is not None else eval_config.get('iou_threshold', 0.5),
+        config_path=args.config
+    )
+
+    table = format_table(results)
+    print(table)
+    if args.output:
+        if args.output.endswith('.json'):
+            text = json.dumps(results, ensure_ascii=False, indent=2)
+        else:
+            text = format_table(results, 'csv' if args.output.endswith('.csv') else 'markdown')
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+        print(f"结果已写入: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,16 @@
 """
 登录注册UI界面
+数据存储的初始化、登录验证与注册在线程池中执行，界面线程只负责显示进度和结果
 """
 
-from PyQt5.QtCore import Qt, pyqtSignal
+import threading
+import traceback
+from typing import Callable, Optional, Tuple
+
+from PyQt5.QtCore import QObject, QRunnable, Qt, QThreadPool, pyqtSignal
 from PyQt5.QtGui import QFont
 from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit,
-                             QPushButton, QMessageBox, QStackedWidget, QWidget)
+                             QPushButton, QMessageBox, QProgressBar, QStackedWidget, QWidget)
 
 from ..utils.db_manager import DatabaseManager
 from ..utils.logger import get_logger
@@ -13,6 +18,68 @@ from ..utils.logger import get_logger
 logger = get_logger(__name__)
 
 
+class AuthTaskSignals(QObject):
+    """后台认证任务的结果信号（跨线程以排队方式送达界面线程）"""
+
+    finished = pyqtSignal(int, bool, str)  # 任务编号, 是否成功, 提示信息
+    failed = pyqtSignal(int, str)          # 任务编号, 异常信息
+
+
+class AuthTask(QRunnable):
+    """在线程池中执行的认证任务"""
+
+    def __init__(self, task_id: int, func: Callable[[], Tuple[bool, str]], cancellable: bool = True):
+        """
+        初始化
+
+        Args:
+            task_id: 任务编号（界面据此丢弃已取消任务的结果）
+            func: 执行认证并返回 (success, message) 的函数
+            cancellable: 开始执行后是否仍可取消（注册等写操作开始后无法撤销，只能在排队期间取消）
+        """
+        super().__init__()
+        self.task_id = task_id
+        self.func = func
+        self.cancellable = cancellable
+        self.signals = AuthTaskSignals()
+        self.cancelled = False
+        self.started = False
+        self._lock = threading.Lock()
+
+    def cancel(self, force: bool = False) -> bool:
+        """
+        取消任务
+
+        Args:
+            force: 已开始的不可取消任务也标记为取消（关闭对话框时使用，结果只记录日志）
+
+        Returns:
+            是否已取消；不可取消的任务已开始执行时返回False
+        """
+        with self._lock:
+            if self.started and not (self.cancellable or force):
+                return False
+            self.cancelled = True
+            return True
+
+    def run(self):
+        with self._lock:
+            # 排队期间已取消的任务不再执行
+            if self.cancelled:
+                return
+            self.started = True
+        try:
+            success, message = self.func()
+        except Exception as e:
+            logger.error(f"认证任务失败: {type(e).__name__}: {e}")
+            logger.error(traceback.format_exc())
+            self.signals.failed.emit(self.task_id, str(e))
+            return
+        if self.cancelled:
+            logger.info(f"已取消的认证任务执行完成: {message}")
+        self.signals.finished.emit(self.task_id, success, message)
+
+
 class LoginRegisterDialog(QDialog):
     """登录注册对话框"""
 
@@ -24,13 +91,20 @@ class LoginRegisterDialog(QDialog):
         self.db_manager = None
         self._db_initialized = False
         
+        # 存储操作串行执行，使用独立的线程池避免被其他任务占满
+        self._thread_pool = QThreadPool(self)
+        self._thread_pool.setMaxThreadCount(1)
+        self._task: Optional[AuthTask] = None
+        self._task_handler: Optional[Callable[[bool, str], None]] = None
+        self._task_counter = 0
+        
         # 只初始化UI，不自动初始化数据库（避免崩溃）
         self.init_ui()
         
         # 不在初始化时自动连接数据库，只在用户操作时按需初始化
 
     def ensure_db_initialized(self):
-        """确保数据存储已初始化（文件存储版本，更简单）"""
+        """确保数据存储已初始化（在后台任务中调用）"""
         if self._db_initialized:
             return True
         
@@ -110,9 +184,14 @@ class LoginRegisterDialog(QDialog):
         self.register_widget = self.create_register_widget()
         self.stacked_widget.addWidget(self.register_widget)
 
+        # 后台任务进度（执行期间显示）
+        self.busy_widget = self.create_busy_widget()
+        self.busy_widget.hide()
+
         # 主布局
         main_layout = QVBoxLayout()
         main_layout.addWidget(self.stacked_widget)
+        main_layout.addWidget(self.busy_widget)
         self.setLayout(main_layout)
 
         # 默认显示登录界面
@@ -243,6 +322,124 @@ class LoginRegisterDialog(QDialog):
         widget.setLayout(layout)
         return widget
 
+    def create_busy_widget(self):
+        """创建进度提示（不确定进度条 + 取消按钮）"""
+        widget = QWidget()
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        self.busy_label = QLabel()
+        self.busy_label.setAlignment(Qt.AlignCenter)
+        layout.addWidget(self.busy_label)
+
+        progress_layout = QHBoxLayout()
+        self.busy_progress = QProgressBar()
+        self.busy_progress.setRange(0, 0)
+        self.busy_progress.setTextVisible(False)
+        progress_layout.addWidget(self.busy_progress)
+
+        self.busy_cancel_btn = cancel_btn = QPushButton('取消')
+        cancel_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #9E9E9E;
+            }
+            QPushButton:hover {
+                background-color: #757575;
+            }
+        """)
+        cancel_btn.clicked.connect(self.cancel_task)
+        progress_layout.addWidget(cancel_btn)
+        layout.addLayout(progress_layout)
+
+        widget.setLayout(layout)
+        return widget
+
+    @property
+    def busy(self) -> bool:
+        """是否有后台任务在执行"""
+        return self._task is not None
+
+    def _set_busy(self, text: Optional[str]):
+        """显示或隐藏进度提示，执行期间禁用输入"""
+        self.stacked_widget.setEnabled(text is None)
+        if text is None:
+            self.busy_widget.hide()
+        else:
+            self.busy_label.setText(text)
+            self.busy_cancel_btn.setEnabled(True)
+            self.busy_widget.show()
+
+    def start_task(
+        self,
+        text: str,
+        func: Callable[[], Tuple[bool, str]],
+        handler: Callable[[bool, str], None],
+        cancellable: bool = True
+    ):
+        """
+        在线程池中执行认证任务
+
+        Args:
+            text: 进度提示文字
+            func: 执行认证并返回 (success, message) 的函数（在后台线程中调用）
+            handler: 任务完成后在界面线程中调用的处理函数
+            cancellable: 开始执行后是否仍可取消
+        """
+        if self.busy:
+            return
+        self._task_counter += 1
+        task = AuthTask(self._task_counter, func, cancellable)
+        task.signals.finished.connect(self._on_task_finished)
+        task.signals.failed.connect(self._on_task_failed)
+        self._task = task
+        self._task_handler = handler
+        self._set_busy(text)
+        self._thread_pool.start(task)
+
+    def cancel_task(self, force: bool = False) -> bool:
+        """
+        取消当前任务：排队中的任务不再执行；已开始的登录会执行完，但结果被丢弃；
+        已开始的注册不能取消（账号已在写入），等待并显示其结果
+
+        Args:
+            force: 已开始的注册同样丢弃结果（关闭对话框时使用）
+
+        Returns:
+            是否已取消（没有任务时返回True）
+        """
+        task = self._task
+        if task is None:
+            return True
+        if not task.cancel(force):
+            self.busy_label.setText("注册信息正在写入，完成后显示结果...")
+            self.busy_cancel_btn.setEnabled(False)
+            return False
+        self._task = None
+        self._task_handler = None
+        self._set_busy(None)
+        logger.info("已取消认证任务")
+        return True
+
+    def _take_task(self, task_id: int) -> Optional[Callable[[bool, str], None]]:
+        """结束编号为 task_id 的当前任务并返回其处理函数，已取消或过期的任务返回None"""
+        if self._task is None or self._task.task_id != task_id:
+            logger.info(f"忽略已取消的认证任务结果: {task_id}")
+            return None
+        handler = self._task_handler
+        self._task = None
+        self._task_handler = None
+        self._set_busy(None)
+        return handler
+
+    def _on_task_finished(self, task_id: int, success: bool, message: str):
+        handler = self._take_task(task_id)
+        if handler is not None:
+            handler(success, message)
+
+    def _on_task_failed(self, task_id: int, error: str):
+        if self._take_task(task_id) is not None:
+            QMessageBox.critical(self, "错误", f"处理过程出错: {error}")
+
     def show_login(self):
         """显示登录界面"""
         self.stacked_widget.setCurrentIndex(0)
@@ -273,14 +470,13 @@ class LoginRegisterDialog(QDialog):
             QMessageBox.warning(self, "警告", "用户名和密码不能为空")
             return
 
-        # 按需初始化数据库
-        if not self.ensure_db_initialized():
-            QMessageBox.warning(self, "警告", "数据存储未初始化，无法登录")
-            return
-
-        try:
-            success, message = self.db_manager.login_user(username, password)
+        def login() -> Tuple[bool, str]:
+            # 按需初始化数据库
+            if not self.ensure_db_initialized():
+                return False, "数据存储未初始化，无法登录"
+            return self.db_manager.login_user(username, password)
 
+        def on_result(success: bool, message: str):
             if success:
                 self.current_user = username
                 QMessageBox.information(self, "成功", message)
@@ -288,11 +484,8 @@ class LoginRegisterDialog(QDialog):
                 self.accept()
             else:
                 QMessageBox.warning(self, "失败", message)
-        except Exception as e:
-            logger.error(f"登录处理失败: {e}")
-            import traceback
-            logger.error(traceback.format_exc())
-            QMessageBox.critical(self, "错误", f"登录过程出错: {e}")
+
+        self.start_task("正在登录...", login, on_result)
 
     def handle_register(self):
         """处理注册"""
@@ -308,28 +501,34 @@ class LoginRegisterDialog(QDialog):
             QMessageBox.warning(self, "警告", "两次输入的密码不一致")
             return
 
-        # 按需初始化数据库
-        if not self.ensure_db_initialized():
-            QMessageBox.warning(self, "警告", "数据存储未初始化，无法注册")
-            return
-
-        try:
-            success, message = self.db_manager.register_user(username, password)
+        def register() -> Tuple[bool, str]:
+            # 按需初始化数据库
+            if not self.ensure_db_initialized():
+                return False, "数据存储未初始化，无法注册"
+            return self.db_manager.register_user(username, password)
 
+        def on_result(success: bool, message: str):
             if success:
                 QMessageBox.information(self, "成功", message + "，请返回登录")
                 self.clear_register_fields()
                 self.show_login()
             else:
                 QMessageBox.warning(self, "失败", message)
-        except Exception as e:
-            logger.error(f"注册处理失败: {e}")
-            import traceback
-            logger.error(traceback.format_exc())
-            QMessageBox.critical(self, "错误", f"注册过程出错: {e}")
+
+        self.start_task("正在注册...", register, on_result, cancellable=False)
+
+    def reject(self):
+        """Esc 先取消正在执行的任务，空闲时才关闭对话框"""
+        if self.busy:
+            self.cancel_task()
+            return
+        super().reject()
 
     def closeEvent(self, event):
         """关闭事件"""
+        self.cancel_task(force=True)
+        # 等待已开始的存储操作结束后再断开
+        self._thread_pool.waitForDone(2000)
         try:
             if self.db_manager:
                 self.db_manager.disconnect()
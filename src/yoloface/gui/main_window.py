@@ -17,9 +17,13 @@ from PyQt5.QtCore import Qt, QThread, pyqtSignal
 from PyQt5.QtGui import QImage, QPixmap
 
 from ..detectors import HaarFaceDetector, YOLO11FaceDetector, YoloFastestV2Detector, FaceTracker
+from ..detectors.attribute_service import get_attribute_service
+from ..detectors.attribute_worker import get_attribute_worker
+from ..detectors.dnn_backend import apply_thread_plan
 from ..utils.logger import get_logger
 from ..utils.video import VideoCapture, FPSCounter, draw_info
-from ..config import Config
+from ..utils.profiler import get_profiler
+from ..config import Config, ConfigWatcher
 
 logger = get_logger(__name__)
 
@@ -39,10 +43,14 @@ class VideoThread(QThread):
         self.fps_counter = FPSCounter(
             config.get('performance.fps_update_interval', 30)
         )
+        self.profiler = get_profiler()
+        self.config_watcher: Optional[ConfigWatcher] = None
         self.init_detector()
     
     def init_detector(self):
         """初始化检测器"""
+        # 按流水线并行规划设置OpenCV线程数（进程内只设置一次）
+        apply_thread_plan()
         try:
             if self.detector_type == 'haar':
                 self.detector = HaarFaceDetector()
@@ -89,46 +97,81 @@ class VideoThread(QThread):
             return
         
         self.fps_counter.reset()
+        self.profiler.reset()
+        
+        if self.config.get('app.hot_reload', False):
+            watcher = ConfigWatcher(self.config, interval=self.config.get('app.hot_reload_interval', 1.0))
+            if watcher.start():
+                self.config_watcher = watcher
         
         while self.running:
-            ret, frame = self.cap.read()
+            # 帧间应用热更新的配置
+            if self.config_watcher:
+                change = self.config_watcher.apply_pending()
+                if change and change.changed('detection.gender'):
+                    get_attribute_service().apply_settings(change.new.detection.gender)
+                if change and change.changed('detection.age'):
+                    get_attribute_service().apply_age_settings(change.new.detection.age)
+                if change and change.changed('detection'):
+                    target = self.tracker if self.detector_type == 'track' else self.detector
+                    try:
+                        if target is not None:
+                            target.apply_settings(change.new.detection)
+                    except Exception as e:
+                        logger.error(f"应用新配置失败: {e}")
+            
+            with self.profiler.span('capture'):
+                ret, frame = self.cap.read()
             if not ret:
                 break
             
             # 检测
             if self.detector_type == 'track':
-                tracks = self.tracker.detect_and_track(frame)
-                # 性别识别已自动集成在draw_tracks中
-                frame = self.tracker.draw_tracks(frame, tracks, show_gender=True)
-                detection_count = len(tracks)
+                detections = self.tracker.detect_and_track(frame)
             elif self.detector_type in ['haar', 'yolo11', 'fastestv2']:
-                faces = self.detector.detect(frame)
-                # 性别识别已自动集成在draw_detections中
-                frame = self.detector.draw_detections(frame, faces, show_gender=True)
-                detection_count = len(faces)
+                detections = self.detector.detect(frame)
             else:
-                detection_count = 0
+                detections = []
+            detection_count = len(detections)
             
             # 计算FPS
             fps = self.fps_counter.update()
             
-            # 添加信息
+            # 绘制检测结果与信息（每帧记录一次绘制耗时，其中的属性识别单独计入 classification）
             algorithm_names = {
                 'haar': 'Haar',
                 'yolo11': 'YOLO11',
                 'fastestv2': 'FastestV2',
                 'track': 'Tracking'
             }
-            frame = draw_info(
-                frame, fps, detection_count,
-                algorithm_names.get(self.detector_type, '')
-            )
+            with self.profiler.span('drawing'):
+                # 性别识别已自动集成在draw_tracks/draw_detections中
+                if self.detector_type == 'track':
+                    frame = self.tracker.draw_tracks(frame, detections, show_gender=True)
+                elif self.detector_type in ['haar', 'yolo11', 'fastestv2']:
+                    frame = self.detector.draw_detections(frame, detections, show_gender=True)
+                frame = draw_info(
+                    frame, fps, detection_count,
+                    algorithm_names.get(self.detector_type, '')
+                )
             
             # 发送帧
             self.frame_ready.emit(frame, detection_count, fps)
             
+            # 周期性写入延迟快照
+            try:
+                self.profiler.maybe_write_snapshot()
+            except OSError as e:
+                logger.warning("写入延迟快照失败: %s", e)
+            
             self.msleep(33)  # ~30 FPS
         
+        if self.config_watcher:
+            self.config_watcher.stop()
+            self.config_watcher = None
+        worker = get_attribute_worker()
+        if worker is not None:
+            worker.stop()
         self.stop_capture()
 
 
@@ -140,6 +183,8 @@ class MainWindow(QMainWindow):
         self.config = config
         self.username = username
         self.video_thread: Optional[VideoThread] = None
+        self.profiler = get_profiler()
+        self._frames_since_stats = 0
         self.init_ui()
     
     def init_ui(self):
@@ -212,6 +257,10 @@ class MainWindow(QMainWindow):
         self.detection_label = QLabel('检测数量: 0')
         stats_layout.addWidget(self.detection_label)
         
+        self.latency_label = QLabel('')
+        self.latency_label.setVisible(self.profiler.enabled)
+        stats_layout.addWidget(self.latency_label)
+        
         stats_group.setLayout(stats_layout)
         right_layout.addWidget(stats_group)
         
@@ -289,30 +338,38 @@ class MainWindow(QMainWindow):
         self.video_label.setText('检测已停止')
         self.fps_label.setText('FPS: 0.00')
         self.detection_label.setText('检测数量: 0')
+        self.latency_label.setText('')
         
         self.log("检测已停止")
         self.statusBar().showMessage('就绪')
     
     def update_frame(self, frame: np.ndarray, detection_count: int, fps: float):
         """更新视频帧"""
-        # 转换颜色空间
-        rgb_image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        h, w, ch = rgb_image.shape
-        bytes_per_line = ch * w
-        qt_image = QImage(rgb_image.data, w, h, bytes_per_line, QImage.Format_RGB888)
-        
-        # 缩放图像以适应标签
-        pixmap = QPixmap.fromImage(qt_image)
-        scaled_pixmap = pixmap.scaled(
-            self.video_label.size(),
-            Qt.KeepAspectRatio,
-            Qt.SmoothTransformation
-        )
-        self.video_label.setPixmap(scaled_pixmap)
+        with self.profiler.span('display'):
+            # 转换颜色空间
+            rgb_image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            h, w, ch = rgb_image.shape
+            bytes_per_line = ch * w
+            qt_image = QImage(rgb_image.data, w, h, bytes_per_line, QImage.Format_RGB888)
+            
+            # 缩放图像以适应标签
+            pixmap = QPixmap.fromImage(qt_image)
+            scaled_pixmap = pixmap.scaled(
+                self.video_label.size(),
+                Qt.KeepAspectRatio,
+                Qt.SmoothTransformation
+            )
+            self.video_label.setPixmap(scaled_pixmap)
         
         # 更新统计信息
         self.fps_label.setText(f'FPS: {fps:.2f}')
         self.detection_label.setText(f'检测数量: {detection_count}')
+        
+        # 各阶段延迟（每秒左右刷新一次）
+        self._frames_since_stats += 1
+        if self.profiler.enabled and self._frames_since_stats >= 30:
+            self._frames_since_stats = 0
+            self.latency_label.setText('各阶段延迟:\n' + self.profiler.summary('\n'))
     
     def closeEvent(self, event):
         """关闭事件"""
@@ -0,0 +1,287 @@
+"""
+多路视频流批量检测
+一个进程读取多路摄像头，各路的新帧合并为一批送入检测器的一次前向推理（模型只加载一份），
+检测结果再分发回各路自己的跟踪器与输出（sink），并按路统计吞吐量
+"""
+
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .utils.logger import get_logger
+from .utils.profiler import get_profiler
+from .utils.video import FPSCounter, MultiVideoCapture, draw_info
+from .detectors import HaarFaceDetector, YOLO11FaceDetector, YoloFastestV2Detector, FaceTracker
+from .detectors.attribute_worker import get_attribute_worker
+from .config import Config, get_config
+
+logger = get_logger(__name__)
+
+ALGORITHM_NAMES = {
+    'haar': 'Haar',
+    'yolo11': 'YOLO11',
+    'fastestv2': 'FastestV2',
+    'track': 'Tracking'
+}
+
+
+class StreamResult(NamedTuple):
+    """单路单帧的处理结果"""
+    stream: int
+    frame: np.ndarray
+    detections: Union[list, dict]
+    captured_at: float
+    latency_ms: float
+
+
+# sink: 接收每路每帧的处理结果（保存、显示、推送等）
+Sink = Callable[[StreamResult], None]
+
+
+class StreamStats:
+    """单路视频流的吞吐统计"""
+
+    def __init__(self, update_interval: int = 30):
+        """
+        初始化
+
+        Args:
+            update_interval: FPS更新间隔（帧数）
+        """
+        self.fps_counter = FPSCounter(update_interval)
+        self.frames = 0
+        self.detections = 0
+        self.latency_ms = 0.0
+        self.started = time.monotonic()
+
+    @property
+    def fps(self) -> float:
+        """最近的帧率"""
+        return self.fps_counter.fps
+
+    @property
+    def average_fps(self) -> float:
+        """启动以来的平均帧率"""
+        elapsed = time.monotonic() - self.started
+        return self.frames / elapsed if elapsed > 0 else 0.0
+
+    def update(self, detection_count: int, latency_ms: float):
+        """记录一帧"""
+        self.frames += 1
+        self.detections += detection_count
+        self.latency_ms = latency_ms
+        self.fps_counter.update()
+
+
+class MultiStreamPipeline:
+    """多路视频流批量检测流水线"""
+
+    def __init__(
+        self,
+        detector_type: str,
+        sources: Sequence[Union[int, str]],
+        config: Optional[Config] = None,
+        sinks: Sequence[Sink] = (),
+        capture: Optional[MultiVideoCapture] = None,
+        draw: bool = True
+    ):
+        """
+        初始化
+
+        Args:
+            detector_type: 'haar'、'yolo11'、'fastestv2' 或 'track'
+            sources: 摄像头索引或视频文件路径列表
+            config: 配置对象，None表示使用全局配置
+            sinks: 结果输出函数列表，每路每帧调用一次
+            capture: 已创建的多路采集对象，None时在 start() 中按配置创建
+            draw: 是否在帧上绘制检测结果与统计信息
+        """
+        self.detector_type = detector_type
+        self.sources = list(sources)
+        self.config = config or get_config()
+        self.sinks = list(sinks)
+        self.capture = capture
+        self.draw = draw
+        self.running = False
+        self.profiler = get_profiler()
+
+        interval = self.config.get('performance.fps_update_interval', 30)
+        self.stats = [StreamStats(interval) for _ in self.sources]
+        self.batches = 0
+        self.batched_frames = 0
+
+        self.detector = None
+        self.trackers: Dict[int, FaceTracker] = {}
+        self._init_detector()
+
+        # 每路每轮各提交一次属性识别请求，队列至少容纳一轮
+        worker = get_attribute_worker()
+        if worker is not None:
+            worker.ensure_queue_depth(len(self.sources))
+
+    def _init_detector(self):
+        """创建共享的检测器；跟踪模式下各路有自己的跟踪器，共享同一个模型"""
+        if self.detector_type == 'haar':
+            self.detector = HaarFaceDetector()
+        elif self.detector_type == 'yolo11':
+            self.detector = YOLO11FaceDetector()
+        elif self.detector_type == 'fastestv2':
+            self.detector = YoloFastestV2Detector()
+        elif self.detector_type == 'track':
+            self.detector = FaceTracker()
+            self.trackers = {
+                stream: self.detector if stream == 0 else FaceTracker(model=self.detector.model)
+                for stream in range(len(self.sources))
+            }
+        else:
+            raise ValueError(f"不支持的检测算法: {self.detector_type}")
+        logger.info(f"多路检测器初始化成功: {self.detector_type}，{len(self.sources)} 路")
+
+    @property
+    def average_batch_size(self) -> float:
+        """平均每次前向推理包含的帧数"""
+        return self.batched_frames / self.batches if self.batches else 0.0
+
+    def apply_settings(self, detection_settings):
+        """
+        热更新检测参数（应在两批之间调用）
+
+        Args:
+            detection_settings: 新的检测配置快照（DetectionSettings）
+        """
+        self.detector.apply_settings(detection_settings)
+        for tracker in self.trackers.values():
+            if tracker is not self.detector:
+                # 共享第一路跟踪器（重新）加载的模型，只更新跟踪参数
+                tracker.model, tracker.model_path = self.detector.model, self.detector.model_path
+                tracker.apply_settings(detection_settings)
+
+    def process(self, batch: Sequence[Tuple[int, np.ndarray, float]]) -> List[StreamResult]:
+        """
+        处理一批帧：一次批量检测，结果分发到各路
+
+        Args:
+            batch: [(流编号, 图像帧, 采集时间戳), ...]
+
+        Returns:
+            各路的处理结果
+        """
+        if not batch:
+            return []
+        frames = [frame for _, frame, _ in batch]
+        detections = self.detector.detect_batch(frames)
+        self.batches += 1
+        self.batched_frames += len(frames)
+
+        results = []
+        for (stream, frame, captured_at), faces in zip(batch, detections):
+            tracker = self.trackers.get(stream)
+            if tracker is not None:
+                with self.profiler.span('postprocess'):
+                    faces = tracker.update_tracks(faces)
+
+            latency_ms = (time.monotonic() - captured_at) * 1000.0
+            stats = self.stats[stream]
+            stats.update(len(faces), latency_ms)
+            if self.draw:
+                # 每路每帧记录一次绘制耗时，其中的属性识别单独计入 classification
+                with self.profiler.span('drawing'):
+                    if tracker is not None:
+                        frame = tracker.draw_tracks(frame, faces, stream=stream)
+                    else:
+                        frame = self.detector.draw_detections(frame, faces, stream=stream)
+                    frame = draw_info(
+                        frame, stats.fps, len(faces),
+                        f'{ALGORITHM_NAMES.get(self.detector_type, "")} #{stream}'
+                    )
+
+            result = StreamResult(stream, frame, faces, captured_at, latency_ms)
+            for sink in self.sinks:
+                try:
+                    sink(result)
+                except Exception as e:
+                    logger.warning("第 %s 路结果输出失败: %s", stream, e)
+            results.append(result)
+        return results
+
+    def start(self):
+        """创建多路采集（未提供时）"""
+        if self.capture is None:
+            camera_config = self.config.get('camera', {})
+            self.capture = MultiVideoCapture(
+                self.sources,
+                width=camera_config.get('width', 640),
+                height=camera_config.get('height', 480),
+                batch_wait_ms=camera_config.get('batch_wait_ms', 10),
+                # 视频文件需要逐帧处理，只有全部是摄像头索引时才丢弃来不及处理的旧帧
+                drop_frames=all(isinstance(source, int) for source in self.sources)
+            )
+        self.running = True
+        for stats in self.stats:
+            stats.started = time.monotonic()
+
+    def run(self, max_batches: Optional[int] = None, before_batch: Optional[Callable[[], None]] = None):
+        """
+        运行直到停止、所有视频源结束或处理完 max_batches 批
+
+        Args:
+            max_batches: 最多处理的批数，None表示不限
+            before_batch: 每批之前调用（如应用热更新的配置）
+        """
+        if not self.running:
+            self.start()
+        processed = 0
+        while self.running and self.capture.alive:
+            if before_batch is not None:
+                before_batch()
+            with self.profiler.span('capture'):
+                batch = self.capture.read_batch()
+            self.process(batch)
+            processed += 1 if batch else 0
+            if max_batches is not None and processed >= max_batches:
+                break
+
+    def stop(self):
+        """停止并释放视频源"""
+        self.running = False
+        if self.capture is not None:
+            self.capture.release()
+
+    def collect(self) -> List[Tuple[str, str, str, float]]:
+        """监控指标采集函数（供 MetricsRegistry.add_collector 使用）"""
+        metrics = [
+            ('stream_batches_total', 'counter', '多路批量推理次数', self.batches),
+            ('stream_batch_size_avg', 'gauge', '每次推理的平均帧数', self.average_batch_size),
+        ]
+        capture = self.capture
+        # 各路为同一指标的不同标签，同名指标的各行连续输出
+        labels = [f'{{stream="{stream}"}}' for stream in range(len(self.stats))]
+        metrics.extend((f'stream_frames_total{label}', 'counter', '各路已处理帧数', stats.frames)
+                       for label, stats in zip(labels, self.stats))
+        metrics.extend((f'stream_fps{label}', 'gauge', '各路当前帧率', stats.fps)
+                       for label, stats in zip(labels, self.stats))
+        metrics.extend((f'stream_latency_ms{label}', 'gauge', '各路采集到输出的延迟（毫秒）', stats.latency_ms)
+                       for label, stats in zip(labels, self.stats))
+        if capture is not None:
+            metrics.extend((f'stream_dropped_total{label}', 'counter', '各路来不及处理而丢弃的帧数', dropped)
+                           for label, dropped in zip(labels, capture.frames_dropped))
+        return metrics
+
+    def report(self) -> str:
+        """
+        生成各路吞吐量报告
+
+        Returns:
+            多行文本
+        """
+        lines = [f"{'流':<6}{'来源':<16}{'帧数':>8}{'平均FPS':>10}{'延迟ms':>10}{'丢帧':>8}{'检测数':>8}"]
+        for stream, (source, stats) in enumerate(zip(self.sources, self.stats)):
+            dropped = self.capture.frames_dropped[stream] if self.capture is not None else 0
+            lines.append(
+                f"{stream:<6}{str(source):<16}{stats.frames:>8}{stats.average_fps:>10.2f}"
+                f"{stats.latency_ms:>10.1f}{dropped:>8}{stats.detections:>8}"
+            )
+        total_fps = sum(stats.average_fps for stats in self.stats)
+        lines.append(f"合计 {total_fps:.2f} FPS，{self.batches} 次推理，平均每批 {self.average_batch_size:.2f} 帧")
+        return '\n'.join(lines)
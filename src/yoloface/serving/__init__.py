@@ -0,0 +1,16 @@
+"""
+本地推理服务模块
+"""
+
+from .batcher import DynamicBatcher
+from .client import RemoteDetectionError, RemoteFaceDetector
+from .http_api import DetectionHTTPServer
+from .server import InferenceServer
+
+__all__ = [
+    'DetectionHTTPServer',
+    'DynamicBatcher',
+    'InferenceServer',
+    'RemoteDetectionError',
+    'RemoteFaceDetector'
+]
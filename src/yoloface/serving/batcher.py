@@ -0,0 +1,188 @@
+"""
+动态凑批
+来自多个连接的单帧请求在后台线程中合并为一次 detect_batch 调用：
+收到第一帧后最多等待 max_delay_ms，凑够 max_batch_size 帧或到期即执行
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 执行一批检测：帧列表 -> 与之一一对应的检测结果列表
+BatchRunner = Callable[[List[np.ndarray]], list]
+
+
+class DynamicBatcher:
+    """动态凑批器（线程安全，检测在单个后台线程中串行执行）"""
+
+    def __init__(
+        self,
+        run_batch: BatchRunner,
+        max_batch_size: int = 4,
+        max_delay_ms: float = 5.0,
+        expected_requests: Optional[Callable[[], int]] = None
+    ):
+        """
+        初始化
+
+        Args:
+            run_batch: 执行一批检测的函数（如检测器的 detect_batch）
+            max_batch_size: 单批最多帧数
+            max_delay_ms: 收到第一帧后等待凑批的最长时间（毫秒）
+            expected_requests: 返回当前可能发来请求的调用方数量（如活动连接数），
+                               已凑够这么多帧时不再等待；None表示总是等到批满或到期
+        """
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_delay = max(0.0, max_delay_ms) / 1000.0
+        self.expected_requests = expected_requests
+        self._queue: 'queue.Queue[Optional[Tuple[np.ndarray, Future]]]' = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+        self.requests = 0
+        self.batches = 0
+        self.batched_frames = 0
+        self.errors = 0
+
+    @property
+    def average_batch_size(self) -> float:
+        """平均每批帧数"""
+        return self.batched_frames / self.batches if self.batches else 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        """等待处理的帧数"""
+        return self._queue.qsize()
+
+    def start(self):
+        """启动后台线程"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name='yoloface-batcher', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 2.0):
+        """停止后台线程，未处理的请求以异常结束"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            self._running = False
+        if thread is None:
+            return
+        self._queue.put(None)
+        thread.join(timeout=timeout)
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                item[1].set_exception(RuntimeError("推理服务已停止"))
+
+    def submit(self, frame: np.ndarray) -> Future:
+        """
+        提交一帧
+
+        Args:
+            frame: 图像帧（在 Future 完成前不得修改）
+
+        Returns:
+            结果为该帧检测结果的 Future
+        """
+        future: Future = Future()
+        if not self._running:
+            future.set_exception(RuntimeError("推理服务未启动"))
+            return future
+        with self._lock:
+            self.requests += 1
+        self._queue.put((frame, future))
+        return future
+
+    def detect_batch(self, frames: Sequence[np.ndarray], timeout: Optional[float] = None) -> list:
+        """
+        提交多帧并等待结果（各帧可能与其他请求合并）
+
+        Args:
+            frames: 图像帧列表
+            timeout: 等待超时（秒）
+
+        Returns:
+            与 frames 一一对应的检测结果
+        """
+        futures = [self.submit(frame) for frame in frames]
+        return [future.result(timeout) for future in futures]
+
+    def _collect(self, first: Tuple[np.ndarray, Future]) -> List[Tuple[np.ndarray, Future]]:
+        """以第一帧开始凑一批"""
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch_size:
+            try:
+                # 已在队列中的请求直接并入
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                expected = self.expected_requests() if self.expected_requests is not None else self.max_batch_size
+                remaining = deadline - time.monotonic()
+                if len(batch) >= expected or remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if item is None:
+                # 停止信号放回，处理完本批后退出
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        """后台线程：凑批并执行检测"""
+        while self._running:
+            first = self._queue.get()
+            if first is None:
+                break
+            batch = self._collect(first)
+            futures = [future for _, future in batch]
+            frames = [frame for frame, _ in batch]
+            # 帧可能是调用方共享内存上的视图，结果返回前释放引用
+            del first, batch
+            try:
+                results = self.run_batch(frames)
+                if len(results) != len(frames):
+                    raise RuntimeError(f"检测结果数量 {len(results)} 与帧数 {len(frames)} 不符")
+            except Exception as e:
+                del frames
+                logger.warning("批量检测失败: %s", e)
+                with self._lock:
+                    self.errors += 1
+                for future in futures:
+                    future.set_exception(e)
+                continue
+            with self._lock:
+                self.batches += 1
+                self.batched_frames += len(frames)
+            del frames
+            for future, result in zip(futures, results):
+                future.set_result(result)
+
+    def collect(self) -> List[Tuple[str, str, str, float]]:
+        """监控指标采集函数（供 MetricsRegistry.add_collector 使用）"""
+        return [
+            ('serve_requests_total', 'counter', '推理服务收到的帧数', self.requests),
+            ('serve_batches_total', 'counter', '推理服务执行的批次数', self.batches),
+            ('serve_batch_size_avg', 'gauge', '推理服务平均每批帧数', self.average_batch_size),
+            ('serve_queue_depth', 'gauge', '推理服务等待处理的帧数', self.queue_depth),
+            ('serve_errors_total', 'counter', '推理服务批量检测失败次数', self.errors),
+        ]
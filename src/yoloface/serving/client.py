@@ -0,0 +1,213 @@
+"""
+本地推理服务客户端
+RemoteFaceDetector 提供与本地检测器相同的 detect() / detect_batch() / draw_detections() 接口，
+现有代码把检测器换成它即可共享 yoloface-serve 进程中的模型
+"""
+
+import socket
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from ..utils.logger import get_logger
+from ..config import get_config
+from ..detectors.attribute_worker import classify_faces
+from ..detectors.gender_classifier import Gender
+from .protocol import FrameBuffer, pack_frames, recv_message, send_message
+
+logger = get_logger(__name__)
+
+
+class RemoteDetectionError(RuntimeError):
+    """推理服务返回错误"""
+
+    def __init__(self, message: str, code: str = 'error'):
+        super().__init__(message)
+        self.code = code
+
+
+class RemoteFaceDetector:
+    """推理服务客户端（线程安全，同一时刻一个请求在途）"""
+
+    def __init__(
+        self,
+        socket_path: Optional[str] = None,
+        timeout: float = 30.0,
+        use_shared_memory: bool = True
+    ):
+        """
+        初始化（首次请求时才连接）
+
+        Args:
+            socket_path: 服务的Unix域套接字路径，None表示使用配置 serving.socket_path
+            timeout: 单次请求超时（秒）
+            use_shared_memory: 是否通过共享内存传递图像帧，False时随消息发送
+        """
+        self.socket_path = socket_path or get_config().get('serving.socket_path', '/tmp/yoloface.sock')
+        self.timeout = timeout
+        self.use_shared_memory = use_shared_memory
+        self._lock = threading.Lock()
+        self._sock: Optional[socket.socket] = None
+        self._buffer = FrameBuffer()
+        self._info: Optional[Dict[str, Any]] = None
+
+    def _connect(self) -> socket.socket:
+        """建立连接（需持有锁）"""
+        if self._sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.socket_path)
+            except OSError:
+                sock.close()
+                raise
+            self._sock = sock
+        return self._sock
+
+    def _request(self, header: Dict[str, Any], payload: bytes = b'') -> Dict[str, Any]:
+        """发送请求并等待响应（需持有锁），连接出错时关闭以便下次重连"""
+        sock = self._connect()
+        try:
+            send_message(sock, header, payload)
+            response, _ = recv_message(sock)
+        except Exception:
+            self._disconnect()
+            raise
+        if not response.get('ok'):
+            raise RemoteDetectionError(response.get('error', '未知错误'), response.get('code', 'error'))
+        return response
+
+    def _disconnect(self):
+        """关闭连接（需持有锁）"""
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+
+    @property
+    def info(self) -> Dict[str, Any]:
+        """服务信息：检测算法、检测元组坐标格式、单批最多帧数"""
+        if self._info is None:
+            with self._lock:
+                if self._info is None:
+                    self._info = self._request({'op': 'info'})
+        return self._info
+
+    @property
+    def detector_type(self) -> str:
+        """服务端使用的检测算法"""
+        return self.info['detector']
+
+    def detect(self, frame: np.ndarray) -> list:
+        """
+        检测人脸
+
+        Args:
+            frame: 输入图像帧 (BGR格式)
+
+        Returns:
+            人脸列表，格式与服务端检测器一致（Haar为 (x, y, w, h)，其余为 (x1, y1, x2, y2, conf, cls)）
+        """
+        return self.detect_batch([frame])[0]
+
+    def detect_batch(self, frames: Sequence[np.ndarray]) -> List[list]:
+        """
+        批量检测（服务端可能与其他客户端的帧合并推理）
+
+        Args:
+            frames: 输入图像帧列表
+
+        Returns:
+            与 frames 一一对应的人脸列表
+        """
+        if not frames:
+            return []
+        frames = [np.ascontiguousarray(frame) for frame in frames]
+        with self._lock:
+            if self.use_shared_memory:
+                descriptors = self._buffer.write(frames)
+                try:
+                    response = self._request({'op': 'detect', 'shm': self._buffer.name, 'frames': descriptors})
+                except RemoteDetectionError as e:
+                    if e.code != 'shm_unavailable':
+                        raise
+                    # 服务端无法访问本进程的共享内存（如不同的挂载命名空间），改为随消息发送
+                    logger.warning("推理服务无法使用共享内存，改为通过套接字传输图像: %s", e)
+                    self.use_shared_memory = False
+                    self._buffer.close()
+                    response = self._request_inline(frames)
+            else:
+                response = self._request_inline(frames)
+        return [[tuple(det) for det in faces] for faces in response['detections']]
+
+    def _request_inline(self, frames: List[np.ndarray]) -> Dict[str, Any]:
+        """图像数据随消息发送（需持有锁）"""
+        descriptors, _ = pack_frames(frames)
+        payload = b''.join(frame.tobytes() for frame in frames)
+        return self._request({'op': 'detect', 'frames': descriptors}, payload)
+
+    def draw_detections(
+        self,
+        frame: np.ndarray,
+        faces: list,
+        color: Tuple[int, int, int] = (0, 255, 0),
+        thickness: int = 2,
+        show_gender: bool = True,
+        stream: Optional[int] = None
+    ) -> np.ndarray:
+        """
+        在图像上绘制检测结果（属性识别在本进程中进行）
+
+        Args:
+            frame: 输入图像帧
+            faces: detect() 返回的人脸列表
+            color: 绘制颜色
+            thickness: 线条粗细
+            show_gender: 是否显示性别
+            stream: 多路视频流时的流编号
+
+        Returns:
+            frame: 绘制了检测框的图像
+        """
+        xywh = self.info['box_format'] == 'xywh'
+        boxes = []
+        for face in faces:
+            x1, y1, a, b = (int(v) for v in face[:4])
+            boxes.append((x1, y1, x1 + a, y1 + b) if xywh else (x1, y1, a, b))
+        labels = ['Face' if xywh else f'Face {face[4]:.2f}' for face in faces]
+
+        if show_gender:
+            h, w = frame.shape[:2]
+            valid, indices = [], []
+            for i, (x1, y1, x2, y2) in enumerate(boxes):
+                x1, y1, x2, y2 = max(0, x1), max(0, y1), min(w, x2), min(h, y2)
+                if x2 - x1 > 10 and y2 - y1 > 10:
+                    valid.append((x1, y1, x2, y2))
+                    indices.append(i)
+            try:
+                for i, result in zip(indices, classify_faces(frame, valid, stream=stream)):
+                    if result and result.gender != Gender.UNKNOWN:
+                        labels[i] = result.label()
+            except Exception as e:
+                logger.debug("性别识别失败: %s", e)
+
+        for (x1, y1, x2, y2), label in zip(boxes, labels):
+            cv2.rectangle(frame, (x1, y1), (x2, y2), color, thickness)
+            cv2.putText(frame, label, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, thickness)
+        return frame
+
+    def close(self):
+        """关闭连接并释放共享内存"""
+        with self._lock:
+            self._disconnect()
+            self._buffer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,323 @@
+"""
+图片检测HTTP接口
+基于标准库 http.server：POST /detect 上传 JPEG/PNG 字节，解码在线程池中进行，
+检测经动态凑批执行，再做性别（及年龄）识别，以JSON返回人脸框；
+超出并发与排队上限的请求直接返回 503，每个响应带有各阶段耗时头
+"""
+
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from ..utils.logger import get_logger
+from ..config import Config, get_config
+from ..detectors.attribute_service import get_attribute_service
+from .batcher import DynamicBatcher
+from .server import BOX_FORMATS, SERVE_ALGORITHMS, create_detector
+
+logger = get_logger(__name__)
+
+
+class HTTPError(Exception):
+    """带状态码的请求错误"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def decode_image(data: bytes) -> np.ndarray:
+    """
+    解码 JPEG/PNG 图片
+
+    Args:
+        data: 图片文件字节
+
+    Returns:
+        BGR图像
+    """
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise HTTPError(400, "无法解码图片（仅支持 JPEG/PNG）")
+    return image
+
+
+class _DetectHandler(BaseHTTPRequestHandler):
+    """HTTP请求处理器"""
+
+    api: 'DetectionHTTPServer' = None
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/health':
+            self._send_json(404, {'error': 'not found'})
+            return
+        self._send_json(200, dict(self.api.status(), status='ok'))
+
+    def do_POST(self):
+        if self.path.split('?', 1)[0] != '/detect':
+            self._send_json(404, {'error': 'not found'})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+        except ValueError:
+            length = -1
+        if length <= 0:
+            self._send_json(411 if length == 0 else 400, {'error': '需要 Content-Length'})
+            return
+        if length > self.api.max_body_bytes:
+            self.close_connection = True
+            self._send_json(413, {'error': f'图片超过 {self.api.max_body_bytes} 字节'})
+            return
+        body = self.rfile.read(length)
+
+        try:
+            result, timings = self.api.handle_detect(body)
+        except HTTPError as e:
+            headers = {'Retry-After': '1'} if e.status == 503 else {}
+            self._send_json(e.status, {'error': str(e)}, headers=headers)
+            return
+        except Exception as e:
+            logger.warning("图片检测失败: %s", e)
+            self._send_json(500, {'error': str(e)})
+            return
+        self._send_json(200, result, timings=timings)
+
+    def _send_json(
+        self,
+        status: int,
+        data: Dict[str, Any],
+        timings: Optional[List[Tuple[str, float]]] = None,
+        headers: Optional[Dict[str, str]] = None
+    ):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if timings:
+            self.send_header('Server-Timing', ', '.join(f'{name};dur={ms:.2f}' for name, ms in timings))
+            for name, ms in timings:
+                self.send_header(f'X-{name.capitalize()}-Time-Ms', f'{ms:.2f}')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # 不输出访问日志，避免刷屏
+        pass
+
+
+class DetectionHTTPServer:
+    """图片检测HTTP服务（独立线程运行）"""
+
+    def __init__(
+        self,
+        host: Optional[str] = None,
+        port: Optional[int] = None,
+        detector_type: Optional[str] = None,
+        detector=None,
+        batcher: Optional[DynamicBatcher] = None,
+        decode_workers: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        config: Optional[Config] = None
+    ):
+        """
+        初始化
+
+        Args:
+            host: 监听地址，None表示使用配置 serving.http.host（默认仅本机）
+            port: 监听端口，0表示自动分配，None表示使用配置
+            detector_type: 检测算法，None表示使用配置 serving.detector
+            detector: 已创建的检测器（提供 detect_batch），None时按 detector_type 创建
+            batcher: 共享的动态凑批器（如与 InferenceServer 共用模型），None时自行创建
+            decode_workers: 图片解码线程数
+            max_concurrency: 同时处理的请求数上限
+            max_queue: 超出并发上限后允许排队的请求数，再多则返回503
+            config: 配置对象，None表示使用全局配置
+        """
+        self.config = config or get_config()
+        serving_config = self.config.get('serving', {})
+        http_config = serving_config.get('http', {}) or {}
+        self.host = host or http_config.get('host', '127.0.0.1')
+        self.port = port if port is not None else http_config.get('port', 8090)
+        self.detector_type = detector_type or serving_config.get('detector', 'yolo11')
+        if self.detector_type not in SERVE_ALGORITHMS:
+            raise ValueError(f"不支持的检测算法: {self.detector_type}")
+        self.max_body_bytes = int(http_config.get('max_body_mb', 10) * 1024 * 1024)
+        self.request_timeout = serving_config.get('request_timeout', 30.0)
+
+        decode_workers = decode_workers or http_config.get('decode_workers', 2)
+        max_concurrency = max_concurrency or http_config.get('max_concurrency', 4)
+        max_queue = max_queue if max_queue is not None else http_config.get('max_queue', 16)
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.max_queue = max(0, int(max_queue))
+        # 进入服务的请求（处理中 + 排队中）与同时处理的请求分别限流
+        self._admission = threading.BoundedSemaphore(self.max_concurrency + self.max_queue)
+        self._active = threading.BoundedSemaphore(self.max_concurrency)
+        self._decoder = ThreadPoolExecutor(max_workers=max(1, int(decode_workers)), thread_name_prefix='yoloface-decode')
+
+        self._owns_batcher = batcher is None
+        if batcher is None:
+            detector = detector if detector is not None else create_detector(self.detector_type)
+            batcher = DynamicBatcher(
+                detector.detect_batch,
+                max_batch_size=serving_config.get('max_batch_size', 4),
+                max_delay_ms=serving_config.get('max_delay_ms', 5.0),
+                expected_requests=lambda: self.in_flight
+            )
+        self.batcher = batcher
+
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.requests = 0
+        self.rejected = 0
+        self._httpd: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        """实际监听地址"""
+        if self._httpd is None:
+            return self.host, self.port
+        return self._httpd.server_address[:2]
+
+    def status(self) -> Dict[str, Any]:
+        """当前负载"""
+        return {
+            'detector': self.detector_type,
+            'in_flight': self.in_flight,
+            'requests': self.requests,
+            'rejected': self.rejected,
+        }
+
+    def handle_detect(self, body: bytes) -> Tuple[Dict[str, Any], List[Tuple[str, float]]]:
+        """
+        处理一次检测请求
+
+        Args:
+            body: 图片文件字节
+
+        Returns:
+            (JSON结果, [(阶段, 耗时ms), ...])
+        """
+        if not self._admission.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HTTPError(503, "服务繁忙，请稍后重试")
+        start = time.perf_counter()
+        with self._lock:
+            self.in_flight += 1
+            self.requests += 1
+        try:
+            if not self._active.acquire(timeout=self.request_timeout):
+                raise HTTPError(503, "排队超时")
+            try:
+                started = time.perf_counter()
+                image = self._decoder.submit(decode_image, body).result(self.request_timeout)
+                decoded = time.perf_counter()
+                faces = self.batcher.detect_batch([image], timeout=self.request_timeout)[0]
+                detected = time.perf_counter()
+                result = self._build_result(image, faces)
+                finished = time.perf_counter()
+            finally:
+                self._active.release()
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            self._admission.release()
+
+        timings = [
+            ('queue', (started - start) * 1000.0),
+            ('decode', (decoded - started) * 1000.0),
+            ('inference', (detected - decoded) * 1000.0),
+            ('attributes', (finished - detected) * 1000.0),
+            ('total', (finished - start) * 1000.0),
+        ]
+        return result, timings
+
+    def _build_result(self, image: np.ndarray, faces: list) -> Dict[str, Any]:
+        """将检测元组转换为JSON结构，并附加性别（及年龄）"""
+        h, w = image.shape[:2]
+        xywh = BOX_FORMATS[self.detector_type] == 'xywh'
+        items = []
+        for face in faces:
+            x1, y1, a, b = (int(v) for v in face[:4])
+            x2, y2 = (x1 + a, y1 + b) if xywh else (a, b)
+            items.append({
+                'box': [x1, y1, x2, y2],
+                'confidence': None if xywh else round(float(face[4]), 4),
+            })
+
+        service = get_attribute_service()
+        if service.enabled and items:
+            boxes = [
+                (max(0, x1), max(0, y1), min(w, x2), min(h, y2))
+                for x1, y1, x2, y2 in (item['box'] for item in items)
+            ]
+            if service.age_enabled:
+                attributes = service.predict_attributes(image, boxes)
+            else:
+                attributes = [(gender, conf, None) for gender, conf in service.predict_frame(image, boxes)]
+            for item, (gender, conf, age) in zip(items, attributes):
+                item['gender'] = gender.name.lower()
+                item['gender_confidence'] = round(float(conf), 4)
+                if age is not None:
+                    item['age'] = {'label': age[0], 'range': list(age[1]), 'confidence': round(float(age[2]), 4)}
+        return {'width': w, 'height': h, 'faces': items}
+
+    def start(self):
+        """启动服务"""
+        if self._httpd is not None:
+            return
+        self.batcher.start()
+        handler = type('DetectHandler', (_DetectHandler,), {'api': self})
+        self._httpd = ThreadingHTTPServer((self.host, self.port), handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='yoloface-http', daemon=True)
+        self._thread.start()
+        host, port = self.address
+        logger.info(
+            f"图片检测服务已启动: http://{host}:{port}/detect"
+            f"（并发 {self.max_concurrency}，排队 {self.max_queue}）"
+        )
+
+    def stop(self):
+        """停止服务"""
+        if self._httpd is None:
+            return
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+        self._httpd = None
+        self._thread = None
+        self._decoder.shutdown(wait=False)
+        if self._owns_batcher:
+            self.batcher.stop()
+        logger.info("图片检测服务已停止")
+
+    def collect(self) -> List[Tuple[str, str, str, float]]:
+        """监控指标采集函数（供 MetricsRegistry.add_collector 使用）"""
+        metrics = [
+            ('http_requests_total', 'counter', '图片检测请求数', self.requests),
+            ('http_rejected_total', 'counter', '因繁忙被拒绝的图片检测请求数', self.rejected),
+            ('http_in_flight', 'gauge', '处理中与排队中的图片检测请求数', self.in_flight),
+        ]
+        if self._owns_batcher:
+            metrics.extend(self.batcher.collect())
+        return metrics
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
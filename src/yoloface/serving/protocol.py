@@ -0,0 +1,187 @@
+"""
+本地推理服务的消息格式
+每条消息为 4字节大端长度 + JSON头，头中 payload_size > 0 时其后紧跟原始字节；
+图像帧优先放在共享内存中，消息里只传共享内存名称、形状和类型
+"""
+
+import json
+import socket
+import struct
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+_HEADER = struct.Struct('>I')
+
+# 单条消息JSON头的上限，防止异常数据导致大量内存分配
+MAX_HEADER_SIZE = 1 << 20
+
+
+class ProtocolError(Exception):
+    """消息格式错误或连接中断"""
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    """读取恰好 size 字节，连接关闭时抛出 ProtocolError"""
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:], size - received)
+        if count == 0:
+            raise ProtocolError("连接已关闭")
+        received += count
+    return bytes(buffer)
+
+
+def send_message(sock: socket.socket, header: Dict[str, Any], payload: bytes = b''):
+    """
+    发送一条消息
+
+    Args:
+        sock: 已连接的套接字
+        header: JSON可序列化的消息头
+        payload: 附带的原始字节（如未使用共享内存时的图像数据）
+    """
+    header = dict(header, payload_size=len(payload))
+    data = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    sock.sendall(_HEADER.pack(len(data)) + data)
+    if payload:
+        sock.sendall(payload)
+
+
+def recv_message(sock: socket.socket) -> Tuple[Dict[str, Any], bytes]:
+    """
+    接收一条消息
+
+    Args:
+        sock: 已连接的套接字
+
+    Returns:
+        (消息头, 附带字节)
+    """
+    (size,) = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    if size > MAX_HEADER_SIZE:
+        raise ProtocolError(f"消息头过大: {size} 字节")
+    try:
+        header = json.loads(_recv_exact(sock, size).decode('utf-8'))
+    except ValueError as e:
+        raise ProtocolError(f"无法解析消息头: {e}") from e
+    payload_size = int(header.get('payload_size', 0))
+    payload = _recv_exact(sock, payload_size) if payload_size > 0 else b''
+    return header, payload
+
+
+def pack_frames(frames: Sequence[np.ndarray]) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    计算多帧连续存放时各帧的描述（形状、类型、偏移）
+
+    Args:
+        frames: 图像帧列表
+
+    Returns:
+        (描述列表, 总字节数)
+    """
+    descriptors, offset = [], 0
+    for frame in frames:
+        descriptors.append({'shape': list(frame.shape), 'dtype': frame.dtype.str, 'offset': offset})
+        offset += frame.nbytes
+    return descriptors, offset
+
+
+def unpack_frames(descriptors: Sequence[Dict[str, Any]], buffer) -> List[np.ndarray]:
+    """
+    按描述将缓冲区解释为多帧图像（不复制）
+
+    Args:
+        descriptors: pack_frames 生成的描述列表
+        buffer: 字节或共享内存缓冲区
+
+    Returns:
+        图像帧视图列表
+    """
+    frames = []
+    for descriptor in descriptors:
+        shape = tuple(int(v) for v in descriptor['shape'])
+        dtype = np.dtype(descriptor['dtype'])
+        offset = int(descriptor.get('offset', 0))
+        count = int(np.prod(shape))
+        if offset < 0 or offset + count * dtype.itemsize > len(buffer):
+            raise ProtocolError("图像数据长度与形状不符")
+        frames.append(np.frombuffer(buffer, dtype=dtype, count=count, offset=offset).reshape(shape))
+    return frames
+
+
+def attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    """
+    打开客户端创建的共享内存
+    只是使用方，不登记到本进程的 resource_tracker，否则本进程退出时会把客户端的共享内存删除
+
+    Args:
+        name: 共享内存名称
+
+    Returns:
+        SharedMemory实例
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python 3.13 之前没有 track 参数
+        from multiprocessing import resource_tracker
+        shm = shared_memory.SharedMemory(name=name)
+        if shm.name not in FrameBuffer.created:
+            # 同一进程创建的共享内存由创建方负责登记与删除
+            try:
+                resource_tracker.unregister(shm._name, 'shared_memory')
+            except Exception:
+                pass
+        return shm
+
+
+class FrameBuffer:
+    """客户端用于传递图像帧的共享内存（按需扩容，跨请求复用）"""
+
+    # 本进程创建的共享内存名称
+    created = set()
+
+    def __init__(self):
+        self._shm: Optional[shared_memory.SharedMemory] = None
+
+    @property
+    def name(self) -> Optional[str]:
+        """当前共享内存名称"""
+        return self._shm.name if self._shm is not None else None
+
+    def write(self, frames: Sequence[np.ndarray]) -> List[Dict[str, Any]]:
+        """
+        将多帧连续写入共享内存（容量不足时重新分配）
+
+        Args:
+            frames: 图像帧列表
+
+        Returns:
+            各帧的描述（形状、类型、偏移）
+        """
+        descriptors, size = pack_frames(frames)
+        if self._shm is None or self._shm.size < size:
+            self.close()
+            self._shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+            FrameBuffer.created.add(self._shm.name)
+        for frame, descriptor in zip(frames, descriptors):
+            target = np.ndarray(frame.shape, dtype=frame.dtype, buffer=self._shm.buf, offset=descriptor['offset'])
+            target[...] = frame
+            del target
+        return descriptors
+
+    def close(self):
+        """释放共享内存"""
+        if self._shm is None:
+            return
+        self._shm.close()
+        try:
+            self._shm.unlink()
+        except FileNotFoundError:
+            pass
+        FrameBuffer.created.discard(self._shm.name)
+        self._shm = None
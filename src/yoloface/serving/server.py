@@ -0,0 +1,314 @@
+"""
+本地推理服务（yoloface-serve）
+一个进程持有检测模型，通过Unix域套接字接收其他本地进程（界面、录像、分析任务）的检测请求；
+图像帧经共享内存传递，来自多个连接的帧动态合并为批量推理，结果以检测元组返回
+"""
+
+import os
+import signal
+import socketserver
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..utils.logger import collect as collect_logging, get_logger
+from ..utils.metrics_server import MetricsServer, get_metrics_registry
+from ..config import Config, get_config
+from .batcher import DynamicBatcher
+from .protocol import ProtocolError, attach_shared_memory, recv_message, send_message, unpack_frames
+
+logger = get_logger(__name__)
+
+# 可通过服务提供的检测算法（跟踪有每个客户端自己的状态，不在服务端运行）
+SERVE_ALGORITHMS = ('haar', 'yolo11', 'fastestv2')
+
+# 各算法检测元组的坐标格式
+BOX_FORMATS = {'haar': 'xywh', 'yolo11': 'xyxy', 'fastestv2': 'xyxy'}
+
+
+def create_detector(detector_type: str):
+    """
+    创建检测器
+
+    Args:
+        detector_type: 'haar'、'yolo11' 或 'fastestv2'
+
+    Returns:
+        检测器实例（提供 detect_batch）
+    """
+    from ..detectors import HaarFaceDetector, YOLO11FaceDetector, YoloFastestV2Detector
+
+    if detector_type == 'haar':
+        return HaarFaceDetector()
+    if detector_type == 'yolo11':
+        return YOLO11FaceDetector()
+    if detector_type == 'fastestv2':
+        return YoloFastestV2Detector()
+    raise ValueError(f"不支持的检测算法: {detector_type}")
+
+
+class _Connection(socketserver.BaseRequestHandler):
+    """单个客户端连接：循环处理请求直到断开"""
+
+    server: '_UnixServer'
+
+    def setup(self):
+        self._shm = None
+        self.server.owner._connection_opened()
+
+    def handle(self):
+        while True:
+            try:
+                header, payload = recv_message(self.request)
+            except (ProtocolError, OSError):
+                return
+            try:
+                response = self._dispatch(header, payload)
+            except Exception as e:
+                response = {'ok': False, 'error': str(e), 'code': getattr(e, 'code', 'error')}
+            try:
+                send_message(self.request, response)
+            except OSError:
+                return
+
+    def finish(self):
+        self._release_shm()
+        self.server.owner._connection_closed()
+
+    def _release_shm(self):
+        """关闭本连接打开的共享内存"""
+        if self._shm is None:
+            return
+        try:
+            self._shm.close()
+        except BufferError:
+            # 仍有检测器持有该内存上的视图，交给垃圾回收
+            pass
+        self._shm = None
+
+    def _buffer(self, name: str):
+        """打开（或复用）客户端的共享内存"""
+        if self._shm is None or self._shm.name.lstrip('/') != name.lstrip('/'):
+            self._release_shm()
+            try:
+                self._shm = attach_shared_memory(name)
+            except OSError as e:
+                error = RuntimeError(f"无法打开共享内存 {name}: {e}")
+                error.code = 'shm_unavailable'
+                raise error from e
+        return self._shm.buf
+
+    def _dispatch(self, header: Dict[str, Any], payload: bytes) -> Dict[str, Any]:
+        """处理一条请求"""
+        owner = self.server.owner
+        op = header.get('op')
+        if op == 'info':
+            return dict(owner.info(), ok=True)
+        if op != 'detect':
+            raise ValueError(f"未知操作: {op}")
+
+        buffer = self._buffer(header['shm']) if header.get('shm') else payload
+        frames = unpack_frames(header.get('frames', []), buffer)
+        try:
+            detections = owner.batcher.detect_batch(frames, timeout=owner.request_timeout)
+        finally:
+            del frames
+        return {'ok': True, 'detections': [[list(det) for det in faces] for faces in detections]}
+
+
+class _UnixServer(socketserver.ThreadingUnixStreamServer):
+    """每个连接一个线程的Unix域套接字服务"""
+
+    daemon_threads = True
+    owner: 'InferenceServer' = None
+
+
+class InferenceServer:
+    """本地推理服务"""
+
+    def __init__(
+        self,
+        socket_path: Optional[str] = None,
+        detector_type: Optional[str] = None,
+        detector=None,
+        max_batch_size: Optional[int] = None,
+        max_delay_ms: Optional[float] = None,
+        config: Optional[Config] = None
+    ):
+        """
+        初始化
+
+        Args:
+            socket_path: Unix域套接字路径，None表示使用配置 serving.socket_path
+            detector_type: 检测算法，None表示使用配置 serving.detector
+            detector: 已创建的检测器（提供 detect_batch），None时按 detector_type 创建
+            max_batch_size: 单批最多帧数，None表示使用配置
+            max_delay_ms: 凑批最长等待（毫秒），None表示使用配置
+            config: 配置对象，None表示使用全局配置
+        """
+        self.config = config or get_config()
+        serving_config = self.config.get('serving', {})
+        self.socket_path = socket_path or serving_config.get('socket_path', '/tmp/yoloface.sock')
+        self.detector_type = detector_type or serving_config.get('detector', 'yolo11')
+        if self.detector_type not in SERVE_ALGORITHMS:
+            raise ValueError(f"不支持的检测算法: {self.detector_type}")
+        self.socket_mode = int(str(serving_config.get('socket_mode', '660')), 8)
+        self.request_timeout = serving_config.get('request_timeout', 30.0)
+        self.detector = detector if detector is not None else create_detector(self.detector_type)
+
+        self._lock = threading.Lock()
+        self.connections = 0
+        self.batcher = DynamicBatcher(
+            self.detector.detect_batch,
+            max_batch_size=max_batch_size if max_batch_size is not None else serving_config.get('max_batch_size', 4),
+            max_delay_ms=max_delay_ms if max_delay_ms is not None else serving_config.get('max_delay_ms', 5.0),
+            expected_requests=lambda: self.connections
+        )
+        self._server: Optional[_UnixServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def info(self) -> Dict[str, Any]:
+        """服务信息（客户端据此确定检测元组格式）"""
+        return {
+            'detector': self.detector_type,
+            'box_format': BOX_FORMATS[self.detector_type],
+            'max_batch_size': self.batcher.max_batch_size,
+        }
+
+    def _connection_opened(self):
+        with self._lock:
+            self.connections += 1
+
+    def _connection_closed(self):
+        with self._lock:
+            self.connections -= 1
+
+    def start(self):
+        """在后台线程中开始服务"""
+        if self._server is not None:
+            return
+        if os.path.exists(self.socket_path):
+            # 上次异常退出留下的套接字文件
+            os.unlink(self.socket_path)
+        self.batcher.start()
+        server = _UnixServer(self.socket_path, _Connection)
+        server.owner = self
+        os.chmod(self.socket_path, self.socket_mode)
+        self._server = server
+        self._thread = threading.Thread(target=server.serve_forever, name='yoloface-serve', daemon=True)
+        self._thread.start()
+        logger.info(
+            f"推理服务已启动: {self.socket_path}（{self.detector_type}，"
+            f"每批最多 {self.batcher.max_batch_size} 帧，等待 {self.batcher.max_delay * 1000:.1f}ms）"
+        )
+
+    def stop(self):
+        """停止服务并删除套接字文件"""
+        server, self._server = self._server, None
+        if server is None:
+            return
+        server.shutdown()
+        server.server_close()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        self.batcher.stop()
+        try:
+            os.unlink(self.socket_path)
+        except FileNotFoundError:
+            pass
+        logger.info("推理服务已停止")
+
+    def collect(self) -> List[Tuple[str, str, str, float]]:
+        """监控指标采集函数（供 MetricsRegistry.add_collector 使用）"""
+        return [('serve_connections', 'gauge', '推理服务当前连接数', self.connections)] + self.batcher.collect()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+def main():
+    """yoloface-serve 命令行入口"""
+    import argparse
+    from ..config import load_config
+    from ..utils.logger import setup_logger
+
+    parser = argparse.ArgumentParser(description='本地人脸检测推理服务（Unix域套接字 + 共享内存）')
+    parser.add_argument('--config', '-c', type=str, default=None, help='配置文件路径')
+    parser.add_argument('--algorithm', '-a', choices=SERVE_ALGORITHMS, default=None,
+                        help='检测算法（默认使用配置 serving.detector）')
+    parser.add_argument('--socket', type=str, default=None, help='Unix域套接字路径（默认使用配置 serving.socket_path）')
+    parser.add_argument('--max-batch-size', type=int, default=None, help='单批最多帧数')
+    parser.add_argument('--max-delay-ms', type=float, default=None, help='凑批最长等待（毫秒）')
+    parser.add_argument('--http-port', type=int, default=None,
+                        help='同时提供图片检测HTTP接口（POST /detect）并指定端口，与套接字服务共用模型')
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help='启用本地监控指标服务并指定端口（仅监听127.0.0.1）')
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    log_config = config.get('logging', {})
+    setup_logger(
+        name='yoloface',
+        level=log_config.get('level', 'INFO'),
+        log_file=log_config.get('file'),
+        console=log_config.get('console', True),
+        format_str=log_config.get('format'),
+        use_queue=log_config.get('use_queue', False),
+        queue_size=log_config.get('queue_size', 10000),
+        max_bytes=int(log_config.get('max_file_mb', 0) * 1024 * 1024),
+        backup_count=log_config.get('backup_count', 3),
+        rate_limit=log_config.get('rate_limit', 0),
+        rate_limit_loggers=log_config.get('rate_limit_loggers')
+    )
+
+    server = InferenceServer(
+        socket_path=args.socket,
+        detector_type=args.algorithm,
+        max_batch_size=args.max_batch_size,
+        max_delay_ms=args.max_delay_ms,
+        config=config
+    )
+    http_server = None
+    if args.http_port is not None or config.get('serving.http.enabled', False):
+        from .http_api import DetectionHTTPServer
+        http_server = DetectionHTTPServer(
+            port=args.http_port,
+            detector_type=server.detector_type,
+            batcher=server.batcher,
+            config=config
+        )
+        # 两种接口的请求一起凑批
+        server.batcher.expected_requests = lambda: server.connections + http_server.in_flight
+
+    metrics_server = None
+    if args.metrics_port is not None:
+        registry = get_metrics_registry()
+        registry.add_collector(server.collect)
+        registry.add_collector(collect_logging)
+        if http_server is not None:
+            registry.add_collector(http_server.collect)
+        metrics_server = MetricsServer(registry, port=args.metrics_port)
+        metrics_server.start()
+
+    stop_event = threading.Event()
+    signal.signal(signal.SIGINT, lambda signum, frame: stop_event.set())
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop_event.set())
+    server.start()
+    if http_server is not None:
+        http_server.start()
+    try:
+        stop_event.wait()
+    finally:
+        if http_server is not None:
+            http_server.stop()
+        server.stop()
+        if metrics_server is not None:
+            metrics_server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -3,15 +3,21 @@
 """
 
 from .logger import setup_logger, get_logger
-from .video import VideoCapture, draw_info
+from .video import VideoCapture, MultiVideoCapture, draw_info, open_capture
 from .file_utils import ensure_dir, get_model_path
+from .profiler import StageProfiler, LatencyHistogram, get_profiler
 
 __all__ = [
     'setup_logger',
     'get_logger',
     'VideoCapture',
+    'MultiVideoCapture',
     'draw_info',
+    'open_capture',
     'ensure_dir',
-    'get_model_path'
+    'get_model_path',
+    'StageProfiler',
+    'LatencyHistogram',
+    'get_profiler'
 ]
 
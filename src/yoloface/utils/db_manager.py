@@ -1,13 +1,20 @@
 """
-数据库管理模块（文件存储版本）
-使用本地JSON文件存储用户数据
+数据库管理模块
+用户数据存储在本地JSON文件（默认）或SQLite数据库中，由配置 user_store.backend 选择；
+SQLite后端以用户名唯一索引查询，适合大量用户
 """
 
+import csv
 import hashlib
 import json
 import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Tuple, Optional
+from typing import Any, Dict, Iterator, List, Tuple, Optional
 
 from ..utils.logger import get_logger
 from ..config import get_config
@@ -15,21 +22,81 @@ from ..config import get_config
 logger = get_logger(__name__)
 
 
+# 支持的存储后端
+STORE_BACKENDS = ('json', 'sqlite')
+
+_SQLITE_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT NOT NULL,
+        password TEXT NOT NULL,
+        created_at TEXT
+    )""",
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_users_username ON users(username)",
+)
+
+# 批量导入/导出支持的文件格式
+USER_FILE_FORMATS = ('csv', 'jsonl')
+
+# 导出的字段（导出文件中为密码哈希，可直接再导入）
+EXPORT_FIELDS = ('username', 'password_hash', 'created_at')
+
+_SHA256_HEX = re.compile(r'^[0-9a-f]{64}$')
+
+
+def _file_format(path: str, fmt: Optional[str]) -> str:
+    """根据参数或文件扩展名确定格式"""
+    fmt = fmt or Path(path).suffix.lstrip('.').lower()
+    if fmt == 'ndjson':
+        fmt = 'jsonl'
+    if fmt not in USER_FILE_FORMATS:
+        raise ValueError(f"不支持的用户文件格式: {fmt}（支持 csv、jsonl）")
+    return fmt
+
+
+def _iter_user_records(path: str, fmt: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """逐行读取用户文件，产生 (行号, 记录)"""
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        if fmt == 'csv':
+            reader = csv.DictReader(f)
+            for record in reader:
+                yield reader.line_num, record
+            return
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            yield line_no, record if isinstance(record, dict) else {}
+
+
 class DatabaseManager:
-    """数据库管理类（文件存储版本）"""
+    """数据库管理类（JSON文件或SQLite存储）"""
 
-    def __init__(self, data_file: Optional[str] = None):
+    def __init__(
+        self,
+        data_file: Optional[str] = None,
+        backend: Optional[str] = None,
+        db_file: Optional[str] = None
+    ):
         """
-        初始化文件存储管理器
+        初始化存储管理器
 
         Args:
-            data_file: 数据文件路径，如果为None则使用默认路径
+            data_file: JSON数据文件路径，如果为None则使用默认路径（SQLite后端首次使用时从该文件迁移）
+            backend: 存储后端 'json' 或 'sqlite'，None表示使用配置 user_store.backend
+            db_file: SQLite数据库路径，None表示使用配置 user_store.sqlite_file（默认输出目录下的 users.db）
         """
+        store_config = {}
         try:
             config = get_config()
             # 获取数据目录配置
             paths_config = config.get('paths', {})
             output_dir = paths_config.get('output_dir', 'data/output')
+            store_config = config.get('user_store', {}) or {}
         except Exception as e:
             logger.warning(f"获取配置失败，使用默认值: {e}")
             output_dir = 'data/output'
@@ -44,12 +111,86 @@ class DatabaseManager:
         else:
             self.data_file = output_path / 'users.json'
         
+        self.backend = backend or store_config.get('backend', 'json')
+        if self.backend not in STORE_BACKENDS:
+            raise ValueError(f"不支持的用户存储后端: {self.backend}")
+        
+        self._db: Optional[sqlite3.Connection] = None
+        # 同一连接（或JSON缓存）可能被界面线程和后台线程使用
+        self._lock = threading.Lock()
+        # JSON存储的内存缓存：文件内容、按用户名的索引，以及加载时文件的 (mtime, size)
+        self._data: Optional[dict] = None
+        self._users: Dict[str, Dict[str, Any]] = {}
+        self._stamp: Optional[Tuple[int, int]] = None
+        if self.backend == 'sqlite':
+            db_file = db_file or store_config.get('sqlite_file')
+            self.db_file = Path(db_file) if db_file else output_path / 'users.db'
+            self._open_db()
+            logger.info(f"使用SQLite存储: {self.db_file}")
+            return
+        
         # 确保数据文件存在
         if not self.data_file.exists():
             self._init_data_file()
         
         logger.info(f"使用文件存储: {self.data_file}")
 
+    def _open_db(self):
+        """打开SQLite数据库（持久连接，WAL模式），首次使用时从JSON文件迁移"""
+        self.db_file.parent.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(str(self.db_file), check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        with db:
+            for statement in _SQLITE_SCHEMA:
+                db.execute(statement)
+        self._db = db
+        
+        empty = db.execute("SELECT 1 FROM users LIMIT 1").fetchone() is None
+        if empty and self.data_file.exists():
+            self.migrate_from_json()
+
+    def _sqlite(self) -> sqlite3.Connection:
+        """返回SQLite连接，断开后再次使用时重新打开"""
+        if self._db is None:
+            self._open_db()
+        return self._db
+
+    def migrate_from_json(self, json_file: Optional[str] = None) -> int:
+        """
+        将JSON文件中的用户导入SQLite数据库（已存在的用户名跳过）
+
+        Args:
+            json_file: JSON数据文件路径，None表示使用 data_file
+
+        Returns:
+            导入的用户数
+        """
+        if self.backend != 'sqlite':
+            raise RuntimeError("仅SQLite存储支持迁移")
+        db = self._sqlite()
+        source = Path(json_file) if json_file else self.data_file
+        try:
+            with open(source, 'r', encoding='utf-8') as f:
+                users = json.load(f).get('users', [])
+        except (OSError, ValueError, AttributeError) as e:
+            logger.warning(f"读取用户数据文件失败，跳过迁移: {e}")
+            return 0
+        
+        rows = [
+            (user['username'], user.get('password', ''), user.get('created_at'))
+            for user in users
+            if isinstance(user, dict) and user.get('username')
+        ]
+        with self._lock, db:
+            before = db.total_changes
+            db.executemany(
+                "INSERT OR IGNORE INTO users (username, password, created_at) VALUES (?, ?, ?)", rows
+            )
+            imported = db.total_changes - before
+        logger.info(f"已从 {source} 迁移 {imported} 个用户到 {self.db_file}")
+        return imported
+
     def _init_data_file(self):
         """初始化数据文件"""
         try:
@@ -81,6 +222,33 @@ class DatabaseManager:
             logger.error(f"加载数据文件失败: {e}")
             return {'users': []}
 
+    def _file_stamp(self) -> Optional[Tuple[int, int]]:
+        """数据文件的 (mtime, size)，文件不存在时返回None"""
+        try:
+            stat = self.data_file.stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _cached_users(self) -> Dict[str, Dict[str, Any]]:
+        """
+        按用户名索引的用户记录（需持有锁）
+        首次调用时加载数据文件，之后仅在文件的修改时间或大小变化（如被其他进程改写）时重新加载
+
+        Returns:
+            {用户名: 用户记录}
+        """
+        stamp = self._file_stamp()
+        if self._data is None or stamp is None or stamp != self._stamp:
+            data = self._load_data()
+            users: Dict[str, Dict[str, Any]] = {}
+            for user in data['users']:
+                # 重复的用户名以第一条为准
+                users.setdefault(user.get('username'), user)
+            self._data, self._users = data, users
+            self._stamp = self._file_stamp()
+        return self._users
+
     def _save_data(self, data: dict):
         """保存数据到文件"""
         try:
@@ -108,7 +276,16 @@ class DatabaseManager:
             raise
 
     def connect(self) -> bool:
-        """连接（文件存储版本，总是返回True）"""
+        """连接（文件存储验证读写，SQLite存储在连接关闭后重新打开）"""
+        if self.backend == 'sqlite':
+            try:
+                if self._db is None:
+                    self._open_db()
+                self._db.execute("SELECT 1")
+                return True
+            except sqlite3.Error as e:
+                logger.error(f"SQLite存储连接失败: {e}")
+                return False
         try:
             # 确保数据文件存在
             if not self.data_file.exists():
@@ -126,15 +303,25 @@ class DatabaseManager:
 
     @property
     def connection(self):
-        """兼容性属性，返回self（表示已连接）"""
+        """兼容性属性，返回SQLite连接或self（表示已连接），未连接时为None"""
+        if self.backend == 'sqlite':
+            return self._db
         return self if self.data_file.exists() else None
 
     def disconnect(self):
         """断开连接（文件存储版本，无需操作）"""
+        if self._db is not None:
+            with self._lock:
+                self._db.close()
+                self._db = None
+            logger.info("SQLite存储连接已关闭")
+            return
         logger.info("文件存储连接已关闭")
 
     def create_user_table(self) -> bool:
-        """创建用户表（文件存储版本，确保数据文件存在）"""
+        """创建用户表（SQLite建表建索引，文件存储确保数据文件存在）"""
+        if self.backend == 'sqlite':
+            return self.connect()
         try:
             if not self.data_file.exists():
                 self._init_data_file()
@@ -156,6 +343,22 @@ class DatabaseManager:
         """对密码进行哈希处理"""
         return hashlib.sha256(password.encode()).hexdigest()
 
+    @staticmethod
+    def validate_credentials(username: str, password: str) -> Optional[str]:
+        """
+        检查注册用的用户名和密码
+
+        Returns:
+            不合法时返回原因，否则返回None
+        """
+        if not username or not password:
+            return "用户名和密码不能为空"
+        if len(username) < 3:
+            return "用户名长度至少为3个字符"
+        if len(password) < 6:
+            return "密码长度至少为6个字符"
+        return None
+
     def register_user(self, username: str, password: str) -> Tuple[bool, str]:
         """
         注册新用户
@@ -167,36 +370,47 @@ class DatabaseManager:
         Returns:
             (success, message)
         """
-        if not username or not password:
-            return False, "用户名和密码不能为空"
-
-        if len(username) < 3:
-            return False, "用户名长度至少为3个字符"
-
-        if len(password) < 6:
-            return False, "密码长度至少为6个字符"
+        error = self.validate_credentials(username, password)
+        if error:
+            return False, error
 
         try:
-            data = self._load_data()
-            users = data.get('users', [])
-            
-            # 检查用户是否已存在
-            for user in users:
-                if user.get('username') == username:
+            if self.backend == 'sqlite':
+                db = self._sqlite()
+                try:
+                    with self._lock, db:
+                        db.execute(
+                            "INSERT INTO users (username, password, created_at) VALUES (?, ?, ?)",
+                            (username, self.hash_password(password), self._get_timestamp())
+                        )
+                except sqlite3.IntegrityError:
                     return False, "用户名已存在"
+                logger.info(f"用户注册成功: {username}")
+                return True, "注册成功"
             
-            # 添加新用户
-            hashed_password = self.hash_password(password)
-            new_user = {
-                'id': len(users) + 1,
-                'username': username,
-                'password': hashed_password,
-                'created_at': self._get_timestamp()
-            }
-            users.append(new_user)
-            data['users'] = users
-            
-            self._save_data(data)
+            with self._lock:
+                index = self._cached_users()
+                # 检查用户是否已存在
+                if username in index:
+                    return False, "用户名已存在"
+                
+                # 添加新用户
+                users = self._data['users']
+                hashed_password = self.hash_password(password)
+                new_user = {
+                    'id': len(users) + 1,
+                    'username': username,
+                    'password': hashed_password,
+                    'created_at': self._get_timestamp()
+                }
+                users.append(new_user)
+                try:
+                    self._save_data(self._data)
+                except Exception:
+                    users.pop()
+                    raise
+                index[username] = new_user
+                self._stamp = self._file_stamp()
             logger.info(f"用户注册成功: {username}")
             return True, "注册成功"
             
@@ -219,16 +433,7 @@ class DatabaseManager:
             return False, "用户名和密码不能为空"
 
         try:
-            data = self._load_data()
-            users = data.get('users', [])
-            
-            # 查找用户
-            user = None
-            for u in users:
-                if u.get('username') == username:
-                    user = u
-                    break
-            
+            user = self._find_user(username)
             if user is None:
                 return False, "用户不存在"
             
@@ -250,19 +455,246 @@ class DatabaseManager:
     def user_exists(self, username: str) -> bool:
         """检查用户是否存在"""
         try:
-            data = self._load_data()
-            users = data.get('users', [])
-            
-            for user in users:
-                if user.get('username') == username:
-                    return True
-            return False
+            return self._find_user(username) is not None
         except Exception as e:
             logger.error(f"检查用户失败: {e}")
             return False
 
+    def import_users(
+        self,
+        path: str,
+        fmt: Optional[str] = None,
+        workers: Optional[int] = None,
+        chunk_size: int = 2000
+    ) -> Dict[str, Any]:
+        """
+        从CSV或JSONL文件批量导入用户
+        逐行读取并校验，明文密码在进程池中哈希，全部用户在一个事务（SQLite）或一次原子写入（JSON）中保存；
+        已存在或文件内重复的用户名跳过
+
+        Args:
+            path: 用户文件，每条记录含 username 与 password（明文），或 password_hash（导出文件中的哈希）
+            fmt: 'csv' 或 'jsonl'，None表示按扩展名判断
+            workers: 哈希进程数，None表示CPU核数，1表示在本进程中计算
+            chunk_size: 每个进程任务的密码数
+
+        Returns:
+            报告：imported、skipped、invalid、errors（前20条不合法记录）、seconds、users_per_second
+        """
+        start = time.perf_counter()
+        fmt = _file_format(path, fmt)
+        now = self._get_timestamp()
+        rows: List[List[Any]] = []
+        plain: List[Tuple[int, str]] = []
+        seen = set()
+        skipped = invalid = 0
+        errors: List[str] = []
+        for line_no, record in _iter_user_records(path, fmt):
+            username = str(record.get('username') or '').strip()
+            password_hash = str(record.get('password_hash') or '').strip().lower()
+            password = str(record.get('password') or '')
+            if password_hash:
+                error = self.validate_credentials(username, 'x' * 6)
+                if error is None and not _SHA256_HEX.match(password_hash):
+                    error = "password_hash 不是SHA-256十六进制串"
+            else:
+                error = self.validate_credentials(username, password)
+            if error:
+                invalid += 1
+                if len(errors) < 20:
+                    errors.append(f"第{line_no}行: {error}")
+                continue
+            if username in seen:
+                skipped += 1
+                continue
+            seen.add(username)
+            if not password_hash:
+                plain.append((len(rows), password))
+            rows.append([username, password_hash, record.get('created_at') or now])
+        
+        for (index, _), hashed in zip(plain, self._hash_passwords([p for _, p in plain], workers, chunk_size)):
+            rows[index][1] = hashed
+        
+        imported = self._insert_users(rows)
+        skipped += len(rows) - imported
+        seconds = time.perf_counter() - start
+        report = {
+            'imported': imported,
+            'skipped': skipped,
+            'invalid': invalid,
+            'errors': errors,
+            'seconds': seconds,
+            'users_per_second': (imported + skipped + invalid) / seconds if seconds > 0 else 0.0,
+        }
+        logger.info(
+            f"批量导入 {path}: 导入 {imported}，跳过 {skipped}，不合法 {invalid}，"
+            f"耗时 {seconds:.2f}s（{report['users_per_second']:.0f} 条/秒）"
+        )
+        return report
+
+    @classmethod
+    def _hash_passwords(cls, passwords: List[str], workers: Optional[int], chunk_size: int) -> List[str]:
+        """批量哈希密码，数量超过一个任务时分块交给进程池"""
+        workers = workers if workers is not None else (os.cpu_count() or 1)
+        if workers <= 1 or len(passwords) <= chunk_size:
+            return [cls.hash_password(password) for password in passwords]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(cls.hash_password, passwords, chunksize=chunk_size))
+
+    def _insert_users(self, rows: List[List[Any]]) -> int:
+        """在一个事务或一次文件写入中保存 [用户名, 密码哈希, 创建时间]，返回实际新增的用户数"""
+        if self.backend == 'sqlite':
+            db = self._sqlite()
+            with self._lock, db:
+                before = db.total_changes
+                db.executemany(
+                    "INSERT OR IGNORE INTO users (username, password, created_at) VALUES (?, ?, ?)", rows
+                )
+                return db.total_changes - before
+        
+        with self._lock:
+            index = self._cached_users()
+            users = self._data['users']
+            count = len(users)
+            new_users = [
+                {'id': count + i + 1, 'username': username, 'password': password, 'created_at': created_at}
+                for i, (username, password, created_at) in enumerate(
+                    row for row in rows if row[0] not in index
+                )
+            ]
+            if not new_users:
+                return 0
+            users.extend(new_users)
+            try:
+                self._save_data(self._data)
+            except Exception:
+                del users[count:]
+                raise
+            for user in new_users:
+                index[user['username']] = user
+            self._stamp = self._file_stamp()
+            return len(new_users)
+
+    def export_users(self, path: str, fmt: Optional[str] = None) -> Dict[str, Any]:
+        """
+        将全部用户逐条导出为CSV或JSONL（写入临时文件后替换，导出文件可再用 import_users 导入）
+
+        Args:
+            path: 导出文件路径
+            fmt: 'csv' 或 'jsonl'，None表示按扩展名判断
+
+        Returns:
+            报告：exported、seconds、users_per_second
+        """
+        start = time.perf_counter()
+        fmt = _file_format(path, fmt)
+        temp_file = Path(str(path) + '.tmp')
+        exported = 0
+        try:
+            with open(temp_file, 'w', encoding='utf-8', newline='') as f:
+                writer = csv.writer(f) if fmt == 'csv' else None
+                if writer is not None:
+                    writer.writerow(EXPORT_FIELDS)
+                for username, password, created_at in self._iter_users():
+                    if not _SHA256_HEX.match(password or ''):
+                        # 旧数据中的明文密码导出为哈希（登录时两种形式都可验证）
+                        password = self.hash_password(password or '')
+                    if writer is not None:
+                        writer.writerow((username, password, created_at or ''))
+                    else:
+                        f.write(json.dumps(dict(zip(EXPORT_FIELDS, (username, password, created_at))),
+                                           ensure_ascii=False) + '\n')
+                    exported += 1
+            os.replace(temp_file, path)
+        except Exception:
+            try:
+                temp_file.unlink()
+            except OSError:
+                pass
+            raise
+        seconds = time.perf_counter() - start
+        logger.info(f"已导出 {exported} 个用户到 {path}，耗时 {seconds:.2f}s")
+        return {
+            'exported': exported,
+            'seconds': seconds,
+            'users_per_second': exported / seconds if seconds > 0 else 0.0,
+        }
+
+    def _iter_users(self) -> Iterator[Tuple[str, str, Optional[str]]]:
+        """逐条产生 (用户名, 密码, 创建时间)"""
+        if self.backend == 'sqlite':
+            db = self._sqlite()
+            with self._lock:
+                cursor = db.execute("SELECT username, password, created_at FROM users ORDER BY id")
+                for row in cursor:
+                    yield row
+            return
+        
+        with self._lock:
+            users = list(self._cached_users().values())
+        for user in users:
+            yield user.get('username'), user.get('password', ''), user.get('created_at')
+
+    def _find_user(self, username: str) -> Optional[Dict[str, Any]]:
+        """按用户名查找用户记录，不存在时返回None"""
+        if self.backend == 'sqlite':
+            db = self._sqlite()
+            with self._lock:
+                row = db.execute(
+                    "SELECT id, username, password, created_at FROM users WHERE username = ?", (username,)
+                ).fetchone()
+            if row is None:
+                return None
+            return dict(zip(('id', 'username', 'password', 'created_at'), row))
+        
+        with self._lock:
+            return self._cached_users().get(username)
+
     @staticmethod
     def _get_timestamp() -> str:
         """获取当前时间戳字符串"""
         from datetime import datetime
         return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+def main():
+    """yoloface-users 命令行入口：批量导入/导出用户"""
+    import argparse
+    from ..config import load_config
+
+    parser = argparse.ArgumentParser(description='用户批量导入/导出（CSV 或 JSONL）')
+    parser.add_argument('--config', '-c', type=str, default=None, help='配置文件路径')
+    parser.add_argument('--backend', choices=STORE_BACKENDS, default=None,
+                        help='存储后端（默认使用配置 user_store.backend）')
+    parser.add_argument('--data-file', type=str, default=None, help='JSON数据文件路径')
+    parser.add_argument('--db-file', type=str, default=None, help='SQLite数据库路径')
+    parser.add_argument('--format', dest='fmt', choices=USER_FILE_FORMATS, default=None,
+                        help='文件格式（默认按扩展名判断）')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    import_parser = subparsers.add_parser('import', help='导入用户（username,password 或 username,password_hash）')
+    import_parser.add_argument('file', help='CSV 或 JSONL 文件')
+    import_parser.add_argument('--workers', type=int, default=None, help='哈希进程数（默认CPU核数）')
+    export_parser = subparsers.add_parser('export', help='导出用户（密码为哈希）')
+    export_parser.add_argument('file', help='CSV 或 JSONL 文件')
+    args = parser.parse_args()
+
+    load_config(args.config)
+    db = DatabaseManager(args.data_file, backend=args.backend, db_file=args.db_file)
+    try:
+        if args.command == 'import':
+            report = db.import_users(args.file, args.fmt, workers=args.workers)
+            for error in report['errors']:
+                print(error)
+            print(
+                f"导入 {report['imported']}，跳过 {report['skipped']}，不合法 {report['invalid']}；"
+                f"耗时 {report['seconds']:.2f}s，{report['users_per_second']:.0f} 条/秒"
+            )
+        else:
+            report = db.export_users(args.file, args.fmt)
+            print(f"导出 {report['exported']}；耗时 {report['seconds']:.2f}s，{report['users_per_second']:.0f} 条/秒")
+    finally:
+        db.disconnect()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,78 +1,358 @@
 """
 日志工具模块
+支持经有界队列在后台线程写日志（QueueHandler/QueueListener），帧循环中的日志调用不等待磁盘或终端；
+逐帧重复出现的日志可按时间窗口限流合并
 """
 
+import atexit
 import logging
+import logging.handlers
 import os
+import queue
+import threading
+import time
+from collections import OrderedDict
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
+
+# 项目日志根记录器名，子模块记录器（yoloface.xxx）的日志传递给它统一输出
+ROOT_LOGGER = 'yoloface'
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """队列满时丢弃日志并计数的 QueueHandler（调用方线程从不阻塞）"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _QueueListener(logging.handlers.QueueListener):
+    """停止时阻塞放入结束标记（有界队列已满时等待后台线程腾出空间，保证剩余日志写完）"""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+def _repeat_message(message: str, elapsed: float, repeated: int) -> str:
+    """附带重复次数的日志消息"""
+    return f"{message}（前 {elapsed:.0f} 秒内另有 {repeated} 条相同日志）"
+
+
+def _label_value(value: str) -> str:
+    """转义Prometheus标签值"""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    重复日志限流：同一记录器、同一级别、同一消息模板的日志在时间窗口内只输出第一条，
+    窗口结束后的下一条附带期间被抑制的条数；之后不再出现的消息由 flush() 补发汇总
+    （日志调用、指标采集与 shutdown_logging 时检查已结束的窗口）。
+    消息按未格式化的模板区分，参数（如异常信息）不同的同类日志视为重复
+    """
+
+    # 检查已结束窗口的最小间隔（秒）
+    sweep_interval = 1.0
+
+    def __init__(
+        self,
+        window: float = 10.0,
+        logger_windows: Optional[Dict[str, float]] = None,
+        max_messages: int = 512
+    ):
+        """
+        初始化
+
+        Args:
+            window: 默认时间窗口（秒），0表示不限流
+            logger_windows: 按记录器名（含其子记录器）覆盖的时间窗口，如 {'yoloface.detectors': 30}
+            max_messages: 最多跟踪的不同消息数，超出时淘汰最久未出现的
+        """
+        super().__init__()
+        self.window = float(window)
+        self.logger_windows = {name: float(value) for name, value in (logger_windows or {}).items()}
+        self.max_messages = max(1, max_messages)
+        self._lock = threading.Lock()
+        self._windows: Dict[str, float] = {}
+        # (记录器, 级别, 模板) -> [窗口开始时间, 窗口内抑制数, 总次数, 总抑制数, 最近一条被抑制日志的参数]
+        self._messages: 'OrderedDict[Tuple[str, int, str], list]' = OrderedDict()
+        self._last_sweep = time.monotonic()
+
+    def window_for(self, name: str) -> float:
+        """记录器适用的时间窗口（按最长的名称前缀匹配）"""
+        window = self._windows.get(name)
+        if window is None:
+            window = self.window
+            best = -1
+            for prefix, value in self.logger_windows.items():
+                if (name == prefix or name.startswith(prefix + '.')) and len(prefix) > best:
+                    window, best = value, len(prefix)
+            self._windows[name] = window
+        return window
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        # 同一条记录经过多个handler时只判定一次
+        decided = getattr(record, '_rate_limit_pass', None)
+        if decided is not None:
+            return decided
+        record._rate_limit_pass = passed = self._check(record)
+        return passed
+
+    def _check(self, record: logging.LogRecord) -> bool:
+        window = self.window_for(record.name)
+        if window <= 0:
+            return True
+        key = (record.name, record.levelno, str(record.msg))
+        now = time.monotonic()
+        if now - self._last_sweep >= self.sweep_interval:
+            self.flush(now=now)
+        with self._lock:
+            state = self._messages.get(key)
+            if state is None:
+                self._messages[key] = [now, 0, 1, 0, None]
+                if len(self._messages) > self.max_messages:
+                    self._messages.popitem(last=False)
+                return True
+            self._messages.move_to_end(key)
+            state[2] += 1
+            elapsed = now - state[0]
+            if elapsed < window:
+                state[1] += 1
+                state[3] += 1
+                state[4] = record.args
+                return False
+            repeated = state[1]
+            state[0], state[1] = now, 0
+        if repeated:
+            record.msg = _repeat_message(record.msg, elapsed, repeated)
+        return True
+
+    def flush(self, force: bool = False, now: Optional[float] = None) -> int:
+        """
+        补发已结束窗口的重复次数汇总（窗口结束后该消息没有再出现时，_check 不会输出汇总）
+
+        Args:
+            force: 不等窗口结束，补发所有未输出的汇总（关闭日志时使用）
+            now: 当前时间（time.monotonic()），默认取当前时间
+
+        Returns:
+            补发的汇总条数
+        """
+        now = time.monotonic() if now is None else now
+        pending = []
+        with self._lock:
+            self._last_sweep = now
+            for (name, level, message), state in self._messages.items():
+                elapsed = now - state[0]
+                if state[1] and (force or elapsed >= self.window_for(name)):
+                    pending.append((name, level, message, state[4], elapsed, state[1]))
+                    state[0], state[1] = now, 0
+        for name, level, message, args, elapsed, repeated in pending:
+            if args:
+                try:
+                    message = message % args
+                except (TypeError, ValueError, KeyError):
+                    pass
+            logger = logging.getLogger(name)
+            record = logger.makeRecord(name, level, '(rate-limit)', 0,
+                                       _repeat_message(message, elapsed, repeated), (), None)
+            # 汇总本身不再参与限流
+            record._rate_limit_pass = True
+            logger.handle(record)
+        return len(pending)
+
+    def collect(self) -> List[Tuple[str, str, str, float]]:
+        """监控指标采集函数：各条被限流消息的出现与抑制次数"""
+        with self._lock:
+            items = [(key, state[2], state[3]) for key, state in self._messages.items() if state[3]]
+        metrics = [('log_suppressed_total', 'counter', '被限流抑制的重复日志条数',
+                    sum(suppressed for _, _, suppressed in items))]
+        labelled = [(f'logger="{_label_value(name)}",level="{logging.getLevelName(level)}",'
+                     f'message="{_label_value(message[:120])}"', total, suppressed)
+                    for (name, level, message), total, suppressed in items]
+        # 同一指标的各条样本连续输出
+        metrics.extend((f'log_repeated_messages_total{{{labels}}}', 'counter', '被限流消息的出现次数', total)
+                       for labels, total, _ in labelled)
+        metrics.extend((f'log_suppressed_messages_total{{{labels}}}', 'counter', '被限流消息的抑制次数', suppressed)
+                       for labels, _, suppressed in labelled)
+        return metrics
+
+
+# 各记录器的 (后台写日志线程, 队列handler)
+_queue_logging: Dict[str, Tuple[_QueueListener, DroppingQueueHandler]] = {}
+# 各记录器的重复日志限流器
+_rate_limiters: Dict[str, RateLimitFilter] = {}
+_queue_lock = threading.Lock()
+
+
+def _remove_handlers(logger: logging.Logger):
+    """移除并关闭记录器已有的handler（含后台写日志线程）"""
+    with _queue_lock:
+        entry = _queue_logging.pop(logger.name, None)
+        _rate_limiters.pop(logger.name, None)
+    if entry is not None:
+        entry[0].stop()
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+    if entry is not None:
+        for handler in entry[0].handlers:
+            handler.close()
 
 
 def setup_logger(
-    name: str = 'yoloface',
+    name: str = ROOT_LOGGER,
     level: str = 'INFO',
     log_file: Optional[str] = None,
     console: bool = True,
-    format_str: Optional[str] = None
+    format_str: Optional[str] = None,
+    use_queue: bool = False,
+    queue_size: int = 10000,
+    max_bytes: int = 0,
+    backup_count: int = 3,
+    rate_limit: float = 0.0,
+    rate_limit_loggers: Optional[Dict[str, float]] = None
 ) -> logging.Logger:
     """
     设置日志记录器
-    
+
     Args:
         name: 日志记录器名称
         level: 日志级别
         log_file: 日志文件路径
         console: 是否输出到控制台
         format_str: 日志格式
-        
+        use_queue: 是否经有界队列在后台线程写日志
+        queue_size: 队列容量，队列满时丢弃新日志并计数
+        max_bytes: 日志文件大小上限（字节），超过后轮转；0表示不轮转
+        backup_count: 轮转保留的旧日志文件数
+        rate_limit: 重复日志限流的时间窗口（秒），0表示不限流
+        rate_limit_loggers: 按记录器名覆盖的限流时间窗口（秒）
+
     Returns:
         配置好的日志记录器
     """
     logger = logging.getLogger(name)
     logger.setLevel(getattr(logging, level.upper()))
-    
-    # 避免重复添加handler
-    if logger.handlers:
-        return logger
-    
+
+    # 重复调用时替换已有的handler（如 get_logger 使用的默认配置），避免重复输出
+    _remove_handlers(logger)
+
     # 默认格式
     if format_str is None:
         format_str = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    
+
     formatter = logging.Formatter(format_str)
-    
+    handlers: List[logging.Handler] = []
+
     # 控制台输出
     if console:
         console_handler = logging.StreamHandler()
         console_handler.setFormatter(formatter)
-        logger.addHandler(console_handler)
-    
+        handlers.append(console_handler)
+
     # 文件输出
     if log_file:
         # 确保日志目录存在
         log_path = Path(log_file)
         log_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        file_handler = logging.FileHandler(log_file, encoding='utf-8')
+
+        if max_bytes > 0:
+            file_handler = logging.handlers.RotatingFileHandler(
+                log_file, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8'
+            )
+        else:
+            file_handler = logging.FileHandler(log_file, encoding='utf-8')
         file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
-    
+        handlers.append(file_handler)
+
+    if use_queue and handlers:
+        queue_handler = DroppingQueueHandler(queue.Queue(maxsize=max(1, queue_size)))
+        listener = _QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+        listener.start()
+        with _queue_lock:
+            _queue_logging[name] = (listener, queue_handler)
+        handlers = [queue_handler]
+
+    if rate_limit > 0 or rate_limit_loggers:
+        # 加在记录器直接使用的handler上：子记录器传递上来的日志同样经过，且在入队/格式化之前丢弃
+        rate_limiter = RateLimitFilter(rate_limit, rate_limit_loggers)
+        for handler in handlers:
+            handler.addFilter(rate_limiter)
+        with _queue_lock:
+            _rate_limiters[name] = rate_limiter
+
+    for handler in handlers:
+        logger.addHandler(handler)
+
     return logger
 
 
-def get_logger(name: str = 'yoloface') -> logging.Logger:
+def get_logger(name: str = ROOT_LOGGER) -> logging.Logger:
     """
     获取日志记录器
-    
+
     Args:
         name: 日志记录器名称
-        
+
     Returns:
         日志记录器
     """
     logger = logging.getLogger(name)
+    if name.startswith(ROOT_LOGGER + '.'):
+        # 子模块记录器不单独配置，日志传递给根记录器
+        root = logging.getLogger(ROOT_LOGGER)
+        if not root.handlers:
+            setup_logger(ROOT_LOGGER)
+        return logger
     if not logger.handlers:
         # 如果没有配置，使用默认配置
         setup_logger(name)
     return logger
 
+
+def dropped_log_count() -> int:
+    """因队列满被丢弃的日志条数"""
+    with _queue_lock:
+        return sum(handler.dropped for _, handler in _queue_logging.values())
+
+
+def collect() -> List[Tuple[str, str, str, float]]:
+    """监控指标采集函数（供 MetricsRegistry.add_collector 使用）"""
+    with _queue_lock:
+        entries = list(_queue_logging.values())
+        rate_limiters = list(_rate_limiters.values())
+    metrics = [
+        ('log_dropped_total', 'counter', '日志队列满时丢弃的日志条数',
+         sum(handler.dropped for _, handler in entries)),
+        ('log_queue_depth', 'gauge', '等待写出的日志条数',
+         sum(handler.queue.qsize() for _, handler in entries)),
+    ]
+    for rate_limiter in rate_limiters:
+        rate_limiter.flush()
+        metrics.extend(rate_limiter.collect())
+    return metrics
+
+
+def shutdown_logging():
+    """补发未输出的重复日志汇总，停止后台写日志线程，写完队列中剩余的日志"""
+    with _queue_lock:
+        names = list(_queue_logging)
+        rate_limiters = list(_rate_limiters.values())
+    for rate_limiter in rate_limiters:
+        rate_limiter.flush(force=True)
+    for name in names:
+        with _queue_lock:
+            entry = _queue_logging.pop(name, None)
+        if entry is not None:
+            entry[0].stop()
+
+
+atexit.register(shutdown_logging)
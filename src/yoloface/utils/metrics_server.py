@@ -0,0 +1,257 @@
+"""
+本地监控指标HTTP服务
+基于标准库 http.server，以Prometheus文本格式输出运行指标
+"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .logger import get_logger
+from .profiler import StageProfiler, get_profiler
+
+logger = get_logger(__name__)
+
+METRIC_PREFIX = 'yoloface_'
+
+# 采集函数返回 [(指标名, 类型, 说明, 值), ...]
+Collector = Callable[[], List[Tuple[str, str, str, float]]]
+
+
+def _read_rss_bytes() -> Optional[int]:
+    """读取当前进程常驻内存（字节）"""
+    try:
+        with open('/proc/self/status', 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        # Linux下单位为KB（峰值），作为近似值
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except Exception:
+        return None
+
+
+def _format_value(value: float) -> str:
+    """格式化指标值"""
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class MetricsRegistry:
+    """运行指标注册表（线程安全）"""
+
+    def __init__(self, profiler: Optional[StageProfiler] = None):
+        """
+        初始化注册表
+
+        Args:
+            profiler: 分阶段延迟统计器，None表示使用全局实例
+        """
+        self._lock = threading.Lock()
+        self._values: Dict[str, Tuple[str, str, float]] = {}
+        self._collectors: List[Collector] = []
+        self._profiler = profiler
+        self._start_time = time.monotonic()
+
+    def set_gauge(self, name: str, value: float, help_text: str = ''):
+        """设置瞬时值指标"""
+        with self._lock:
+            self._values[name] = ('gauge', help_text, float(value))
+
+    def inc_counter(self, name: str, amount: float = 1.0, help_text: str = ''):
+        """累加计数器指标"""
+        with self._lock:
+            _, old_help, old_value = self._values.get(name, ('counter', help_text, 0.0))
+            self._values[name] = ('counter', help_text or old_help, old_value + amount)
+
+    def add_collector(self, collector: Collector):
+        """
+        注册采集函数，渲染时调用
+
+        Args:
+            collector: 返回 [(指标名, 类型, 说明, 值), ...] 的可调用对象
+        """
+        with self._lock:
+            self._collectors.append(collector)
+
+    def remove_collector(self, collector: Collector):
+        """移除采集函数"""
+        with self._lock:
+            if collector in self._collectors:
+                self._collectors.remove(collector)
+
+    def render(self) -> str:
+        """
+        渲染为Prometheus文本格式
+
+        Returns:
+            指标文本
+        """
+        with self._lock:
+            values = dict(self._values)
+            collectors = list(self._collectors)
+
+        lines: List[str] = []
+        declared = set()
+
+        def emit(name: str, metric_type: str, help_text: str, value: float):
+            # 指标名可带标签（name{label="value"}），同名指标只声明一次
+            full_name = METRIC_PREFIX + name
+            base_name = full_name.split('{', 1)[0]
+            if base_name not in declared:
+                declared.add(base_name)
+                if help_text:
+                    lines.append(f'# HELP {base_name} {help_text}')
+                lines.append(f'# TYPE {base_name} {metric_type}')
+            lines.append(f'{full_name} {_format_value(value)}')
+
+        emit('uptime_seconds', 'gauge', '进程运行时长（秒）',
+             time.monotonic() - self._start_time)
+        rss = _read_rss_bytes()
+        if rss is not None:
+            emit('process_resident_memory_bytes', 'gauge', '进程常驻内存（字节）', rss)
+
+        for name, (metric_type, help_text, value) in sorted(values.items()):
+            emit(name, metric_type, help_text, value)
+
+        for collector in collectors:
+            try:
+                for name, metric_type, help_text, value in collector():
+                    emit(name, metric_type, help_text, value)
+            except Exception as e:
+                logger.debug("指标采集失败: %s", e)
+
+        lines.extend(self._render_histograms())
+        return '\n'.join(lines) + '\n'
+
+    def _render_histograms(self) -> List[str]:
+        """将分阶段延迟直方图渲染为Prometheus histogram"""
+        profiler = self._profiler or get_profiler()
+        histograms = profiler.histograms()
+        if not histograms:
+            return []
+
+        name = METRIC_PREFIX + 'stage_latency_seconds'
+        lines = [
+            f'# HELP {name} 各处理阶段耗时（秒）',
+            f'# TYPE {name} histogram',
+        ]
+        for stage, hist in histograms.items():
+            cumulative = 0
+            for bound, count in zip(hist.bounds, hist.counts):
+                cumulative += count
+                lines.append(
+                    f'{name}_bucket{{stage="{stage}",le="{_format_value(bound / 1000.0)}"}} '
+                    f'{cumulative}'
+                )
+            lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {hist.count}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {_format_value(hist.total / 1000.0)}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {hist.count}')
+        return lines
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """指标请求处理器"""
+
+    registry: MetricsRegistry = None
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] not in ('/metrics', '/'):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # 不输出访问日志，避免刷屏
+        pass
+
+
+class MetricsServer:
+    """本地监控指标HTTP服务（独立线程运行）"""
+
+    def __init__(
+        self,
+        registry: Optional[MetricsRegistry] = None,
+        host: str = '127.0.0.1',
+        port: int = 9108
+    ):
+        """
+        初始化服务
+
+        Args:
+            registry: 指标注册表，None表示使用全局实例
+            host: 监听地址，默认仅本机
+            port: 监听端口，0表示自动分配
+        """
+        self.registry = registry or get_metrics_registry()
+        self.host = host
+        self.port = port
+        self._httpd: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        """实际监听地址"""
+        if self._httpd is None:
+            return self.host, self.port
+        return self._httpd.server_address[:2]
+
+    def start(self):
+        """启动服务"""
+        if self._httpd is not None:
+            return
+        handler = type('MetricsHandler', (_MetricsHandler,), {'registry': self.registry})
+        self._httpd = ThreadingHTTPServer((self.host, self.port), handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever,
+            name='yoloface-metrics',
+            daemon=True
+        )
+        self._thread.start()
+        host, port = self.address
+        logger.info(f"监控指标服务已启动: http://{host}:{port}/metrics")
+
+    def stop(self):
+        """停止服务"""
+        if self._httpd is None:
+            return
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+        self._httpd = None
+        self._thread = None
+        logger.info("监控指标服务已停止")
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+# 全局注册表实例
+_global_registry: Optional[MetricsRegistry] = None
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    """获取全局指标注册表"""
+    global _global_registry
+    if _global_registry is None:
+        _global_registry = MetricsRegistry()
+    return _global_registry
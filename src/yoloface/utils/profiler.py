@@ -0,0 +1,291 @@
+"""
+分阶段延迟统计模块
+使用单调时钟记录各处理阶段耗时，并汇总为固定分桶直方图
+"""
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+# 流水线阶段（按处理顺序）
+STAGES = (
+    'capture',
+    'preprocess',
+    'inference',
+    'postprocess',
+    'classification',
+    'drawing',
+    'display',
+)
+
+# 默认分桶上界（毫秒），最后一个桶为 +Inf
+DEFAULT_BUCKETS_MS = (1.0, 2.0, 5.0, 10.0, 20.0, 50.0, 100.0, 200.0, 500.0, 1000.0)
+
+
+class LatencyHistogram:
+    """固定分桶延迟直方图"""
+
+    __slots__ = ('bounds', 'counts', 'count', 'total', 'max')
+
+    def __init__(self, bounds: Sequence[float] = DEFAULT_BUCKETS_MS):
+        """
+        初始化直方图
+
+        Args:
+            bounds: 升序排列的分桶上界（毫秒）
+        """
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value_ms: float):
+        """记录一次耗时（毫秒）"""
+        self.counts[bisect_left(self.bounds, value_ms)] += 1
+        self.count += 1
+        self.total += value_ms
+        if value_ms > self.max:
+            self.max = value_ms
+
+    @property
+    def mean(self) -> float:
+        """平均耗时（毫秒）"""
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, q: float) -> float:
+        """
+        根据分桶估算分位数
+
+        Args:
+            q: 分位数，取值 0~1
+
+        Returns:
+            对应分桶的上界（毫秒），落在 +Inf 桶时返回观测到的最大值
+        """
+        if self.count == 0:
+            return 0.0
+        target = q * self.count
+        cumulative = 0
+        for i, c in enumerate(self.counts):
+            cumulative += c
+            if cumulative >= target:
+                return self.bounds[i] if i < len(self.bounds) else self.max
+        return self.max
+
+    def to_dict(self) -> Dict:
+        """转换为字典"""
+        return {
+            'buckets': list(self.bounds),
+            'counts': list(self.counts),
+            'count': self.count,
+            'sum_ms': round(self.total, 3),
+            'mean_ms': round(self.mean, 3),
+            'max_ms': round(self.max, 3),
+            'p50_ms': self.percentile(0.5),
+            'p95_ms': self.percentile(0.95),
+            'p99_ms': self.percentile(0.99),
+        }
+
+
+class _Span:
+    """
+    计时区间（上下文管理器）
+    记录的是阶段自身耗时：同一线程内嵌套的子区间（如绘制中的属性识别）从外层区间中扣除，各阶段不重复计时
+    """
+
+    __slots__ = ('_profiler', '_stage', '_start')
+
+    def __init__(self, profiler: 'StageProfiler', stage: str):
+        self._profiler = profiler
+        self._stage = stage
+        self._start = 0.0
+
+    def __enter__(self):
+        self._profiler._span_stack().append(0.0)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        elapsed = (time.perf_counter() - self._start) * 1000.0
+        stack = self._profiler._span_stack()
+        children = stack.pop()
+        if stack:
+            stack[-1] += elapsed
+        self._profiler.record(self._stage, max(elapsed - children, 0.0))
+        return False
+
+
+class _NullSpan:
+    """禁用时使用的空计时区间"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class StageProfiler:
+    """分阶段延迟统计器"""
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        buckets: Sequence[float] = DEFAULT_BUCKETS_MS,
+        snapshot_file: Optional[str] = None,
+        snapshot_interval: float = 10.0
+    ):
+        """
+        初始化统计器
+
+        Args:
+            enabled: 是否启用，禁用时 span() 返回空上下文，几乎无开销
+            buckets: 直方图分桶上界（毫秒）
+            snapshot_file: 周期性JSON快照文件路径，None表示不写快照
+            snapshot_interval: 快照写入间隔（秒）
+        """
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        self.snapshot_file = snapshot_file
+        self.snapshot_interval = snapshot_interval
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self._last_snapshot = time.monotonic()
+        self._local = threading.local()
+
+    def _span_stack(self) -> List[float]:
+        """当前线程正在计时的区间栈，每项为已结束子区间的累计耗时（毫秒）"""
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def span(self, stage: str):
+        """
+        创建一个计时区间
+
+        Args:
+            stage: 阶段名称
+
+        Returns:
+            上下文管理器，退出时记录耗时
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, stage)
+
+    def record(self, stage: str, value_ms: float):
+        """
+        直接记录一次耗时
+
+        Args:
+            stage: 阶段名称
+            value_ms: 耗时（毫秒）
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            hist = self._histograms.get(stage)
+            if hist is None:
+                hist = self._histograms[stage] = LatencyHistogram(self.buckets)
+            hist.observe(value_ms)
+
+    def histograms(self) -> Dict[str, LatencyHistogram]:
+        """获取各阶段直方图（按流水线顺序）"""
+        with self._lock:
+            items = dict(self._histograms)
+        order = {name: i for i, name in enumerate(STAGES)}
+        return dict(sorted(items.items(), key=lambda kv: order.get(kv[0], len(order))))
+
+    def snapshot(self) -> Dict:
+        """生成当前统计快照"""
+        with self._lock:
+            stages = {name: hist.to_dict() for name, hist in self._histograms.items()}
+        return {
+            'timestamp': time.time(),
+            'stages': stages,
+        }
+
+    def summary(self, separator: str = ' | ') -> str:
+        """
+        生成简要统计文本
+
+        Args:
+            separator: 各阶段之间的分隔符
+
+        Returns:
+            形如 "inference p50=20 p95=50 ms" 的文本
+        """
+        parts = []
+        for name, hist in self.histograms().items():
+            parts.append(
+                f"{name} p50={hist.percentile(0.5):.0f} p95={hist.percentile(0.95):.0f} ms"
+            )
+        return separator.join(parts)
+
+    def maybe_write_snapshot(self, force: bool = False) -> bool:
+        """
+        到达间隔时写入JSON快照
+
+        Args:
+            force: 是否忽略间隔立即写入
+
+        Returns:
+            是否写入了快照
+        """
+        if not self.enabled or not self.snapshot_file:
+            return False
+        now = time.monotonic()
+        if not force and now - self._last_snapshot < self.snapshot_interval:
+            return False
+        self._last_snapshot = now
+
+        path = Path(self.snapshot_file)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_file = path.with_suffix('.tmp')
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+        os.replace(temp_file, path)
+        return True
+
+    def reset(self):
+        """清空统计数据"""
+        with self._lock:
+            self._histograms.clear()
+        self._last_snapshot = time.monotonic()
+
+
+# 全局统计器实例
+_global_profiler: Optional[StageProfiler] = None
+
+
+def get_profiler() -> StageProfiler:
+    """获取全局统计器实例（首次调用时根据配置创建）"""
+    global _global_profiler
+    if _global_profiler is None:
+        from ..config import get_config
+        config = get_config()
+        profiling_config = config.get('performance.profiling', {})
+        _global_profiler = StageProfiler(
+            enabled=profiling_config.get('enabled', True),
+            buckets=profiling_config.get('buckets_ms') or DEFAULT_BUCKETS_MS,
+            snapshot_file=profiling_config.get('snapshot_file'),
+            snapshot_interval=profiling_config.get('snapshot_interval', 10.0)
+        )
+    return _global_profiler
+
+
+def set_profiler(profiler: StageProfiler):
+    """替换全局统计器实例"""
+    global _global_profiler
+    _global_profiler = profiler
@@ -4,8 +4,9 @@
 
 import cv2
 import numpy as np
+import threading
 import time
-from typing import Tuple, Optional
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
 
 
 class VideoCapture:
@@ -63,6 +64,160 @@ class VideoCapture:
         self.release()
 
 
+def open_capture(source: Union[int, str], width: int = 640, height: int = 480):
+    """
+    打开视频源：'synthetic:...' 为合成视频的虚拟采集源，其余为摄像头索引或视频文件
+
+    Args:
+        source: 视频源
+        width: 视频宽度
+        height: 视频高度
+
+    Returns:
+        VideoCapture 或 SyntheticCapture
+    """
+    from .synthetic_video import SyntheticCapture, is_synthetic_source
+
+    if is_synthetic_source(source):
+        return SyntheticCapture.from_source(source, width, height)
+    return VideoCapture(source, width, height)
+
+
+class MultiVideoCapture:
+    """多路视频源并发采集：每路一个读取线程，只保留最新一帧，按批取出各路的新帧"""
+    
+    def __init__(
+        self,
+        sources: Sequence[Union[int, str]],
+        width: int = 640,
+        height: int = 480,
+        batch_wait_ms: float = 10.0,
+        drop_frames: bool = True,
+        capture_factory: Optional[Callable[[Union[int, str]], VideoCapture]] = None
+    ):
+        """
+        初始化并启动各路读取线程
+        
+        Args:
+            sources: 摄像头索引、视频文件路径或合成视频源（'synthetic:<种子>[,参数=值...]'）列表
+            width: 视频宽度
+            height: 视频高度
+            batch_wait_ms: 第一路新帧到达后等待其余各路的最长时间（毫秒），用于凑满一批
+            drop_frames: 处理跟不上时是否用新帧覆盖未取走的旧帧（摄像头）；
+                         False时读取线程等待旧帧被取走（视频文件，保证逐帧处理）
+            capture_factory: 创建单路采集对象的函数，None时使用 open_capture
+        """
+        self.sources = list(sources)
+        self.batch_wait = max(0.0, batch_wait_ms) / 1000.0
+        self.drop_frames = drop_frames
+        factory = capture_factory or (lambda source: open_capture(source, width, height))
+        
+        self._cond = threading.Condition()
+        self._latest: Dict[int, Tuple[np.ndarray, float]] = {}
+        self._ended = set()
+        self._stop_event = threading.Event()
+        self.frames_read = [0] * len(self.sources)
+        self.frames_dropped = [0] * len(self.sources)
+        
+        self._captures = []
+        try:
+            for source in self.sources:
+                self._captures.append(factory(source))
+        except Exception:
+            self.release()
+            raise
+        self._threads = [
+            threading.Thread(target=self._reader, args=(i,), name=f'capture-{i}', daemon=True)
+            for i in range(len(self._captures))
+        ]
+        for thread in self._threads:
+            thread.start()
+    
+    def __len__(self) -> int:
+        return len(self.sources)
+    
+    @property
+    def alive(self) -> bool:
+        """是否还有未结束的视频源（或尚未取走的帧）"""
+        with self._cond:
+            return bool(self._latest) or len(self._ended) < len(self._captures)
+    
+    def _reader(self, stream: int):
+        """单路读取线程"""
+        cap = self._captures[stream]
+        while not self._stop_event.is_set():
+            if not self.drop_frames:
+                with self._cond:
+                    self._cond.wait_for(
+                        lambda: stream not in self._latest or self._stop_event.is_set()
+                    )
+                if self._stop_event.is_set():
+                    return
+            ret, frame = cap.read()
+            with self._cond:
+                if not ret or frame is None:
+                    # 视频文件读完或摄像头断开
+                    self._ended.add(stream)
+                    self._cond.notify_all()
+                    return
+                if stream in self._latest:
+                    # 上一帧还没被取走就被覆盖
+                    self.frames_dropped[stream] += 1
+                self._latest[stream] = (frame, time.monotonic())
+                self.frames_read[stream] += 1
+                self._cond.notify_all()
+    
+    def read_batch(self, timeout: float = 1.0) -> List[Tuple[int, np.ndarray, float]]:
+        """
+        取出各路的最新帧
+        
+        等到至少一路有新帧后，再最多等待 batch_wait_ms 让其余仍在运行的各路也到达
+        
+        Args:
+            timeout: 等待第一帧的最长时间（秒）
+            
+        Returns:
+            [(流编号, 图像帧, 采集时间戳), ...]，按流编号排序；超时或全部结束时为空列表
+        """
+        with self._cond:
+            if not self._cond.wait_for(
+                lambda: self._latest or len(self._ended) >= len(self._captures), timeout
+            ):
+                return []
+            deadline = time.monotonic() + self.batch_wait
+            while True:
+                live = len(self._captures) - len(self._ended - self._latest.keys())
+                remaining = deadline - time.monotonic()
+                if len(self._latest) >= live or remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch = [(stream, frame, stamp) for stream, (frame, stamp) in sorted(self._latest.items())]
+            self._latest.clear()
+            # 唤醒等待旧帧被取走的读取线程
+            self._cond.notify_all()
+            return batch
+    
+    def release(self):
+        """停止读取线程并释放所有视频源"""
+        self._stop_event.set()
+        with self._cond:
+            self._cond.notify_all()
+        for thread in getattr(self, '_threads', []):
+            thread.join(timeout=1.0)
+        for cap in self._captures:
+            cap.release()
+        with self._cond:
+            self._ended.update(range(len(self._captures)))
+            self._latest.clear()
+            self._cond.notify_all()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+
 class FPSCounter:
     """FPS计数器"""
     
@@ -0,0 +1,86 @@
+"""
+配置测试
+"""
+
+import dataclasses
+
+import pytest
+
+
+def test_settings_snapshot_defaults():
+    """测试类型化配置快照"""
+    from yoloface.config import Config
+    
+    config = Config()
+    settings = config.settings
+    
+    assert settings.detection.haar.scale_factor == config.get('detection.haar.scale_factor')
+    assert settings.detection.haar.min_size == (30, 30)
+    assert settings.output.save_frames is False
+    
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        settings.camera.index = 1
+    with pytest.raises(AttributeError):
+        settings.camera.__dict__
+
+
+def test_set_invalidates_cache_and_snapshot():
+    """测试修改配置后缓存与快照同步更新"""
+    from yoloface.config import Config
+    
+    config = Config()
+    assert config.get('detection.haar.scale_factor') == 1.1
+    config.set('detection.haar.scale_factor', 1.2)
+    
+    assert config.get('detection.haar.scale_factor') == 1.2
+    assert config.settings.detection.haar.scale_factor == 1.2
+
+
+def test_build_settings_rejects_bad_values():
+    """测试错误配置值"""
+    from yoloface.config import build_settings
+    
+    with pytest.raises(ValueError):
+        build_settings({'detection': {'haar': {'min_size': 'big'}}})
+
+
+def test_config_watcher_applies_valid_changes(tmp_path):
+    """测试配置热加载：仅应用校验通过的修改"""
+    import os
+    from yoloface.config import Config, ConfigWatcher
+    
+    config_file = tmp_path / 'config.yaml'
+    config_file.write_text('detection:\n  haar:\n    scale_factor: 1.1\n', encoding='utf-8')
+    config = Config(str(config_file))
+    watcher = ConfigWatcher(config)
+    
+    def rewrite(text, bump):
+        config_file.write_text(text, encoding='utf-8')
+        stat = config_file.stat()
+        os.utime(config_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + bump))
+    
+    rewrite('detection:\n  haar:\n    scale_factor: 1.3\n', 10**9)
+    assert watcher.check()
+    assert config.settings.detection.haar.scale_factor == 1.1
+    change = watcher.apply_pending()
+    assert change.changed('detection.haar')
+    assert not change.changed('detection.yolo11')
+    assert config.settings.detection.haar.scale_factor == 1.3
+    assert watcher.apply_pending() is None
+    
+    rewrite('detection:\n  haar:\n    min_size: oops\n', 2 * 10**9)
+    assert not watcher.check()
+    assert config.settings.detection.haar.scale_factor == 1.3
+    
+    # 命令行覆盖项在热加载后仍然生效
+    config.override('camera.index', 2)
+    rewrite('camera:\n  index: 0\ndetection:\n  haar:\n    scale_factor: 1.4\n', 3 * 10**9)
+    assert watcher.check()
+    change = watcher.apply_pending()
+    assert change.changed('detection.haar')
+    assert config.settings.detection.haar.scale_factor == 1.4
+    assert config.settings.camera.index == 2 and config.get('camera.index') == 2
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -2,6 +2,8 @@
 检测器测试
 """
 
+import json
+
 import pytest
 import numpy as np
 import cv2
@@ -45,6 +47,343 @@ def test_haar_detector_detect(sample_image):
     assert isinstance(faces, list)
 
 
+def test_attribute_service_shares_classifier():
+    """测试属性服务对同一配置只创建一个分类器，并支持多线程并发预测"""
+    from concurrent.futures import ThreadPoolExecutor
+    from yoloface.detectors import AttributeModelService, Gender
+    
+    service = AttributeModelService()
+    assert service.get_classifier() is service.get_classifier()
+    
+    faces = [np.full((64, 64, 3), 60 + i * 20, dtype=np.uint8) for i in range(8)]
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = [result for batch in pool.map(lambda face: service.predict_batch([face]), faces)
+                   for result in batch]
+    
+    assert results == service.predict_batch(faces)
+    assert all(gender in (Gender.MALE, Gender.FEMALE) for gender, _ in results)
+
+
+def test_frame_features_match_per_face_statistics():
+    """测试整帧积分图特征与逐个人脸计算结果一致"""
+    from yoloface.detectors.features import FrameFeatureExtractor
+    
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 256, (120, 160, 3), dtype=np.uint8)
+    boxes = [(10, 20, 60, 90), (100, 0, 160, 50), (-5, 100, 30, 130)]
+    
+    features = FrameFeatureExtractor().compute(frame, boxes=boxes)
+    stats = features.box_stats(boxes)
+    edges = cv2.Canny(features.gray, 50, 150)
+    
+    assert features.offset == (0, 0)
+    for i, (x1, y1, x2, y2) in enumerate(features.clip_boxes(boxes)):
+        crop = features.gray[y1:y2, x1:x2].astype(np.float64)
+        assert stats['mean'][i] == pytest.approx(crop.mean())
+        assert stats['std'][i] == pytest.approx(crop.std())
+        assert stats['edge_density'][i] == pytest.approx((edges[y1:y2, x1:x2] > 0).mean())
+    
+    # 只处理人脸所在区域时，统计结果不变
+    sub_features = FrameFeatureExtractor().compute(frame, boxes=boxes[:1])
+    assert sub_features.offset == (10, 20)
+    assert sub_features.box_stats(boxes[:1])['mean'][0] == pytest.approx(stats['mean'][0])
+
+
+def test_gender_classify_frame_vectorized():
+    """测试整帧性别分类返回与人脸一一对应的结果"""
+    from yoloface.detectors import GenderClassifier, Gender
+    
+    classifier = GenderClassifier()
+    frame = np.full((200, 200, 3), 90, dtype=np.uint8)
+    results = classifier.classify_frame(frame, [(0, 0, 100, 100), (100, 100, 180, 200)])
+    
+    assert len(results) == 2
+    assert all(gender in (Gender.MALE, Gender.FEMALE) and 0.5 <= conf <= 0.9
+               for gender, conf in results)
+
+
+def test_gender_classify_frame_matches_per_face_path():
+    """测试整帧分类与逐个人脸分类结果一致（含需要放大的小人脸）"""
+    from yoloface.detectors import GenderClassifier
+    
+    rng = np.random.default_rng(4)
+    frame = cv2.GaussianBlur(rng.integers(0, 256, (300, 400, 3), dtype=np.uint8), (5, 5), 0)
+    cv2.circle(frame, (300, 150), 60, (40, 40, 40), -1)
+    boxes = [(10, 10, 60, 50), (100, 40, 170, 110), (200, 100, 230, 200), (240, 80, 370, 230), (390, 290, 420, 320)]
+    
+    classifier = GenderClassifier()
+    expected = [
+        classifier._simple_classify(frame[max(0, y1):y2, max(0, x1):x2]) for x1, y1, x2, y2 in boxes
+    ]
+    assert classifier.classify_frame(frame, boxes) == expected
+
+
+def test_gender_classify_frame_faster_than_per_face_path():
+    """测试整帧分类比逐个人脸分类快（640x480下常见的小于100像素的人脸）"""
+    import timeit
+    from yoloface.detectors import GenderClassifier
+
+    rng = np.random.default_rng(5)
+    frame = cv2.GaussianBlur(rng.integers(0, 256, (480, 640, 3), dtype=np.uint8), (5, 5), 0)
+    boxes = [(x, y, x + 40, y + 50) for y in range(10, 400, 80) for x in range(10, 600, 80)]
+    classifier = GenderClassifier()
+
+    def per_face():
+        return [classifier.predict(frame[y1:y2, x1:x2]) for x1, y1, x2, y2 in boxes]
+
+    def frame_path():
+        return classifier.classify_frame(frame, boxes)
+
+    assert frame_path() == per_face()
+    per_face_time = min(timeit.repeat(per_face, number=3, repeat=7))
+    frame_time = min(timeit.repeat(frame_path, number=3, repeat=7))
+    assert frame_time < per_face_time
+
+
+def test_age_estimator_shares_face_features():
+    """测试年龄与性别共享同一人脸特征包，且批量结果与逐个结果一致"""
+    from yoloface.detectors import AgeEstimator, AttributeModelService, GenderClassifier
+    from yoloface.detectors.features import FaceFeatures
+    
+    rng = np.random.default_rng(1)
+    faces = [rng.integers(0, 256, (120, 110, 3), dtype=np.uint8), np.full((80, 80, 3), 150, dtype=np.uint8)]
+    features = [FaceFeatures(face) for face in faces]
+    
+    estimator = AgeEstimator(enabled=True)
+    GenderClassifier().classify_batch(faces, features)
+    gray = features[0].gray
+    ages = estimator.predict_batch(faces, features)
+    assert features[0].gray is gray
+    assert ages == [estimator.predict(face) for face in faces]
+    assert all(label in AgeEstimator.AGE_LABELS and 0 < conf <= 1 for label, _, conf in ages)
+    assert estimator.predict(faces[0][:5]) == ('Unknown', (0, 0), 0.5)
+    
+    frame = np.zeros((200, 200, 3), dtype=np.uint8)
+    results = AttributeModelService().predict_attributes(frame, [(0, 0, 120, 110), (150, 150, 250, 250)])
+    assert len(results) == 2 and all(len(result) == 3 for result in results)
+    
+    # 性别与 predict_frame 走同一整帧路径，含年龄的结果同样进入人脸结果缓存
+    from yoloface.detectors.crop_cache import CropCache
+    service = AttributeModelService(crop_cache=CropCache(max_entries=8))
+    frame[20:140, 30:140] = faces[0]
+    boxes = [(30, 20, 140, 140)]
+    first = service.predict_attributes(frame, boxes)
+    assert [result[:2] for result in first] == service.predict_frame(frame, boxes)
+    assert service.predict_attributes(frame, boxes) == first
+    assert service.crop_cache.hits == 1
+
+
+def test_predict_attributes_builds_face_features_once(monkeypatch):
+    """测试同时估计性别与年龄时每个人脸只构建一次特征包，两者共用"""
+    from dataclasses import replace
+    from yoloface.detectors import AttributeModelService
+    from yoloface.detectors.features import FaceFeatures
+
+    built = []
+    original_init = FaceFeatures.__init__
+
+    def counting_init(self, face_roi, *args, **kwargs):
+        original_init(self, face_roi, *args, **kwargs)
+        built.append(self)
+
+    monkeypatch.setattr(FaceFeatures, '__init__', counting_init)
+    rng = np.random.default_rng(2)
+    frame = cv2.GaussianBlur(rng.integers(0, 256, (240, 320, 3), dtype=np.uint8), (5, 5), 0)
+    boxes = [(10, 10, 60, 70), (80, 20, 200, 150), (220, 100, 300, 200)]
+    service = AttributeModelService()
+    service.apply_age_settings(replace(service._age_settings, enabled=True))
+    results = service.predict_attributes(frame, boxes)
+
+    assert len(built) == len(boxes)
+    # 性别与年龄共用同一特征包中的灰度与边缘图
+    assert all('gray' in feat._cache and 'edges' in feat._cache for feat in built)
+    assert [result[:2] for result in results] == service.predict_frame(frame, boxes)
+
+
+def test_attribute_worker_returns_results_asynchronously():
+    """测试异步属性识别：首帧不阻塞，结果按关联键返回，队列深度有上限"""
+    import time
+    from yoloface.detectors import AttributeModelService, Gender
+    from yoloface.detectors.attribute_worker import AttributeWorker
+    
+    worker = AttributeWorker(AttributeModelService(), max_queue_depth=1, refresh_interval_ms=0)
+    frame = np.full((200, 200, 3), 90, dtype=np.uint8)
+    boxes = [(0, 0, 100, 100), (100, 100, 180, 200)]
+    try:
+        assert worker.lookup(frame, boxes, keys=[1, 2]) == [None, None]
+        deadline = time.monotonic() + 5
+        while worker.completed == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        results = worker.lookup(frame, boxes, keys=[1, 2])
+        assert all(result.gender in (Gender.MALE, Gender.FEMALE) for result in results)
+        assert worker.queue_depth <= 1
+        assert {name for name, *_ in worker.collect()} >= {'attribute_queue_depth', 'attribute_dropped_total'}
+    finally:
+        worker.stop()
+
+
+def test_crop_cache_lru_ttl_and_hits():
+    """测试人脸结果缓存：感知哈希命中、LRU淘汰、过期失效"""
+    import time
+    from yoloface.detectors import AttributeModelService
+    from yoloface.detectors.crop_cache import CropCache, dhash
+    
+    rng = np.random.default_rng(2)
+    face = cv2.resize(rng.integers(0, 256, (8, 8, 3), dtype=np.uint8), (64, 64))
+    assert dhash(face) == dhash(cv2.resize(face, (128, 128)))
+    
+    cache = CropCache(max_entries=2, ttl_ms=50, position_grid=32)
+    keys = [cache.make_key(face, (0, 0, 64, 64)), cache.make_key(face, (100, 0, 164, 64)), ('other',)]
+    assert keys[0] != keys[1]
+    for i, key in enumerate(keys):
+        cache.put(key, i)
+    assert len(cache) == 2 and cache.get(keys[0]) is None and cache.get(keys[2]) == 2
+    time.sleep(0.06)
+    assert cache.get(keys[2]) is None
+    assert cache.hits == 1 and cache.misses == 2
+    
+    service = AttributeModelService(crop_cache=CropCache(max_entries=8))
+    frame = np.zeros((200, 200, 3), dtype=np.uint8)
+    frame[20:120, 20:120] = face[0, 0]
+    first = service.predict_frame(frame, [(20, 20, 120, 120)])
+    assert service.predict_frame(frame, [(20, 20, 120, 120)]) == first
+    assert service.crop_cache.hits == 1 and service.crop_cache.hit_rate == 0.5
+
+
+def test_blob_preprocessor_matches_opencv_and_maps_boxes_back():
+    """测试预处理与 blobFromImage 一致，且letterbox坐标可精确映射回原图"""
+    from yoloface.detectors.preprocess import BlobPreprocessor
+    
+    rng = np.random.default_rng(3)
+    image = rng.integers(0, 256, (97, 131, 3), dtype=np.uint8)
+    for mode, crop in (('crop', True), ('stretch', False)):
+        preprocessor = BlobPreprocessor((227, 227), mean=(104, 117, 123), mode=mode)
+        blob, _ = preprocessor(image)
+        expected = cv2.dnn.blobFromImage(image, 1.0, (227, 227), (104, 117, 123), swapRB=False, crop=crop)
+        np.testing.assert_array_equal(blob, expected)
+    
+    preprocessor = BlobPreprocessor((416, 416), scale=1 / 255.0, swap_rb=True)
+    frame = rng.integers(0, 256, (480, 640, 3), dtype=np.uint8)
+    blob, info = preprocessor(frame)
+    assert blob.shape == (1, 3, 416, 416) and blob.dtype == np.float32
+    assert (info.pad_x, info.pad_y) == (0.0, 52.0)
+    assert preprocessor(frame)[0] is not None and preprocessor._buffer.shape[0] == 1
+    box = np.array([[64.0, 48.0, 320.0, 240.0]])
+    mapped = box * info.scale_x + [info.pad_x, info.pad_y, info.pad_x, info.pad_y]
+    np.testing.assert_allclose(info.to_source(mapped), box)
+
+
+def test_dnn_backend_selection_is_benchmarked_and_cached(tmp_path):
+    """测试DNN后端实测选择、磁盘缓存与线程规划"""
+    from yoloface.detectors.dnn_backend import (
+        CPU_CHOICE, DnnBackendSelector, available_backends, cuda_device_count, parse_backend, plan_num_threads
+    )
+    
+    assert CPU_CHOICE[:2] in available_backends()
+    assert parse_backend('opencv/cpu') == CPU_CHOICE[:2]
+    assert parse_backend('nonexistent') is None
+    if cuda_device_count() == 0:
+        # 没有CUDA设备时不尝试CUDA，避免OpenCV静默回退到CPU后被误记为CUDA
+        assert all(backend != parse_backend('cuda')[0] for backend, _ in available_backends())
+        assert DnnBackendSelector(mode='cuda').candidates() == [CPU_CHOICE[:2]]
+    assert plan_num_threads(cpu_count=8, async_attributes=True, num_processes=2) == 3
+    assert plan_num_threads(num_threads=2, cpu_count=8) == 2
+    assert plan_num_threads(cpu_count=1) == 1
+    
+    # 用Caffe prototxt构建一个只有单层卷积的网络
+    prototxt = tmp_path / 'tiny.prototxt'
+    prototxt.write_text(
+        'input: "data"\ninput_dim: 1\ninput_dim: 3\ninput_dim: 8\ninput_dim: 8\n'
+        'layer { name: "pool" type: "Pooling" bottom: "data" top: "pool" '
+        'pooling_param { pool: AVE kernel_size: 2 stride: 2 } }\n'
+    )
+    net = cv2.dnn.readNetFromCaffe(str(prototxt))
+    cache_file = tmp_path / 'backend.json'
+    
+    selector = DnnBackendSelector(mode='cpu', cache_file=str(cache_file), runs=1)
+    choice = selector.select(net, str(prototxt), (1, 3, 8, 8))
+    assert choice[:2] == CPU_CHOICE[:2] and cache_file.exists()
+    
+    cached = DnnBackendSelector(mode='cpu', cache_file=str(cache_file)).select(net, str(prototxt), (1, 3, 8, 8))
+    assert cached[:2] == choice[:2]
+
+
+def test_model_variant_resolution(tmp_path):
+    """测试量化模型变体的命名约定与回退"""
+    from yoloface.detectors.model_variants import resolve_model_variant, variant_path
+
+    model = tmp_path / 'model.onnx'
+    model.write_bytes(b'fp32')
+    assert variant_path(str(model), 'int8') == str(tmp_path / 'model.int8.onnx')
+    assert variant_path(str(tmp_path / 'model.int8.onnx'), 'fp16') == str(tmp_path / 'model.fp16.onnx')
+
+    # 变体不存在时回退到原模型
+    assert resolve_model_variant(str(model), 'int8') == str(model)
+    assert resolve_model_variant(str(model), 'auto') == str(model)
+
+    (tmp_path / 'model.int8.onnx').write_bytes(b'int8')
+    assert resolve_model_variant(str(model), 'int8') == str(tmp_path / 'model.int8.onnx')
+    assert resolve_model_variant(str(model), 'auto') == str(tmp_path / 'model.int8.onnx')
+    assert resolve_model_variant(str(model), 'fp32') == str(model)
+
+
+def test_model_registry_index_manifest_and_shared_load(tmp_path, monkeypatch):
+    """测试模型注册表的索引、清单读写、校验和与共享加载"""
+    from yoloface.detectors import model_registry
+    from yoloface.detectors.dnn_backend import DnnBackendSelector
+    from yoloface.detectors.model_registry import ModelRegistry
+    
+    # 测速结果写到临时目录，不污染仓库中的默认缓存文件
+    selector = DnnBackendSelector(mode='cpu', cache_file=str(tmp_path / 'backend.json'), runs=1)
+    monkeypatch.setattr(model_registry, 'get_backend_selector', lambda: selector)
+
+    models_dir = tmp_path / 'models'
+    models_dir.mkdir()
+    (models_dir / 'det.onnx').write_bytes(b'fp32')
+    (models_dir / 'det.int8.onnx').write_bytes(b'int8')
+    manifest = tmp_path / 'manifest.json'
+
+    registry = ModelRegistry(str(manifest), [str(models_dir)])
+    assert registry.index() == 2
+    entry = registry.find('det.onnx')
+    assert entry.path == str(models_dir / 'det.onnx') and entry.format == 'onnx'
+    assert registry.resolve('det.onnx', 'int8').precision == 'int8'
+    assert registry.resolve('det.onnx', 'fp16').path == entry.path
+    assert registry.find('missing.onnx') is None
+
+    registry.save()
+    data = json.loads(manifest.read_text())
+    item = next(item for item in data['models'] if item['path'].endswith('det.onnx'))
+    item.update(name='det', input_size=[320, 320])
+    manifest.write_text(json.dumps(data))
+    reloaded = ModelRegistry(str(manifest), [str(models_dir)])
+    named = reloaded.find('det')
+    assert named.input_size == (320, 320) and len(named.sha256) == 64
+
+    # 清单中的校验和与文件不一致时拒绝加载
+    (models_dir / 'det.onnx').write_bytes(b'tampered')
+    with pytest.raises(ValueError):
+        reloaded.load_net(named, (1, 3, 8, 8))
+
+    onnx = pytest.importorskip('onnx')
+    from onnx import TensorProto, helper
+    graph = helper.make_graph(
+        [helper.make_node('Relu', ['data'], ['out'])], 'tiny',
+        [helper.make_tensor_value_info('data', TensorProto.FLOAT, [1, 3, 8, 8])],
+        [helper.make_tensor_value_info('out', TensorProto.FLOAT, [1, 3, 8, 8])]
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid('', 13)])
+    model.ir_version = 8
+    onnx.save(model, str(models_dir / 'relu.onnx'))
+
+    registry = ModelRegistry(None, [str(models_dir)])
+    first = registry.load_net(registry.find('relu.onnx'), (1, 3, 8, 8))
+    second = registry.load_net(registry.find('relu.onnx'), (1, 3, 8, 8))
+    assert first.net is second.net and registry.loads == 1 and registry.shared_hits == 1
+    first.net.setInput(-np.ones((1, 3, 8, 8), dtype=np.float32))
+    assert first.net.forward().max() == 0
+
+
 def test_config_loading():
     """测试配置加载"""
     from yoloface.config import Config
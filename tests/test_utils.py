@@ -0,0 +1,600 @@
+"""
+工具模块测试
+"""
+
+import json
+import os
+import time
+
+import pytest
+
+
+def test_latency_histogram_buckets():
+    """测试延迟直方图分桶与分位数"""
+    from yoloface.utils.profiler import LatencyHistogram
+    
+    hist = LatencyHistogram(bounds=(1.0, 5.0, 10.0))
+    for value in (0.5, 3.0, 3.0, 7.0, 50.0):
+        hist.observe(value)
+    
+    assert hist.counts == [1, 2, 1, 1]
+    assert hist.count == 5
+    assert hist.percentile(0.5) == 5.0
+    assert hist.percentile(1.0) == 50.0
+
+
+def test_stage_profiler_spans(tmp_path):
+    """测试分阶段计时与JSON快照"""
+    from yoloface.utils.profiler import StageProfiler
+    
+    snapshot_file = tmp_path / 'latency.json'
+    profiler = StageProfiler(snapshot_file=str(snapshot_file))
+    with profiler.span('inference'):
+        pass
+    profiler.record('capture', 3.0)
+    
+    assert list(profiler.histograms()) == ['capture', 'inference']
+    
+    # 嵌套区间只记录自身耗时，子区间不会被外层重复计入
+    with profiler.span('drawing'):
+        with profiler.span('classification'):
+            time.sleep(0.02)
+    histograms = profiler.histograms()
+    assert histograms['classification'].total >= 20.0
+    assert histograms['drawing'].total < 10.0
+    assert profiler.maybe_write_snapshot(force=True)
+    data = json.loads(snapshot_file.read_text(encoding='utf-8'))
+    assert data['stages']['capture']['count'] == 1
+
+
+def test_stage_profiler_disabled():
+    """测试禁用时不记录数据"""
+    from yoloface.utils.profiler import StageProfiler
+    
+    profiler = StageProfiler(enabled=False)
+    with profiler.span('inference'):
+        pass
+    assert profiler.histograms() == {}
+    assert not profiler.maybe_write_snapshot(force=True)
+
+
+def test_metrics_server_serves_prometheus_text():
+    """测试本地监控指标服务"""
+    from urllib.request import urlopen
+    from yoloface.utils.metrics_server import MetricsRegistry, MetricsServer
+    from yoloface.utils.profiler import StageProfiler
+    
+    profiler = StageProfiler()
+    profiler.record('inference', 12.0)
+    registry = MetricsRegistry(profiler=profiler)
+    registry.set_gauge('fps', 25.5, '当前帧率')
+    registry.inc_counter('frames_total', 3)
+    
+    with MetricsServer(registry, port=0) as server:
+        host, port = server.address
+        body = urlopen(f'http://{host}:{port}/metrics', timeout=5).read().decode('utf-8')
+    
+    assert 'yoloface_fps 25.5' in body
+    assert 'yoloface_frames_total 3' in body
+    assert 'yoloface_stage_latency_seconds_count{stage="inference"} 1' in body
+
+
+class _FakeCapture:
+    """按顺序返回给定帧的采集对象"""
+    
+    def __init__(self, frames):
+        self.frames = list(frames)
+    
+    def read(self):
+        if not self.frames:
+            return False, None
+        return True, self.frames.pop(0)
+    
+    def release(self):
+        self.frames = []
+
+
+def test_multi_stream_pipeline_batches_and_routes_per_stream():
+    """测试多路采集按批取帧，批量检测结果分发回各路并分别统计"""
+    import numpy as np
+    from yoloface.multi_stream import MultiStreamPipeline
+    from yoloface.utils.video import MultiVideoCapture
+    
+    counts = {0: 3, 1: 5}
+    capture = MultiVideoCapture(
+        [0, 1], batch_wait_ms=200, drop_frames=False,
+        capture_factory=lambda source: _FakeCapture(
+            np.full((120, 160, 3), 40 * source, dtype=np.uint8) for _ in range(counts[source])
+        )
+    )
+    seen = []
+    pipeline = MultiStreamPipeline('haar', [0, 1], sinks=[seen.append], capture=capture)
+    try:
+        pipeline.run()
+    finally:
+        pipeline.stop()
+    
+    assert [stats.frames for stats in pipeline.stats] == [3, 5]
+    assert sorted(result.stream for result in seen) == [0] * 3 + [1] * 5
+    assert pipeline.batched_frames == 8 and pipeline.batches < 8
+    assert 'stream_frames_total{stream="1"}' in {name for name, *_ in pipeline.collect()}
+    assert len(pipeline.report().splitlines()) == 4
+
+
+class _BatchRecordingDetector:
+    """记录每次批量大小的检测器，返回以帧像素值编码的检测框"""
+    
+    def __init__(self):
+        self.batch_sizes = []
+    
+    def detect_batch(self, frames):
+        self.batch_sizes.append(len(frames))
+        return [[(int(frame[0, 0, 0]), 0, 10, 10, 0.9, 0)] for frame in frames]
+
+
+def test_inference_server_batches_requests_over_unix_socket(tmp_path):
+    """测试本地推理服务：共享内存传帧、多连接动态凑批、结果按请求返回"""
+    import numpy as np
+    from concurrent.futures import ThreadPoolExecutor
+    from yoloface.serving import InferenceServer, RemoteFaceDetector
+    
+    detector = _BatchRecordingDetector()
+    socket_path = str(tmp_path / 'serve.sock')
+    with InferenceServer(socket_path, 'fastestv2', detector=detector, max_batch_size=4, max_delay_ms=200) as server:
+        clients = [RemoteFaceDetector(socket_path, use_shared_memory=(i % 2 == 0)) for i in range(4)]
+        try:
+            assert clients[0].info['box_format'] == 'xyxy'
+            frames = [np.full((48, 64, 3), i, dtype=np.uint8) for i in range(4)]
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                results = list(pool.map(lambda i: clients[i].detect(frames[i]), range(4)))
+            assert results == [[(i, 0, 10, 10, 0.9, 0)] for i in range(4)]
+            assert max(detector.batch_sizes) > 1
+            
+            assert clients[1].detect_batch(frames[:3]) == results[:3]
+            assert server.batcher.requests == 7
+            assert {name for name, *_ in server.collect()} >= {'serve_batches_total', 'serve_batch_size_avg'}
+        finally:
+            for client in clients:
+                client.close()
+    assert not os.path.exists(socket_path)
+
+
+def test_http_detect_api_on_localhost():
+    """测试图片检测HTTP接口：JSON结果、耗时头、错误请求与并发上限"""
+    import threading
+    import urllib.error
+    import urllib.request
+    import cv2
+    import numpy as np
+    from yoloface.serving import DetectionHTTPServer
+    
+    class BlockingDetector(_BatchRecordingDetector):
+        def __init__(self):
+            super().__init__()
+            self.entered = threading.Event()
+            self.release = threading.Event()
+            self.release.set()
+        
+        def detect_batch(self, frames):
+            self.entered.set()
+            self.release.wait(5)
+            return super().detect_batch(frames)
+    
+    def post(url, data):
+        request = urllib.request.Request(url, data=data, method='POST')
+        try:
+            with urllib.request.urlopen(request, timeout=10) as response:
+                return response.status, dict(response.headers), json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, dict(e.headers), json.loads(e.read())
+    
+    detector = BlockingDetector()
+    frame = np.full((60, 80, 3), 7, dtype=np.uint8)
+    image = cv2.imencode('.png', frame)[1].tobytes()
+    with DetectionHTTPServer('127.0.0.1', 0, 'fastestv2', detector=detector,
+                             max_concurrency=1, max_queue=0) as server:
+        url = 'http://%s:%d' % server.address
+        status, headers, data = post(url + '/detect', image)
+        assert status == 200
+        assert (data['width'], data['height']) == (80, 60)
+        assert [face['box'] for face in data['faces']] == [[7, 0, 10, 10]]
+        assert 'total;dur=' in headers['Server-Timing']
+        assert float(headers['X-Total-Time-Ms']) >= float(headers['X-Inference-Time-Ms'])
+        
+        assert post(url + '/detect', b'not an image')[0] == 400
+        assert post(url + '/unknown', image)[0] == 404
+        
+        # 唯一的处理名额被占用且不允许排队时直接返回503
+        detector.release.clear()
+        detector.entered.clear()
+        busy = threading.Thread(target=post, args=(url + '/detect', image))
+        busy.start()
+        assert detector.entered.wait(5)
+        status, headers, _ = post(url + '/detect', image)
+        detector.release.set()
+        busy.join(5)
+        assert status == 503 and headers['Retry-After'] == '1'
+        assert server.status()['rejected'] == 1
+
+
+def test_database_manager_sqlite_backend(tmp_path):
+    """测试SQLite用户存储：从JSON迁移、用户名唯一、断开后重新连接"""
+    from yoloface.utils.db_manager import DatabaseManager
+    
+    json_file = tmp_path / 'users.json'
+    json_file.write_text(json.dumps({'users': [
+        {'id': 1, 'username': 'alice', 'password': DatabaseManager.hash_password('secret1')},
+        {'id': 2, 'username': 'legacy', 'password': 'plain-pw'},
+    ]}), encoding='utf-8')
+    
+    db = DatabaseManager(str(json_file), backend='sqlite', db_file=str(tmp_path / 'users.db'))
+    assert db.connect() and db.create_user_table()
+    assert db.connection.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+    assert db.login_user('alice', 'secret1') == (True, "登录成功")
+    assert db.login_user('legacy', 'plain-pw')[0]
+    assert db.login_user('alice', 'wrong-pw') == (False, "密码错误")
+    
+    assert db.register_user('bob', 'secret2') == (True, "注册成功")
+    assert db.register_user('bob', 'secret3') == (False, "用户名已存在")
+    db.disconnect()
+    assert db.user_exists('bob') and not db.user_exists('carol')
+    # 已有数据时不再重复迁移
+    assert db.migrate_from_json() == 0
+    db.disconnect()
+
+
+def test_database_manager_json_cache_reloads_on_change(tmp_path):
+    """测试JSON用户存储缓存：重复查询不重读文件，文件被外部修改后重新加载"""
+    from yoloface.utils.db_manager import DatabaseManager
+    
+    json_file = tmp_path / 'users.json'
+    db = DatabaseManager(str(json_file), backend='json')
+    loads = []
+    original_load = db._load_data
+    db._load_data = lambda: loads.append(1) or original_load()
+    
+    assert db.register_user('alice', 'secret1')[0]
+    assert db.login_user('alice', 'secret1')[0]
+    assert db.user_exists('alice') and not db.user_exists('bob')
+    assert len(loads) == 1
+    assert json.loads(json_file.read_text(encoding='utf-8'))['users'][0]['username'] == 'alice'
+    
+    # 其他进程改写文件
+    data = json.loads(json_file.read_text(encoding='utf-8'))
+    data['users'].append({'id': 2, 'username': 'bob', 'password': DatabaseManager.hash_password('secret2')})
+    json_file.write_text(json.dumps(data), encoding='utf-8')
+    assert db.login_user('bob', 'secret2')[0]
+    assert len(loads) == 2
+
+
+def test_database_manager_bulk_import_export(tmp_path):
+    """测试用户批量导入（校验、去重、一次写入）与导出后再导入SQLite"""
+    from yoloface.utils.db_manager import DatabaseManager
+    
+    csv_file = tmp_path / 'users.csv'
+    csv_file.write_text(
+        'username,password\n'
+        'alice,secret1\n'
+        'bob,secret2\n'
+        'al,secret3\n'
+        'carol,123\n'
+        'alice,secret4\n',
+        encoding='utf-8'
+    )
+    db = DatabaseManager(str(tmp_path / 'users.json'), backend='json')
+    assert db.register_user('bob', 'existing')[0]
+    report = db.import_users(str(csv_file), workers=1)
+    assert (report['imported'], report['skipped'], report['invalid']) == (1, 2, 2)
+    assert report['errors'][0].startswith('第4行')
+    assert db.login_user('alice', 'secret1')[0] and db.login_user('bob', 'existing')[0]
+    
+    export_file = tmp_path / 'users.jsonl'
+    assert db.export_users(str(export_file))['exported'] == 2
+    sqlite_db = DatabaseManager(str(tmp_path / 'other.json'), backend='sqlite', db_file=str(tmp_path / 'users.db'))
+    assert sqlite_db.import_users(str(export_file))['imported'] == 2
+    assert sqlite_db.login_user('alice', 'secret1')[0]
+    assert sqlite_db.import_users(str(export_file))['skipped'] == 2
+    sqlite_db.disconnect()
+
+
+def test_queue_logging_rotates_and_counts_drops(tmp_path):
+    """测试队列日志：后台线程写文件并按大小轮转，队列满时丢弃计数"""
+    import logging
+    import queue
+    from yoloface.utils.logger import DroppingQueueHandler, collect, setup_logger, shutdown_logging
+    
+    log_file = tmp_path / 'app.log'
+    logger = setup_logger('queue-logging-test', log_file=str(log_file), console=False,
+                          format_str='%(message)s', use_queue=True, max_bytes=200, backup_count=2)
+    for i in range(20):
+        logger.info("第 %d 条日志", i)
+    shutdown_logging()
+    assert "第 19 条日志" in log_file.read_text(encoding='utf-8')
+    assert (tmp_path / 'app.log.1').exists()
+    assert {name for name, *_ in collect()} == {'log_dropped_total', 'log_queue_depth'}
+    
+    handler = DroppingQueueHandler(queue.Queue(maxsize=2))
+    for i in range(3):
+        handler.handle(logging.LogRecord('test', logging.INFO, __file__, 0, "msg %d", (i,), None))
+    assert handler.dropped == 1
+    assert handler.queue.get_nowait().getMessage() == "msg 0"
+    setup_logger('queue-logging-test', console=False)
+
+
+def test_rate_limit_filter_aggregates_repeated_logs():
+    """测试重复日志限流：窗口内只输出一条，之后附带重复次数，并按消息导出计数"""
+    import logging
+    from yoloface.utils.logger import RateLimitFilter
+    from yoloface.utils.metrics_server import MetricsRegistry
+    
+    records = []
+    
+    class ListHandler(logging.Handler):
+        def emit(self, record):
+            records.append(record.getMessage())
+    
+    rate_limiter = RateLimitFilter(window=0.05, logger_windows={'rate-limit-test.quiet': 0})
+    logger = logging.getLogger('rate-limit-test')
+    logger.propagate = False
+    handlers = [ListHandler(), ListHandler()]
+    for handler in handlers:
+        handler.addFilter(rate_limiter)
+        logger.addHandler(handler)
+    try:
+        for i in range(5):
+            logger.warning("性别分类失败: %s", f"错误{i}")
+        time.sleep(0.06)
+        logger.warning("性别分类失败: %s", "错误5")
+        for _ in range(3):
+            logging.getLogger('rate-limit-test.quiet').warning("不限流")
+    finally:
+        for handler in handlers:
+            logger.removeHandler(handler)
+    
+    # 每条记录经过两个handler
+    assert records[0::2] == records[1::2]
+    assert records[0::2] == [
+        "性别分类失败: 错误0",
+        "性别分类失败: 错误5（前 0 秒内另有 4 条相同日志）",
+        "不限流", "不限流", "不限流",
+    ]
+    
+    registry = MetricsRegistry()
+    registry.add_collector(rate_limiter.collect)
+    text = registry.render()
+    assert 'yoloface_log_suppressed_total 4' in text
+    assert 'yoloface_log_suppressed_messages_total{logger="rate-limit-test",level="WARNING",' \
+           'message="性别分类失败: %s"} 4' in text
+    assert text.count('# TYPE yoloface_log_repeated_messages_total counter') == 1
+
+
+def test_rate_limit_filter_flushes_finished_bursts():
+    """测试限流汇总补发：重复日志停止后，窗口结束时仍输出被抑制的条数"""
+    import logging
+    from yoloface.utils.logger import RateLimitFilter
+
+    records = []
+
+    class ListHandler(logging.Handler):
+        def emit(self, record):
+            records.append(record.getMessage())
+
+    rate_limiter = RateLimitFilter(window=0.05)
+    logger = logging.getLogger('rate-limit-flush-test')
+    logger.propagate = False
+    handler = ListHandler()
+    handler.addFilter(rate_limiter)
+    logger.addHandler(handler)
+    try:
+        for i in range(3):
+            logger.warning("读取帧失败: %s", i)
+        # 窗口未结束时不补发
+        assert rate_limiter.flush() == 0
+        time.sleep(0.06)
+        assert rate_limiter.flush() == 1
+        assert rate_limiter.flush(force=True) == 0
+    finally:
+        logger.removeHandler(handler)
+
+    assert records == ["读取帧失败: 0", "读取帧失败: 2（前 0 秒内另有 2 条相同日志）"]
+
+
+def test_evaluation_metrics_and_datasets(tmp_path):
+    """测试评估：WIDER/FDDB 标注读取、向量化IoU匹配、AP 与 Pareto 标记"""
+    import math
+    import numpy as np
+    from yoloface.evaluation import (DetectionEvaluator, iou_matrix, load_fddb, load_wider_face,
+                                     mark_pareto, match_detections)
+    
+    wider = tmp_path / 'wider.txt'
+    wider.write_text(
+        '0--Parade/a.jpg\n2\n10 20 30 40 0 0 0 0 0 0\n5 5 4 4 0 0 0 1 0 0\n'
+        '0--Parade/b.jpg\n0\n0 0 0 0 0 0 0 0 0 0\n',
+        encoding='utf-8'
+    )
+    samples = load_wider_face(wider, tmp_path / 'images')
+    assert [s.image_path for s in samples] == [str(tmp_path / 'images' / '0--Parade' / 'a.jpg'),
+                                              str(tmp_path / 'images' / '0--Parade' / 'b.jpg')]
+    assert samples[0].boxes.tolist() == [[10, 20, 40, 60], [5, 5, 9, 9]]
+    assert samples[0].ignore.tolist() == [False, True] and len(samples[1].boxes) == 0
+    
+    fddb = tmp_path / 'fold.txt'
+    fddb.write_text('2002/08/11/big/img_591\n1\n40 20 %f 100 100 1\n' % (math.pi / 2), encoding='utf-8')
+    box = load_fddb(fddb, tmp_path)[0]
+    assert box.image_path.endswith('img_591.jpg')
+    assert np.allclose(box.boxes, [[80, 60, 120, 140]], atol=1e-3)
+    
+    gt = np.array([[0, 0, 10, 10], [20, 20, 30, 30]], dtype=np.float32)
+    assert np.allclose(iou_matrix(gt, [[0, 0, 10, 5]]), [[0.5], [0.0]])
+    # 高分框先匹配，重复检测同一人脸记为误检，落在忽略标注上的检测不计
+    detections = np.array([[0, 0, 10, 10], [1, 1, 10, 10], [20, 20, 30, 30], [50, 50, 60, 60]])
+    matches = match_detections(detections, [0.6, 0.9, 0.8, 0.7], gt, iou_threshold=0.5)
+    assert matches.tolist() == [0, 1, 1, 0]
+    ignored = match_detections(detections[2:3], [0.8], gt, np.array([False, True]))
+    assert ignored.tolist() == [-1]
+    
+    evaluator = DetectionEvaluator(0.5)
+    evaluator.add(detections, [0.6, 0.9, 0.8, 0.7], gt)
+    summary = evaluator.summary()
+    assert (summary['tp'], summary['fp'], summary['num_gt']) == (2, 2, 2)
+    assert summary['recall'] == 1.0 and summary['precision'] == 0.5
+    assert summary['ap'] == 1.0
+    
+    results = mark_pareto([
+        {'ap': 0.9, 'ms_per_frame': 20.0}, {'ap': 0.8, 'ms_per_frame': 5.0},
+        {'ap': 0.7, 'ms_per_frame': 8.0}, {'error': 'x'},
+    ])
+    assert [r['pareto'] for r in results] == [True, True, False, False]
+
+
+def test_evaluation_grid_runs_across_processes(tmp_path):
+    """测试参数网格在多个进程中评估并输出表格"""
+    import cv2
+    import numpy as np
+    from yoloface.evaluation import format_table, load_wider_face, run_grid
+    
+    (tmp_path / 'images').mkdir()
+    cv2.imwrite(str(tmp_path / 'images' / 'a.png'), np.full((120, 160, 3), 128, dtype=np.uint8))
+    annotations = tmp_path / 'gt.txt'
+    annotations.write_text('a.png\n1\n40 30 50 60 0 0 0 0 0 0\nmissing.png\n0\n0 0 0 0 0 0 0 0 0 0\n',
+                           encoding='utf-8')
+    samples = load_wider_face(annotations, tmp_path / 'images')
+    
+    results = run_grid(samples, {'haar': {'min_neighbors': [3, 5]}}, workers=2)
+    assert [r['params'] for r in results] == [{'min_neighbors': 3}, {'min_neighbors': 5}]
+    assert all(r['images'] == 1 and r['missing'] == 1 and r['num_gt'] == 1 for r in results)
+    table = format_table(results)
+    assert table.splitlines()[0].startswith('| detector | params | AP')
+    assert len(table.splitlines()) == 4
+
+
+def test_gender_calibration_matches_classifier(tmp_path):
+    """测试性别阈值标定：特征库缓存、网格搜索结果与分类器逐张分类一致"""
+    import cv2
+    import numpy as np
+    from yoloface.config.settings import GenderHeuristicSettings
+    from yoloface.detectors import Gender, GenderClassifier
+    from yoloface.evaluation import (extract_features, format_config_block, load_gender_dataset,
+                                     search_thresholds, threshold_grid)
+    
+    rng = np.random.default_rng(7)
+    for label, base in (('male', 90), ('female', 150)):
+        (tmp_path / label).mkdir()
+        for i in range(6):
+            size = (60 + 20 * i, 70 + 15 * i)
+            image = np.clip(rng.normal(base, 25 + 5 * i, size + (3,)), 0, 255).astype(np.uint8)
+            cv2.imwrite(str(tmp_path / label / f'{i}.png'), image)
+    faces = load_gender_dataset(tmp_path)
+    assert [face.label for face in faces] == [0] * 6 + [1] * 6
+    
+    cache = tmp_path / 'cache' / 'features.npy'
+    store = extract_features(faces, cache_path=str(cache), workers=2)
+    assert len(store) == 12 and cache.exists()
+    assert np.array_equal(extract_features(faces, cache_path=str(cache), workers=1), store)
+    
+    best = search_thresholds(store, threshold_grid(store, steps=5), top_k=3)
+    assert len(best) == 3 and best[0]['balanced_accuracy'] >= best[-1]['balanced_accuracy']
+    classifier = GenderClassifier(enabled=True, heuristic=GenderHeuristicSettings(**best[0]['thresholds']))
+    predicted = [classifier.predict(cv2.imread(face.image_path))[0] for face in faces]
+    correct = sum((gender == Gender.MALE) == (face.label == 1) for gender, face in zip(predicted, faces))
+    assert correct / len(faces) == pytest.approx(best[0]['accuracy'])
+    assert format_config_block(best[0]['thresholds']).startswith('detection:\n  gender:\n    heuristic:\n')
+
+
+def test_synthetic_video_is_deterministic_and_scorable(tmp_path):
+    """测试合成视频：确定性渲染、写盘后真值一致、作为多路采集源运行，并按真值评分"""
+    import numpy as np
+    from yoloface.evaluation import TrackingEvaluator
+    from yoloface.multi_stream import MultiStreamPipeline
+    from yoloface.utils.synthetic_video import (SyntheticVideo, load_truth, truth_arrays,
+                                                write_video)
+    
+    video = SyntheticVideo(seed=5, width=320, height=240, frames=12, faces=3, lifetime=6, light_switch=4)
+    frame, truth = video.render(7)
+    again, again_truth = SyntheticVideo(video.spec).render(7)
+    assert np.array_equal(frame, again) and truth == again_truth
+    assert all(0 <= f.box[0] < f.box[2] <= 320 and 0 <= f.box[1] < f.box[3] <= 240 for f in truth)
+    # 人脸消失后以新ID重新出现
+    ids = {face.track_id for i in range(len(video)) for face in video.truth(i)}
+    assert max(ids) > 3
+    
+    assert write_video(video, str(tmp_path / 'frames'), str(tmp_path / 'gt.txt')) == 12
+    assert len(list((tmp_path / 'frames').iterdir())) == 12
+    loaded = load_truth(str(tmp_path / 'gt.txt'), len(video))
+    assert [[(f.track_id, f.box) for f in faces] for faces in loaded] == \
+        [[(f.track_id, f.box) for f in video.truth(i)] for i in range(len(video))]
+    
+    # 真值作为跟踪结果得满分，交换ID计入ID切换
+    evaluator = TrackingEvaluator()
+    swapped = TrackingEvaluator()
+    for i in range(len(video)):
+        boxes, track_ids, ignore = truth_arrays(video.truth(i))
+        evaluator.add(boxes, track_ids, boxes, track_ids, ignore)
+        swapped.add(boxes, track_ids, boxes, track_ids[::-1] if i >= 6 else track_ids, ignore)
+    assert evaluator.summary()['mota'] == 1.0 and evaluator.summary()['id_switches'] == 0
+    assert swapped.summary()['id_switches'] > 0
+    
+    seen = []
+    pipeline = MultiStreamPipeline('haar', ['synthetic:1,frames=3', 'synthetic:2,frames=5,faces=1'],
+                                   sinks=[seen.append])
+    try:
+        pipeline.run()
+    finally:
+        pipeline.stop()
+    assert [stats.frames for stats in pipeline.stats] == [3, 5]
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
+
+
+def test_login_dialog_ignores_stale_tasks_and_keeps_started_registration(monkeypatch):
+    """测试登录对话框的后台任务：过期任务的结果被丢弃，已开始的注册不能取消并显示结果"""
+    pytest.importorskip('PyQt5')
+    monkeypatch.setenv('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtWidgets import QApplication
+    from yoloface.gui.login_dialog import LoginRegisterDialog
+    
+    class StubPool:
+        """只记录任务、不执行的线程池"""
+        def __init__(self):
+            self.tasks = []
+        
+        def start(self, task):
+            self.tasks.append(task)
+        
+        def waitForDone(self, msecs=-1):
+            return True
+    
+    app = QApplication.instance() or QApplication([])
+    assert app is not None
+    dialog = LoginRegisterDialog()
+    pool = dialog._thread_pool = StubPool()
+    results = []
+    
+    dialog.start_task("正在登录...", lambda: (True, "登录成功"), lambda *result: results.append(('login',) + result))
+    login = pool.tasks[0]
+    assert dialog.cancel_task() and login.cancelled and not dialog.busy
+    
+    def register():
+        # 写入期间取消被拒绝，任务继续
+        assert not dialog.cancel_task()
+        assert dialog.busy and not dialog.busy_cancel_btn.isEnabled()
+        return True, "注册成功"
+    
+    dialog.start_task("正在注册...", register, lambda *result: results.append(('register',) + result),
+                      cancellable=False)
+    registration = pool.tasks[1]
+    assert registration.task_id != login.task_id
+    
+    # 已取消任务排队结束后不执行，迟到的结果被丢弃
+    login.run()
+    assert dialog._take_task(login.task_id) is None
+    dialog._on_task_finished(login.task_id, True, "登录成功")
+    assert results == [] and dialog.busy
+    
+    # 同线程发出的信号直接调用处理函数
+    registration.run()
+    assert results == [('register', True, "注册成功")] and not dialog.busy
+    assert dialog._take_task(registration.task_id) is None
+    dialog.deleteLater()